@@ -0,0 +1,236 @@
+import argparse
+import contextlib
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import synthetic_data
+from instrumentation import peak_rss_mb, reset_peak_rss
+
+# -------------------------------------------------
+# Benchmark do pipeline sobre dados sintéticos (10x–1000x o export real)
+# -------------------------------------------------
+# Para cada escala, gera (ou reaproveita) um export sintético com
+# synthetic_data.py e roda as etapas load → clean → features → transform →
+# describe → plot num subprocesso novo, para que o pico de memória de uma
+# escala não contamine a seguinte. Cada etapa registra tempo de parede, pico
+# de RSS e linhas/s. O resultado vai para um JSON e pode ser comparado com
+# um baseline gravado antes, acusando regressões de tempo.
+#
+#   python src/benchmark.py --scales 100000 1000000
+#   python src/benchmark.py --scales 100000 --save-baseline
+#   python src/benchmark.py --scales 100000 --stages load clean transform
+
+BASE_DIR      = os.path.dirname(__file__)            # .../src
+RESULTS_PATH  = os.path.join(BASE_DIR, os.pardir, "data", "bench", "results.json")
+BASELINE_PATH = os.path.join(BASE_DIR, os.pardir, "data", "bench", "baseline.json")
+
+STAGES = ["load", "clean", "features", "transform", "describe", "plot"]
+DEFAULT_SCALES = [100_000, 1_000_000, 10_000_000]
+
+# Regressão: etapa mais lenta que o baseline além da tolerância relativa
+# e de uma diferença mínima absoluta (evita ruído em etapas de milissegundos)
+DEFAULT_TOLERANCE = 0.20
+MIN_ABS_DELTA_S = 0.05
+
+
+# -------------------------------------------------
+# 1) Medição: tempo de parede e pico de RSS por etapa
+# -------------------------------------------------
+
+def _timed(name, rows, func, *args):
+    reset_peak_rss()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        result = func(*args)
+        wall = time.perf_counter() - start
+    peak = peak_rss_mb()
+    if rows is None:
+        rows = len(result)   # etapa de leitura: linhas produzidas
+    metrics = {
+        "wall_s": round(wall, 4),
+        "peak_rss_mb": round(peak, 1) if peak is not None else None,
+        "rows": rows,
+        "rows_per_s": round(rows / wall, 1) if wall > 0 else None,
+    }
+    print(f"[bench]   {name:<10} {wall:9.3f} s  {metrics['peak_rss_mb']} MB  {metrics['rows_per_s']} linhas/s",
+          file=sys.stderr)
+    return result, metrics
+
+
+# -------------------------------------------------
+# 2) Execução de uma escala (roda dentro do subprocesso)
+# -------------------------------------------------
+
+def run_stages(raw_path, stages=STAGES):
+    """Roda as etapas pedidas sobre `raw_path` e devolve as métricas de cada uma."""
+    os.environ.setdefault("MPLBACKEND", "Agg")
+    import data_cleaning
+    import data_transformation
+    import descriptive_analysis
+    import exploratory_analysis
+    import feature_engineering
+    from ingestion import read_raw
+
+    # Etapas dependem das anteriores: roda o prefixo necessário, mede só as pedidas
+    last = max(STAGES.index(s) for s in stages)
+    needed = STAGES[:last + 1]
+    results = {}
+
+    def step(name, func, rows, *args):
+        if name in stages:
+            out, results[name] = _timed(name, rows, func, *args)
+            return out
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            return func(*args)
+
+    # Leitura direta do JSON (sem o cache de raw_cache.py): mede o parse
+    df_raw = step("load", read_raw, None, raw_path)
+    n_raw = len(df_raw)
+
+    if "clean" in needed:
+        df_clean = step("clean", data_cleaning.clean_data, n_raw, df_raw)
+        del df_raw
+    if "features" in needed:
+        df_features = step("features", feature_engineering.add_features, len(df_clean), df_clean)
+    if "transform" in needed:
+        df_transformed = step("transform", data_transformation.transform_data, len(df_features), df_features)
+        del df_features
+    if "describe" in needed:
+        step("describe", descriptive_analysis.describe_data, len(df_transformed), df_transformed)
+    if "plot" in needed:
+        # Gráficos vão para um diretório temporário, não para reports/
+        with tempfile.TemporaryDirectory() as tmp:
+            exploratory_analysis.REPORTS_DIR = tmp
+            step("plot", _plot_all, len(df_transformed), df_clean, df_transformed)
+    return {name: results[name] for name in STAGES if name in results}
+
+
+def _plot_all(df_clean, df_transformed):
+    import exploratory_analysis
+
+    charts = exploratory_analysis.explore_cleaned(df_clean)
+    charts += exploratory_analysis.plot_churn_by_category(df_transformed)
+    charts += exploratory_analysis.analyze_numeric_churn(df_transformed)
+    exploratory_analysis.render_report(charts, df_clean, df_transformed)
+
+
+def _run_scale_subprocess(raw_path, stages):
+    cmd = [sys.executable, os.path.abspath(__file__), "--run-one", raw_path, "--stages", *stages]
+    env = dict(os.environ, MPLBACKEND="Agg")
+    proc = subprocess.run(cmd, stdout=subprocess.PIPE, env=env, check=True, text=True)
+    return json.loads(proc.stdout)
+
+
+# -------------------------------------------------
+# 3) Resultados e comparação com o baseline
+# -------------------------------------------------
+
+def _git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR,
+                             capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(scales, stages=STAGES, seed=synthetic_data.DEFAULT_SEED):
+    results = {
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "seed": seed,
+        "stages": list(stages),
+        "runs": [],
+    }
+    for scale in scales:
+        print(f"[bench] Escala {scale:,} linhas: preparando dataset sintético...", file=sys.stderr)
+        raw_path = synthetic_data.ensure_dataset(scale, seed)
+        stage_metrics = _run_scale_subprocess(raw_path, stages)
+        results["runs"].append({
+            "scale": scale,
+            "raw_bytes": os.path.getsize(raw_path),
+            "stages": stage_metrics,
+            "total_s": round(sum(m["wall_s"] for m in stage_metrics.values()), 4),
+        })
+    return results
+
+
+def save_results(results, path=RESULTS_PATH):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    return path
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """Compara tempos por (escala, etapa); devolve a lista de regressões."""
+    base_runs = {run["scale"]: run for run in baseline.get("runs", [])}
+    regressions = []
+    print(f"\n{'escala':>12} {'etapa':<10} {'baseline_s':>11} {'atual_s':>9} {'razão':>7}")
+    for run in results["runs"]:
+        base = base_runs.get(run["scale"])
+        if base is None:
+            continue
+        for stage, metrics in run["stages"].items():
+            if stage not in base["stages"]:
+                continue
+            old, new = base["stages"][stage]["wall_s"], metrics["wall_s"]
+            ratio = new / old if old > 0 else float("inf")
+            flag = ""
+            if ratio > 1 + tolerance and new - old > MIN_ABS_DELTA_S:
+                flag = "  << REGRESSÃO"
+                regressions.append({"scale": run["scale"], "stage": stage,
+                                    "baseline_s": old, "current_s": new, "ratio": round(ratio, 3)})
+            print(f"{run['scale']:>12,} {stage:<10} {old:>11.3f} {new:>9.3f} {ratio:>7.2f}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark do pipeline Telecom X com dados sintéticos.")
+    parser.add_argument("--scales", nargs="+", type=int, default=DEFAULT_SCALES, help="linhas por execução")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES, help="etapas medidas")
+    parser.add_argument("--seed", type=int, default=synthetic_data.DEFAULT_SEED)
+    parser.add_argument("--output", default=RESULTS_PATH, help="arquivo JSON de resultados")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline para comparação")
+    parser.add_argument("--save-baseline", action="store_true", help="grava os resultados também como baseline")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="aumento relativo de tempo tolerado antes de acusar regressão")
+    parser.add_argument("--run-one", metavar="RAW_PATH", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.run_one:
+        # Modo interno: uma escala, métricas em JSON no stdout
+        print(json.dumps(run_stages(args.run_one, args.stages)))
+        return 0
+
+    results = run_benchmark(args.scales, args.stages, args.seed)
+    print("[bench] Resultados salvos em:", save_results(results, args.output))
+
+    if args.save_baseline:
+        print("[bench] Baseline salvo em:", save_results(results, args.baseline))
+        return 0
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        results["regressions"] = regressions
+        save_results(results, args.output)
+        if regressions:
+            print(f"\n[bench] {len(regressions)} regressão(ões) em relação ao baseline.")
+            return 1
+        print("\n[bench] Sem regressões em relação ao baseline.")
+    else:
+        print("[bench] Nenhum baseline em", args.baseline, "(use --save-baseline para criar).")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,157 @@
+import os
+import ast
+import json
+import hashlib
+
+import pandas as pd
+
+# -------------------------------------------------
+# Cache dos gráficos de reports/
+# -------------------------------------------------
+# Cada spec (ver report_renderer.py) recebe uma chave: o SHA-256 do spec
+# (sem a mensagem de console), do conteúdo exato das colunas que alimentam o
+# gráfico e do código que desenha (chart_summaries.py, report_renderer.py,
+# os módulos de src/ de que chart_summaries.py importa os cálculos e as
+# versões de matplotlib/seaborn). O manifesto .chart_cache.json, na
+# própria pasta dos PNGs, guarda por arquivo a chave e o (tamanho, mtime) do
+# PNG gravado. Se a chave não mudou e o PNG continua lá, intacto, o gráfico
+# não é renderizado de novo.
+#
+#   TELECOMX_CHART_CACHE=0   desliga o cache (renderiza tudo)
+
+MANIFEST_FILE = ".chart_cache.json"
+ENABLED = os.environ.get("TELECOMX_CHART_CACHE", "1") != "0"
+
+_CODE_FILES = ["chart_summaries.py", "report_renderer.py", "chart_cache.py"]
+# Os números dos gráficos vêm destes módulos e dos que chart_summaries importa
+# (correlation.py, exact_stats.py, stats_accumulators.py, ...), lidos dos imports
+_SUMMARIES_FILE = "chart_summaries.py"
+_code_fingerprint = None
+
+
+# -------------------------------------------------
+# 1) Chaves
+# -------------------------------------------------
+
+def code_files(src_dir):
+    """_CODE_FILES e os módulos de `src_dir` importados por chart_summaries.py."""
+    with open(os.path.join(src_dir, _SUMMARIES_FILE), "r", encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    modules = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            modules.add(node.module)
+        elif isinstance(node, ast.Import):
+            modules.update(alias.name for alias in node.names)
+    local = sorted(f"{name}.py" for name in modules if os.path.isfile(os.path.join(src_dir, f"{name}.py")))
+    return _CODE_FILES + [name for name in local if name not in _CODE_FILES]
+
+
+def code_fingerprint():
+    """Hash do código de desenho: mudar o renderizador invalida os gráficos antigos."""
+    global _code_fingerprint
+    if _code_fingerprint is None:
+        import matplotlib
+        import seaborn
+
+        digest = hashlib.sha256(f"{matplotlib.__version__}|{seaborn.__version__}".encode())
+        src_dir = os.path.dirname(os.path.abspath(__file__))
+        for name in code_files(src_dir):
+            with open(os.path.join(src_dir, name), "rb") as f:
+                digest.update(f.read())
+        _code_fingerprint = digest.hexdigest()
+    return _code_fingerprint
+
+
+def _column_digest(name, dtype):
+    return hashlib.sha256(f"{name}|{dtype}".encode())
+
+
+def _update_digest(digest, series):
+    # O hash é calculado valor a valor: ler a coluna em chunks dá o mesmo resultado
+    digest.update(pd.util.hash_pandas_object(series, index=False).to_numpy().tobytes())
+    return digest
+
+
+def column_fingerprint(series):
+    """Hash do conteúdo (valores, ordem, dtype) de uma coluna."""
+    return _update_digest(_column_digest(series.name, series.dtype), series).hexdigest()
+
+
+def chunked_fingerprints(read_chunks, columns):
+    """column_fingerprint de cada coluna de `columns`, lendo a tabela em chunks (`read_chunks(columns)`)."""
+    digests = {}
+    for chunk in read_chunks(list(columns)):
+        for col in columns:
+            if col not in digests:
+                digests[col] = _column_digest(col, chunk[col].dtype)
+            _update_digest(digests[col], chunk[col])
+    return {col: (digests[col] if col in digests else _column_digest(col, None)).hexdigest() for col in columns}
+
+
+def chart_key(spec, column_hashes):
+    """Chave de um spec dado o hash de cada uma das suas colunas de entrada."""
+    described = {k: v for k, v in spec.items() if k != "message"}
+    digest = hashlib.sha256(code_fingerprint().encode())
+    digest.update(json.dumps(described, sort_keys=True, default=str).encode())
+    for col in spec["columns"]:
+        digest.update(column_hashes[col].encode())
+    return digest.hexdigest()
+
+
+def chart_keys(specs, tables):
+    """Chave de cada spec; colunas usadas por vários gráficos são hasheadas uma vez só.
+
+    Tabelas passadas como leitor em chunks (ver chart_summaries.py) são lidas
+    numa só passada com todas as colunas pedidas.
+    """
+    hashes = {}
+    for name, table in tables.items():
+        if callable(table):
+            columns = list(dict.fromkeys(col for spec in specs if spec["table"] == name for col in spec["columns"]))
+            if columns:
+                hashes.update({(name, col): h for col, h in chunked_fingerprints(table, columns).items()})
+    keys = []
+    for spec in specs:
+        df = tables[spec["table"]]
+        for col in spec["columns"]:
+            if (spec["table"], col) not in hashes:
+                hashes[(spec["table"], col)] = column_fingerprint(df[col])
+        keys.append(chart_key(spec, {col: hashes[(spec["table"], col)] for col in spec["columns"]}))
+    return keys
+
+
+# -------------------------------------------------
+# 2) Manifesto
+# -------------------------------------------------
+
+def load_manifest(reports_dir):
+    try:
+        with open(os.path.join(reports_dir, MANIFEST_FILE), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_manifest(reports_dir, manifest):
+    tmp_path = os.path.join(reports_dir, f"{MANIFEST_FILE}.{os.getpid()}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, os.path.join(reports_dir, MANIFEST_FILE))
+
+
+def is_fresh(manifest, reports_dir, filename, key):
+    """True se o PNG gravado corresponde à chave (e não foi alterado nem removido)."""
+    entry = manifest.get(filename)
+    if not entry or entry["key"] != key:
+        return False
+    try:
+        stat = os.stat(os.path.join(reports_dir, filename))
+    except FileNotFoundError:
+        return False
+    return entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns
+
+
+def record(manifest, reports_dir, filename, key):
+    stat = os.stat(os.path.join(reports_dir, filename))
+    manifest[filename] = {"key": key, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
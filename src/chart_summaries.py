@@ -0,0 +1,411 @@
+import numpy as np
+import pandas as pd
+
+from correlation import chunked_comoments, correlation_matrix, frame_comoments, numeric_columns, table_comoments
+from exact_stats import WIDEN, open_windows, resolve_windows
+from stats_accumulators import (new_ordered_sum, new_sketch, ordered_sum, update_ordered_sum, update_selection,
+                                update_sketch)
+from stats_engine import interpolate, quantile_positions
+
+# -------------------------------------------------
+# Resumos pré-agregados para os gráficos de reports/
+# -------------------------------------------------
+# Os gráficos não recebem mais as linhas dos clientes: cada spec (ver
+# report_renderer.py) é reduzido aqui a um resumo pequeno, calculado com
+# operações vetorizadas sobre cada coluna:
+#   count        -> tabela de contagens (níveis de x × níveis de hue)
+#   hist/hist_by -> histograma de bins fixos + KDE aproximada por bins
+#   box          -> quartis, bigodes e outliers por grupo
+#   heatmap_corr -> matriz de correlação, a partir dos co-momentos de
+#                   correlation.py (com `stats_table`, os gravados da tabela)
+# O custo de desenhar a figura passa a depender do número de bins/níveis,
+# não do número de clientes.
+#
+# Tabelas maiores que a memória (modo out-of-core) entram como um leitor em
+# chunks em vez de um DataFrame: summarize_chart_chunks() chega ao mesmo
+# resumo com acumuladores combináveis e algumas passadas sobre a tabela
+# (contagens por par de valores, mínimo/máximo antes das bordas dos bins,
+# quartis por seleção exata de postos, co-momentos para a correlação).
+
+# KDE: mesma grade (200 pontos, sem extrapolar o intervalo dos dados) e largura
+# de banda (regra de Scott) do histplot(kde=True); os dados entram agrupados
+# em KDE_BINS bins finos em vez de um kernel por linha
+KDE_GRIDSIZE = 200
+KDE_BINS = 2048
+
+# Boxplot: no máximo MAX_FLIERS outliers distintos por caixa (igualmente
+# espaçados entre os valores ordenados, incluindo os extremos)
+BOX_WHIS = 1.5
+MAX_FLIERS = 2000
+# Em chunks, outliers distintos guardados por caixa entre um chunk e outro:
+# até esse número o resultado é o mesmo da leitura em memória; acima dele o
+# conjunto é afinado (igualmente espaçado, com os extremos) a cada chunk
+FLIER_BUFFER = 10 * MAX_FLIERS
+
+
+# -------------------------------------------------
+# 1) Preparação das colunas
+# -------------------------------------------------
+
+def plot_frame(df):
+    """Ajusta os tipos compactos de schema.py (anuláveis, categóricos) para os gráficos do seaborn."""
+    out = df.copy(deep=False)
+    for col in out.columns:
+        dtype = out[col].dtype
+        if isinstance(dtype, pd.CategoricalDtype):
+            # Categorias sem ocorrência (ex.: 'unknown') não viram barras vazias
+            out[col] = out[col].cat.remove_unused_categories()
+        elif str(dtype) == "boolean":
+            out[col] = out[col].astype(object).where(out[col].notna(), np.nan)
+        elif isinstance(dtype, pd.api.extensions.ExtensionDtype) and pd.api.types.is_integer_dtype(dtype):
+            out[col] = out[col].astype("float64")
+    return out
+
+
+def factorize(series):
+    """Níveis na ordem em que o seaborn os desenha e o código (-1 = ausente) de cada linha."""
+    series = plot_frame(series.to_frame())[series.name]
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return list(series.cat.categories), series.cat.codes.to_numpy()
+    codes, uniques = pd.factorize(series)
+    levels = list(uniques)
+    # Níveis numéricos (inclusive True/False) são ordenados; os demais ficam na ordem de aparição
+    if all(isinstance(v, (int, float, np.number, bool, np.bool_)) for v in levels):
+        order = np.argsort(np.asarray(levels, dtype="float64"), kind="stable")
+        remap = np.empty(len(levels), dtype=np.intp)
+        remap[order] = np.arange(len(levels))
+        codes = np.where(codes >= 0, remap[codes], -1)
+        levels = [levels[i] for i in order]
+    return levels, codes
+
+
+def numeric_values(series):
+    """Valores como float64 (texto numérico é convertido; o que não converte vira NaN)."""
+    if not pd.api.types.is_numeric_dtype(series.dtype) or isinstance(series.dtype, pd.CategoricalDtype):
+        series = pd.to_numeric(series.astype(object), errors="coerce")
+    return series.to_numpy(dtype="float64", na_value=np.nan)
+
+
+# -------------------------------------------------
+# 2) Resumos
+# -------------------------------------------------
+
+def count_table(x_levels, x_codes, hue_levels=None, hue_codes=None, weights=None):
+    """Contagens por nível de x (e de hue); linhas com valor ausente ficam de fora, como no countplot.
+
+    `weights` conta cada linha tantas vezes quanto o peso (ex.: contagens de pair_counts).
+    """
+    if hue_levels is None:
+        valid = x_codes >= 0
+        counts = np.bincount(x_codes[valid], minlength=len(x_levels),
+                             weights=None if weights is None else weights[valid])
+        return {"x_levels": x_levels, "hue_levels": None, "counts": counts.astype(np.int64)}
+    valid = (x_codes >= 0) & (hue_codes >= 0)
+    flat = x_codes[valid].astype(np.int64) * len(hue_levels) + hue_codes[valid]
+    counts = np.bincount(flat, minlength=len(x_levels) * len(hue_levels),
+                         weights=None if weights is None else weights[valid]).astype(np.int64)
+    return {"x_levels": x_levels, "hue_levels": hue_levels,
+            "counts": counts.reshape(len(x_levels), len(hue_levels))}
+
+
+def kde_curve(n, std, lo, hi, counts, edges, gridsize=KDE_GRIDSIZE):
+    """Densidade gaussiana (Scott) a partir do histograma fino (`counts`, `edges`) de `n` valores."""
+    bandwidth = std * n ** (-1 / 5)
+    centers = (edges[:-1] + edges[1:]) / 2
+    support = np.linspace(lo, hi, gridsize)
+    z = (support[:, None] - centers[None, :]) / bandwidth
+    density = np.exp(-0.5 * z * z) @ counts / (n * bandwidth * np.sqrt(2 * np.pi))
+    return {"support": support, "density": density}
+
+
+def binned_kde(values, gridsize=KDE_GRIDSIZE, bins=KDE_BINS):
+    """Densidade gaussiana (Scott) avaliada a partir de um histograma fino; None se for degenerada."""
+    n = values.size
+    if n < 2:
+        return None
+    std = values.std(ddof=1)
+    if not std > 0:
+        return None
+    lo, hi = values.min(), values.max()
+    counts, edges = np.histogram(values, bins=bins, range=(lo, hi))
+    return kde_curve(n, std, lo, hi, counts, edges, gridsize)
+
+
+def distribution(values, bins=30, kde=False):
+    """Histograma de `bins` bins fixos (mesmas bordas do histplot) e, se pedido, a KDE por bins."""
+    values = values[~np.isnan(values)]
+    if values.size == 0:
+        return None
+    counts, edges = np.histogram(values, bins=np.histogram_bin_edges(values, bins=bins))
+    return {"n": int(values.size), "edges": edges, "counts": counts,
+            "kde": binned_kde(values) if kde else None}
+
+
+def thin_sorted(values, size):
+    """No máximo `size` valores igualmente espaçados de `values` (ordenados), incluindo os extremos."""
+    if values.size <= size:
+        return values
+    return values[np.linspace(0, values.size - 1, size).round().astype(np.intp)]
+
+
+def box_stats(values, whis=BOX_WHIS, max_fliers=MAX_FLIERS):
+    """Quartis, bigodes e outliers no formato de Axes.bxp (mesma regra de matplotlib.cbook.boxplot_stats)."""
+    values = values[~np.isnan(values)]
+    if values.size == 0:
+        return None
+    q1, med, q3 = np.percentile(values, [25, 50, 75])
+    iqr = q3 - q1
+    inside_hi = values[values <= q3 + whis * iqr]
+    inside_lo = values[values >= q1 - whis * iqr]
+    whishi = inside_hi.max() if inside_hi.size else q3
+    whislo = inside_lo.min() if inside_lo.size else q1
+    fliers = thin_sorted(np.unique(values[(values < whislo) | (values > whishi)]), max_fliers)
+    return {"med": med, "q1": q1, "q3": q3, "whislo": whislo, "whishi": whishi,
+            "mean": values.mean(), "fliers": fliers}
+
+
+def grouped_box_stats(levels, codes, values):
+    """box_stats de `values` para cada nível (uma ordenação por código em vez de um filtro por grupo)."""
+    order = np.argsort(codes, kind="stable")
+    bounds = np.searchsorted(codes[order], np.arange(len(levels) + 1))
+    return [box_stats(values[order[bounds[i]:bounds[i + 1]]]) for i in range(len(levels))]
+
+
+def _heatmap_comoments(spec, columns, compute):
+    # `stats_table`: as linhas são as da tabela gravada, então valem as estatísticas dela
+    if spec.get("stats_table"):
+        return table_comoments(spec["stats_table"], columns, compute)
+    return compute()
+
+
+# -------------------------------------------------
+# 3) Resumo de cada spec
+# -------------------------------------------------
+
+def summarize_chart(spec, df, cache=None):
+    """Reduz `df` ao resumo que o spec precisa; `cache` reaproveita colunas já fatoradas/convertidas."""
+    cache = {} if cache is None else cache
+
+    def levels(col):
+        key = ("levels", spec["table"], col)
+        if key not in cache:
+            cache[key] = factorize(df[col])
+        return cache[key]
+
+    def numbers(col):
+        key = ("numbers", spec["table"], col)
+        if key not in cache:
+            cache[key] = numeric_values(df[col])
+        return cache[key]
+
+    kind = spec["kind"]
+    if kind == "count":
+        if spec.get("hue") is None:
+            return count_table(*levels(spec["x"]))
+        return count_table(*levels(spec["x"]), *levels(spec["hue"]))
+    if kind == "hist":
+        return distribution(numbers(spec["x"]), spec.get("bins", 30), spec.get("kde", False))
+    if kind == "hist_by":
+        by_levels, by_codes = levels(spec["by"])
+        values = numbers(spec["x"])
+        groups = []
+        for value, _, _ in spec["groups"]:
+            mask = by_codes == by_levels.index(value) if value in by_levels else np.zeros(len(values), bool)
+            groups.append(distribution(values[mask], spec.get("bins", 30), spec.get("kde", False)))
+        return {"groups": groups}
+    if kind == "box":
+        x_levels, x_codes = levels(spec["x"])
+        return {"levels": x_levels, "stats": grouped_box_stats(x_levels, x_codes, numbers(spec["y"]))}
+    if kind == "heatmap_corr":
+        df = plot_frame(df)
+        columns = numeric_columns(df)
+        return {"corr": correlation_matrix(_heatmap_comoments(spec, columns, lambda: frame_comoments(df, columns)))}
+    raise ValueError(f"Tipo de gráfico desconhecido: {kind!r}")
+
+
+# -------------------------------------------------
+# 4) Resumos lidos em chunks (tabelas maiores que a memória)
+# -------------------------------------------------
+# `read_chunks(columns)` abre uma nova leitura só das colunas pedidas (ex.:
+# storage.iter_table_chunks); cada resumo abaixo é igual ao da seção 3 sobre
+# a tabela inteira.
+
+COUNT_COL = "_contagem"
+
+
+def pair_counts(chunks, columns):
+    """Contagem de cada combinação distinta de `columns` (ausentes incluídos), na ordem de primeira aparição.
+
+    As categóricas mantêm as categorias do esquema; fatorar as colunas do
+    resultado dá os mesmos níveis (e a mesma ordem) que fatorar a tabela.
+    """
+    columns = list(columns)
+    acc = None
+    for chunk in chunks:
+        part = chunk[columns].assign(**{COUNT_COL: np.int64(1)})
+        if acc is not None:
+            part = pd.concat([acc, part], ignore_index=True)
+        acc = part.groupby(columns, dropna=False, observed=True, sort=False)[COUNT_COL].sum().reset_index()
+    if acc is None:
+        return pd.DataFrame({**{col: pd.Series(dtype=object) for col in columns},
+                             COUNT_COL: pd.Series(dtype=np.int64)})
+    return acc
+
+
+def _chunk_groups(chunk, x, group_values):
+    """Valores (float64, sem ausentes) de `x` no chunk para cada valor de grupo (None = todas as linhas)."""
+    values = numeric_values(chunk[x])
+    out = []
+    for by, value in group_values:
+        if by is None:
+            kept = values
+        else:
+            levels, codes = factorize(chunk[by])
+            kept = values[codes == levels.index(value)] if value in levels else values[:0]
+        out.append(kept[~np.isnan(kept)])
+    return out
+
+
+def _distributions(read_groups, n_groups, bins=30, kde=False):
+    """distribution() de cada grupo; `read_groups()` gera, por chunk, a lista de valores de cada grupo."""
+    tracks = [{"n": 0, "lo": np.inf, "hi": -np.inf, "sum": new_ordered_sum("float64")} for _ in range(n_groups)]
+    for groups in read_groups():
+        for track, values in zip(tracks, groups):
+            if values.size:
+                track["n"] += values.size
+                track["lo"], track["hi"] = min(track["lo"], values.min()), max(track["hi"], values.max())
+                update_ordered_sum(track["sum"], values)
+
+    for track in tracks:
+        if track["n"]:
+            track["edges"] = np.histogram_bin_edges(np.array([track["lo"], track["hi"]]), bins=bins)
+            track["counts"] = np.zeros(len(track["edges"]) - 1, dtype=np.int64)
+            track["mean"] = ordered_sum(track["sum"]) / track["n"]
+            track["sq"] = new_ordered_sum("float64")
+            track["fine"] = np.zeros(KDE_BINS, dtype=np.int64)
+    for groups in read_groups():
+        for track, values in zip(tracks, groups):
+            if values.size:
+                track["counts"] += np.histogram(values, bins=track["edges"])[0]
+                if kde:
+                    deviations = values - track["mean"]
+                    update_ordered_sum(track["sq"], np.multiply(deviations, deviations, out=deviations))
+                    counts, track["fine_edges"] = np.histogram(values, bins=KDE_BINS,
+                                                               range=(track["lo"], track["hi"]))
+                    track["fine"] += counts
+
+    out = []
+    for track in tracks:
+        if not track["n"]:
+            out.append(None)
+            continue
+        curve = None
+        if kde and track["n"] >= 2:
+            std = np.sqrt(ordered_sum(track["sq"]) / (track["n"] - 1))
+            if std > 0:
+                curve = kde_curve(track["n"], std, track["lo"], track["hi"], track["fine"], track["fine_edges"])
+        out.append({"n": int(track["n"]), "edges": track["edges"], "counts": track["counts"], "kde": curve})
+    return out
+
+
+def _box_stats_groups(read_groups, n_groups, whis=BOX_WHIS, max_fliers=MAX_FLIERS, flier_buffer=FLIER_BUFFER):
+    """box_stats() de cada grupo: quartis por seleção exata de postos, depois bigodes e outliers.
+
+    Cada caixa guarda no máximo `flier_buffer` outliers distintos durante a leitura.
+    """
+    tracks = [{"n": 0, "lo": np.inf, "hi": -np.inf, "sum": new_ordered_sum("float64"), "sketch": new_sketch(),
+               "ranked": {}} for _ in range(n_groups)]
+    for groups in read_groups():
+        for track, values in zip(tracks, groups):
+            if values.size:
+                track["n"] += values.size
+                track["lo"], track["hi"] = min(track["lo"], values.min()), max(track["hi"], values.max())
+                update_ordered_sum(track["sum"], values)
+                update_sketch(track["sketch"], values)
+
+    percentiles = [0.25, 0.5, 0.75]
+    pending = []
+    for i, track in enumerate(tracks):
+        if track["n"]:
+            prev, nxt, _ = quantile_positions(track["n"], percentiles)
+            track["ranks"] = [list(g) for g in dict.fromkeys(tuple(sorted({int(a), int(b)}))
+                                                             for a, b in zip(prev, nxt))]
+            pending.append(i)
+    widen = 1
+    while pending:
+        for i in pending:
+            track = tracks[i]
+            track["windows"] = open_windows(track["sketch"], track["n"], track["lo"], track["hi"],
+                                            track["ranks"], widen)
+        for groups in read_groups():
+            for i in pending:
+                for _, selection in tracks[i]["windows"]:
+                    update_selection(selection, groups[i])
+        pending = [i for i in pending if not resolve_windows(tracks[i]["windows"], tracks[i]["ranked"])]
+        widen *= WIDEN
+
+    for track in tracks:
+        if track["n"]:
+            prev, nxt, gamma = quantile_positions(track["n"], percentiles)
+            a = np.array([track["ranked"][int(i)] for i in prev])
+            b = np.array([track["ranked"][int(i)] for i in nxt])
+            track["q1"], track["med"], track["q3"] = interpolate(a, b, gamma)
+            iqr = track["q3"] - track["q1"]
+            track["bounds"] = (track["q1"] - whis * iqr, track["q3"] + whis * iqr)
+            track["whislo"], track["whishi"], track["fliers"] = np.inf, -np.inf, np.empty(0)
+    for groups in read_groups():
+        for track, values in zip(tracks, groups):
+            if values.size:
+                low, high = track["bounds"]
+                inside_hi, inside_lo = values[values <= high], values[values >= low]
+                if inside_hi.size:
+                    track["whishi"] = max(track["whishi"], inside_hi.max())
+                if inside_lo.size:
+                    track["whislo"] = min(track["whislo"], inside_lo.min())
+                # Abaixo do menor valor >= low (ou acima do maior <= high) = fora de [low, high]
+                track["fliers"] = thin_sorted(np.union1d(track["fliers"], values[(values < low) | (values > high)]),
+                                              flier_buffer)
+
+    out = []
+    for track in tracks:
+        if not track["n"]:
+            out.append(None)
+            continue
+        whishi = track["whishi"] if np.isfinite(track["whishi"]) else track["q3"]
+        whislo = track["whislo"] if np.isfinite(track["whislo"]) else track["q1"]
+        fliers = thin_sorted(track["fliers"], max_fliers)
+        out.append({"med": track["med"], "q1": track["q1"], "q3": track["q3"], "whislo": whislo,
+                    "whishi": whishi, "mean": ordered_sum(track["sum"]) / track["n"], "fliers": fliers})
+    return out
+
+
+def summarize_chart_chunks(spec, read_chunks):
+    """Mesmo resumo de summarize_chart lendo a tabela em chunks (`read_chunks(columns)`)."""
+    kind = spec["kind"]
+    if kind == "count":
+        columns = [spec["x"]] if spec.get("hue") is None else [spec["x"], spec["hue"]]
+        pairs = pair_counts(read_chunks(columns), columns)
+        weights = pairs[COUNT_COL].to_numpy()
+        if spec.get("hue") is None:
+            return count_table(*factorize(pairs[spec["x"]]), weights=weights)
+        return count_table(*factorize(pairs[spec["x"]]), *factorize(pairs[spec["hue"]]), weights=weights)
+    if kind == "hist":
+        groups = [(None, None)]
+        read_groups = lambda: (_chunk_groups(c, spec["x"], groups) for c in read_chunks([spec["x"]]))
+        return _distributions(read_groups, 1, spec.get("bins", 30), spec.get("kde", False))[0]
+    if kind == "hist_by":
+        groups = [(spec["by"], value) for value, _, _ in spec["groups"]]
+        read_groups = lambda: (_chunk_groups(c, spec["x"], groups)
+                               for c in read_chunks([spec["by"], spec["x"]]))
+        return {"groups": _distributions(read_groups, len(groups), spec.get("bins", 30), spec.get("kde", False))}
+    if kind == "box":
+        pairs = pair_counts(read_chunks([spec["x"]]), [spec["x"]])
+        x_levels, _ = factorize(pairs[spec["x"]])
+        groups = [(spec["x"], level) for level in x_levels]
+        read_groups = lambda: (_chunk_groups(c, spec["y"], groups) for c in read_chunks([spec["x"], spec["y"]]))
+        return {"levels": x_levels, "stats": _box_stats_groups(read_groups, len(groups))}
+    if kind == "heatmap_corr":
+        columns = spec["columns"]
+        compute = lambda: chunked_comoments((plot_frame(c) for c in read_chunks(columns)), columns)
+        return {"corr": correlation_matrix(_heatmap_comoments(spec, columns, compute))}
+    raise ValueError(f"Tipo de gráfico desconhecido: {kind!r}")
@@ -0,0 +1,292 @@
+import os
+import json
+import errno
+import filecmp
+import shutil
+import uuid
+import numpy as np
+import pandas as pd
+
+# -------------------------------------------------
+# Formato colunar binário (um .npy por coluna + meta.json)
+# -------------------------------------------------
+# Cada tabela é um diretório:
+#   meta.json        -> número de linhas e descrição de cada coluna
+#   c<i>.npy         -> valores (numéricos) ou códigos (dicionário/categórica) da coluna i
+#   c<i>.cats.npy    -> categorias da coluna i, quando todas são strings
+#   c<i>.mask.npy    -> máscara de nulos (strings sem dicionário e tipos anuláveis)
+# Só usamos numpy (.npy sem pickle), então a leitura é uma cópia direta do
+# disco para o array, sem reparsear texto nem reinferir tipos.
+
+FORMAT_VERSION = 1
+META_FILE = "meta.json"
+
+# Acima desta razão (únicos / linhas) a coluna de texto é salva como string
+# de largura fixa, sem dicionário (ex.: customerID).
+DICTIONARY_MAX_RATIO = 0.5
+
+
+def _codes_dtype(n_categories):
+    if n_categories < np.iinfo("int8").max:
+        return "int8"
+    if n_categories < np.iinfo("int16").max:
+        return "int16"
+    return "int32"
+
+
+def _all_str(values):
+    return all(isinstance(v, str) for v in values)
+
+
+# -------------------------------------------------
+# 1) Escrita
+# -------------------------------------------------
+
+def _write_categories(directory, i, categories, col_meta):
+    if _all_str(categories):
+        np.save(os.path.join(directory, f"c{i}.cats.npy"), np.array(categories, dtype=str))
+    else:
+        # Categorias mistas (ex.: Churn com True/False e ""): guardadas no meta.json
+        col_meta["categories"] = [v.item() if isinstance(v, np.generic) else v for v in categories]
+
+
+def _write_categorical_column(directory, i, series, col_meta):
+    cat = series.cat
+    col_meta["kind"] = "categorical"
+    col_meta["ordered"] = bool(cat.ordered)
+    n_categories = len(cat.categories)
+    np.save(os.path.join(directory, f"c{i}.npy"), cat.codes.to_numpy().astype(_codes_dtype(n_categories)))
+    _write_categories(directory, i, list(cat.categories), col_meta)
+
+
+def _write_object_column(directory, i, series, col_meta):
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    n = len(series)
+    uniques = list(uniques)
+
+    if _all_str(uniques) and n > 0 and len(uniques) > DICTIONARY_MAX_RATIO * n:
+        # Alta cardinalidade: string de largura fixa + máscara de nulos
+        mask = codes == -1
+        values = series.where(~mask, "").to_numpy(dtype=str)
+        np.save(os.path.join(directory, f"c{i}.npy"), values)
+        if mask.any():
+            np.save(os.path.join(directory, f"c{i}.mask.npy"), mask)
+            col_meta["mask"] = True
+        col_meta["kind"] = "string"
+        return
+
+    col_meta["kind"] = "dictionary"
+    np.save(os.path.join(directory, f"c{i}.npy"), codes.astype(_codes_dtype(len(uniques))))
+    _write_categories(directory, i, uniques, col_meta)
+
+
+def _write_masked_column(directory, i, series, col_meta):
+    # Tipos anuláveis (Int8, boolean, ...): valores no dtype numpy + máscara de nulos
+    mask = series.isna().to_numpy()
+    values = series.to_numpy(dtype=series.dtype.numpy_dtype, na_value=0)
+    np.save(os.path.join(directory, f"c{i}.npy"), values)
+    np.save(os.path.join(directory, f"c{i}.mask.npy"), mask)
+    col_meta["kind"] = "masked"
+
+
+def _same_tree(a, b):
+    """True se os diretórios `a` e `b` têm os mesmos arquivos com o mesmo conteúdo."""
+    names = sorted(os.listdir(a))
+    if names != sorted(os.listdir(b)):
+        return False
+    for name in names:
+        pa, pb = os.path.join(a, name), os.path.join(b, name)
+        if os.path.isdir(pa) != os.path.isdir(pb):
+            return False
+        if not (_same_tree(pa, pb) if os.path.isdir(pa) else filecmp.cmp(pa, pb, shallow=False)):
+            return False
+    return True
+
+
+def replace_directory(tmp_dir, directory):
+    """Instala `tmp_dir` (já completo) em `directory`, substituindo a versão anterior.
+
+    A versão antiga é renomeada para o lado, a nova entra com um rename e só
+    então a antiga é apagada: a tabela não fica ausente durante o rmtree. Se
+    outro escritor (estágios em paralelo) instalou a dele entre os dois
+    renames, o rename falha com ENOTEMPTY/EEXIST; com o mesmo conteúdo isso é
+    sucesso e o temporário é descartado, senão tenta de novo (vale o último).
+    """
+    parent = os.path.dirname(os.path.abspath(directory))
+    while True:
+        old_dir = os.path.join(parent, f".old-{uuid.uuid4().hex}")
+        try:
+            os.rename(directory, old_dir)
+        except FileNotFoundError:
+            old_dir = None
+        try:
+            os.rename(tmp_dir, directory)
+            return directory
+        except OSError as exc:
+            if exc.errno not in (errno.ENOTEMPTY, errno.EEXIST):
+                raise
+            try:
+                same = _same_tree(tmp_dir, directory)
+            except FileNotFoundError:
+                same = False  # um terceiro escritor já a moveu para o lado: tenta de novo
+            if same:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+                return directory
+        finally:
+            if old_dir is not None:
+                shutil.rmtree(old_dir, ignore_errors=True)
+
+
+def write_frame(df, directory, extra_files=None):
+    """Grava `df` no formato colunar de forma atômica (diretório temporário + rename).
+
+    `extra_files` ({nome: texto}) são gravados no mesmo diretório temporário,
+    para entrarem junto com as colunas na troca atômica.
+    """
+    parent = os.path.dirname(os.path.abspath(directory))
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = os.path.join(parent, f".tmp-{uuid.uuid4().hex}")
+    os.makedirs(tmp_dir)
+
+    try:
+        meta = {"format_version": FORMAT_VERSION, "n_rows": len(df), "columns": []}
+        for i, col in enumerate(df.columns):
+            series = df[col]
+            col_meta = {"name": col, "dtype": str(series.dtype)}
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                _write_categorical_column(tmp_dir, i, series, col_meta)
+            elif series.dtype == object:
+                _write_object_column(tmp_dir, i, series, col_meta)
+            elif isinstance(series.dtype, pd.api.extensions.ExtensionDtype):
+                _write_masked_column(tmp_dir, i, series, col_meta)
+            else:
+                col_meta["kind"] = "numeric"
+                np.save(os.path.join(tmp_dir, f"c{i}.npy"), series.to_numpy())
+            meta["columns"].append(col_meta)
+
+        with open(os.path.join(tmp_dir, META_FILE), "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        for name, text in (extra_files or {}).items():
+            with open(os.path.join(tmp_dir, name), "w", encoding="utf-8") as f:
+                f.write(text)
+
+        replace_directory(tmp_dir, directory)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    return directory
+
+
+# -------------------------------------------------
+# 2) Leitura (com projeção de colunas)
+# -------------------------------------------------
+
+def read_meta(directory):
+    with open(os.path.join(directory, META_FILE), "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    if meta.get("format_version") != FORMAT_VERSION:
+        raise ValueError(f"Versão de formato colunar não suportada em {directory}")
+    return meta
+
+
+def _read_column(directory, i, col_meta, mmap_mode=None, rows=None):
+    # `rows` (slice) lê só um trecho: com mmap_mode, só esse trecho sai do disco
+    rows = slice(None) if rows is None else rows
+    values = np.load(os.path.join(directory, f"c{i}.npy"), mmap_mode=mmap_mode)[rows]
+    kind = col_meta["kind"]
+
+    if kind == "numeric":
+        return values
+
+    if kind == "masked":
+        mask = np.load(os.path.join(directory, f"c{i}.mask.npy"), mmap_mode=mmap_mode)[rows]
+        out = pd.array(np.asarray(values), dtype=col_meta["dtype"])
+        out[np.asarray(mask)] = pd.NA
+        return out
+
+    if kind == "string":
+        out = values.astype(object)
+        if col_meta.get("mask"):
+            mask = np.load(os.path.join(directory, f"c{i}.mask.npy"), mmap_mode=mmap_mode)[rows]
+            out[np.asarray(mask)] = np.nan
+        return out
+
+    if "categories" in col_meta:
+        cats = col_meta["categories"]
+    else:
+        cats = np.load(os.path.join(directory, f"c{i}.cats.npy")).astype(object)
+
+    if kind == "categorical":
+        return pd.Categorical.from_codes(
+            np.asarray(values), categories=cats, ordered=col_meta.get("ordered", False)
+        )
+
+    # Dicionário: reconstrói a coluna de objetos a partir dos códigos
+    categories = np.empty(len(cats) + 1, dtype=object)
+    categories[:-1] = cats
+    categories[-1] = np.nan  # código -1 aponta para o último slot (nulo)
+    return categories[np.asarray(values)]
+
+
+def _resolve_columns(directory, meta, columns):
+    by_name = {c["name"]: (i, c) for i, c in enumerate(meta["columns"])}
+    if columns is None:
+        columns = [c["name"] for c in meta["columns"]]
+    missing = [c for c in columns if c not in by_name]
+    if missing:
+        raise KeyError(f"Colunas não encontradas em {directory}: {missing}")
+    return [(col, *by_name[col]) for col in columns]
+
+
+def read_frame(directory, columns=None, mmap_mode=None):
+    """Lê a tabela colunar; `columns` limita a leitura às colunas pedidas."""
+    meta = read_meta(directory)
+    resolved = _resolve_columns(directory, meta, columns)
+    data = {col: _read_column(directory, i, col_meta, mmap_mode=mmap_mode) for col, i, col_meta in resolved}
+    return pd.DataFrame(data, columns=[col for col, _, _ in resolved], index=pd.RangeIndex(meta["n_rows"]))
+
+
+def _read_rows(directory, resolved, start, stop):
+    rows = slice(start, stop)
+    data = {}
+    for col, i, col_meta in resolved:
+        values = _read_column(directory, i, col_meta, mmap_mode="r", rows=rows)
+        # Cópia do trecho: o DataFrame não segura o mapeamento do arquivo inteiro
+        data[col] = np.array(values) if isinstance(values, np.memmap) else values
+    return pd.DataFrame(data, columns=[col for col, _, _ in resolved], index=pd.RangeIndex(start, stop))
+
+
+def read_frame_rows(directory, start, stop, columns=None):
+    """Só as linhas [start, stop) da tabela colunar (arquivos mapeados em memória); índice = posições."""
+    meta = read_meta(directory)
+    stop = min(stop, meta["n_rows"])
+    return _read_rows(directory, _resolve_columns(directory, meta, columns), start, max(start, stop))
+
+
+def iter_frame_chunks(directory, chunk_rows, columns=None):
+    """Gera a tabela colunar em DataFrames de até `chunk_rows` linhas (arquivos mapeados em memória)."""
+    if chunk_rows <= 0:
+        raise ValueError("chunk_rows deve ser positivo")
+    meta = read_meta(directory)
+    resolved = _resolve_columns(directory, meta, columns)
+    for start in range(0, meta["n_rows"], chunk_rows):
+        yield _read_rows(directory, resolved, start, min(start + chunk_rows, meta["n_rows"]))
+
+
+def read_column_array(directory, name):
+    """Coluna numérica mapeada em memória (sem cópia), ex.: posições gravadas junto da tabela."""
+    meta = read_meta(directory)
+    for i, col_meta in enumerate(meta["columns"]):
+        if col_meta["name"] == name:
+            if col_meta["kind"] != "numeric":
+                raise ValueError(f"Coluna '{name}' de {directory} não é numérica")
+            return np.load(os.path.join(directory, f"c{i}.npy"), mmap_mode="r")
+    raise KeyError(f"Coluna não encontrada em {directory}: {name}")
+
+
+def directory_size(directory):
+    total = 0
+    for root, _, files in os.walk(directory):
+        for name in files:
+            total += os.path.getsize(os.path.join(root, name))
+    return total
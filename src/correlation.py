@@ -0,0 +1,120 @@
+import os
+import uuid
+import numpy as np
+
+from instrumentation import span
+from stats_accumulators import comoment_corr, merge_comoments, new_comoments, remove_comoments, update_comoments
+from storage import CLEAN_DIR, table_path
+
+# -------------------------------------------------
+# Matriz de correlação incremental (estatísticas suficientes)
+# -------------------------------------------------
+# A correlação de Pearson de cada par de colunas sai das estatísticas
+# suficientes do par (co-momentos de stats_accumulators.py, seção 8):
+# contagem, média, soma dos quadrados dos desvios e soma dos produtos dos
+# desvios. São as somas, somas de quadrados e produtos cruzados, guardadas
+# já centradas: com valores na casa dos milhares (ex.: cobrança total) as
+# somas brutas perderiam os dígitos que a correlação usa.
+#
+# As estatísticas são atualizadas chunk a chunk, combinadas entre partições
+# (out_of_core.py) e ajustadas pelos deltas de incremental.py (retira as
+# linhas removidas/alteradas e soma as novas), sem reler a tabela. Ficam
+# gravadas em data/clean/<tabela>.corr.npz junto com o mtime da tabela que
+# descrevem; se a tabela mudou por outro caminho, são recalculadas. A matriz
+# sai das estatísticas em O(k²), sem tocar nas linhas.
+
+STATS_SUFFIX = ".corr.npz"
+
+
+# -------------------------------------------------
+# 1) Estatísticas de DataFrames
+# -------------------------------------------------
+
+def numeric_columns(df):
+    return df.select_dtypes(include="number").columns.tolist()
+
+
+def frame_comoments(df, columns=None, acc=None):
+    """Acrescenta as linhas de `df` (colunas `columns`, padrão: as numéricas) ao acumulador."""
+    columns = numeric_columns(df) if columns is None else list(columns)
+    acc = new_comoments(columns) if acc is None else acc
+    return update_comoments(acc, df[columns].to_numpy(dtype="float64", na_value=np.nan))
+
+
+def chunked_comoments(chunks, columns):
+    """Co-momentos de `columns` numa passada pelos chunks (DataFrames)."""
+    acc = new_comoments(columns)
+    for chunk in chunks:
+        frame_comoments(chunk, columns, acc)
+    return acc
+
+
+def apply_delta(acc, removed=None, added=None):
+    """Estatísticas depois de tirar as linhas de `removed` e acrescentar as de `added` (DataFrames)."""
+    columns = acc["columns"]
+    if removed is not None and len(removed):
+        acc = remove_comoments(acc, frame_comoments(removed, columns))
+    if added is not None and len(added):
+        acc = merge_comoments(acc, frame_comoments(added, columns))
+    return acc
+
+
+def correlation_matrix(acc):
+    """Matriz de Pearson (DataFrame, como DataFrame.corr) em O(k²) a partir das estatísticas."""
+    return comoment_corr(acc)
+
+
+# -------------------------------------------------
+# 2) Persistência junto da tabela
+# -------------------------------------------------
+
+def _stats_path(table, directory):
+    return os.path.join(directory, table + STATS_SUFFIX)
+
+
+def _table_version(table, directory):
+    # Mesmo critério de storage.resolve_format: o mtime do arquivo da tabela
+    try:
+        path = table_path(table, directory)
+    except FileNotFoundError:
+        return None
+    return f"{os.path.basename(path)}:{os.stat(path).st_mtime_ns}"
+
+
+def save_correlation(acc, table, directory=CLEAN_DIR):
+    """Grava as estatísticas da tabela `table` (já salva) de forma atômica; devolve o caminho."""
+    path = _stats_path(table, directory)
+    tmp_path = os.path.join(directory, f".tmp-{uuid.uuid4().hex}.npz")
+    with open(tmp_path, "wb") as f:
+        np.savez(f, columns=np.array(acc["columns"], dtype=str),
+                 version=np.array(_table_version(table, directory) or "", dtype=str),
+                 n=acc["n"], mean=acc["mean"], m2=acc["m2"], cross=acc["cross"])
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_correlation(table, columns=None, directory=CLEAN_DIR):
+    """Estatísticas gravadas de `table`, ou None se faltam, são de outra versão da tabela ou de outras colunas."""
+    path = _stats_path(table, directory)
+    if not os.path.exists(path):
+        return None
+    with np.load(path, allow_pickle=False) as data:
+        stored_columns = data["columns"].tolist()
+        if str(data["version"]) != _table_version(table, directory):
+            return None
+        if columns is not None and stored_columns != list(columns):
+            return None
+        return {"columns": stored_columns, "n": data["n"], "mean": data["mean"],
+                "m2": data["m2"], "cross": data["cross"]}
+
+
+def table_comoments(table, columns, compute, directory=CLEAN_DIR):
+    """Estatísticas gravadas de `table` se ainda valem; senão `compute()` e grava o resultado."""
+    with span("table_comoments", table=table) as info:
+        acc = load_correlation(table, columns, directory)
+        info["stored"] = acc is not None
+        if acc is None:
+            acc = compute()
+            if _table_version(table, directory) is not None:
+                save_correlation(acc, table, directory)
+    return acc
@@ -0,0 +1,251 @@
+import os
+import sys
+import json
+import shutil
+import uuid
+import numpy as np
+import pandas as pd
+
+from columnar import replace_directory
+from feature_matrix import MATRIX_DIR, load_features, read_index
+from instrumentation import span
+
+# -------------------------------------------------
+# Índice de clientes (ID_Cliente → linha da matriz de features)
+# -------------------------------------------------
+# Consultas pontuais ("o registro transformado do cliente 0002-ORFBO") não
+# precisam ler a tabela inteira: o índice guarda os IDs ordenados e, para
+# cada um, a posição da linha na matriz de features (feature_matrix.py):
+#   keys.npy     -> IDs em ordem crescente (texto de largura fixa)
+#   rows.npy     -> posição (int64) de cada ID na matriz
+#   index.json   -> número de chaves e o build da matriz indexada
+# Os dois .npy são abertos com mmap: uma consulta é uma busca binária
+# (np.searchsorted, O(log n)) que toca poucas páginas do arquivo, e um lote
+# de IDs é resolvido numa única chamada vetorizada. As linhas encontradas
+# são lidas da matriz mapeada só nas posições pedidas.
+#
+# Atualização incremental: incremental.py já sabe, ao mesclar o delta, para
+# onde foi cada linha da tabela anterior e onde entraram as linhas novas.
+# apply_delta() usa esse mapa de posições: as posições das chaves mantidas
+# são remapeadas (só inteiros, O(n)), as que saíram são descartadas e só os
+# IDs novos/alterados são ordenados e intercalados na lista já ordenada.
+# As demais gravações reconstroem o índice (build_index). O índice só é
+# usado se o build gravado for o da matriz atual; senão, é reconstruído a
+# partir da coluna de IDs da matriz.
+
+INDEX_DIR = os.path.join(os.path.dirname(MATRIX_DIR), "telecom_churn_transformed.index")
+KEY_COLUMN = "ID_Cliente"
+INDEX_FILE = "index.json"
+FORMAT_VERSION = 1
+
+
+# -------------------------------------------------
+# 1) Construção e atualização
+# -------------------------------------------------
+
+def _read_keys(directory, mmap_mode=None):
+    keys = np.load(os.path.join(directory, "keys.npy"), mmap_mode=mmap_mode)
+    rows = np.load(os.path.join(directory, "rows.npy"), mmap_mode=mmap_mode)
+    return keys, rows
+
+
+def _staged(directory, write):
+    """Grava o índice via `write(tmp_dir, meta)` num diretório temporário e troca de forma atômica."""
+    parent = os.path.dirname(os.path.abspath(directory))
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = os.path.join(parent, f".tmp-{uuid.uuid4().hex}")
+    os.makedirs(tmp_dir)
+    try:
+        meta = {"format_version": FORMAT_VERSION}
+        write(tmp_dir, meta)
+        with open(os.path.join(tmp_dir, INDEX_FILE), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        replace_directory(tmp_dir, directory)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    return directory
+
+
+def _write_index(keys, rows, build, directory):
+    def write(tmp_dir, meta):
+        np.save(os.path.join(tmp_dir, "keys.npy"), keys)
+        np.save(os.path.join(tmp_dir, "rows.npy"), rows)
+        meta.update(keys=len(keys), build=build)
+    return _staged(directory, write)
+
+
+def build_index(ids, build=None, directory=INDEX_DIR):
+    """Grava o índice de `ids` (IDs na ordem das linhas da matriz do build `build`)."""
+    keys = np.asarray(ids, dtype=str)
+    if not pd.Index(keys).is_unique:
+        raise ValueError(f"'{KEY_COLUMN}' tem IDs repetidos; o índice exige um registro por cliente")
+    with span("customer_index", keys=len(keys)):
+        rows = np.argsort(keys, kind="stable").astype(np.int64)
+        return _write_index(keys[rows], rows, build, directory)
+
+
+def _merge_runs(runs, out_keys, out_rows, block):
+    """Intercala runs ordenados (keys, rows) em blocos: a cada rodada, tudo até o menor fim de bloco."""
+    starts = [0] * len(runs)
+    written = 0
+    while True:
+        active = [i for i, (keys, _) in enumerate(runs) if starts[i] < len(keys)]
+        if not active:
+            return
+        cut = min(runs[i][0][min(starts[i] + block, len(runs[i][0])) - 1] for i in active)
+        keys, rows = [], []
+        for i in active:
+            run_keys, run_rows = runs[i]
+            segment = run_keys[starts[i]:starts[i] + block]
+            take = int(np.searchsorted(segment, cut, side="right"))
+            keys.append(segment[:take])
+            rows.append(run_rows[starts[i]:starts[i] + take])
+            starts[i] += take
+        keys = np.concatenate(keys).astype(out_keys.dtype)
+        order = np.argsort(keys, kind="stable")
+        keys, rows = keys[order], np.concatenate(rows)[order]
+        # Chaves iguais caem sempre na mesma rodada (todas <= cut saem juntas)
+        if (keys[1:] == keys[:-1]).any():
+            raise ValueError(f"'{KEY_COLUMN}' tem IDs repetidos; o índice exige um registro por cliente")
+        out_keys[written:written + len(keys)] = keys
+        out_rows[written:written + len(keys)] = rows
+        written += len(keys)
+
+
+def build_index_chunks(read_ids, build=None, directory=INDEX_DIR, block=1 << 16):
+    """Mesmo índice de build_index com ordenação externa: `read_ids()` gera os IDs em lotes, na ordem das linhas.
+
+    Cada lote vira um run ordenado em disco; os runs são intercalados em
+    blocos de `block` chaves direto nos arquivos mapeados do índice.
+    """
+    def write(tmp_dir, meta):
+        runs_dir = os.path.join(tmp_dir, "runs")
+        os.makedirs(runs_dir)
+        paths, total, width = [], 0, 1
+        for ids in read_ids():
+            keys = np.asarray(ids, dtype=str)
+            order = np.argsort(keys, kind="stable")
+            path = os.path.join(runs_dir, f"run-{len(paths):05d}")
+            np.save(path + ".keys.npy", keys[order])
+            np.save(path + ".rows.npy", order.astype(np.int64) + total)
+            paths.append(path)
+            total += len(keys)
+            width = max(width, keys.dtype.itemsize // np.dtype("U1").itemsize)
+
+        with span("customer_index", keys=total, runs=len(paths)):
+            runs = [(np.load(p + ".keys.npy", mmap_mode="r"), np.load(p + ".rows.npy", mmap_mode="r"))
+                    for p in paths]
+            out_keys = np.lib.format.open_memmap(os.path.join(tmp_dir, "keys.npy"), mode="w+",
+                                                 dtype=f"U{width}", shape=(total,))
+            out_rows = np.lib.format.open_memmap(os.path.join(tmp_dir, "rows.npy"), mode="w+",
+                                                 dtype=np.int64, shape=(total,))
+            _merge_runs(runs, out_keys, out_rows, max(1, block // max(1, len(runs))))
+            out_keys.flush()
+            out_rows.flush()
+            del runs, out_keys, out_rows
+        shutil.rmtree(runs_dir)
+        meta.update(keys=total, build=build)
+
+    return _staged(directory, write)
+
+
+def apply_delta(row_map, added_ids, added_rows, build=None, base_build=None, directory=INDEX_DIR):
+    """Atualiza o índice gravado sem reordenar as chaves que já estavam nele.
+
+    `row_map[i]` é a posição nova da linha `i` da matriz anterior (-1 se ela
+    saiu) e `added_ids`/`added_rows` são os IDs inseridos e suas posições.
+    Devolve None (sem gravar) se o índice gravado não for o da matriz
+    `base_build`; nesse caso o chamador reconstrói com build_index().
+    """
+    row_map = np.asarray(row_map, dtype=np.int64)
+    try:
+        with open(os.path.join(directory, INDEX_FILE), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+    except FileNotFoundError:
+        return None
+    if (meta.get("format_version") != FORMAT_VERSION or base_build is None
+            or meta.get("build") != base_build or meta.get("keys") != len(row_map)):
+        return None
+
+    with span("customer_index", keys=len(row_map), added=len(added_rows)):
+        keys, rows = _read_keys(directory)
+        # Remapeamento só de inteiros: a ordem das chaves mantidas não muda
+        rows = row_map[rows]
+        kept = rows >= 0
+        keys, rows = keys[kept], rows[kept]
+
+        added_keys = np.asarray(added_ids, dtype=str)
+        if len(added_keys):
+            order = np.argsort(added_keys, kind="stable")
+            added_keys, added_rows = added_keys[order], np.asarray(added_rows, dtype=np.int64)[order]
+            # Largura de texto suficiente para os IDs antigos e os novos
+            width = max(keys.dtype.itemsize, added_keys.dtype.itemsize) // np.dtype("U1").itemsize
+            keys = keys.astype(f"U{width}")
+            at = np.searchsorted(keys, added_keys)
+            if len(keys) and (keys[np.minimum(at, len(keys) - 1)] == added_keys).any():
+                raise ValueError(f"IDs inseridos já estão no índice de '{KEY_COLUMN}'")
+            keys = np.insert(keys, at, added_keys)
+            rows = np.insert(rows, at, added_rows)
+        return _write_index(keys, rows, build, directory)
+
+
+def index_matrix(matrix_dir=MATRIX_DIR, directory=INDEX_DIR):
+    """Reconstrói o índice a partir da coluna de IDs da matriz de features gravada."""
+    build = read_index(matrix_dir).get("build")
+    ids = load_features([KEY_COLUMN], matrix_dir, schema_dtypes=False)[KEY_COLUMN]
+    return build_index(ids, build=build, directory=directory)
+
+
+# -------------------------------------------------
+# 2) Consultas
+# -------------------------------------------------
+
+def _open(directory, matrix_dir):
+    try:
+        with open(os.path.join(directory, INDEX_FILE), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+    except FileNotFoundError:
+        meta = {}
+    build = read_index(matrix_dir).get("build")
+    if meta.get("format_version") != FORMAT_VERSION or build is None or meta.get("build") != build:
+        print(f"[customer_index] Índice ausente ou desatualizado; atualizando a partir de {matrix_dir}")
+        index_matrix(matrix_dir, directory)
+    return _read_keys(directory, mmap_mode="r")
+
+
+def lookup(ids, directory=INDEX_DIR, matrix_dir=MATRIX_DIR):
+    """Posições na matriz de features de cada ID de `ids` (-1 para IDs não encontrados)."""
+    keys, rows = _open(directory, matrix_dir)
+    ids = np.atleast_1d(np.asarray(ids, dtype=str))
+    if len(keys) == 0:
+        return np.full(len(ids), -1, dtype=np.int64)
+    at = np.minimum(np.searchsorted(keys, ids), len(keys) - 1)
+    found = keys[at] == ids
+    return np.where(found, rows[at], -1)
+
+
+def fetch(ids, columns=None, directory=INDEX_DIR, matrix_dir=MATRIX_DIR):
+    """Registros transformados dos IDs pedidos, na ordem pedida; IDs não encontrados são omitidos."""
+    positions = lookup(ids, directory, matrix_dir)
+    positions = positions[positions >= 0]
+    if columns is not None and KEY_COLUMN not in columns:
+        columns = [KEY_COLUMN] + list(columns)
+    return load_features(columns, matrix_dir, rows=positions)
+
+
+# -------------------------------------------------
+# 3) Linha de comando
+# -------------------------------------------------
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(f"Uso: python {os.path.basename(__file__)} ID_CLIENTE [ID_CLIENTE ...]")
+        sys.exit(2)
+    pedidos = sys.argv[1:]
+    registros = fetch(pedidos)
+    faltando = sorted(set(pedidos) - set(registros[KEY_COLUMN]))
+    with pd.option_context("display.max_columns", None, "display.width", 200):
+        print(registros.set_index(KEY_COLUMN).T if len(registros) else "Nenhum cliente encontrado.")
+    if faltando:
+        print("\nIDs não encontrados:", ", ".join(faltando))
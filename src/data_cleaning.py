@@ -1,36 +1,17 @@
-import os
-import json
 import pandas as pd
 
-# -------------------------------------------------
-# 1) Carregar JSON bruto e normalizar em DataFrame
-# -------------------------------------------------
-raw_path = os.path.join(
-    os.path.dirname(__file__),
-    os.pardir,
-    "data",
-    "raw",
-    "TelecomX_Data.json"
-)
-
-with open(raw_path, "r", encoding="utf-8") as f:
-    data_json = json.load(f)
-
-df_full = pd.json_normalize(data_json)
-
-# -------------------------------------------------
-# 2) Verificar quais colunas existem (para conferência)
-# -------------------------------------------------
-print("Colunas disponíveis em df_full:\n")
-for col in df_full.columns:
-    print(f"  - {col}")
-print(f"\nTotal de colunas: {len(df_full.columns)}\n")
-
-# -------------------------------------------------
-# 3) Criar o subset com as colunas relevantes
-#    Use exatamente estes nomes, conforme o JSON
-# -------------------------------------------------
-colunas_relevantes = [
+from imputation import coerce_numeric, fit_fill_values, save_fill_values
+from ingestion import RAW_PATH, rejected_values
+from instrumentation import span, traced
+from normalization import CLEANING_MAPS, normalize_column, replace_unexpected
+from raw_cache import load_raw
+from schema import CLEANED_SCHEMA, apply_schema
+from storage import save_table
+
+OUTPUT_TABLE = "telecom_churn_cleaned"
+
+# Colunas relevantes: use exatamente estes nomes, conforme o JSON
+COLUNAS_RELEVANTES = [
     "customerID",               # ID do cliente
     "Churn",                    # coluna alvo (True/False ou Yes/No)
     # Perfil demográfico
@@ -58,67 +39,8 @@ colunas_relevantes = [
     "account.Charges.Total"
 ]
 
-colunas_existentes = [c for c in colunas_relevantes if c in df_full.columns]
-df = df_full[colunas_existentes].copy()
-
-print("Dimensões iniciais do subset:", df.shape)
-print("Colunas selecionadas:", colunas_existentes, "\n")
-
-# -------------------------------------------------
-# 4) Tratar valores ausentes (missing values)
-# -------------------------------------------------
-print("1) TRATAMENTO DE VALORES AUSENTES (missing values)")
-missing_before = df.isna().sum().sort_values(ascending=False)
-print("Valores ausentes antes do tratamento:")
-print(missing_before[missing_before > 0], "\n")
-
-# Preencher account.Charges.Total com mediana, se houver missing
-if "account.Charges.Total" in df.columns:
-    n_missing = df["account.Charges.Total"].isna().sum()
-    if n_missing > 0:
-        mediana = df["account.Charges.Total"].median()
-        df["account.Charges.Total"].fillna(mediana, inplace=True)
-        print(f"  • Preencheu {n_missing} missings em 'account.Charges.Total' com mediana = {mediana:.2f}")
-
-# Preencher outras numéricas com mediana (caso apareçam)
-for col in df.select_dtypes(include="number").columns:
-    if df[col].isna().sum() > 0:
-        med = df[col].median()
-        df[col].fillna(med, inplace=True)
-        print(f"  • Preencheu missings em '{col}' com mediana {med:.2f}")
-
-# Preencher categóricas com 'unknown'
-for col in df.select_dtypes(include="object").columns:
-    if df[col].isna().sum() > 0:
-        n_miss = df[col].isna().sum()
-        df[col].fillna("unknown", inplace=True)
-        print(f"  • Preencheu {n_miss} missings em '{col}' com 'unknown'")
-
-print("\nValores ausentes após tratamento (deve estar vazio):")
-print(df.isna().sum()[df.isna().sum() > 0], "\n")
-
-# -------------------------------------------------
-# 5) Remover duplicados
-# -------------------------------------------------
-print("2) TRATAMENTO DE DADOS DUPLICADOS")
-if "customerID" in df.columns:
-    dup_count = df.duplicated(subset=["customerID"]).sum()
-    print(f"  • {dup_count} registros duplicados em 'customerID' antes de remover")
-    df.drop_duplicates(subset=["customerID"], keep="first", inplace=True)
-    print(f"  • Removidos duplicados, agora dimensões: {df.shape}")
-else:
-    dup_total = df.duplicated().sum()
-    print(f"  • {dup_total} registros duplicados (todas as colunas) antes de remover")
-    df.drop_duplicates(keep="first", inplace=True)
-    print(f"  • Removidos duplicados, agora dimensões: {df.shape}")
-print()
-
-# -------------------------------------------------
-# 6) Padronizar strings em colunas categóricas
-# -------------------------------------------------
-print("3) PADRONIZAÇÃO DE STRINGS (strip + lower)")
-
-categorical_cols = [
+# Colunas categóricas padronizadas com strip() + lower()
+CATEGORICAL_COLS = [
     "customer.gender",
     "customer.Partner",
     "customer.Dependents",
@@ -137,122 +59,183 @@ categorical_cols = [
     "Churn"
 ]
 
-for col in categorical_cols:
-    if col in df.columns and df[col].dtype == "object":
-        df[col] = df[col].str.strip().str.lower()
-        print(f"  • '{col}': strip() e lower() aplicados")
-print()
-
-# -------------------------------------------------
-# 7) Corrigir valores inconsistentes em categorias
-# -------------------------------------------------
-print("4) CORREÇÃO DE VALORES INCONSISTENTES (mapeamento)")
-
-# Churn: mapear 'yes'/'no' para boolean (True/False)
-if "Churn" in df.columns:
-    df["Churn"] = df["Churn"].replace({"yes": True, "no": False})
-    print("  • 'Churn': mapeou 'yes' → True e 'no' → False")
-
-# gender: mapear 'male'/'female' conforme dicionário (pode deixar como está)
-# senior citizen já é numérico (0/1)  
-# Não há colunas extra em gênero, então não precisa mapear.
-
-# phone.PhoneService: manter 'yes' ou 'no'
-# multiple lines: manter 'yes' / 'no' / 'no phone service'
-if "phone.MultipleLines" in df.columns:
-    df["phone.MultipleLines"] = df["phone.MultipleLines"].replace({
-        "no phone service": "no phone service",
-        "no": "no",
-        "yes": "yes"
-    })
-    print("  • 'phone.MultipleLines': valores padronizados")
-
-# internet.InternetService
-if "internet.InternetService" in df.columns:
-    df["internet.InternetService"] = df["internet.InternetService"].replace({
-        "dsl": "dsl",
-        "fiber optic": "fiber optic",
-        "no": "no"
-    })
-    print("  • 'internet.InternetService': valores padronizados (dsl/fiber optic/no)")
-
-# Para colunas que têm “no internet service” vs “no” vs “yes”:
-col_internet_cat = [
-    "internet.OnlineSecurity",
-    "internet.OnlineBackup",
-    "internet.DeviceProtection",
-    "internet.TechSupport",
-    "internet.StreamingTV",
-    "internet.StreamingMovies"
-]
-for col in col_internet_cat:
-    if col in df.columns:
-        df[col] = df[col].replace({
-            "no": "no",
-            "yes": "yes",
-            "no internet service": "no internet service"
-        })
-        print(f"  • '{col}': valores padronizados (yes / no / no internet service)")
-
-# contract: mapear possíveis variações (ex.: 'month-to-month', 'one year', 'two year')
-if "account.Contract" in df.columns:
-    df["account.Contract"] = df["account.Contract"].replace({
-        "month-to-month": "month-to-month",
-        "one year": "one year",
-        "two year": "two year"
-    })
-    print("  • 'account.Contract': valores padronizados")
-
-# paperless billing: 'yes' / 'no'
-if "account.PaperlessBilling" in df.columns:
-    df["account.PaperlessBilling"] = df["account.PaperlessBilling"].replace({
-        "yes": "yes",
-        "no": "no"
-    })
-    print("  • 'account.PaperlessBilling': valores padronizados")
-
-# payment method: mapear as strings já convertidas para lower (e.g., 'electronic check', 'mailed check', etc.)
-if "account.PaymentMethod" in df.columns:
-    # Exemplo de mapeamento (se necessário)
-    df["account.PaymentMethod"] = df["account.PaymentMethod"].replace({
-        "electronic check": "electronic check",
-        "mailed check": "mailed check",
-        "bank transfer (automatic)": "bank transfer (automatic)",
-        "credit card (automatic)": "credit card (automatic)"
-    })
-    print("  • 'account.PaymentMethod': valores padronizados")
-print()
-
-# -------------------------------------------------
-# 8) Tratar outliers em colunas numéricas (opcional)
-# -------------------------------------------------
-print("5) TRATAMENTO DE OUTLIERS EM COLUNAS NUMÉRICAS (opcional)")
-numeric_cols = ["customer.SeniorCitizen", "customer.tenure", "account.Charges.Monthly", "account.Charges.Total"]
-for col in numeric_cols:
-    if col in df.columns:
-        # Exemplo genérico: remover valores negativos ou absurdos (se existirem)
-        if df[col].dtype in ["int64", "float64"]:
-            cond_invalid = (df[col] < 0)
-            n_out = cond_invalid.sum()
-            if n_out > 0:
-                print(f"  • Encontrou {n_out} valores inválidos em '{col}'. Removendo.")
-                df = df[~cond_invalid].copy()
-                print(f"  • Novo tamanho após remover outliers de '{col}': {df.shape}")
-print()
-
-# -------------------------------------------------
-# 9) (Opcional) Filtrar datas anômalas – **não aplicável** pois não existem colunas de data
-# -------------------------------------------------
-print("6) TRATAMENTO DE DATAS ANÔMALAS (não aplicável)")
-
-# -------------------------------------------------
-# 10) Mostrar resultado final e salvar
-# -------------------------------------------------
-print("Dimensões finais após limpeza:", df.shape)
-print("Colunas finais:", df.columns.tolist())
-
-clean_dir = os.path.join(os.path.dirname(__file__), os.pardir, "data", "clean")
-os.makedirs(clean_dir, exist_ok=True)
-cleaned_path = os.path.join(clean_dir, "telecom_churn_cleaned.csv")
-df.to_csv(cleaned_path, index=False)
-print(f"\nDataFrame completamente limpo salvo em: {cleaned_path}")
+
+def relevant_subset(df_full):
+    """Colunas de COLUNAS_RELEVANTES presentes no DataFrame bruto (sem cópia e sem imprimir)."""
+    return df_full[[c for c in COLUNAS_RELEVANTES if c in df_full.columns]]
+
+
+def select_columns(df_full):
+    """Seleciona o subset de colunas relevantes do DataFrame bruto."""
+    # -------------------------------------------------
+    # 2) Verificar quais colunas existem (para conferência)
+    # -------------------------------------------------
+    print("Colunas disponíveis em df_full:\n")
+    for col in df_full.columns:
+        print(f"  - {col}")
+    print(f"\nTotal de colunas: {len(df_full.columns)}\n")
+
+    # -------------------------------------------------
+    # 3) Criar o subset com as colunas relevantes
+    # -------------------------------------------------
+    colunas_existentes = [c for c in COLUNAS_RELEVANTES if c in df_full.columns]
+    df = df_full[colunas_existentes].copy()
+
+    print("Dimensões iniciais do subset:", df.shape)
+    print("Colunas selecionadas:", colunas_existentes, "\n")
+
+    return df
+
+
+@traced("data_cleaning")
+def clean_data(df_full, fill_values=None):
+    """Aplica todas as etapas de limpeza e devolve o DataFrame limpo.
+
+    `fill_values` (coluna -> valor, ver imputation.py) substitui as medianas
+    calculadas sobre `df_full`; o processamento incremental e os shards usam
+    as medianas do export inteiro. Colunas sem fill value são ajustadas aqui.
+    """
+    fill_values = dict(fill_values or {})
+    with span("select_columns"):
+        df = select_columns(df_full)
+
+    # -------------------------------------------------
+    # 4) Tratar valores ausentes (missing values)
+    # -------------------------------------------------
+    with span("missing_values"):
+        print("1) TRATAMENTO DE VALORES AUSENTES (missing values)")
+        # account.Charges.Total já vem numérico da ingestão (brancos e textos
+        # inválidos viram ausentes e são preenchidos como as demais numéricas);
+        # coerce_numeric cobre DataFrames montados por fora dela
+        for col, motivos in rejected_values(df_full).items():
+            if motivos["blank"] or motivos["invalid"]:
+                print(f"  • '{col}': {motivos['blank']} em branco e {motivos['invalid']} inválidos "
+                      f"convertidos em ausentes na ingestão")
+        df, rejeitados = coerce_numeric(df)
+        for col, n_rejeitados in rejeitados.items():
+            if n_rejeitados > 0:
+                print(f"  • '{col}': {n_rejeitados} valores não numéricos tratados como ausentes")
+
+        missing_before = df.isna().sum().sort_values(ascending=False)
+        print("Valores ausentes antes do tratamento:")
+        print(missing_before[missing_before > 0], "\n")
+
+        # Preencher numéricas com a mediana (todas as medianas que faltam numa só passada)
+        numeric_missing = [col for col in df.select_dtypes(include="number").columns if df[col].isna().any()]
+        fill_values.update(fit_fill_values(df, [c for c in numeric_missing if c not in fill_values]))
+        for col in numeric_missing:
+            n_missing = df[col].isna().sum()
+            df[col] = df[col].fillna(fill_values[col])
+            print(f"  • Preencheu {n_missing} missings em '{col}' com mediana = {fill_values[col]:.2f}")
+
+        # Preencher categóricas com 'unknown'
+        for col in df.select_dtypes(include="object").columns:
+            if df[col].isna().sum() > 0:
+                n_miss = df[col].isna().sum()
+                df[col].fillna("unknown", inplace=True)
+                print(f"  • Preencheu {n_miss} missings em '{col}' com 'unknown'")
+
+        print("\nValores ausentes após tratamento (deve estar vazio):")
+        print(df.isna().sum()[df.isna().sum() > 0], "\n")
+
+    # -------------------------------------------------
+    # 5) Remover duplicados
+    # -------------------------------------------------
+    with span("duplicates"):
+        print("2) TRATAMENTO DE DADOS DUPLICADOS")
+        if "customerID" in df.columns:
+            dup_count = df.duplicated(subset=["customerID"]).sum()
+            print(f"  • {dup_count} registros duplicados em 'customerID' antes de remover")
+            df.drop_duplicates(subset=["customerID"], keep="first", inplace=True)
+            print(f"  • Removidos duplicados, agora dimensões: {df.shape}")
+        else:
+            dup_total = df.duplicated().sum()
+            print(f"  • {dup_total} registros duplicados (todas as colunas) antes de remover")
+            df.drop_duplicates(keep="first", inplace=True)
+            print(f"  • Removidos duplicados, agora dimensões: {df.shape}")
+        print()
+
+    # -------------------------------------------------
+    # 6) Padronizar strings em colunas categóricas
+    # 7) Corrigir valores inconsistentes em categorias
+    # -------------------------------------------------
+    with span("normalize_strings"):
+        # Uma única passada por coluna (ver normalization.py): strip + lower e o
+        # mapeamento de CLEANING_MAPS rodam só sobre os valores únicos.
+        print("3) PADRONIZAÇÃO DE STRINGS (strip + lower)")
+        for col in CATEGORICAL_COLS:
+            if col in df.columns and df[col].dtype == "object":
+                df[col] = normalize_column(df[col], CLEANING_MAPS.get(col))
+                print(f"  • '{col}': strip() e lower() aplicados")
+        print()
+
+        print("4) CORREÇÃO DE VALORES INCONSISTENTES (mapeamento)")
+        if "Churn" in df.columns:
+            print("  • 'Churn': mapeou 'yes' → True e 'no' → False")
+        # Os demais valores (yes / no / no internet service, tipos de contrato e
+        # de pagamento) já saem padronizados do strip + lower. Um valor fora das
+        # categorias de schema.py vira 'unknown' (como um ausente) e é contado,
+        # em vez de parar a limpeza em apply_schema()
+        for col in CATEGORICAL_COLS:
+            dtype = CLEANED_SCHEMA.get(col)
+            if col in df.columns and isinstance(dtype, pd.CategoricalDtype):
+                df[col], inesperados = replace_unexpected(df[col], dtype.categories)
+                if inesperados:
+                    exemplos = ", ".join(f"{v!r} ({n})" for v, n in list(inesperados.items())[:5])
+                    print(f"  • '{col}': {sum(inesperados.values())} valor(es) fora das categorias "
+                          f"esperadas trocados por 'unknown': {exemplos}")
+        print()
+
+    # -------------------------------------------------
+    # 8) Tratar outliers em colunas numéricas (opcional)
+    # -------------------------------------------------
+    with span("outliers"):
+        print("5) TRATAMENTO DE OUTLIERS EM COLUNAS NUMÉRICAS (opcional)")
+        numeric_cols = ["customer.SeniorCitizen", "customer.tenure", "account.Charges.Monthly", "account.Charges.Total"]
+        for col in numeric_cols:
+            if col in df.columns:
+                # Exemplo genérico: remover valores negativos ou absurdos (se existirem)
+                if df[col].dtype in ["int64", "float64"]:
+                    cond_invalid = (df[col] < 0)
+                    n_out = cond_invalid.sum()
+                    if n_out > 0:
+                        print(f"  • Encontrou {n_out} valores inválidos em '{col}'. Removendo.")
+                        df = df[~cond_invalid].copy()
+                        print(f"  • Novo tamanho após remover outliers de '{col}': {df.shape}")
+        print()
+
+    # -------------------------------------------------
+    # 9) (Opcional) Filtrar datas anômalas – **não aplicável** pois não existem colunas de data
+    # -------------------------------------------------
+    print("6) TRATAMENTO DE DATAS ANÔMALAS (não aplicável)")
+
+    # -------------------------------------------------
+    # 10) Mostrar resultado final
+    # -------------------------------------------------
+    print("Dimensões finais após limpeza:", df.shape)
+    print("Colunas finais:", df.columns.tolist())
+    with span("schema"):
+        df = apply_schema(df, "cleaned")
+    return df
+
+
+def main():
+    # -------------------------------------------------
+    # 1) Carregar JSON bruto e normalizar em DataFrame
+    # -------------------------------------------------
+    # Parse único do JSON, reaproveitado via cache colunar (ver raw_cache.py)
+    df_full = load_raw(RAW_PATH)
+
+    # Medianas de todas as numéricas, gravadas para o incremental e o scoring
+    fill_values = fit_fill_values(relevant_subset(df_full))
+    print(f"Fill values gravados em: {save_fill_values(fill_values, len(df_full))}\n")
+
+    df = clean_data(df_full, fill_values=fill_values)
+
+    # Salvar em data/clean/ (ver storage.py)
+    cleaned_paths = save_table(df, OUTPUT_TABLE)
+    print(f"\nDataFrame completamente limpo salvo em: {', '.join(cleaned_paths)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,121 +1,127 @@
 import os
+import sys
 import json
-import pandas as pd
-
-# -------------------------------------------------
-# 1) Carregar o JSON bruto e criar o DataFrame completo
-# -------------------------------------------------
-raw_path = os.path.join(
-    os.path.dirname(__file__),
-    os.pardir,
-    "data",
-    "raw",
-    "TelecomX_Data.json"
-)
-
-with open(raw_path, "r", encoding="utf-8") as f:
-    data_json = json.load(f)
-
-df = pd.json_normalize(data_json)
-
-# Converter colunas de data para datetime, se existirem
-if "signup_date" in df.columns:
-    df["signup_date"] = pd.to_datetime(df["signup_date"], errors="coerce")
-if "last_active_date" in df.columns:
-    df["last_active_date"] = pd.to_datetime(df["last_active_date"], errors="coerce")
-
-# -------------------------------------------------
-# 2) Selecionar colunas relevantes para churn (criar subset em memória)
-# -------------------------------------------------
-colunas_relevantes = [
-    "customer_id", "churn_flag",
-    "gender", "senior_citizen", "partner", "dependents",
-    "tenure_months", "contract_type", "paperless_billing", "payment_method",
-    "monthly_charges", "total_charges",
-    "internet_service", "tech_support",
-    "signup_date", "last_active_date"
-]
-colunas_existentes = [c for c in colunas_relevantes if c in df.columns]
-df_subset = df[colunas_existentes].copy()
-
-print("Executando Data Quality Checks sobre o subset criado em memória …\n")
-
-# -------------------------------------------------
-# 3) Checar valores ausentes (missing values)
-# -------------------------------------------------
-print("1) MISSING VALUES")
-missing_counts = df_subset.isna().sum().sort_values(ascending=False)
-print(missing_counts[missing_counts > 0], "\n")
-
-total_rows = df_subset.shape[0]
-missing_pct = (df_subset.isna().sum() / total_rows * 100).sort_values(ascending=False)
-print("Porcentagem de missing (se > 0):")
-print(missing_pct[missing_pct > 0].round(2).astype(str) + "%", "\n")
-
-# -------------------------------------------------
-# 4) Checar duplicados
-# -------------------------------------------------
-print("2) DUPLICADOS")
-if "customer_id" in df_subset.columns:
-    duped = df_subset.duplicated(subset=["customer_id"]).sum()
-    print(f"Duplicados em 'customer_id': {duped}\n")
-else:
-    duped = df_subset.duplicated().sum()
-    print(f"Duplicados totais: {duped}\n")
-
-# -------------------------------------------------
-# 5) Tipos de dados e formatação
-# -------------------------------------------------
-print("3) TIPOS DE DADOS")
-print(df_subset.dtypes, "\n")
-
-categorical_cols = [
-    "gender", "partner", "dependents", "phone_service", "multiple_lines",
-    "internet_service", "online_security", "online_backup",
-    "device_protection", "tech_support", "streaming_tv", "streaming_movies",
-    "contract_type", "paperless_billing", "payment_method"
-]
-
-print("Valores únicos em colunas categóricas:")
-for col in categorical_cols:
-    if col in df_subset.columns:
-        uniques = df_subset[col].unique()
-        print(f"  - {col} ({len(uniques)}): {uniques}")
-print()
-
-# -------------------------------------------------
-# 6) Verificar formatação de strings
-# -------------------------------------------------
-print("4) FORMATAÇÃO DE STRINGS")
-for col in categorical_cols:
-    if col in df_subset.columns and df_subset[col].dtype == "object":
-        stripped = df_subset[col].str.strip()
-        n_spaces = (stripped != df_subset[col]).sum()
-        if n_spaces > 0:
-            print(f"  • {col}: há {n_spaces} valores com espaços em branco.")
-        lower = df_subset[col].str.lower()
-        if any(df_subset[col].str.lower() != df_subset[col]):
-            print(f"  • {col}: diferenças de maiúsculas/minúsculas detectadas.")
-print()
-
-# -------------------------------------------------
-# 7) Outliers em colunas numéricas
-# -------------------------------------------------
-print("5) OUTLIERS EM NUMÉRICOS")
-numeric_cols = df_subset.select_dtypes(include=["int64", "float64"]).columns.tolist()
-for col in numeric_cols:
-    desc = df_subset[col].describe()
-    print(f"  • {col}: count={desc['count']}, mean={desc['mean']:.2f}, min={desc['min']}, 25%={desc['25%']}, 50%={desc['50%']}, 75%={desc['75%']}, max={desc['max']}\n")
-
-# -------------------------------------------------
-# 8) Range de datas
-# -------------------------------------------------
-print("6) RANGE DE DATAS")
-date_cols = df_subset.select_dtypes(include=["datetime64[ns]"]).columns.tolist()
-for col in date_cols:
-    min_date = df_subset[col].min()
-    max_date = df_subset[col].max()
-    print(f"  • {col}: de {min_date.date()} até {max_date.date()}")
-print()
-
-print("Data Quality Checks finalizado.")
+import argparse
+
+from ingestion import DEFAULT_CHUNK_SIZE, RAW_PATH, read_raw_chunks, sample_raw
+from instrumentation import traced
+from quality_rules import MAX_RATE, SAMPLE_MAX_RATE, run_checks, sampled_checks
+
+# -------------------------------------------------
+# Data Quality Checks sobre o export bruto
+# -------------------------------------------------
+# As regras (nulos, categorias aceitas, faixas numéricas, unicidade e formato
+# do customerID, higiene de strings) estão declaradas em quality_rules.py e
+# são avaliadas chunk a chunk sobre o JSON lido em streaming, então o pico de
+# memória depende de --chunk-rows, não do tamanho do export. O resultado vai
+# para um relatório JSON (contagem e linhas de exemplo por regra) e um
+# resumo é impresso no terminal.
+#
+# Com --sample N as regras são avaliadas sobre uma amostra estratificada por
+# Churn (até N linhas por estrato), sorteada durante a leitura do JSON, e cada
+# taxa sai com intervalo de confiança;
+# só as regras cujo intervalo contém o limiar são recontadas no export
+# inteiro (ver quality_rules.sampled_checks).
+
+REPORT_PATH = os.path.join(os.path.dirname(__file__), os.pardir, "reports", "data_quality.json")
+
+
+def save_report(result, path=REPORT_PATH):
+    """Grava o relatório de qualidade de forma atômica."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    return path
+
+
+def _format_rate(entry):
+    if "rate_low" not in entry:
+        return f"{entry['rate']:.2%}"
+    return f"{entry['rate']:.2%}, IC {entry['rate_low']:.2%}–{entry['rate_high']:.2%}"
+
+
+def print_profile(prof):
+    print(f"Amostra: {prof['sampled']} de {prof['rows']} linhas, estratificada por {prof['by']} "
+          f"(intervalos de {prof['confidence']:.0%})")
+    for col, entry in prof["columns"].items():
+        m = entry["missing"]
+        if m["estimate"]:
+            print(f"  • {col}: ausentes {m['estimate']:.2%} (IC {m['low']:.2%}–{m['high']:.2%})")
+        for p, q in entry.get("quantiles", {}).items():
+            print(f"  • {col}: q{p:g} = {q['estimate']:.2f} (IC {q['low']:.2f}–{q['high']:.2f})")
+    print()
+
+
+def print_summary(result):
+    print(f"Linhas verificadas: {result['rows']}")
+    if result["missing_columns"]:
+        print("Colunas ausentes no export:", ", ".join(result["missing_columns"]))
+    estimado = " (estimadas)" if result["mode"] == "sample" else ""
+    print(f"Violações{estimado}: {result['errors']} erro(s), {result['warnings']} aviso(s)\n")
+    for entry in result["rules"]:
+        if entry["status"] == "ok":
+            continue
+        marca = "ERRO " if entry["severity"] == "error" else "AVISO"
+        print(f"  [{marca}] {entry['column']} / {entry['check']}: {entry['violations']} linha(s) "
+              f"({_format_rate(entry)}) -> {entry['status']}{' (recontada)' if entry.get('escalated') else ''}")
+        for sample in entry["samples"]:
+            print(f"           linha {sample['row']} ({sample['customerID']}): {sample['value']!r}")
+    print()
+    if result["passed"]:
+        veredito = "aprovado"
+    elif result["inconclusive"] and not result["missing_columns"] and all(
+            e["status"] != "falha" for e in result["rules"]):
+        veredito = f"inconclusivo ({result['inconclusive']} regra(s) de erro não verificada(s) na amostra)"
+    else:
+        veredito = "reprovado"
+    print("Veredito:", veredito, f"(limiar de {result['max_rate']:.2%} por regra)")
+    print()
+
+
+@traced("data_quality")
+def check_raw(path=RAW_PATH, chunk_size=DEFAULT_CHUNK_SIZE, max_rate=MAX_RATE):
+    """Relatório de qualidade do JSON bruto em `path`, lido em chunks de `chunk_size` linhas."""
+    return run_checks(read_raw_chunks(path, chunk_size, coerce=False), max_rate=max_rate)
+
+
+@traced("data_quality_sample")
+def check_raw_sample(size, path=RAW_PATH, chunk_size=DEFAULT_CHUNK_SIZE, max_rate=SAMPLE_MAX_RATE):
+    """Relatório de qualidade por amostra de até `size` linhas por valor de Churn."""
+    return sampled_checks(sample_raw(path, size, coerce=False),
+                          lambda: read_raw_chunks(path, chunk_size, coerce=False), max_rate=max_rate)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verificações de qualidade sobre o export bruto.")
+    parser.add_argument("--raw-path", default=RAW_PATH, help="JSON bruto a verificar")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_SIZE, metavar="N",
+                        help="linhas por chunk na leitura em streaming")
+    parser.add_argument("--report", default=REPORT_PATH, help="caminho do relatório JSON")
+    parser.add_argument("--strict", action="store_true",
+                        help="termina com código 1 se alguma regra de severidade 'error' falhar "
+                             "(ou, com --sample, não puder ser verificada)")
+    parser.add_argument("--sample", type=int, metavar="N",
+                        help="avalia as regras sobre uma amostra de até N linhas por valor de Churn")
+    parser.add_argument("--max-rate", type=float, metavar="FRAÇÃO",
+                        help=f"fração de linhas tolerada por regra de erro (padrão {MAX_RATE:g}; "
+                             f"{SAMPLE_MAX_RATE:g} com --sample)")
+    args = parser.parse_args()
+
+    print("Executando Data Quality Checks sobre", args.raw_path, "…\n")
+    if args.sample:
+        max_rate = SAMPLE_MAX_RATE if args.max_rate is None else args.max_rate
+        result = check_raw_sample(args.sample, args.raw_path, args.chunk_rows, max_rate)
+        print_profile(result["profile"])
+    else:
+        result = check_raw(args.raw_path, args.chunk_rows, MAX_RATE if args.max_rate is None else args.max_rate)
+    print_summary(result)
+    print("Relatório salvo em:", save_report(result, args.report))
+    print("Data Quality Checks finalizado.")
+    if args.strict and not result["passed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,29 +1,19 @@
-import os
-import pandas as pd
+from customer_index import KEY_COLUMN, apply_delta, build_index, build_index_chunks
+from feature_matrix import is_fresh, read_index, write_feature_matrix, write_feature_matrix_chunks
+from instrumentation import span, traced
+from normalization import TRANSLATION_MAPS, normalize_column
+from schema import apply_schema
+from storage import CLEAN_DIR, iter_table_chunks, load_table, save_table, save_table_chunks, table_path
 
 # -------------------------------------------------
-# 1) Definir caminhos de entrada e saída
+# 1) Definir tabelas de entrada e saída (em data/clean/, ver storage.py)
 # -------------------------------------------------
 
-BASE_DIR = os.path.dirname(__file__)                      # .../src
-INPUT_CSV = os.path.join(BASE_DIR, os.pardir, "data", "clean", "telecom_churn_features.csv")
-OUTPUT_DIR = os.path.join(BASE_DIR, os.pardir, "data", "clean")
-OUTPUT_CSV = os.path.join(OUTPUT_DIR, "telecom_churn_transformed.csv")
+INPUT_TABLE = "telecom_churn_features"
+OUTPUT_TABLE = "telecom_churn_transformed"
 
-# -------------------------------------------------
-# 2) Carregar o CSV com features já calculadas
-# -------------------------------------------------
-
-print("Carregando dados para transformacao de:", INPUT_CSV)
-df = pd.read_csv(INPUT_CSV)
-
-print("Dimensoes antes da transformacao:", df.shape)
-print()
-
-# -------------------------------------------------
-# 3) Renomear colunas para nomes em portugues
-# -------------------------------------------------
-mapeamento_colunas = {
+# Nomes em português (ou nomes claros) para as colunas
+MAPEAMENTO_COLUNAS = {
     "customerID":              "ID_Cliente",
     "Churn":                   "Evasao",
     "customer.gender":         "Genero",
@@ -48,104 +38,155 @@ mapeamento_colunas = {
     "Contas_Diarias":          "Cobranca_Diaria"
 }
 
-df.rename(columns=mapeamento_colunas, inplace=True)
-
-print("Colunas renomeadas para portugues (ou nomes claros).")
-print("Novas colunas:", df.columns.tolist())
-print()
-
-# -------------------------------------------------
-# 4) Converter valores textuais para binarios ou 'Sim'/'Nao'
-# -------------------------------------------------
-
-print("1) Conversao de valores textuais para binarios")
-
-# (a) Converter Evasao (True/False) para 1/0
-df["Evasao"] = df["Evasao"].map({True: 1, False: 0})
-print("  - Coluna 'Evasao' convertida para 1 (Sim) / 0 (Nao)")
-
-# (b) Converter colunas yes/no -> 1/0
-cols_yes_no = [
-    "Tem_Conjuge", "Tem_Dependentes", "Tem_Telefone",
-    "Fatura_Digital"
-]
-
-for col in cols_yes_no:
-    if col in df.columns:
-        df[col] = df[col].map({"yes": 1, "no": 0, "unknown": 0})
-        print(f"  - '{col}' mapeado para 1/0 (yes->1, no->0)")
-
-# (c) Colunas com 'yes' / 'no' / 'no internet service' -> 1/0
-cols_three_cats = [
-    "Linhas_Adicionais",
-    "Seg_Online", "Backup_Online", "Prot_Dispositivos",
-    "Suporte_Tecnico", "Streaming_TV", "Streaming_Filmes"
-]
-
-for col in cols_three_cats:
-    if col in df.columns:
-        df[col] = df[col].map({
-            "yes": 1,
-            "no": 0,
-            "no internet service": 0
-        })
-        print(f"  - '{col}' mapeado (yes->1, no->0, no internet service->0)")
-
-# (d) Traduzir Tipo_Internet
-if "Tipo_Internet" in df.columns:
-    df["Tipo_Internet"] = df["Tipo_Internet"].map({
-        "dsl": "DSL",
-        "fiber optic": "Fibra Optica",
-        "no": "Sem Internet"
-    })
-    print("  - 'Tipo_Internet' traduzido: dsl->DSL, fiber optic->Fibra Optica, no->Sem Internet")
-
-# (e) Traduzir Tipo_Contrato
-if "Tipo_Contrato" in df.columns:
-    df["Tipo_Contrato"] = df["Tipo_Contrato"].map({
-        "month-to-month": "Mensal",
-        "one year": "Anual",
-        "two year": "Bienal"
-    })
-    print("  - 'Tipo_Contrato' traduzido: month-to-month->Mensal, one year->Anual, two year->Bienal")
-
-# (f) Traduzir Metodo_Pagamento
-if "Metodo_Pagamento" in df.columns:
-    df["Metodo_Pagamento"] = df["Metodo_Pagamento"].map({
-        "electronic check": "Cheque Eletronico",
-        "mailed check": "Cheque Enviado",
-        "bank transfer (automatic)": "Transferencia Bancaria (Automatica)",
-        "credit card (automatic)": "Cartao de Credito (Automatico)"
-    })
-    print("  - 'Metodo_Pagamento' traduzido para portugues")
-
-print()
 
-# -------------------------------------------------
-# 5) Converter 'Genero' para 1/0 (opcional)
-# -------------------------------------------------
-if "Genero" in df.columns:
-    df["Genero"] = df["Genero"].map({"female": 1, "male": 0})
-    print("  - 'Genero' mapeado: female->1, male->0")
-print()
-
-# -------------------------------------------------
-# 6) Garantir 'Idoso' como 0/1
-# -------------------------------------------------
-if "Idoso" in df.columns:
-    df["Idoso"] = df["Idoso"].astype(int)
-    print("  - 'Idoso' mantido como 0/1")
-print()
-
-# -------------------------------------------------
-# 7) Mostra as primeiras 5 linhas para conferência
-# -------------------------------------------------
-print("Primeiras 5 linhas apos transformacoes:\n")
-print(df.head(), "\n")
-
-# -------------------------------------------------
-# 8) Salvar o DataFrame transformado
-# -------------------------------------------------
-os.makedirs(OUTPUT_DIR, exist_ok=True)
-df.to_csv(OUTPUT_CSV, index=False)
-print(f"DataFrame transformado salvo em: {OUTPUT_CSV}")
+def translate(series):
+    """Mapeia `series` com o dicionário de TRANSLATION_MAPS (valores fora do mapa viram NaN)."""
+    return normalize_column(series, TRANSLATION_MAPS[series.name], standardize=False, keep_unmapped=False)
+
+
+@traced("data_transformation")
+def transform_data(df):
+    """Devolve uma cópia de `df` com colunas renomeadas e valores convertidos."""
+    df = df.copy()
+    print("Dimensoes antes da transformacao:", df.shape)
+    print()
+
+    # -------------------------------------------------
+    # 3) Renomear colunas para nomes em portugues
+    # -------------------------------------------------
+
+    with span("rename"):
+        df.rename(columns=MAPEAMENTO_COLUNAS, inplace=True)
+
+    print("Colunas renomeadas para portugues (ou nomes claros).")
+    print("Novas colunas:", df.columns.tolist())
+    print()
+
+    # -------------------------------------------------
+    # 4) Converter valores textuais para binarios ou 'Sim'/'Nao'
+    # -------------------------------------------------
+
+    with span("translate"):
+        print("1) Conversao de valores textuais para binarios")
+
+        # Os dicionários de cada coluna estão em normalization.TRANSLATION_MAPS;
+        # translate() mapeia só os valores únicos e reconstrói pelos códigos.
+
+        # (a) Converter Evasao (True/False) para 1/0
+        df["Evasao"] = translate(df["Evasao"])
+        print("  - Coluna 'Evasao' convertida para 1 (Sim) / 0 (Nao)")
+
+        # (b) Converter colunas yes/no -> 1/0
+        cols_yes_no = [
+            "Tem_Conjuge", "Tem_Dependentes", "Tem_Telefone",
+            "Fatura_Digital"
+        ]
+
+        for col in cols_yes_no:
+            if col in df.columns:
+                df[col] = translate(df[col])
+                print(f"  - '{col}' mapeado para 1/0 (yes->1, no->0)")
+
+        # (c) Colunas com 'yes' / 'no' / 'no internet service' -> 1/0
+        cols_three_cats = [
+            "Linhas_Adicionais",
+            "Seg_Online", "Backup_Online", "Prot_Dispositivos",
+            "Suporte_Tecnico", "Streaming_TV", "Streaming_Filmes"
+        ]
+
+        for col in cols_three_cats:
+            if col in df.columns:
+                df[col] = translate(df[col])
+                print(f"  - '{col}' mapeado (yes->1, no->0, no internet service->0)")
+
+        # (d) Traduzir Tipo_Internet
+        if "Tipo_Internet" in df.columns:
+            df["Tipo_Internet"] = translate(df["Tipo_Internet"])
+            print("  - 'Tipo_Internet' traduzido: dsl->DSL, fiber optic->Fibra Optica, no->Sem Internet")
+
+        # (e) Traduzir Tipo_Contrato
+        if "Tipo_Contrato" in df.columns:
+            df["Tipo_Contrato"] = translate(df["Tipo_Contrato"])
+            print("  - 'Tipo_Contrato' traduzido: month-to-month->Mensal, one year->Anual, two year->Bienal")
+
+        # (f) Traduzir Metodo_Pagamento
+        if "Metodo_Pagamento" in df.columns:
+            df["Metodo_Pagamento"] = translate(df["Metodo_Pagamento"])
+            print("  - 'Metodo_Pagamento' traduzido para portugues")
+
+        print()
+
+        # -------------------------------------------------
+        # 5) Converter 'Genero' para 1/0 (opcional)
+        # -------------------------------------------------
+        if "Genero" in df.columns:
+            df["Genero"] = translate(df["Genero"])
+            print("  - 'Genero' mapeado: female->1, male->0")
+        print()
+
+    # -------------------------------------------------
+    # 6) Garantir 'Idoso' como 0/1
+    # -------------------------------------------------
+    if "Idoso" in df.columns:
+        df["Idoso"] = df["Idoso"].astype(int)
+        print("  - 'Idoso' mantido como 0/1")
+    print()
+
+    # -------------------------------------------------
+    # 7) Mostra as primeiras 5 linhas para conferência
+    # -------------------------------------------------
+    print("Primeiras 5 linhas apos transformacoes:\n")
+    print(df.head(), "\n")
+    with span("schema"):
+        df = apply_schema(df, "transformed")
+    return df
+
+
+def save_transformed(df, index_delta=None):
+    """Grava a tabela transformada, a matriz de features mapeável e o índice por ID_Cliente.
+
+    `index_delta` = (mapa de posições, IDs inseridos, posições deles) permite
+    atualizar o índice sem reordená-lo (ver customer_index.apply_delta).
+    """
+    base_build = read_index()["build"] if index_delta is not None and is_fresh() else None
+    paths = save_table(df, OUTPUT_TABLE)
+    matrix_dir = write_feature_matrix(df)
+    build = read_index(matrix_dir)["build"]
+    index_dir = apply_delta(*index_delta, build=build, base_build=base_build) if base_build else None
+    paths += [matrix_dir, index_dir or build_index(df["ID_Cliente"], build=build)]
+    return paths
+
+
+def save_transformed_chunks(chunks, chunk_rows, directory=CLEAN_DIR):
+    """save_transformed para uma tabela que chega em chunks (modo out-of-core, ver out_of_core.py).
+
+    A tabela vai para o formato particionado; a matriz e o índice são
+    gerados relendo-a em chunks de `chunk_rows` linhas.
+    """
+    paths = save_table_chunks(chunks, OUTPUT_TABLE, directory=directory)
+    matrix_dir = write_feature_matrix_chunks(lambda: iter_table_chunks(OUTPUT_TABLE, chunk_rows, directory=directory))
+    build = read_index(matrix_dir)["build"]
+    ids = lambda: (chunk[KEY_COLUMN] for chunk in iter_table_chunks(OUTPUT_TABLE, chunk_rows, [KEY_COLUMN],
+                                                                    directory=directory))
+    paths += [matrix_dir, build_index_chunks(ids, build=build)]
+    return paths
+
+
+def main():
+    # -------------------------------------------------
+    # 2) Carregar a tabela com features já calculadas
+    # -------------------------------------------------
+    print("Carregando dados para transformacao de:", table_path(INPUT_TABLE))
+    df = load_table(INPUT_TABLE)
+
+    df = transform_data(df)
+
+    # -------------------------------------------------
+    # 8) Salvar o DataFrame transformado
+    # -------------------------------------------------
+    output_paths = save_transformed(df)
+    print(f"DataFrame transformado salvo em: {', '.join(output_paths)}")
+
+
+if __name__ == "__main__":
+    main()
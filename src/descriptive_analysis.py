@@ -1,112 +1,225 @@
-import os
-import pandas as pd
+import argparse
+
+from exact_stats import exact_statistics
+from feature_matrix import load_transformed
+from instrumentation import span, traced
+from sampling import profile, sample_chunks
+from stats_accumulators import SKETCH_K, accumulate_chunks
+from stats_engine import column_stats, compute_statistics, describe, value_counts
+from storage import iter_table_chunks, table_columns, table_path
 
 # -------------------------------------------------
-# 1) Definir caminho de entrada (CSV transformado)
+# 1) Definir tabela de entrada (transformada, ver storage.py)
 # -------------------------------------------------
 
-BASE_DIR = os.path.dirname(__file__)  # .../src
-INPUT_CSV = os.path.join(BASE_DIR, os.pardir, "data", "clean", "telecom_churn_transformed.csv")
+INPUT_TABLE = "telecom_churn_transformed"
 
-# -------------------------------------------------
-# 2) Carregar o DataFrame transformado
-# -------------------------------------------------
+# Colunas categóricas para contagem de frequências
+CATEGORICAL_COLS = [
+    "Genero", "Idoso", "Tem_Conjuge", "Tem_Dependentes",
+    "Tem_Telefone", "Tipo_Internet", "Tipo_Contrato",
+    "Fatura_Digital", "Metodo_Pagamento"
+]
 
-print("Carregando dados de:", INPUT_CSV)
-df = pd.read_csv(INPUT_CSV)
+# Coluna que separa os grupos das estatísticas por grupo
+GROUP_COL = "Evasao"
 
-print("Dimensoes do DataFrame:", df.shape)
-print()
+# Linhas por chunk na leitura do modo amostra (--sample sem --chunk-rows)
+SAMPLE_CHUNK_ROWS = 100_000
 
-# -------------------------------------------------
-# 3) Estatísticas gerais com describe()
-# -------------------------------------------------
 
-print("=== Estatísticas Descritivas GERAIS (DataFrame.describe) ===")
-# describe() por padrão mostra count, mean, std, min, 25%, 50%, 75%, max para colunas numéricas
-stats_gerais = df.describe()
-print(stats_gerais)
-print()
+def _quantile_note(s, p):
+    # Quantis de sketch (modo em chunks): erro de posto e faixa que contém o valor exato
+    if not s.get("quantile_error"):
+        return ""
+    lo, hi = s["quantile_bounds"][p]
+    return f"  (aprox.: ±{s['quantile_error']:.2%} do posto, entre {lo:.2f} e {hi:.2f})"
 
-# Se quiser incluir também colunas categóricas (para contar valores únicos), use describe(include='all'):
-print("=== Estatísticas Descritivas COMPLETAS (DataFrame.describe include='all') ===")
-stats_all = df.describe(include="all")
-print(stats_all)
-print()
 
-# -------------------------------------------------
-# 4) Mediana e outras métricas específicas
-# -------------------------------------------------
+@traced("descriptive_analysis")
+def describe_data(df=None, stats=None):
+    """Imprime as estatísticas descritivas do DataFrame transformado e devolve o resultado de stats_engine.
+
+    Todas as tabelas saem de uma única passada (compute_statistics) sobre o
+    DataFrame; `stats` permite reaproveitar um resultado já calculado (ou
+    acumulado em chunks, ver stats_accumulators.py), e então `df` é opcional.
+    """
+    if stats is None:
+        stats = compute_statistics(df, by=GROUP_COL if GROUP_COL in df.columns else None)
 
-# Exemplo: calcular mediana manualmente para Cobranca_Mensal e Meses_Contratado
-if "Cobranca_Mensal" in df.columns:
-    mediana_mensal = df["Cobranca_Mensal"].median()
-    print(f"Mediana de Cobranca_Mensal: {mediana_mensal:.2f}")
-
-if "Meses_Contratado" in df.columns:
-    mediana_tenure = df["Meses_Contratado"].median()
-    print(f"Mediana de Meses_Contratado: {mediana_tenure:.2f}")
-print()
-
-# Outras métricas: variância, amplitude (max - min), coeficiente de variação
-numeric_cols = df.select_dtypes(include=["int64", "float64"]).columns.tolist()
-print("=== Métricas ADICIONAIS para colunas numéricas ===")
-for col in numeric_cols:
-    series = df[col]
-    media = series.mean()
-    desvio = series.std()
-    variancia = series.var()
-    minimo = series.min()
-    maximo = series.max()
-    amplitude = maximo - minimo
-    coef_var = desvio / media if media != 0 else float("nan")
-    print(f"- {col}:")
-    print(f"    count = {series.count()}")
-    print(f"    média = {media:.2f}")
-    print(f"    mediana = {series.median():.2f}")
-    print(f"    desvio padrão = {desvio:.2f}")
-    print(f"    variância = {variancia:.2f}")
-    print(f"    mínimo = {minimo:.2f}")
-    print(f"    25% = {series.quantile(0.25):.2f}")
-    print(f"    50% = {series.quantile(0.50):.2f}")
-    print(f"    75% = {series.quantile(0.75):.2f}")
-    print(f"    máximo = {maximo:.2f}")
-    print(f"    amplitude (max-min) = {amplitude:.2f}")
-    print(f"    coeficiente de variação (std/mean) = {coef_var:.2f}")
+    print("Dimensoes do DataFrame:", (stats["rows"], len(stats["columns"])))
     print()
 
-# -------------------------------------------------
-# 5) Contagem de frequências para colunas categóricas
-# -------------------------------------------------
+    # -------------------------------------------------
+    # 3) Estatísticas gerais com describe()
+    # -------------------------------------------------
+
+    with span("describe"):
+        print("=== Estatísticas Descritivas GERAIS (DataFrame.describe) ===")
+        # describe() por padrão mostra count, mean, std, min, 25%, 50%, 75%, max para colunas numéricas
+        stats_gerais = describe(stats)
+        print(stats_gerais)
+        erros = [column_stats(stats, col).get("quantile_error", 0.0) for col in stats["columns"]]
+        if any(erros):
+            print(f"(quantis aproximados por sketch KLL, k={stats['sketch_k']}: erro de posto até "
+                  f"{max(erros):.2%} com {stats['confidence']:.0%} de confiança)")
+    print()
 
-print("=== CONTAGEM DE FREQUÊNCIAS PARA COLUNAS CATEGÓRICAS ===")
-categorical_cols = [
-    "Genero", "Idoso", "Tem_Conjuge", "Tem_Dependentes",
-    "Tem_Telefone", "Tipo_Internet", "Tipo_Contrato",
-    "Fatura_Digital", "Metodo_Pagamento"
-]
+    # Se quiser incluir também colunas categóricas (para contar valores únicos), use describe(include='all'):
+    with span("describe_all"):
+        print("=== Estatísticas Descritivas COMPLETAS (DataFrame.describe include='all') ===")
+        stats_all = describe(stats, include="all")
+        print(stats_all)
+    print()
 
-for col in categorical_cols:
-    if col in df.columns:
-        contagens = df[col].value_counts(dropna=False)
-        porcentagens = df[col].value_counts(normalize=True, dropna=False) * 100
-        print(f"- {col}:")
-        print("   Frequência absoluta:")
-        print(contagens.to_dict())
-        print("   Frequência relativa (%):")
-        print(porcentagens.round(2).to_dict())
-        print()
+    # -------------------------------------------------
+    # 4) Mediana e outras métricas específicas
+    # -------------------------------------------------
 
-# -------------------------------------------------
-# 6) Grupos de estatísticas (por Evasao = 0/1)
-# -------------------------------------------------
+    with span("extra_metrics"):
+        # Exemplo: mediana de Cobranca_Mensal e Meses_Contratado
+        if "Cobranca_Mensal" in stats["columns"]:
+            s = column_stats(stats, "Cobranca_Mensal")
+            print(f"Mediana de Cobranca_Mensal: {s['median']:.2f}{_quantile_note(s, 0.5)}")
 
-if "Evasao" in df.columns:
-    print("=== ESTATÍSTICAS POR Evasao (0 = não evadiu, 1 = evadiu) ===\n")
-    grupos = df.groupby("Evasao")
-    for nome, grupo in grupos:
-        print(f"-- Evasao = {int(nome)} --")
-        print(grupo.describe(include="all"))
+        if "Meses_Contratado" in stats["columns"]:
+            s = column_stats(stats, "Meses_Contratado")
+            print(f"Mediana de Meses_Contratado: {s['median']:.2f}{_quantile_note(s, 0.5)}")
         print()
 
-print("\nAnálise descritiva concluída.")
+        # Outras métricas: variância, amplitude (max - min), coeficiente de variação
+        numeric_cols = [col for col, entry in stats["columns"].items() if entry["kind"] == "numeric"]
+        print("=== Métricas ADICIONAIS para colunas numéricas ===")
+        for col in numeric_cols:
+            s = column_stats(stats, col)
+            media = s["mean"]
+            desvio = s["std"]
+            variancia = s["var"]
+            minimo = s["min"]
+            maximo = s["max"]
+            amplitude = maximo - minimo
+            coef_var = desvio / media if media != 0 else float("nan")
+            print(f"- {col}:")
+            print(f"    count = {s['count']}")
+            print(f"    média = {media:.2f}")
+            print(f"    mediana = {s['median']:.2f}{_quantile_note(s, 0.5)}")
+            print(f"    desvio padrão = {desvio:.2f}")
+            print(f"    variância = {variancia:.2f}")
+            print(f"    mínimo = {minimo:.2f}")
+            print(f"    25% = {s['quantiles'][0.25]:.2f}{_quantile_note(s, 0.25)}")
+            print(f"    50% = {s['quantiles'][0.5]:.2f}{_quantile_note(s, 0.5)}")
+            print(f"    75% = {s['quantiles'][0.75]:.2f}{_quantile_note(s, 0.75)}")
+            print(f"    máximo = {maximo:.2f}")
+            print(f"    amplitude (max-min) = {amplitude:.2f}")
+            print(f"    coeficiente de variação (std/mean) = {coef_var:.2f}")
+            print()
+
+    # -------------------------------------------------
+    # 5) Contagem de frequências para colunas categóricas
+    # -------------------------------------------------
+
+    with span("frequencies"):
+        print("=== CONTAGEM DE FREQUÊNCIAS PARA COLUNAS CATEGÓRICAS ===")
+
+        for col in CATEGORICAL_COLS:
+            if col in stats["columns"]:
+                contagens = value_counts(stats, col, dropna=False)
+                porcentagens = value_counts(stats, col, normalize=True, dropna=False) * 100
+                print(f"- {col}:")
+                print("   Frequência absoluta:")
+                print(contagens.to_dict())
+                print("   Frequência relativa (%):")
+                print(porcentagens.round(2).to_dict())
+                print()
+
+    # -------------------------------------------------
+    # 6) Grupos de estatísticas (por Evasao = 0/1)
+    # -------------------------------------------------
+
+    with span("by_evasao"):
+        if stats["by"] == GROUP_COL:
+            print("=== ESTATÍSTICAS POR Evasao (0 = não evadiu, 1 = evadiu) ===\n")
+            for nome in stats["groups"]:
+                print(f"-- Evasao = {int(nome)} --")
+                print(describe(stats, group=nome, include="all"))
+                print()
+
+    print("\nAnálise descritiva concluída.")
+    return stats
+
+
+@traced("descriptive_sample")
+def describe_sample(size, chunk_rows=SAMPLE_CHUNK_ROWS):
+    """Perfil por amostra estratificada por Evasao: ausentes, quantis e frequências com intervalos."""
+    by = GROUP_COL if GROUP_COL in table_columns(INPUT_TABLE) else None
+    prof = profile(sample_chunks(iter_table_chunks(INPUT_TABLE, chunk_rows), size, by=by))
+    print(f"Amostra: {prof['sampled']} de {prof['rows']} linhas, estratificada por {prof['by']} "
+          f"(até {size} por grupo; intervalos de {prof['confidence']:.0%})")
+    print()
+
+    def ic(est, fmt):
+        return f"{est['estimate']:{fmt}} (IC {est['low']:{fmt}} – {est['high']:{fmt}})"
+
+    print("=== Valores ausentes (estimados) ===")
+    for col, entry in prof["columns"].items():
+        print(f"- {col}: {ic(entry['missing'], '.2%')}")
+    print()
+
+    print("=== Quantis das colunas numéricas (estimados) ===")
+    for col, entry in prof["columns"].items():
+        if "quantiles" in entry:
+            print(f"- {col}:")
+            for p, q in entry["quantiles"].items():
+                print(f"    {p:.0%} = {ic(q, '.2f')}")
+    print()
+
+    print("=== Frequência relativa das colunas categóricas (estimada) ===")
+    for col in CATEGORICAL_COLS:
+        entry = prof["columns"].get(col, {})
+        if "frequencies" in entry:
+            print(f"- {col}:")
+            for valor, freq in entry["frequencies"].items():
+                print(f"    {valor}: {ic(freq, '.2%')}")
+    print()
+    return prof
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Estatísticas descritivas da tabela transformada.")
+    parser.add_argument("--chunk-rows", type=int, metavar="N",
+                        help="lê a tabela em chunks de N linhas (para tabelas maiores que a memória; "
+                             "quantis aproximados)")
+    parser.add_argument("--sketch-k", type=int, default=SKETCH_K,
+                        help="tamanho do sketch de quantis no modo em chunks")
+    parser.add_argument("--exact", action="store_true",
+                        help="com --chunk-rows, estatísticas exatas (iguais às da tabela inteira) "
+                             "relendo a tabela em mais passadas, em vez de quantis aproximados")
+    parser.add_argument("--sample", type=int, metavar="N",
+                        help="perfil rápido sobre uma amostra de até N linhas por valor de Evasao, "
+                             "com intervalos de confiança")
+    args = parser.parse_args()
+
+    # -------------------------------------------------
+    # 2) Carregar o DataFrame transformado
+    # -------------------------------------------------
+
+    print("Carregando dados de:", table_path(INPUT_TABLE))
+    if args.sample:
+        describe_sample(args.sample, args.chunk_rows or SAMPLE_CHUNK_ROWS)
+        return
+
+    if args.chunk_rows:
+        by = GROUP_COL if GROUP_COL in table_columns(INPUT_TABLE) else None
+        if args.exact:
+            stats = exact_statistics(lambda: iter_table_chunks(INPUT_TABLE, args.chunk_rows), by=by, k=args.sketch_k)
+        else:
+            stats = accumulate_chunks(iter_table_chunks(INPUT_TABLE, args.chunk_rows), by=by, k=args.sketch_k)
+        describe_data(stats=stats)
+        return
+
+    df = load_transformed()
+    describe_data(df)
+
+
+if __name__ == "__main__":
+    main()
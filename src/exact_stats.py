@@ -0,0 +1,266 @@
+import numpy as np
+import pandas as pd
+
+from instrumentation import span
+from stats_accumulators import (SKETCH_K, finalize, new_ordered_sum, new_selection, new_table, ordered_sum,
+                                rank_window, selected_values, update_ordered_sum, update_selection, update_table)
+from stats_engine import PERCENTILES, interpolate, is_numeric, native_values, quantile_positions, sorted_median
+
+# -------------------------------------------------
+# Estatísticas exatas lidas em chunks (modo out-of-core)
+# -------------------------------------------------
+# exact_statistics(read_chunks, by) devolve o mesmo dict de
+# stats_engine.compute_statistics, com os mesmos valores bit a bit, sem
+# nunca ter a tabela inteira em memória. `read_chunks()` abre uma nova
+# leitura da tabela (ex.: storage.iter_table_chunks) a cada passada:
+#   1ª passada -> acumuladores de stats_accumulators.py (frequências, sketch
+#                 KLL, contagens por grupo), mínimo/máximo e as somas da
+#                 média na mesma ordem de blocos do numpy
+#   2ª passada -> soma dos quadrados dos desvios (variância) e, para cada
+#                 quantil, os valores da janela de postos indicada pelo sketch
+#   passadas extras (raras) -> janelas que não continham o posto pedido são
+#                 alargadas até [mínimo, máximo] e relidas
+# A memória depende do chunk, do sketch e dos valores distintos em cada
+# janela, não do número de linhas.
+
+# Alargamento da janela de postos a cada passada extra; a partir de
+# MAX_WIDEN a janela vira [mínimo, máximo] e sempre acerta
+WIDEN = 8
+MAX_WIDEN = WIDEN ** 3
+
+
+# -------------------------------------------------
+# 1) Recortes (total e grupos) de cada chunk
+# -------------------------------------------------
+
+def _scopes(chunk, by):
+    """(chave do recorte, posições das linhas no chunk): None = total; depois cada nível de `by`."""
+    yield None, None
+    if by is not None:
+        codes, levels = pd.factorize(chunk[by])
+        for i, level in enumerate(levels.tolist()):
+            yield level, np.flatnonzero(codes == i)
+
+
+def _visit(chunk, by, columns, visit):
+    """visit(coluna, recorte, valores, válidos, tipo) para cada coluna numérica de `columns` no chunk."""
+    native = {col: native_values(chunk[col]) for col in columns}
+    for scope, rows in _scopes(chunk, by):
+        for col, (values, valid, how) in native.items():
+            if rows is not None:
+                values, valid = values[rows], valid[rows]
+            visit(col, scope, values, valid, how)
+
+
+# -------------------------------------------------
+# 2) Média e variância na ordem do numpy (ver stats_engine._mean_var)
+# -------------------------------------------------
+
+def _new_track(how, dtype):
+    """Acumuladores de um recorte de coluna; `dtype` é o dtype dos valores de origem."""
+    if how == "masked":
+        # np.mean/np.var sobre os válidos: inteiros acumulam em float64
+        sum_dtype = np.dtype("float64") if dtype.kind in "iub" else dtype
+        return {"how": how, "value_dtype": dtype, "count": 0, "min": None, "max": None, "ranked": {},
+                "sum": new_ordered_sum(sum_dtype), "sq": new_ordered_sum(sum_dtype)}
+    value_dtype = np.dtype("float64") if how == "int" else dtype
+    return {"how": how, "value_dtype": dtype, "count": 0, "min": None, "max": None, "ranked": {},
+            "sum": new_ordered_sum(value_dtype), "sum64": new_ordered_sum("float64"),
+            "sq": new_ordered_sum("float64")}
+
+
+def _filled(track, values, valid):
+    if track["how"] == "int":
+        values = values.astype("float64")
+    return np.where(valid, values, 0)
+
+
+def _update_first(track, values, valid):
+    kept = values[valid]
+    track["count"] += kept.size
+    if kept.size:
+        low, high = kept.min(), kept.max()
+        track["min"] = low if track["min"] is None else min(track["min"], low)
+        track["max"] = high if track["max"] is None else max(track["max"], high)
+    if track["how"] == "masked":
+        update_ordered_sum(track["sum"], kept)
+    else:
+        filled = _filled(track, values, valid)
+        update_ordered_sum(track["sum"], filled)
+        update_ordered_sum(track["sum64"], filled)
+
+
+def _center(track):
+    """Média (no dtype do pandas) e o centro usado na soma dos quadrados."""
+    count = track["count"]
+    total = ordered_sum(track["sum"])
+    if track["how"] == "masked":
+        track["mean"] = total.dtype.type(total / count) if count else np.nan
+        track["center"] = np.true_divide(np.array([total]), count) if count else None
+    else:
+        dtype = track["sum"]["dtype"]
+        track["mean"] = total / dtype.type(count) if count else np.nan
+        track["center"] = ordered_sum(track["sum64"]) / dtype.type(count) if count else None
+
+
+def _update_second(track, values, valid):
+    if track["center"] is None:
+        return
+    if track["how"] == "masked":
+        x = values[valid] - track["center"]
+        update_ordered_sum(track["sq"], np.multiply(x, x, out=x))
+    else:
+        sqr = (track["center"] - _filled(track, values, valid)) ** 2
+        np.putmask(sqr, ~valid, 0)
+        update_ordered_sum(track["sq"], sqr)
+
+
+def _variance(track):
+    count = track["count"]
+    if count < 2:
+        return np.nan
+    sq = ordered_sum(track["sq"])
+    if track["how"] == "masked":
+        return sq.dtype.type(sq / np.intp(count - 1))
+    dtype = track["sum"]["dtype"]
+    return (sq / dtype.type(count - 1)).astype(dtype)
+
+
+# -------------------------------------------------
+# 3) Quantis e mediana por seleção de postos
+# -------------------------------------------------
+
+def _needed_ranks(n, percentiles):
+    """Postos pedidos, agrupados por janela (um grupo por quantil e um para a mediana, sem repetição)."""
+    prev, nxt, _ = quantile_positions(n, percentiles)
+    mid = n // 2
+    groups = [sorted({int(a), int(b)}) for a, b in zip(prev, nxt)]
+    groups.append([mid] if n % 2 else [mid - 1, mid])
+    return [list(g) for g in dict.fromkeys(tuple(g) for g in groups)]
+
+
+def open_windows(sketch, count, low, high, rank_groups, widen=1):
+    """Uma seleção (ver stats_accumulators.new_selection) por grupo de postos, com a faixa indicada pelo sketch."""
+    windows = []
+    for ranks in rank_groups:
+        if widen >= MAX_WIDEN:
+            lo, hi = float(low), float(high)
+        else:
+            lo, hi = rank_window(sketch, count, ranks, widen, lowest=float(low), highest=float(high))
+        windows.append((ranks, new_selection(lo, hi)))
+    return windows
+
+
+def resolve_windows(windows, ranked):
+    """Guarda em `ranked` os valores dos postos resolvidos; devolve True se todas as janelas acertaram."""
+    done = True
+    for ranks, selection in windows:
+        values = selected_values(selection, ranks)
+        if values is None:
+            done = False
+        else:
+            ranked.update(zip(ranks, values))
+    return done
+
+
+def _open_windows(track, sketch, percentiles, widen=1):
+    return open_windows(sketch, track["count"], track["min"], track["max"],
+                        _needed_ranks(track["count"], percentiles), widen)
+
+
+def _quantiles(track, percentiles):
+    n = track["count"]
+    if not n:
+        return [np.nan] * len(percentiles), np.nan
+    ranked = track["ranked"]
+    prev, nxt, gamma = quantile_positions(n, percentiles)
+    dtype = track["value_dtype"]
+    a = np.array([ranked[int(i)] for i in prev], dtype=dtype)
+    b = np.array([ranked[int(i)] for i in nxt], dtype=dtype)
+    mid = n // 2
+    middle = np.array([ranked[mid]] if n % 2 else [ranked[mid - 1], ranked[mid]], dtype=dtype)
+    return interpolate(a, b, gamma), sorted_median(middle, track["how"])
+
+
+# -------------------------------------------------
+# 4) API pública
+# -------------------------------------------------
+
+def _column_acc(acc, col, scope):
+    return acc["overall"][col] if scope is None else acc["groups"][scope][col]
+
+
+def exact_statistics(read_chunks, by=None, percentiles=PERCENTILES, k=SKETCH_K):
+    """Estatísticas de compute_statistics (mesmos valores) lendo a tabela em chunks, em duas passadas ou mais."""
+    with span("exact_statistics", by=by) as info:
+        acc = new_table(by, k)
+        tracks = {}
+        columns = None
+
+        def first(col, scope, values, valid, how):
+            if (col, scope) not in tracks:
+                tracks[(col, scope)] = _new_track(how, values.dtype)
+            _update_first(tracks[(col, scope)], values, valid)
+
+        for chunk in read_chunks():
+            if columns is None:
+                columns = [col for col in chunk.columns if is_numeric(chunk[col].dtype)]
+            update_table(acc, chunk)
+            _visit(chunk, by, columns, first)
+
+        for (col, scope), track in tracks.items():
+            _center(track)
+            track["windows"] = (_open_windows(track, _column_acc(acc, col, scope)["sketch"], percentiles)
+                                if track["count"] else [])
+
+        def second(col, scope, values, valid, how):
+            track = tracks[(col, scope)]
+            _update_second(track, values, valid)
+            for _, selection in track["windows"]:
+                update_selection(selection, values[valid])
+
+        for chunk in read_chunks():
+            _visit(chunk, by, columns, second)
+        passes = 2
+
+        # Janelas que não continham o posto: alargadas e relidas só para essas colunas
+        pending = {key for key, track in tracks.items() if not resolve_windows(track["windows"], track["ranked"])}
+        widen = 1
+        while pending:
+            widen *= WIDEN
+            for col, scope in pending:
+                tracks[(col, scope)]["windows"] = _open_windows(
+                    tracks[(col, scope)], _column_acc(acc, col, scope)["sketch"], percentiles, widen)
+
+            def extra(col, scope, values, valid, how):
+                if (col, scope) in pending:
+                    for _, selection in tracks[(col, scope)]["windows"]:
+                        update_selection(selection, values[valid])
+
+            for chunk in read_chunks():
+                _visit(chunk, by, sorted({col for col, _ in pending}), extra)
+            passes += 1
+            pending = {key for key in pending
+                       if not resolve_windows(tracks[key]["windows"], tracks[key]["ranked"])}
+
+        stats = finalize(acc, percentiles)
+        for col in columns or []:
+            entry = stats["columns"][col]
+            for scope, summary in [(None, entry["overall"])] + list(zip(stats["groups"], entry["groups"])):
+                summary.pop("quantile_error", None)
+                summary.pop("quantile_bounds", None)
+                track = tracks.get((col, scope))
+                if track is None:
+                    continue
+                var = _variance(track)
+                quantiles, median = _quantiles(track, percentiles)
+                summary.update(
+                    count=track["count"], mean=track["mean"], var=var, std=np.sqrt(var),
+                    min=track["min"] if track["count"] else np.nan,
+                    max=track["max"] if track["count"] else np.nan,
+                    median=median, quantiles=dict(zip(percentiles, quantiles)),
+                )
+        # Sem sketch no resultado: nenhum quantil é aproximado
+        del stats["sketch_k"], stats["confidence"]
+        info["rows"], info["passes"] = stats["rows"], passes
+    return stats
@@ -1,200 +1,33 @@
 import os
+import argparse
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
+
+from instrumentation import traced
+from chart_summaries import COUNT_COL, pair_counts, plot_frame
+from exact_stats import exact_statistics
+from feature_matrix import load_transformed
+from report_renderer import render_charts
+from stats_engine import compute_statistics, describe, describe_by_group
+from storage import iter_table_chunks, load_table, table_columns, table_path
 
 # -------------------------------------------------
 # 1) Configurações iniciais
 # -------------------------------------------------
 
-sns.set_style("whitegrid")
-plt.rcParams["figure.figsize"] = (8, 5)
-
 # Caminhos
 BASE_DIR    = os.path.dirname(__file__)            # .../src
-CLEAN_CSV   = os.path.join(BASE_DIR, os.pardir, "data", "clean", "telecom_churn_cleaned.csv")
+CLEAN_TABLE = "telecom_churn_cleaned"
+INPUT_TABLE = "telecom_churn_transformed"
 REPORTS_DIR = os.path.join(BASE_DIR, os.pardir, "reports")
 
-# Garante que a pasta reports/ exista
-os.makedirs(REPORTS_DIR, exist_ok=True)
-
-# -------------------------------------------------
-# 2) Carregar o CSV limpo
-# -------------------------------------------------
-
-print("Carregando dados limpos de:", CLEAN_CSV)
-df = pd.read_csv(CLEAN_CSV)
-
-print("Dimensoes do DataFrame limpo:", df.shape)
-print()
-
-# -------------------------------------------------
-# 3) Estatísticas Descritivas
-# -------------------------------------------------
-
-print("=== Estatísticas Descritivas (todas as colunas) ===")
-print(df.describe(include="all"))
-print("\n")
-
-# Se quiser estatísticas separadas para churn = True/False:
-if "Churn" in df.columns:
-    print("=== Estatísticas para clientes que churnaram (Churn=True) ===")
-    print(df[df["Churn"] == True].describe(include="all"))
-    print("\n")
-    print("=== Estatísticas para clientes que permaneceram (Churn=False) ===")
-    print(df[df["Churn"] == False].describe(include="all"))
-    print("\n")
-
-# -------------------------------------------------
-# 4) Gráficos Básicos
-# -------------------------------------------------
-
-# 4.1) Histograma de monthly charges
-if "account.Charges.Monthly" in df.columns:
-    plt.figure()
-    sns.histplot(df["account.Charges.Monthly"], bins=30, kde=True)
-    plt.title("Distribuição de Monthly Charges")
-    plt.xlabel("Monthly Charges")
-    plt.ylabel("Contagem")
-    plt.tight_layout()
-    out_path = os.path.join(REPORTS_DIR, "hist_monthly_charges.png")
-    plt.savefig(out_path)
-    plt.close()
-    print("Histograma de 'account.Charges.Monthly' salvo em:", out_path)
-
-# 4.2) Boxplot: monthly charges × churn
-if {"account.Charges.Monthly", "Churn"}.issubset(df.columns):
-    plt.figure()
-    sns.boxplot(x="Churn", y="account.Charges.Monthly", data=df)
-    plt.title("Boxplot: Monthly Charges por Churn")
-    plt.xlabel("Churn (False=permanece, True=cancelou)")
-    plt.ylabel("Monthly Charges")
-    plt.tight_layout()
-    out_path = os.path.join(REPORTS_DIR, "boxplot_monthly_charges_churn.png")
-    plt.savefig(out_path)
-    plt.close()
-    print("Boxplot 'Monthly Charges × Churn' salvo em:", out_path)
-
-# 4.3) Countplot: contrato × churn
-if {"account.Contract", "Churn"}.issubset(df.columns):
-    plt.figure(figsize=(8, 5))
-    sns.countplot(x="account.Contract", hue="Churn", data=df)
-    plt.title("Contagem de Churn por Tipo de Contrato")
-    plt.xlabel("Contract")
-    plt.ylabel("Contagem")
-    plt.xticks(rotation=45)
-    plt.tight_layout()
-    out_path = os.path.join(REPORTS_DIR, "count_churn_contract.png")
-    plt.savefig(out_path)
-    plt.close()
-    print("Countplot 'Churn × Account.Contract' salvo em:", out_path)
-
-# 4.4) Countplot: internet service × churn
-if {"internet.InternetService", "Churn"}.issubset(df.columns):
-    plt.figure(figsize=(8, 5))
-    sns.countplot(x="internet.InternetService", hue="Churn", data=df)
-    plt.title("Contagem de Churn por Internet Service")
-    plt.xlabel("Internet Service")
-    plt.ylabel("Contagem")
-    plt.xticks(rotation=45)
-    plt.tight_layout()
-    out_path = os.path.join(REPORTS_DIR, "count_churn_internet_service.png")
-    plt.savefig(out_path)
-    plt.close()
-    print("Countplot 'Churn × Internet Service' salvo em:", out_path)
-
-# 4.5) Countplot: gender × churn
-if {"customer.gender", "Churn"}.issubset(df.columns):
-    plt.figure(figsize=(6, 4))
-    sns.countplot(x="customer.gender", hue="Churn", data=df)
-    plt.title("Contagem de Churn por Gênero")
-    plt.xlabel("Gênero")
-    plt.ylabel("Contagem")
-    plt.tight_layout()
-    out_path = os.path.join(REPORTS_DIR, "count_churn_gender.png")
-    plt.savefig(out_path)
-    plt.close()
-    print("Countplot 'Churn × Gender' salvo em:", out_path)
-
-# -------------------------------------------------
-# 5) Heatmap de Correlação (apenas numéricos)
-# -------------------------------------------------
-
-numeric_cols = df.select_dtypes(include=["int64", "float64"]).columns.tolist()
-if len(numeric_cols) >= 2:
-    corr = df[numeric_cols].corr()
-    plt.figure(figsize=(10, 8))
-    sns.heatmap(corr, annot=True, fmt=".2f", cmap="coolwarm")
-    plt.title("Mapa de Correlação - Variáveis Numéricas")
-    plt.tight_layout()
-    out_path = os.path.join(REPORTS_DIR, "heatmap_correlation.png")
-    plt.savefig(out_path)
-    plt.close()
-    print("Heatmap de correlação salvo em:", out_path)
-
-# -------------------------------------------------
-# 6) Gráficos adicionais sugeridos
-#    (exemplos de variáveis de serviço × churn)
-# -------------------------------------------------
-
-serv_cols = [
+# Variáveis de serviço × churn (tabela limpa)
+SERV_COLS = [
     "internet.OnlineSecurity", "internet.OnlineBackup", "internet.DeviceProtection",
     "internet.TechSupport", "internet.StreamingTV", "internet.StreamingMovies"
 ]
-for col in serv_cols:
-    if {col, "Churn"}.issubset(df.columns):
-        plt.figure(figsize=(6, 4))
-        sns.countplot(x=col, hue="Churn", data=df)
-        plt.title(f"Churn por {col}")
-        plt.xlabel(col)
-        plt.ylabel("Contagem")
-        plt.xticks(rotation=45)
-        plt.tight_layout()
-        filename = f"count_churn_{col.replace('.', '_')}.png"
-        out_path = os.path.join(REPORTS_DIR, filename)
-        plt.savefig(out_path)
-        plt.close()
-        print(f"Countplot 'Churn × {col}' salvo em:", out_path)
-
-# -------------------------------------------------
-# 7) Finalização
-# -------------------------------------------------
-
-print("\nAnalise exploratoria concluida. Confira a pasta 'reports/' para os PNGs.")
-
-import os
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-
-# -------------------------------------------------
-# Configurações iniciais
-# -------------------------------------------------
-
-sns.set_style("whitegrid")
-plt.rcParams["figure.figsize"] = (8, 5)
-
-BASE_DIR    = os.path.dirname(__file__)            # pasta src/
-INPUT_CSV   = os.path.join(BASE_DIR, os.pardir, "data", "clean", "telecom_churn_transformed.csv")
-REPORTS_DIR = os.path.join(BASE_DIR, os.pardir, "reports")
-os.makedirs(REPORTS_DIR, exist_ok=True)
-
-# -------------------------------------------------
-# Carregar dados transformados
-# -------------------------------------------------
-
-print("Carregando dados de:", INPUT_CSV)
-df = pd.read_csv(INPUT_CSV)
-
-print("Dimensoes do DataFrame:", df.shape)
-print()
-
-# -------------------------------------------------
-# Lista de variáveis categóricas para explorar churn
-# -------------------------------------------------
 
 # Essas colunas já estão em português e mapeadas como 0/1 ou categorias legíveis
-categorical_cols = [
+CATEGORICAL_COLS = [
     "Genero",           # 1=female, 0=male
     "Idoso",            # 1 se idoso, 0 caso contrário
     "Tem_Conjuge",      # 1/0
@@ -205,275 +38,369 @@ categorical_cols = [
     "Fatura_Digital",   # 1/0
 ]
 
-# -------------------------------------------------
-# Para cada coluna categórica, gerar countplot de churn
-# -------------------------------------------------
+# Variáveis numéricas comparadas por Evasao (tabela transformada)
+NUMERIC_CHURN_COLS = ["Cobranca_Total", "Meses_Contratado"]
 
-for col in categorical_cols:
-    if col not in df.columns:
-        continue
-
-    # 1) Gráfico de barras / countplot
-    plt.figure()
-    # hue="Evasao" mostra separado quem permaneceu vs saiu
-    sns.countplot(x=col, hue="Evasao", data=df, palette="pastel")
-    plt.title(f"Churn por {col}")
-    plt.xlabel(col)
-    plt.ylabel("Quantidade de Clientes")
-    plt.xticks(rotation=45)
-    plt.legend(title="Evasão", labels=["Permaneceu", "Saiu"])
-    plt.tight_layout()
-
-    # Salvar a figura
-    filename = f"churn_by_{col.lower()}.png"
-    out_path = os.path.join(REPORTS_DIR, filename)
-    plt.savefig(out_path)
-    plt.close()
-    print(f"Gráfico 'Churn × {col}' salvo em: {out_path}")
-
-    # 2) Exibir contagens e porcentagens no console
-    print(f"\n=== Contagens por {col} e Evasao ===")
-    cross_tab = pd.crosstab(df[col], df["Evasao"], margins=False)
-    # Renomear colunas 0 e 1 para legibilidade
-    cross_tab.columns = ["Permaneceu", "Saiu"]
-    print(cross_tab)
-    print("\n=== Porcentagens por {col} ===")
-    cross_pct = cross_tab.div(cross_tab.sum(axis=1), axis=0) * 100
-    print(cross_pct.round(2))
-    print("\n" + "-"*50 + "\n")
-
-print("Análise de churn por variáveis categóricas concluída.")
 
-import os
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
+def _chart(kind, table, columns, filename, message, **options):
+    return dict(kind=kind, table=table, columns=list(columns), filename=filename, message=message, **options)
 
-# -------------------------------------------------
-# Configurações iniciais
-# -------------------------------------------------
 
-sns.set_style("whitegrid")
-plt.rcParams["figure.figsize"] = (8, 5)
+def _describe_group(stats, level):
+    # Grupo sem nenhuma linha (ex.: export sem nenhum cliente que saiu)
+    if level not in stats["groups"]:
+        return "(nenhum cliente neste grupo)"
+    return describe(stats, group=level, include="all")
 
-BASE_DIR    = os.path.dirname(__file__)            # pasta src/
-INPUT_CSV   = os.path.join(BASE_DIR, os.pardir, "data", "clean", "telecom_churn_transformed.csv")
-REPORTS_DIR = os.path.join(BASE_DIR, os.pardir, "reports")
-os.makedirs(REPORTS_DIR, exist_ok=True)
 
-# -------------------------------------------------
-# Carregar dados transformados
-# -------------------------------------------------
+def table_reader(name, chunk_rows):
+    """Leitor em chunks da tabela `name`: read_chunks(columns=None) abre uma nova leitura a cada chamada."""
+    return lambda columns=None: iter_table_chunks(name, chunk_rows, columns)
 
-print("Carregando dados de:", INPUT_CSV)
-df = pd.read_csv(INPUT_CSV)
 
-print("Dimensoes do DataFrame:", df.shape)
-print()
+def empty_frame(read_chunks):
+    """DataFrame sem linhas com as colunas e os dtypes da tabela lida em chunks."""
+    for chunk in read_chunks():
+        return chunk.iloc[:0]
+    return pd.DataFrame()
 
-# -------------------------------------------------
-# 1) Distribuição de 'Cobranca_Total' por Evasao
-# -------------------------------------------------
 
-if "Cobranca_Total" in df.columns and "Evasao" in df.columns:
-    # (a) Boxplot de Cobranca_Total × Evasao
-    plt.figure()
-    sns.boxplot(x="Evasao", y="Cobranca_Total", data=df, palette="pastel")
-    plt.title("Boxplot: Total Gasto por Evasao")
-    plt.xlabel("Evasao (0 = permaneceu, 1 = saiu)")
-    plt.ylabel("Cobranca Total (R$)")
-    plt.tight_layout()
-    box_tot_path = os.path.join(REPORTS_DIR, "boxplot_cobranca_total_churn.png")
-    plt.savefig(box_tot_path)
-    plt.close()
-    print("Boxplot 'Cobranca_Total × Evasao' salvo em:", box_tot_path)
-
-    # (b) Histograma comparativo de Cobranca_Total
-    plt.figure()
-    sns.histplot(df[df["Evasao"] == 0]["Cobranca_Total"], color="#a8dadc", label="Permaneceu", kde=True, stat="density", bins=30)
-    sns.histplot(df[df["Evasao"] == 1]["Cobranca_Total"], color="#f4a261", label="Saiu", kde=True, stat="density", bins=30)
-    plt.title("Distribuição de Cobranca_Total por Evasao")
-    plt.xlabel("Cobranca Total (R$)")
-    plt.ylabel("Densidade")
-    plt.legend(title="Status")
-    plt.tight_layout()
-    hist_tot_path = os.path.join(REPORTS_DIR, "hist_cobranca_total_churn.png")
-    plt.savefig(hist_tot_path)
-    plt.close()
-    print("Histograma 'Cobranca_Total por Evasao' salvo em:", hist_tot_path)
-
-    # (c) Estatísticas resumidas
-    print("\n=== Estatísticas de Cobranca_Total por Evasao ===")
-    stats_ct = df.groupby("Evasao")["Cobranca_Total"].describe().round(2)
-    # Renomear índice para legibilidade
-    stats_ct.index = ["Permaneceu", "Saiu"]
-    print(stats_ct)
-    print()
-else:
-    print("Coluna 'Cobranca_Total' ou 'Evasao' não encontrada no DataFrame.")
+def churn_crosstabs(read_chunks, columns, by="Evasao"):
+    """pd.crosstab(df[col], df[by]) de cada coluna, somando contagens por chunk (sem carregar a tabela)."""
+    crosstabs = {}
+    for col in columns:
+        pairs = plot_frame(pair_counts(read_chunks([col, by]), [col, by]))
+        cross_tab = pd.crosstab(pairs[col], pairs[by], values=pairs[COUNT_COL], aggfunc="sum")
+        crosstabs[col] = cross_tab.fillna(0).astype("int64")
+    return crosstabs
 
-# -------------------------------------------------
-# 2) Distribuição de 'Meses_Contratado' por Evasao
-# -------------------------------------------------
 
-if "Meses_Contratado" in df.columns and "Evasao" in df.columns:
-    # (a) Boxplot de Meses_Contratado × Evasao
-    plt.figure()
-    sns.boxplot(x="Evasao", y="Meses_Contratado", data=df, palette="pastel")
-    plt.title("Boxplot: Meses_Contratado por Evasao")
-    plt.xlabel("Evasao (0 = permaneceu, 1 = saiu)")
-    plt.ylabel("Meses Contratado")
-    plt.tight_layout()
-    box_ten_path = os.path.join(REPORTS_DIR, "boxplot_meses_contratado_churn.png")
-    plt.savefig(box_ten_path)
-    plt.close()
-    print("Boxplot 'Meses_Contratado × Evasao' salvo em:", box_ten_path)
-
-    # (b) Histograma comparativo de Meses_Contratado
-    plt.figure()
-    sns.histplot(df[df["Evasao"] == 0]["Meses_Contratado"], color="#a8dadc", label="Permaneceu", kde=True, stat="density", bins=30)
-    sns.histplot(df[df["Evasao"] == 1]["Meses_Contratado"], color="#f4a261", label="Saiu", kde=True, stat="density", bins=30)
-    plt.title("Distribuição de Meses_Contratado por Evasao")
-    plt.xlabel("Meses Contratado")
-    plt.ylabel("Densidade")
-    plt.legend(title="Status")
-    plt.tight_layout()
-    hist_ten_path = os.path.join(REPORTS_DIR, "hist_meses_contratado_churn.png")
-    plt.savefig(hist_ten_path)
-    plt.close()
-    print("Histograma 'Meses_Contratado por Evasao' salvo em:", hist_ten_path)
-
-    # (c) Estatísticas resumidas
-    print("\n=== Estatísticas de Meses_Contratado por Evasao ===")
-    stats_mt = df.groupby("Evasao")["Meses_Contratado"].describe().round(2)
-    stats_mt.index = ["Permaneceu", "Saiu"]
-    print(stats_mt)
-    print()
-else:
-    print("Coluna 'Meses_Contratado' ou 'Evasao' não encontrada no DataFrame.")
+@traced("explore_cleaned")
+def explore_cleaned(df, stats=None, stats_table=None):
+    """Estatísticas sobre a tabela limpa; devolve os specs dos gráficos básicos.
 
-print("Analise numerica de churn concluida.")
+    `stats` (stats_engine, agrupado por Churn) permite passar estatísticas já
+    calculadas em chunks; então `df` só precisa das colunas e dos dtypes.
+    `stats_table` é o nome da tabela gravada de onde vêm as linhas: o heatmap
+    usa (e mantém) as estatísticas de correlação dela (ver correlation.py).
+    """
+    # -------------------------------------------------
+    # 3) Estatísticas Descritivas
+    # -------------------------------------------------
 
-# -------------------------------------------------
-# 7) Análise Numérica de churn: Cobranca_Total e Meses_Contratado
-# -------------------------------------------------
+    # Uma passada (stats_engine.py) serve às três tabelas: total, Churn=True e Churn=False
+    if stats is None:
+        stats = compute_statistics(df, by="Churn" if "Churn" in df.columns else None)
 
-# Importante: verifique se, antes deste bloco, você já importou:
-# import os
-# import pandas as pd
-# import matplotlib.pyplot as plt
-# import seaborn as sns
-#
-# E se definiu:
-# BASE_DIR, REPORTS_DIR, df (DataFrame limpo ou transformado conforme seu pipeline atual).
-#
-# No exemplo abaixo, assumimos que df já foi carregado e contém as colunas:
-#    - 'Cobranca_Total'
-#    - 'Meses_Contratado'
-#    - 'Evasao'
-
-# 7.1) Boxplot de Cobranca_Total × Evasao
-if "Cobranca_Total" in df.columns and "Evasao" in df.columns:
-    plt.figure()
-    sns.boxplot(x="Evasao", y="Cobranca_Total", data=df, palette="pastel")
-    plt.title("Boxplot: Cobranca_Total por Evasao")
-    plt.xlabel("Evasao (0 = permaneceu, 1 = saiu)")
-    plt.ylabel("Cobranca Total (R$)")
-    plt.tight_layout()
-
-    box_tot_path = os.path.join(REPORTS_DIR, "boxplot_cobranca_total_churn.png")
-    plt.savefig(box_tot_path)
-    plt.close()
-    print("Boxplot 'Cobranca_Total × Evasao' salvo em:", box_tot_path)
-
-    # Histograma comparativo de Cobranca_Total
-    plt.figure()
-    sns.histplot(
-        df[df["Evasao"] == 0]["Cobranca_Total"],
-        color="#a8dadc",
-        label="Permaneceu",
-        kde=True,
-        stat="density",
-        bins=30
-    )
-    sns.histplot(
-        df[df["Evasao"] == 1]["Cobranca_Total"],
-        color="#f4a261",
-        label="Saiu",
-        kde=True,
-        stat="density",
-        bins=30
-    )
-    plt.title("Distribuicao de Cobranca_Total por Evasao")
-    plt.xlabel("Cobranca Total (R$)")
-    plt.ylabel("Densidade")
-    plt.legend(title="Status")
-    plt.tight_layout()
-
-    hist_tot_path = os.path.join(REPORTS_DIR, "hist_cobranca_total_churn.png")
-    plt.savefig(hist_tot_path)
-    plt.close()
-    print("Histograma 'Cobranca_Total por Evasao' salvo em:", hist_tot_path)
-
-    # Estatísticas resumidas
-    print("\n=== Estatísticas de Cobranca_Total por Evasao ===")
-    stats_ct = df.groupby("Evasao")["Cobranca_Total"].describe().round(2)
-    stats_ct.index = ["Permaneceu", "Saiu"]
-    print(stats_ct)
-    print()
-else:
-    print("Coluna 'Cobranca_Total' ou 'Evasao' não encontrada no DataFrame.")
-
-# 7.2) Boxplot de Meses_Contratado × Evasao
-if "Meses_Contratado" in df.columns and "Evasao" in df.columns:
-    plt.figure()
-    sns.boxplot(x="Evasao", y="Meses_Contratado", data=df, palette="pastel")
-    plt.title("Boxplot: Meses_Contratado por Evasao")
-    plt.xlabel("Evasao (0 = permaneceu, 1 = saiu)")
-    plt.ylabel("Meses Contratado")
-    plt.tight_layout()
-
-    box_ten_path = os.path.join(REPORTS_DIR, "boxplot_meses_contratado_churn.png")
-    plt.savefig(box_ten_path)
-    plt.close()
-    print("Boxplot 'Meses_Contratado × Evasao' salvo em:", box_ten_path)
-
-    # Histograma comparativo de Meses_Contratado
-    plt.figure()
-    sns.histplot(
-        df[df["Evasao"] == 0]["Meses_Contratado"],
-        color="#a8dadc",
-        label="Permaneceu",
-        kde=True,
-        stat="density",
-        bins=30
-    )
-    sns.histplot(
-        df[df["Evasao"] == 1]["Meses_Contratado"],
-        color="#f4a261",
-        label="Saiu",
-        kde=True,
-        stat="density",
-        bins=30
-    )
-    plt.title("Distribuicao de Meses_Contratado por Evasao")
-    plt.xlabel("Meses Contratado")
-    plt.ylabel("Densidade")
-    plt.legend(title="Status")
-    plt.tight_layout()
-
-    hist_ten_path = os.path.join(REPORTS_DIR, "hist_meses_contratado_churn.png")
-    plt.savefig(hist_ten_path)
-    plt.close()
-    print("Histograma 'Meses_Contratado por Evasao' salvo em:", hist_ten_path)
-
-    # Estatísticas resumidas
-    print("\n=== Estatísticas de Meses_Contratado por Evasao ===")
-    stats_mt = df.groupby("Evasao")["Meses_Contratado"].describe().round(2)
-    stats_mt.index = ["Permaneceu", "Saiu"]
-    print(stats_mt)
+    print("Dimensoes do DataFrame limpo:", (stats["rows"], df.shape[1]))
     print()
-else:
-    print("Coluna 'Meses_Contratado' ou 'Evasao' não encontrada no DataFrame.")
 
-print("Analise numerica de churn concluida.")
+    print("=== Estatísticas Descritivas (todas as colunas) ===")
+    print(describe(stats, include="all"))
+    print("\n")
+
+    # Se quiser estatísticas separadas para churn = True/False:
+    if "Churn" in df.columns:
+        print("=== Estatísticas para clientes que churnaram (Churn=True) ===")
+        print(_describe_group(stats, True))
+        print("\n")
+        print("=== Estatísticas para clientes que permaneceram (Churn=False) ===")
+        print(_describe_group(stats, False))
+        print("\n")
+
+    # -------------------------------------------------
+    # 4) Gráficos Básicos (renderizados por report_renderer.py)
+    # -------------------------------------------------
+    charts = []
+
+    # 4.1) Histograma de monthly charges
+    if "account.Charges.Monthly" in df.columns:
+        charts.append(_chart(
+            "hist", "cleaned", ["account.Charges.Monthly"], "hist_monthly_charges.png",
+            "Histograma de 'account.Charges.Monthly' salvo em:",
+            x="account.Charges.Monthly", bins=30, kde=True,
+            title="Distribuição de Monthly Charges", xlabel="Monthly Charges", ylabel="Contagem",
+        ))
+
+    # 4.2) Boxplot: monthly charges × churn
+    if {"account.Charges.Monthly", "Churn"}.issubset(df.columns):
+        charts.append(_chart(
+            "box", "cleaned", ["Churn", "account.Charges.Monthly"], "boxplot_monthly_charges_churn.png",
+            "Boxplot 'Monthly Charges × Churn' salvo em:",
+            x="Churn", y="account.Charges.Monthly",
+            title="Boxplot: Monthly Charges por Churn",
+            xlabel="Churn (False=permanece, True=cancelou)", ylabel="Monthly Charges",
+        ))
+
+    # 4.3) Countplot: contrato × churn
+    if {"account.Contract", "Churn"}.issubset(df.columns):
+        charts.append(_chart(
+            "count", "cleaned", ["account.Contract", "Churn"], "count_churn_contract.png",
+            "Countplot 'Churn × Account.Contract' salvo em:",
+            x="account.Contract", hue="Churn", figsize=(8, 5), rotation=45,
+            title="Contagem de Churn por Tipo de Contrato", xlabel="Contract", ylabel="Contagem",
+        ))
+
+    # 4.4) Countplot: internet service × churn
+    if {"internet.InternetService", "Churn"}.issubset(df.columns):
+        charts.append(_chart(
+            "count", "cleaned", ["internet.InternetService", "Churn"], "count_churn_internet_service.png",
+            "Countplot 'Churn × Internet Service' salvo em:",
+            x="internet.InternetService", hue="Churn", figsize=(8, 5), rotation=45,
+            title="Contagem de Churn por Internet Service", xlabel="Internet Service", ylabel="Contagem",
+        ))
+
+    # 4.5) Countplot: gender × churn
+    if {"customer.gender", "Churn"}.issubset(df.columns):
+        charts.append(_chart(
+            "count", "cleaned", ["customer.gender", "Churn"], "count_churn_gender.png",
+            "Countplot 'Churn × Gender' salvo em:",
+            x="customer.gender", hue="Churn", figsize=(6, 4),
+            title="Contagem de Churn por Gênero", xlabel="Gênero", ylabel="Contagem",
+        ))
+
+    # -------------------------------------------------
+    # 5) Heatmap de Correlação (apenas numéricos)
+    # -------------------------------------------------
+
+    numeric_cols = plot_frame(df).select_dtypes(include="number").columns.tolist()
+    if len(numeric_cols) >= 2:
+        charts.append(_chart(
+            "heatmap_corr", "cleaned", numeric_cols, "heatmap_correlation.png",
+            "Heatmap de correlação salvo em:",
+            figsize=(10, 8), title="Mapa de Correlação - Variáveis Numéricas", stats_table=stats_table,
+        ))
+
+    # -------------------------------------------------
+    # 6) Gráficos adicionais sugeridos
+    #    (exemplos de variáveis de serviço × churn)
+    # -------------------------------------------------
+
+    for col in SERV_COLS:
+        if {col, "Churn"}.issubset(df.columns):
+            charts.append(_chart(
+                "count", "cleaned", [col, "Churn"], f"count_churn_{col.replace('.', '_')}.png",
+                f"Countplot 'Churn × {col}' salvo em:",
+                x=col, hue="Churn", figsize=(6, 4), rotation=45,
+                title=f"Churn por {col}", xlabel=col, ylabel="Contagem",
+            ))
+
+    return charts
+
+
+@traced("plot_churn_by_category")
+def plot_churn_by_category(df, crosstabs=None, rows=None):
+    """Tabelas de contingência de Evasao por variável categórica; devolve os specs dos countplots.
+
+    `crosstabs` (ver churn_crosstabs) e `rows` substituem as linhas de `df`
+    quando a tabela é lida em chunks.
+    """
+    df = plot_frame(df)
+    print("Dimensoes do DataFrame:", df.shape if rows is None else (rows, df.shape[1]))
+    print()
+    charts = []
+
+    # -------------------------------------------------
+    # Para cada coluna categórica, gerar countplot de churn
+    # -------------------------------------------------
+
+    for col in CATEGORICAL_COLS:
+        if col not in df.columns:
+            continue
+
+        # 1) Gráfico de barras / countplot
+        # hue="Evasao" mostra separado quem permaneceu vs saiu
+        charts.append(_chart(
+            "count", "transformed", [col, "Evasao"], f"churn_by_{col.lower()}.png",
+            f"Gráfico 'Churn × {col}' salvo em:",
+            x=col, hue="Evasao", palette="pastel", rotation=45,
+            legend_title="Evasão", legend_labels=["Permaneceu", "Saiu"],
+            title=f"Churn por {col}", xlabel=col, ylabel="Quantidade de Clientes",
+        ))
+
+        # 2) Exibir contagens e porcentagens no console
+        print(f"\n=== Contagens por {col} e Evasao ===")
+        if crosstabs is not None:
+            cross_tab = crosstabs[col].copy()
+        else:
+            cross_tab = pd.crosstab(df[col], df["Evasao"], margins=False)
+        # Renomear colunas 0 e 1 para legibilidade
+        cross_tab.columns = ["Permaneceu", "Saiu"]
+        print(cross_tab)
+        print("\n=== Porcentagens por {col} ===")
+        cross_pct = cross_tab.div(cross_tab.sum(axis=1), axis=0) * 100
+        print(cross_pct.round(2))
+        print("\n" + "-"*50 + "\n")
+
+    print("Análise de churn por variáveis categóricas concluída.")
+    return charts
+
+
+def _numeric_churn_charts(col, xlabel, box_title, hist_title):
+    """Boxplot e histograma comparativo de `col` por Evasao."""
+    return [
+        _chart(
+            "box", "transformed", ["Evasao", col], f"boxplot_{col.lower()}_churn.png",
+            f"Boxplot '{col} × Evasao' salvo em:",
+            x="Evasao", y=col, palette="pastel",
+            title=box_title, xlabel="Evasao (0 = permaneceu, 1 = saiu)", ylabel=xlabel,
+        ),
+        _chart(
+            "hist_by", "transformed", ["Evasao", col], f"hist_{col.lower()}_churn.png",
+            f"Histograma '{col} por Evasao' salvo em:",
+            x=col, by="Evasao", groups=[(0, "#a8dadc", "Permaneceu"), (1, "#f4a261", "Saiu")],
+            kde=True, stat="density", bins=30, legend_title="Status",
+            title=hist_title, xlabel=xlabel, ylabel="Densidade",
+        ),
+    ]
+
+
+@traced("analyze_numeric_churn")
+def analyze_numeric_churn(df, stats=None, rows=None):
+    """Estatísticas de variáveis numéricas por Evasao; devolve os specs dos boxplots e histogramas.
+
+    `stats` (stats_engine, agrupado por Evasao) evita recalcular as estatísticas já
+    obtidas pela análise descritiva; com `rows`, `df` só precisa das colunas.
+    """
+    print("Dimensoes do DataFrame:", df.shape if rows is None else (rows, df.shape[1]))
+    print()
+    if stats is None or stats["by"] != "Evasao":
+        stats = compute_statistics(df, by="Evasao" if "Evasao" in df.columns else None)
+    charts = []
+
+    # -------------------------------------------------
+    # 1) Distribuição de 'Cobranca_Total' por Evasao
+    # -------------------------------------------------
+
+    if "Cobranca_Total" in df.columns and "Evasao" in df.columns:
+        # (a) Boxplot de Cobranca_Total × Evasao e (b) histograma comparativo
+        charts += _numeric_churn_charts(
+            "Cobranca_Total", "Cobranca Total (R$)",
+            "Boxplot: Cobranca_Total por Evasao", "Distribuicao de Cobranca_Total por Evasao",
+        )
+
+        # (c) Estatísticas resumidas
+        print("\n=== Estatísticas de Cobranca_Total por Evasao ===")
+        stats_ct = describe_by_group(stats, "Cobranca_Total").round(2)
+        # Renomear índice para legibilidade
+        stats_ct.index = ["Permaneceu", "Saiu"]
+        print(stats_ct)
+        print()
+    else:
+        print("Coluna 'Cobranca_Total' ou 'Evasao' não encontrada no DataFrame.")
+
+    # -------------------------------------------------
+    # 2) Distribuição de 'Meses_Contratado' por Evasao
+    # -------------------------------------------------
+
+    if "Meses_Contratado" in df.columns and "Evasao" in df.columns:
+        charts += _numeric_churn_charts(
+            "Meses_Contratado", "Meses Contratado",
+            "Boxplot: Meses_Contratado por Evasao", "Distribuicao de Meses_Contratado por Evasao",
+        )
+
+        # (c) Estatísticas resumidas
+        print("\n=== Estatísticas de Meses_Contratado por Evasao ===")
+        stats_mt = describe_by_group(stats, "Meses_Contratado").round(2)
+        stats_mt.index = ["Permaneceu", "Saiu"]
+        print(stats_mt)
+        print()
+    else:
+        print("Coluna 'Meses_Contratado' ou 'Evasao' não encontrada no DataFrame.")
+
+    print("Analise numerica de churn concluida.")
+    return charts
+
+
+def render_report(charts, df_clean=None, df_transformed=None, max_workers=None):
+    """Renderiza os specs em reports/ (em paralelo, ver report_renderer.py).
+
+    As tabelas podem ser DataFrames ou leitores em chunks (ver table_reader).
+    """
+    tables = {"cleaned": df_clean, "transformed": df_transformed}
+    paths = render_charts(charts, tables, REPORTS_DIR, max_workers=max_workers)
+    print("\nAnalise exploratoria concluida. Confira a pasta 'reports/' para os PNGs.")
+    return paths
+
+
+def cleaned_charts(chunk_rows=None):
+    """Carrega a tabela limpa; devolve (specs dos gráficos básicos, tabela limpa).
+
+    Com `chunk_rows`, a tabela é lida em chunks (mesmos resultados) e o
+    segundo item é o leitor em chunks em vez do DataFrame.
+    """
+    # -------------------------------------------------
+    # 2) Carregar a tabela limpa
+    # -------------------------------------------------
+    print("Carregando dados limpos de:", table_path(CLEAN_TABLE))
+    if chunk_rows:
+        read_clean = table_reader(CLEAN_TABLE, chunk_rows)
+        by = "Churn" if "Churn" in table_columns(CLEAN_TABLE) else None
+        return (explore_cleaned(empty_frame(read_clean), stats=exact_statistics(read_clean, by=by),
+                                stats_table=CLEAN_TABLE), read_clean)
+    df_clean = load_table(CLEAN_TABLE)
+    return explore_cleaned(df_clean, stats_table=CLEAN_TABLE), df_clean
+
+
+def transformed_charts(chunk_rows=None):
+    """Carrega a tabela transformada; devolve (specs dos gráficos por Evasao, tabela transformada).
+
+    Com `chunk_rows`, como em cleaned_charts.
+    """
+    # -------------------------------------------------
+    # Carregar dados transformados (só as colunas usadas nos gráficos)
+    # -------------------------------------------------
+    colunas_transformadas = table_columns(INPUT_TABLE)
+
+    print("Carregando dados de:", table_path(INPUT_TABLE))
+    colunas_usadas = [c for c in CATEGORICAL_COLS + ["Evasao"] + NUMERIC_CHURN_COLS if c in colunas_transformadas]
+    colunas_categoricas = [c for c in CATEGORICAL_COLS + ["Evasao"] if c in colunas_usadas]
+    colunas_numericas = [c for c in ["Evasao"] + NUMERIC_CHURN_COLS if c in colunas_usadas]
+    if chunk_rows:
+        read_transformed = table_reader(INPUT_TABLE, chunk_rows)
+        empty = empty_frame(lambda: read_transformed(colunas_usadas))
+        crosstabs = (churn_crosstabs(read_transformed, [c for c in CATEGORICAL_COLS if c in colunas_usadas])
+                     if "Evasao" in colunas_usadas else None)
+        stats = exact_statistics(lambda: read_transformed(colunas_numericas),
+                                 by="Evasao" if "Evasao" in colunas_usadas else None)
+        charts = plot_churn_by_category(empty[colunas_categoricas], crosstabs=crosstabs, rows=stats["rows"])
+        charts += analyze_numeric_churn(empty[colunas_numericas], stats, rows=stats["rows"])
+        return charts, read_transformed
+
+    # Pela matriz mapeada em memória quando ela está atualizada (ver feature_matrix.py)
+    df_transformed = load_transformed(columns=colunas_usadas)
+    charts = plot_churn_by_category(df_transformed[colunas_categoricas])
+    charts += analyze_numeric_churn(df_transformed[colunas_numericas])
+    return charts, df_transformed
+
+
+def report_cleaned(chunk_rows=None):
+    """Só a metade da tabela limpa (usada pelo scheduler.py); devolve os PNGs."""
+    charts, df_clean = cleaned_charts(chunk_rows)
+    return render_report(charts, df_clean=df_clean)
+
+
+def report_transformed(chunk_rows=None):
+    """Só a metade da tabela transformada (usada pelo scheduler.py); devolve os PNGs."""
+    charts, df_transformed = transformed_charts(chunk_rows)
+    return render_report(charts, df_transformed=df_transformed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Análise exploratória e gráficos das tabelas limpa e transformada.")
+    parser.add_argument("--chunk-rows", type=int, metavar="N",
+                        help="lê as tabelas em chunks de N linhas, sem carregá-las inteiras "
+                             "(para tabelas maiores que a memória; mesmos resultados)")
+    args = parser.parse_args()
+
+    charts, df_clean = cleaned_charts(args.chunk_rows)
+    charts_transformed, df_transformed = transformed_charts(args.chunk_rows)
+
+    # -------------------------------------------------
+    # Renderizar todos os gráficos de uma vez (em paralelo)
+    # -------------------------------------------------
+    render_report(charts + charts_transformed, df_clean, df_transformed)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,49 +1,58 @@
-import os
-import pandas as pd
+from instrumentation import traced
+from schema import apply_schema
+from storage import load_table, save_table, table_path
 
 # -------------------------------------------------
-# 1) Definir caminhos de entrada e saída
+# 1) Definir tabelas de entrada e saída (em data/clean/, ver storage.py)
 # -------------------------------------------------
-# Caminho para o CSV limpo que criamos em data_cleaning.py
-BASE_DIR = os.path.dirname(__file__)                     # .../src
-CLEANED_CSV = os.path.join(BASE_DIR, os.pardir, "data", "clean", "telecom_churn_cleaned.csv")
+# Tabela limpa que criamos em data_cleaning.py
+INPUT_TABLE = "telecom_churn_cleaned"
 
-# Caminho para onde vamos salvar o CSV com a nova feature
-OUTPUT_DIR = os.path.join(BASE_DIR, os.pardir, "data", "clean")
-OUTPUT_CSV = os.path.join(OUTPUT_DIR, "telecom_churn_features.csv")
+# Tabela onde vamos salvar o DataFrame com a nova feature
+OUTPUT_TABLE = "telecom_churn_features"
 
-# -------------------------------------------------
-# 2) Carregar o DataFrame limpo
-# -------------------------------------------------
-print("Carregando CSV limpo de:", CLEANED_CSV)
-df = pd.read_csv(CLEANED_CSV)
 
-print("Dimensões antes de adicionar nova coluna:", df.shape)
-print()
+@traced("feature_engineering")
+def add_features(df):
+    """Devolve uma cópia de `df` com a coluna 'Contas_Diarias'."""
+    df = df.copy()
+    print("Dimensões antes de adicionar nova coluna:", df.shape)
+    print()
 
-# -------------------------------------------------
-# 3) Criar a coluna 'Contas_Diarias'
-# -------------------------------------------------
-# Assumimos que 'account.Charges.Monthly' existe e representa o valor cobrado no mês
-if "account.Charges.Monthly" not in df.columns:
-    raise KeyError("Coluna 'account.Charges.Monthly' não encontrada no DataFrame.")
+    # -------------------------------------------------
+    # 3) Criar a coluna 'Contas_Diarias'
+    # -------------------------------------------------
+    # Assumimos que 'account.Charges.Monthly' existe e representa o valor cobrado no mês
+    if "account.Charges.Monthly" not in df.columns:
+        raise KeyError("Coluna 'account.Charges.Monthly' não encontrada no DataFrame.")
 
-# Calcule o valor diário como MonthlyCharges dividido por 30
-df["Contas_Diarias"] = df["account.Charges.Monthly"] / 30
+    # Calcule o valor diário como MonthlyCharges dividido por 30
+    df["Contas_Diarias"] = df["account.Charges.Monthly"] / 30
 
-# Opcional: arredonde para 2 casas decimais
-df["Contas_Diarias"] = df["Contas_Diarias"].round(2)
+    # Opcional: arredonde para 2 casas decimais
+    df["Contas_Diarias"] = df["Contas_Diarias"].round(2)
 
-print("Coluna 'Contas_Diarias' criada com sucesso.")
-print("Dimensões após adicionar a coluna:", df.shape)
-print()
+    print("Coluna 'Contas_Diarias' criada com sucesso.")
+    print("Dimensões após adicionar a coluna:", df.shape)
+    print()
+    return apply_schema(df, "features")
+
+
+def main():
+    # -------------------------------------------------
+    # 2) Carregar o DataFrame limpo
+    # -------------------------------------------------
+    print("Carregando dados limpos de:", table_path(INPUT_TABLE))
+    df = load_table(INPUT_TABLE)
+
+    df = add_features(df)
+
+    # -------------------------------------------------
+    # 4) Salvar o novo DataFrame com a feature
+    # -------------------------------------------------
+    output_paths = save_table(df, OUTPUT_TABLE)
+    print(f"DataFrame com nova feature salvo em: {', '.join(output_paths)}")
 
-# -------------------------------------------------
-# 4) Salvar o novo DataFrame com a feature
-# -------------------------------------------------
-# Garante que a pasta de saída exista
-os.makedirs(OUTPUT_DIR, exist_ok=True)
 
-# Salva em CSV
-df.to_csv(OUTPUT_CSV, index=False)
-print(f"DataFrame com nova feature salvo em: {OUTPUT_CSV}")
+if __name__ == "__main__":
+    main()
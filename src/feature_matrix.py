@@ -0,0 +1,271 @@
+import os
+import json
+import shutil
+import uuid
+import numpy as np
+import pandas as pd
+
+from columnar import replace_directory
+from instrumentation import span
+from schema import apply_schema
+from storage import CLEAN_DIR, load_table, resolve_format, table_path
+
+# -------------------------------------------------
+# Matriz de features mapeada em memória (tabela transformada)
+# -------------------------------------------------
+# Além da tabela em data/clean/, a etapa de transformação grava um diretório
+# em data/matrix/ com
+#   matrix.npy   -> todas as colunas numéricas/flags como uma matriz float64
+#                   (linhas × colunas, ordem Fortran: cada coluna é contígua;
+#                   ausentes do Int8 viram NaN)
+#   codes.npy    -> códigos int8 das colunas categóricas (mesma disposição)
+#   s<i>.npy     -> colunas de texto (ex.: ID_Cliente) em largura fixa
+#   index.json   -> sidecar: linhas, ordem e dtype de cada coluna, categorias
+#                   e um id de build (ver customer_index.py)
+# Os arquivos são abertos com np.load(mmap_mode="r"): as colunas do DataFrame
+# são views do arquivo (sem cópia), e vários processos de análise lendo a
+# mesma matriz compartilham o page cache do sistema em vez de cada um ter a
+# sua cópia. Com schema_dtypes=True (padrão), as flags voltam aos dtypes de
+# schema.py (Int8/int8/int16, uma cópia pequena); as colunas float64 seguem
+# como views.
+
+MATRIX_DIR = os.path.join(CLEAN_DIR, os.pardir, "matrix", "telecom_churn_transformed")
+SOURCE_TABLE = "telecom_churn_transformed"
+INDEX_FILE = "index.json"
+FORMAT_VERSION = 1
+
+
+def _storage(dtype):
+    if isinstance(dtype, pd.CategoricalDtype):
+        return "codes"
+    if pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype):
+        return "matrix"
+    return "strings"
+
+
+# -------------------------------------------------
+# 1) Escrita
+# -------------------------------------------------
+
+def _write_block(directory, name, columns, dtype, to_array):
+    if not columns:
+        return
+    block = np.lib.format.open_memmap(os.path.join(directory, name), mode="w+", dtype=dtype,
+                                      shape=(len(columns[0][1]), len(columns)), fortran_order=True)
+    for j, (_, series) in enumerate(columns):
+        block[:, j] = to_array(series)
+    block.flush()
+    del block
+
+
+def write_feature_matrix(df, directory=MATRIX_DIR):
+    """Grava a matriz de features de `df` de forma atômica (diretório temporário + rename)."""
+    parent = os.path.dirname(os.path.abspath(directory))
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = os.path.join(parent, f".tmp-{uuid.uuid4().hex}")
+    os.makedirs(tmp_dir)
+
+    try:
+        with span("write_feature_matrix", rows=len(df)):
+            index = {"format_version": FORMAT_VERSION, "build": uuid.uuid4().hex, "rows": len(df), "columns": []}
+            blocks = {"matrix": [], "codes": []}
+            for i, col in enumerate(df.columns):
+                series = df[col]
+                storage = _storage(series.dtype)
+                entry = {"name": col, "dtype": str(series.dtype), "storage": storage}
+                if storage == "strings":
+                    entry["file"] = f"s{i}.npy"
+                    missing = series.isna().to_numpy()
+                    np.save(os.path.join(tmp_dir, entry["file"]), series.where(~missing, "").to_numpy(dtype=str))
+                    if missing.any():
+                        entry["mask"] = f"s{i}.mask.npy"
+                        np.save(os.path.join(tmp_dir, entry["mask"]), missing)
+                else:
+                    entry["position"] = len(blocks[storage])
+                    blocks[storage].append((col, series))
+                    if storage == "codes":
+                        if len(series.cat.categories) >= np.iinfo(np.int8).max:
+                            raise ValueError(f"Categorias demais para códigos int8 em '{col}'")
+                        entry["categories"] = [v.item() if isinstance(v, np.generic) else v
+                                               for v in series.cat.categories]
+                        entry["ordered"] = bool(series.cat.ordered)
+                index["columns"].append(entry)
+
+            _write_block(tmp_dir, "matrix.npy", blocks["matrix"], np.float64,
+                         lambda s: s.to_numpy(dtype=np.float64, na_value=np.nan))
+            _write_block(tmp_dir, "codes.npy", blocks["codes"], np.int8,
+                         lambda s: s.cat.codes.to_numpy())
+            with open(os.path.join(tmp_dir, INDEX_FILE), "w", encoding="utf-8") as f:
+                json.dump(index, f, ensure_ascii=False)
+
+        replace_directory(tmp_dir, directory)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    return directory
+
+
+def write_feature_matrix_chunks(read_chunks, directory=MATRIX_DIR):
+    """Mesma matriz de write_feature_matrix a partir de uma tabela lida em chunks (duas passadas).
+
+    `read_chunks()` abre uma nova leitura da tabela; a 1ª passada conta as
+    linhas e mede a largura dos textos, a 2ª preenche os arquivos mapeados.
+    """
+    rows, first, widths, masked = 0, None, {}, set()
+    for chunk in read_chunks():
+        first = chunk if first is None else first
+        rows += len(chunk)
+        for col in chunk.columns:
+            if _storage(chunk[col].dtype) == "strings":
+                missing = chunk[col].isna().to_numpy()
+                values = chunk[col].where(~missing, "").to_numpy(dtype=str)
+                widths[col] = max(widths.get(col, 1), values.dtype.itemsize // np.dtype("U1").itemsize)
+                if missing.any():
+                    masked.add(col)
+    if first is None:
+        raise ValueError("Tabela sem chunks: nada para gravar na matriz de features")
+
+    parent = os.path.dirname(os.path.abspath(directory))
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = os.path.join(parent, f".tmp-{uuid.uuid4().hex}")
+    os.makedirs(tmp_dir)
+
+    try:
+        with span("write_feature_matrix", rows=rows, chunked=True):
+            index = {"format_version": FORMAT_VERSION, "build": uuid.uuid4().hex, "rows": rows, "columns": []}
+            files, positions = {}, {"matrix": [], "codes": []}
+            for i, col in enumerate(first.columns):
+                series = first[col]
+                storage = _storage(series.dtype)
+                entry = {"name": col, "dtype": str(series.dtype), "storage": storage}
+                if storage == "strings":
+                    entry["file"] = f"s{i}.npy"
+                    files[col] = [np.lib.format.open_memmap(os.path.join(tmp_dir, entry["file"]), mode="w+",
+                                                            dtype=f"U{widths[col]}", shape=(rows,))]
+                    if col in masked:
+                        entry["mask"] = f"s{i}.mask.npy"
+                        files[col].append(np.lib.format.open_memmap(os.path.join(tmp_dir, entry["mask"]),
+                                                                    mode="w+", dtype=bool, shape=(rows,)))
+                else:
+                    entry["position"] = len(positions[storage])
+                    positions[storage].append(col)
+                    if storage == "codes":
+                        if len(series.cat.categories) >= np.iinfo(np.int8).max:
+                            raise ValueError(f"Categorias demais para códigos int8 em '{col}'")
+                        entry["categories"] = [v.item() if isinstance(v, np.generic) else v
+                                               for v in series.cat.categories]
+                        entry["ordered"] = bool(series.cat.ordered)
+                index["columns"].append(entry)
+
+            blocks = {storage: np.lib.format.open_memmap(os.path.join(tmp_dir, f"{storage}.npy"), mode="w+",
+                                                         dtype=np.float64 if storage == "matrix" else np.int8,
+                                                         shape=(rows, len(cols)), fortran_order=True)
+                      for storage, cols in positions.items() if cols}
+            start = 0
+            for chunk in read_chunks():
+                stop = start + len(chunk)
+                for storage, block in blocks.items():
+                    for j, col in enumerate(positions[storage]):
+                        series = chunk[col]
+                        block[start:stop, j] = (series.to_numpy(dtype=np.float64, na_value=np.nan)
+                                                if storage == "matrix" else series.cat.codes.to_numpy())
+                for col, arrays in files.items():
+                    missing = chunk[col].isna().to_numpy()
+                    arrays[0][start:stop] = chunk[col].where(~missing, "").to_numpy(dtype=str)
+                    if len(arrays) > 1:
+                        arrays[1][start:stop] = missing
+                start = stop
+            for array in list(blocks.values()) + [a for arrays in files.values() for a in arrays]:
+                array.flush()
+            del blocks, files
+            with open(os.path.join(tmp_dir, INDEX_FILE), "w", encoding="utf-8") as f:
+                json.dump(index, f, ensure_ascii=False)
+
+        replace_directory(tmp_dir, directory)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    return directory
+
+
+# -------------------------------------------------
+# 2) Leitura (zero-copy)
+# -------------------------------------------------
+
+def read_index(directory=MATRIX_DIR):
+    with open(os.path.join(directory, INDEX_FILE), "r", encoding="utf-8") as f:
+        index = json.load(f)
+    if index.get("format_version") != FORMAT_VERSION:
+        raise ValueError(f"Versão de matriz de features não suportada em {directory}")
+    return index
+
+
+def open_matrix(directory=MATRIX_DIR):
+    """(sidecar, matriz float64 mapeada, códigos int8 mapeados); blocos ausentes saem como None."""
+    index = read_index(directory)
+    blocks = []
+    for name in ("matrix.npy", "codes.npy"):
+        path = os.path.join(directory, name)
+        blocks.append(np.load(path, mmap_mode="r") if os.path.exists(path) else None)
+    return index, blocks[0], blocks[1]
+
+
+def load_features(columns=None, directory=MATRIX_DIR, schema_dtypes=True, rows=None):
+    """DataFrame com as colunas pedidas; colunas da matriz são views do arquivo mapeado.
+
+    Com `rows` (posições), lê só essas linhas: o índice do DataFrame são as
+    posições e só as páginas tocadas do arquivo são carregadas.
+    """
+    index, matrix, codes = open_matrix(directory)
+    by_name = {entry["name"]: entry for entry in index["columns"]}
+    columns = list(by_name) if columns is None else list(columns)
+    missing = [c for c in columns if c not in by_name]
+    if missing:
+        raise KeyError(f"Colunas não encontradas em {directory}: {missing}")
+
+    # Slice básico mantém a view do arquivo; posições explícitas copiam só as linhas pedidas
+    take = slice(None) if rows is None else np.asarray(rows, dtype=np.intp)
+    data = {}
+    for col in columns:
+        entry = by_name[col]
+        if entry["storage"] == "matrix":
+            data[col] = matrix[take, entry["position"]]
+        elif entry["storage"] == "codes":
+            data[col] = pd.Categorical.from_codes(codes[take, entry["position"]], categories=entry["categories"],
+                                                  ordered=entry["ordered"])
+        else:
+            values = np.load(os.path.join(directory, entry["file"]), mmap_mode="r")[take].astype(object)
+            if "mask" in entry:
+                values[np.load(os.path.join(directory, entry["mask"]), mmap_mode="r")[take]] = np.nan
+            data[col] = values
+    row_index = pd.RangeIndex(index["rows"]) if rows is None else pd.Index(take)
+    df = pd.DataFrame(data, columns=columns, index=row_index, copy=False)
+    return apply_schema(df, "transformed") if schema_dtypes else df
+
+
+def is_fresh(directory=MATRIX_DIR, table=SOURCE_TABLE):
+    """True se a matriz existe e não é mais antiga que a tabela de origem."""
+    try:
+        matrix_mtime = os.path.getmtime(os.path.join(directory, INDEX_FILE))
+        return matrix_mtime >= os.path.getmtime(table_path(table))
+    except (FileNotFoundError, ValueError):
+        return False
+
+
+def load_transformed(columns=None, directory=MATRIX_DIR):
+    """Tabela transformada pela matriz mapeada quando ela está atualizada; senão, por storage.load_table."""
+    if is_fresh(directory):
+        available = {entry["name"] for entry in read_index(directory)["columns"]}
+        if columns is None or set(columns) <= available:
+            with span("load_features", columns=len(columns) if columns is not None else len(available)):
+                return load_features(columns, directory)
+    return load_table(SOURCE_TABLE, columns=columns)
+
+
+# -------------------------------------------------
+# 3) Linha de comando: gerar a matriz a partir da tabela gravada
+# -------------------------------------------------
+
+if __name__ == "__main__":
+    print("Lendo", table_path(SOURCE_TABLE), f"({resolve_format(SOURCE_TABLE)})")
+    print("Matriz de features gravada em:", write_feature_matrix(load_table(SOURCE_TABLE)))
@@ -0,0 +1,93 @@
+import os
+import json
+import numpy as np
+import pandas as pd
+
+from instrumentation import span
+from storage import CLEAN_DIR
+
+# -------------------------------------------------
+# Imputação de ausentes numéricos pela mediana
+# -------------------------------------------------
+# 1) Colunas numéricas que chegam como texto do JSON bruto (account.Charges.Total:
+#    "593.3", " ") já saem da ingestão como float64 (ver ingestion.py);
+#    coerce_numeric() converte as que ainda estiverem como texto (DataFrames
+#    montados por fora da ingestão). O que não é número vira ausente e passa
+#    a ser preenchido como as demais numéricas.
+# 2) As medianas de todas as colunas pedidas saem de uma única seleção
+#    (np.partition sobre o bloco colunas × linhas), sem ordenar os dados; o
+#    resultado é o mesmo de Series.median().
+# 3) Os valores ajustados ("fill values") são gravados em
+#    data/clean/fill_values.json; o incremental e o scoring os reaplicam sem
+#    reler o histórico.
+
+FILL_VALUES_PATH = os.path.join(CLEAN_DIR, "fill_values.json")
+
+# Colunas numéricas que o JSON bruto traz como texto
+NUMERIC_TEXT_COLS = ["account.Charges.Total"]
+
+
+def coerce_numeric(df, columns=NUMERIC_TEXT_COLS):
+    """Converte as colunas de texto numérico para float64; devolve (df, rejeitados por coluna).
+
+    Textos que não são números (ex.: " ") viram NaN e são contados em `rejeitados`.
+    """
+    out = df.copy(deep=False)
+    rejected = {}
+    for col in columns:
+        if col in out.columns and not pd.api.types.is_numeric_dtype(out[col].dtype):
+            values = pd.to_numeric(out[col], errors="coerce")
+            rejected[col] = int((values.isna() & out[col].notna()).sum())
+            out[col] = values.astype("float64")
+    return out, rejected
+
+
+def medians(df, columns):
+    """Medianas exatas de `columns` numa só passada de seleção (np.partition), ignorando ausentes."""
+    columns = list(columns)
+    if not columns:
+        return {}
+    block = np.empty((len(columns), len(df)), dtype="float64")
+    for i, col in enumerate(columns):
+        block[i] = df[col].to_numpy(dtype="float64", na_value=np.nan)
+    missing = np.isnan(block)
+    counts = (~missing).sum(axis=1)
+    # Ausentes vão para o fim de cada linha; só as posições do meio são selecionadas
+    block[missing] = np.inf
+    lower, upper = (counts - 1) // 2, counts // 2
+    valid = counts > 0
+    result = np.full(len(columns), np.nan)
+    if valid.any():
+        kth = np.unique(np.concatenate([lower[valid], upper[valid]]))
+        selected = np.partition(block, kth, axis=1)
+        rows = np.flatnonzero(valid)
+        result[rows] = (selected[rows, lower[rows]] + selected[rows, upper[rows]]) / 2
+    return {col: float(value) for col, value in zip(columns, result)}
+
+
+def fit_fill_values(df, columns=None):
+    """Fill values (mediana) das colunas numéricas de `df` (todas, se `columns` for None)."""
+    with span("fit_fill_values", rows=len(df)):
+        df, _ = coerce_numeric(df)
+        if columns is None:
+            columns = df.select_dtypes(include="number").columns
+        return medians(df, columns)
+
+
+def save_fill_values(fill_values, rows, path=FILL_VALUES_PATH):
+    """Grava os fill values (e o número de linhas usadas no ajuste) de forma atômica."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"rows": int(rows), "fill_values": fill_values}, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_fill_values(path=FILL_VALUES_PATH):
+    """Fill values gravados por save_fill_values, ou None se ainda não existem."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)["fill_values"]
+    except FileNotFoundError:
+        return None
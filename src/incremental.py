@@ -0,0 +1,187 @@
+import argparse
+import numpy as np
+import pandas as pd
+
+import data_cleaning
+import data_transformation
+import feature_engineering
+from correlation import apply_delta, frame_comoments, load_correlation, save_correlation
+from imputation import fit_fill_values, load_fill_values, save_fill_values
+from ingestion import RAW_PATH
+from raw_cache import load_raw
+from storage import load_table, save_table
+
+# -------------------------------------------------
+# Processamento incremental (delta) por customerID
+# -------------------------------------------------
+# A cada execução, o export bruto é comparado com o snapshot da última
+# execução processada: para cada customerID guardamos um hash do conteúdo da
+# linha bruta. Só clientes novos ou alterados passam pela limpeza, features e
+# transformação; o resultado é mesclado nas tabelas já gravadas, clientes que
+# sumiram do export são removidos e a ordem final segue a do export, como
+# numa execução completa.
+#
+# Semântica preservada de data_cleaning.py:
+#   - drop_duplicates(subset=["customerID"], keep="first"): o diff usa só a
+#     primeira ocorrência de cada ID no export novo;
+#   - medianas de preenchimento: as do export inteiro (antes da remoção de
+#     duplicados), não só do delta. São ajustadas e gravadas em
+#     data/clean/fill_values.json nas execuções completas (ver imputation.py)
+#     e reaplicadas nas execuções de delta, sem recalcular sobre o histórico;
+#   - linhas descartadas na limpeza (outliers) somem das saídas mesmo que
+#     existissem na execução anterior.
+#
+# As estatísticas de correlação da tabela limpa (ver correlation.py) seguem
+# o mesmo delta: saem as linhas removidas/alteradas e entram as do delta.
+
+SNAPSHOT_TABLE = "telecom_churn_raw_snapshot"
+ID_COL = "customerID"
+OUTPUT_ID_COL = "ID_Cliente"
+
+OUTPUT_TABLES = {
+    "cleaned":     (data_cleaning.OUTPUT_TABLE, ID_COL),
+    "features":    (feature_engineering.OUTPUT_TABLE, ID_COL),
+    "transformed": (data_transformation.OUTPUT_TABLE, OUTPUT_ID_COL),
+}
+
+
+# -------------------------------------------------
+# 1) Snapshot: customerID + hash do conteúdo bruto
+# -------------------------------------------------
+
+def raw_subset(df_raw):
+    """Colunas relevantes do export bruto (mesmo subset de data_cleaning.py)."""
+    colunas_existentes = [c for c in data_cleaning.COLUNAS_RELEVANTES if c in df_raw.columns]
+    return df_raw[colunas_existentes]
+
+
+def build_snapshot(df_subset):
+    """Primeira ocorrência de cada customerID e o hash da respectiva linha bruta."""
+    first = df_subset.drop_duplicates(subset=[ID_COL], keep="first")
+    row_hash = pd.util.hash_pandas_object(first, index=False).to_numpy()
+    snapshot = pd.DataFrame({ID_COL: first[ID_COL].to_numpy(), "row_hash": row_hash})
+    return first, snapshot
+
+
+def diff_snapshots(old, new):
+    """Classifica os IDs em novos, alterados, removidos e inalterados."""
+    merged = new.merge(old, on=ID_COL, how="outer", suffixes=("", "_old"), indicator=True)
+    novos = merged.loc[merged["_merge"] == "left_only", ID_COL]
+    removidos = merged.loc[merged["_merge"] == "right_only", ID_COL]
+    both = merged[merged["_merge"] == "both"]
+    alterados = both.loc[both["row_hash"] != both["row_hash_old"], ID_COL]
+    inalterados = both.loc[both["row_hash"] == both["row_hash_old"], ID_COL]
+    return {
+        "novos": pd.Index(novos),
+        "alterados": pd.Index(alterados),
+        "removidos": pd.Index(removidos),
+        "inalterados": pd.Index(inalterados),
+    }
+
+
+# -------------------------------------------------
+# 2) Mescla do delta nas tabelas gravadas
+# -------------------------------------------------
+
+def merge_delta(stored, delta, id_col, drop_ids, order):
+    """Remove `drop_ids` de `stored`, acrescenta `delta` e reordena pela ordem do export.
+
+    Devolve (tabela mesclada, posição nova de cada linha de `stored` (-1 se
+    removida), posição nova de cada linha de `delta`).
+    """
+    keep = ~stored[id_col].isin(drop_ids).to_numpy()
+    merged = pd.concat([stored[keep], delta], ignore_index=True)
+    positions = pd.Index(order).get_indexer(merged[id_col])
+    perm = np.argsort(positions, kind="stable")
+    new_positions = np.empty(len(perm), dtype=np.int64)
+    new_positions[perm] = np.arange(len(perm))
+
+    row_map = np.full(len(stored), -1, dtype=np.int64)
+    row_map[keep] = new_positions[:keep.sum()]
+    return merged.iloc[perm].reset_index(drop=True), row_map, new_positions[keep.sum():]
+
+
+def _outputs_exist():
+    try:
+        load_table(SNAPSHOT_TABLE, columns=[ID_COL])
+        for table, id_col in OUTPUT_TABLES.values():
+            load_table(table, columns=[id_col])
+    except (FileNotFoundError, KeyError):
+        return False
+    return True
+
+
+def _process(df_rows, fill_values):
+    df_clean = data_cleaning.clean_data(df_rows, fill_values=fill_values)
+    df_features = feature_engineering.add_features(df_clean)
+    df_transformed = data_transformation.transform_data(df_features)
+    return {"cleaned": df_clean, "features": df_features, "transformed": df_transformed}
+
+
+def run_incremental(raw_path=RAW_PATH, full=False):
+    """Atualiza as tabelas de data/clean/ processando só o delta do export bruto."""
+    df_subset = raw_subset(load_raw(raw_path))
+    first, snapshot = build_snapshot(df_subset)
+
+    full = full or not _outputs_exist()
+    fill_values = None if full else load_fill_values()
+    if fill_values is None:
+        fill_values = fit_fill_values(df_subset)
+        print("[incremental] Fill values gravados em:", save_fill_values(fill_values, len(df_subset)))
+
+    index_delta = None
+    if full:
+        print("[incremental] Sem snapshot anterior (ou --full): processando o export inteiro.")
+        outputs = _process(df_subset, fill_values)
+        corr_stats = frame_comoments(outputs["cleaned"])
+        summary = {"novos": len(first), "alterados": 0, "removidos": 0, "inalterados": 0}
+    else:
+        old = load_table(SNAPSHOT_TABLE)
+        diff = diff_snapshots(old, snapshot)
+        summary = {k: len(v) for k, v in diff.items()}
+        print("[incremental] Delta em relação ao último snapshot:", summary)
+
+        to_process = diff["novos"].append(diff["alterados"])
+        drop_ids = diff["alterados"].append(diff["removidos"])
+        delta_rows = first[first[ID_COL].isin(to_process)]
+        delta = _process(delta_rows, fill_values) if len(delta_rows) else None
+
+        outputs = {}
+        # Só valem se descrevem a tabela limpa ainda gravada (antes desta execução)
+        corr_stats = load_correlation(OUTPUT_TABLES["cleaned"][0])
+        for stage, (table, id_col) in OUTPUT_TABLES.items():
+            stored = load_table(table)
+            delta_stage = delta[stage] if delta is not None else stored.iloc[0:0]
+            if stage == "cleaned" and corr_stats is not None:
+                corr_stats = apply_delta(corr_stats, stored[stored[id_col].isin(drop_ids)], delta_stage)
+            outputs[stage], row_map, delta_positions = merge_delta(stored, delta_stage, id_col, drop_ids,
+                                                                   snapshot[ID_COL])
+            if stage == "transformed":
+                # Mapa de posições para atualizar o índice de clientes sem reordená-lo
+                index_delta = (row_map, delta_stage[id_col], delta_positions)
+
+    for stage, (table, _) in OUTPUT_TABLES.items():
+        if stage == "transformed":
+            paths = data_transformation.save_transformed(outputs[stage], index_delta=index_delta)
+        else:
+            paths = save_table(outputs[stage], table)
+        print(f"[incremental] '{stage}' salvo em: {', '.join(paths)}")
+    if corr_stats is not None:
+        path = save_correlation(corr_stats, OUTPUT_TABLES["cleaned"][0])
+        print(f"[incremental] Estatísticas de correlação salvas em: {path}")
+    save_table(snapshot, SNAPSHOT_TABLE)
+    return outputs, summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Processa só os clientes novos/alterados do export bruto.")
+    parser.add_argument("--raw-path", default=RAW_PATH, help="JSON bruto de entrada")
+    parser.add_argument("--full", action="store_true", help="ignora o snapshot e reprocessa tudo")
+    args = parser.parse_args(argv)
+
+    _, summary = run_incremental(args.raw_path, full=args.full)
+    print("[incremental] Concluído:", summary)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,442 @@
+import os
+import json
+import numpy as np
+import pandas as pd
+
+from instrumentation import traced
+from sampling import SAMPLE_SEED, sample_records
+
+# -------------------------------------------------
+# Ingestão incremental do JSON bruto da Telecom X
+# -------------------------------------------------
+# O arquivo bruto é um array JSON de registros aninhados. Em vez de carregar
+# tudo com json.load + pd.json_normalize (que mantém a árvore de objetos Python
+# e o DataFrame em memória ao mesmo tempo), lemos o array registro a registro
+# e achatamos cada um direto em buffers tipados por coluna. A cada
+# `chunk_size` registros um DataFrame é emitido e os buffers são reciclados,
+# então o pico de memória depende do tamanho do chunk, não do arquivo.
+#
+# Números que o export traz como texto (account.Charges.Total: "593.3", " ")
+# são convertidos aqui mesmo: ao emitir o chunk, a coluna inteira vira um
+# array de bytes de largura fixa, é validada (tabela de caracteres aceitos
+# sobre a matriz de bytes) e convertida para float64 numa única conversão do
+# numpy, sem float() nem objetos Python intermediários por valor. Brancos e
+# textos inválidos viram NaN e são contados por coluna em df.attrs["rejected"]
+# = {"rows": linhas, "columns": {coluna: {"blank": n, "invalid": n}}}.
+#
+# As demais colunas numéricas seguem as mesmas regras valor a valor e entram
+# nas mesmas contagens de rejeitados: as de ponto flutuante
+# (account.Charges.Monthly) aceitam números JSON e textos numéricos; as
+# inteiras (customer.tenure, customer.SeniorCitizen) só números inteiros
+# exatos (12, 12.0 ou o texto "12"). 12.7 numa coluna inteira, true e textos
+# que não são números viram ausentes, em vez de serem truncados ou
+# convertidos em silêncio.
+#
+# Com coerce=False nenhuma coluna numérica é convertida: todas saem com o
+# valor original do JSON (12.7, true, "abc", " "), para as regras de
+# qualidade mostrarem o valor bruto que viola cada regra. raw_number()
+# converte esses valores com as mesmas regras da ingestão.
+
+RAW_PATH = os.path.join(
+    os.path.dirname(__file__),
+    os.pardir,
+    "data",
+    "raw",
+    "TelecomX_Data.json"
+)
+
+DEFAULT_CHUNK_SIZE = 100_000
+READ_BLOCK_SIZE = 1 << 20  # 1 MiB de texto por leitura
+
+# Versão do formato do DataFrame achatado (tipos das colunas); entra na chave
+# do cache de raw_cache.py, então snapshots de versões anteriores são ignorados
+INGESTION_VERSION = 4
+
+# Largura do buffer de texto numérico; textos maiores são rejeitados
+NUMERIC_TEXT_WIDTH = 32
+REJECTED_ATTR = "rejected"
+
+# Estrutura aninhada conhecida: (caminho no JSON, coluna achatada, tipo do buffer)
+# Os nomes das colunas seguem exatamente o padrão do pd.json_normalize;
+# "numtext" é texto numérico, convertido para float64 na ingestão.
+RAW_SCHEMA = [
+    (("customerID",),                     "customerID",                "str"),
+    (("Churn",),                          "Churn",                     "str"),
+    (("customer", "gender"),              "customer.gender",           "str"),
+    (("customer", "SeniorCitizen"),       "customer.SeniorCitizen",    "int"),
+    (("customer", "Partner"),             "customer.Partner",          "str"),
+    (("customer", "Dependents"),          "customer.Dependents",       "str"),
+    (("customer", "tenure"),              "customer.tenure",           "int"),
+    (("phone", "PhoneService"),           "phone.PhoneService",        "str"),
+    (("phone", "MultipleLines"),          "phone.MultipleLines",       "str"),
+    (("internet", "InternetService"),     "internet.InternetService",  "str"),
+    (("internet", "OnlineSecurity"),      "internet.OnlineSecurity",   "str"),
+    (("internet", "OnlineBackup"),        "internet.OnlineBackup",     "str"),
+    (("internet", "DeviceProtection"),    "internet.DeviceProtection", "str"),
+    (("internet", "TechSupport"),         "internet.TechSupport",      "str"),
+    (("internet", "StreamingTV"),         "internet.StreamingTV",      "str"),
+    (("internet", "StreamingMovies"),     "internet.StreamingMovies",  "str"),
+    (("account", "Contract"),             "account.Contract",          "str"),
+    (("account", "PaperlessBilling"),     "account.PaperlessBilling",  "str"),
+    (("account", "PaymentMethod"),        "account.PaymentMethod",     "str"),
+    (("account", "Charges", "Monthly"),   "account.Charges.Monthly",   "float"),
+    (("account", "Charges", "Total"),     "account.Charges.Total",     "numtext"),
+]
+
+RAW_COLUMNS = [col for _, col, _ in RAW_SCHEMA]
+NUMERIC_TEXT_COLUMNS = [col for _, col, kind in RAW_SCHEMA if kind == "numtext"]
+
+# Bytes aceitos num número em texto; espaços (e o preenchimento nulo do buffer)
+# nas pontas são ignorados pela conversão
+_BLANK_BYTES = np.zeros(256, dtype=bool)
+_BLANK_BYTES[list(b" \t\r\n\x00")] = True
+_NUMBER_BYTES = _BLANK_BYTES.copy()
+_NUMBER_BYTES[list(b"0123456789.+-eE")] = True
+
+# Motivo de rejeição por linha nos buffers numéricos (0 = aceito ou ausente no JSON)
+_BLANK, _INVALID = 1, 2
+_BLANK_CHARS = " \t\r\n"
+_NUMBER_CHARS = frozenset("0123456789.+-eE")
+
+
+# -------------------------------------------------
+# 1) Leitura incremental do array de registros
+# -------------------------------------------------
+
+def iter_raw_records(path=RAW_PATH, block_size=READ_BLOCK_SIZE):
+    """Percorre o array JSON de nível superior devolvendo um registro por vez."""
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as f:
+        buf = f.read(block_size)
+        eof = not buf
+        pos = _skip_whitespace(buf, 0)
+
+        # Garante que o arquivo começa com '['
+        while pos >= len(buf) and not eof:
+            chunk = f.read(block_size)
+            eof = not chunk
+            buf += chunk
+            pos = _skip_whitespace(buf, pos)
+        if pos >= len(buf):
+            return
+        if buf[pos] != "[":
+            raise ValueError(f"Esperado um array JSON em {path}, encontrado {buf[pos]!r}")
+        pos += 1
+
+        while True:
+            pos = _skip_separators(buf, pos)
+            if pos >= len(buf):
+                buf = "" if eof else f.read(block_size)
+                if not buf:
+                    raise ValueError(f"Array JSON não foi fechado em {path}")
+                pos = 0
+                continue
+            if buf[pos] == "]":
+                return
+            if buf[pos] != "{":
+                raise ValueError(f"Registro inesperado em {path}: {buf[pos:pos + 20]!r}")
+            try:
+                record, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                # Registro cortado no fim do bloco: descarta o que já foi
+                # consumido e lê mais texto antes de tentar de novo.
+                if eof:
+                    raise
+                chunk = f.read(block_size)
+                eof = not chunk
+                buf = buf[pos:] + chunk
+                pos = 0
+                continue
+            yield record
+            pos = end
+
+
+def _skip_whitespace(buf, pos):
+    n = len(buf)
+    while pos < n and buf[pos] in " \t\r\n":
+        pos += 1
+    return pos
+
+
+def _skip_separators(buf, pos):
+    n = len(buf)
+    while pos < n and buf[pos] in " \t\r\n,":
+        pos += 1
+    return pos
+
+
+# -------------------------------------------------
+# 2) Buffers tipados por coluna
+# -------------------------------------------------
+
+def _schema(coerce=True):
+    if coerce:
+        return RAW_SCHEMA
+    return [(path, col, "str" if kind == "str" else "raw") for path, col, kind in RAW_SCHEMA]
+
+
+def _new_buffers(size, schema=RAW_SCHEMA):
+    buffers = {}
+    for _, col, kind in schema:
+        if kind == "int":
+            buffers[col] = (np.zeros(size, dtype="int64"), np.zeros(size, dtype=bool),
+                            np.zeros(size, dtype="int8"))
+        elif kind == "float":
+            buffers[col] = (np.full(size, np.nan, dtype="float64"), np.zeros(size, dtype="int8"))
+        else:
+            buffers[col] = np.empty(size, dtype=object)
+    return buffers
+
+
+def _lookup(record, path):
+    value = record
+    for key in path:
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    return value
+
+
+def _number_text(text):
+    """(número, motivo) de um texto num campo numérico, com as regras de parse_numeric_text."""
+    text = text.strip(_BLANK_CHARS)
+    if not text:
+        return None, _BLANK
+    if len(text) > NUMERIC_TEXT_WIDTH or not _NUMBER_CHARS.issuperset(text):
+        return None, _INVALID
+    try:
+        return float(text), 0
+    except ValueError:
+        return None, _INVALID
+
+
+def _json_float(value):
+    """(número, motivo) de um valor JSON numa coluna de ponto flutuante; ausente = (None, 0)."""
+    if type(value) is float or type(value) is int:
+        try:
+            return float(value), 0
+        except OverflowError:
+            return None, _INVALID
+    if value is None:
+        return None, 0
+    if type(value) is str:
+        return _number_text(value)
+    return None, _INVALID
+
+
+def raw_number(value):
+    """Valor bruto do JSON (ver coerce=False) como float, com as regras da ingestão; NaN se ausente ou inválido."""
+    number, _ = _json_float(value)
+    return np.nan if number is None else number
+
+
+def _json_int(value):
+    """(inteiro, motivo) de um valor JSON numa coluna inteira; ausente = (None, 0)."""
+    if type(value) is int:
+        return value, 0
+    if value is None:
+        return None, 0
+    if type(value) is float:
+        number, reason = value, 0
+    elif type(value) is str:
+        number, reason = _number_text(value)
+    else:
+        # true/false, listas e objetos não são contagens
+        return None, _INVALID
+    if number is None:
+        return None, reason
+    if not number.is_integer():
+        return None, _INVALID
+    return int(number), 0
+
+
+def _fill_row(buffers, i, record, schema=RAW_SCHEMA):
+    for path, col, kind in schema:
+        value = _lookup(record, path)
+        # Texto primeiro: é o tipo da maioria das colunas
+        if kind == "str":
+            buffers[col][i] = value
+        elif kind == "int":
+            values, missing, reasons = buffers[col]
+            number, reasons[i] = _json_int(value)
+            missing[i] = number is None
+            if number is not None:
+                try:
+                    values[i] = number
+                except OverflowError:
+                    missing[i], reasons[i] = True, _INVALID
+        elif kind == "float":
+            values, reasons = buffers[col]
+            number, reasons[i] = _json_float(value)
+            values[i] = np.nan if number is None else number
+        elif kind == "raw":
+            # Listas e objetos viram o texto JSON (valores hasheáveis para as regras)
+            buffers[col][i] = value if value is None or isinstance(value, (str, int, float)) else json.dumps(value)
+        elif type(value) is str and len(value) <= NUMERIC_TEXT_WIDTH:
+            buffers[col][i] = value
+        else:
+            buffers[col][i] = _numeric_token(value)
+
+
+def _numeric_token(value):
+    # Fora do caminho comum (texto curto): ausente fica None; número JSON vira
+    # texto; texto longo demais e outros tipos viram "?", sempre inválido
+    if value is None:
+        return None
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return repr(value)
+    return "?"
+
+
+def _text_bytes(text):
+    """Textos (str de até NUMERIC_TEXT_WIDTH caracteres ou None) -> (bytes de largura fixa, ausentes)."""
+    missing = np.equal(text, None)
+    text = np.where(missing, "", text)
+    try:
+        return text.astype(f"S{NUMERIC_TEXT_WIDTH}"), missing
+    except UnicodeEncodeError:
+        # Algum texto não ASCII (nunca é número): só esse chunk vai valor a valor
+        return np.array([t if t.isascii() else "?" for t in text], dtype=f"S{NUMERIC_TEXT_WIDTH}"), missing
+
+
+def parse_numeric_text(raw, missing):
+    """Converte um array de bytes de largura fixa para float64; devolve (valores, rejeitados).
+
+    Brancos e textos que não são números viram NaN e são contados em
+    `rejeitados` = {"blank": n, "invalid": n}; posições de `missing` (valor
+    ausente no JSON) viram NaN sem contar como rejeitadas.
+    """
+    n = len(raw)
+    matrix = raw.view(np.uint8).reshape(n, raw.dtype.itemsize)
+    blank = _BLANK_BYTES[matrix].all(axis=1) & ~missing
+    invalid = ~_NUMBER_BYTES[matrix].all(axis=1) & ~missing
+    null = missing | blank | invalid
+    tokens = raw.copy()
+    tokens[null] = b"nan"
+    try:
+        values = tokens.astype("float64")
+    except ValueError:
+        # Só caracteres aceitos, mas mal formado (ex.: "1.2.3"): confere os textos distintos
+        uniques, inverse = np.unique(tokens, return_inverse=True)
+        parsed = np.empty(len(uniques), dtype="float64")
+        for j, token in enumerate(uniques):
+            try:
+                parsed[j] = float(token)
+            except ValueError:
+                parsed[j] = np.nan
+        values = parsed[inverse]
+        invalid |= np.isnan(values) & ~null
+    return values, {"blank": int(blank.sum()), "invalid": int(invalid.sum())}
+
+
+def _reason_counts(reasons):
+    return {"blank": int((reasons == _BLANK).sum()), "invalid": int((reasons == _INVALID).sum())}
+
+
+def _buffers_to_frame(buffers, n, schema=RAW_SCHEMA):
+    data = {}
+    rejected = {}
+    for _, col, kind in schema:
+        if kind == "int":
+            values, missing, reasons = buffers[col]
+            values, missing = values[:n], missing[:n]
+            rejected[col] = _reason_counts(reasons[:n])
+            if missing.any():
+                # Mesmo comportamento do json_normalize: inteiros com ausentes viram float
+                values = values.astype("float64")
+                values[missing] = np.nan
+            else:
+                values = values.copy()
+            data[col] = values
+        elif kind == "float":
+            values, reasons = buffers[col]
+            data[col] = values[:n].copy()
+            rejected[col] = _reason_counts(reasons[:n])
+        elif kind == "numtext":
+            data[col], rejected[col] = parse_numeric_text(*_text_bytes(buffers[col][:n]))
+        else:
+            data[col] = buffers[col][:n].copy()
+    df = pd.DataFrame(data, columns=RAW_COLUMNS)
+    df.attrs[REJECTED_ATTR] = {"rows": n, "columns": rejected}
+    return df
+
+
+def merge_rejected(a, b):
+    """Soma duas contagens de rejeitados (formato de df.attrs["rejected"])."""
+    columns = {col: dict(counts) for col, counts in a.get("columns", {}).items()}
+    for col, counts in b.get("columns", {}).items():
+        entry = columns.setdefault(col, {})
+        for reason, count in counts.items():
+            entry[reason] = entry.get(reason, 0) + count
+    return {"rows": a.get("rows", 0) + b.get("rows", 0), "columns": columns}
+
+
+def rejected_values(df):
+    """Rejeitados por coluna na conversão de texto numérico de `df` ({} se desconhecido).
+
+    Só vale para o DataFrame inteiro que saiu da ingestão: recortes dele
+    herdam o attrs do pandas, mas não as contagens certas.
+    """
+    info = df.attrs.get(REJECTED_ATTR) or {}
+    return info.get("columns", {}) if info.get("rows") == len(df) else {}
+
+
+# -------------------------------------------------
+# 3) API pública: chunks de DataFrame ou o DataFrame completo
+# -------------------------------------------------
+
+def records_to_frame(records, coerce=True):
+    """DataFrame achatado (mesmas colunas e tipos de read_raw) a partir de registros já parseados."""
+    schema = _schema(coerce)
+    buffers = _new_buffers(len(records), schema)
+    for i, record in enumerate(records):
+        _fill_row(buffers, i, record, schema)
+    return _buffers_to_frame(buffers, len(records), schema)
+
+
+def read_raw_chunks(path=RAW_PATH, chunk_size=DEFAULT_CHUNK_SIZE, coerce=True):
+    """Gera DataFrames achatados de até `chunk_size` linhas a partir do JSON bruto.
+
+    Com coerce=False as colunas numéricas saem com os valores originais do JSON.
+    """
+    if chunk_size <= 0:
+        raise ValueError("chunk_size deve ser positivo")
+    schema = _schema(coerce)
+    buffers = _new_buffers(chunk_size, schema)
+    n = 0
+    for record in iter_raw_records(path):
+        _fill_row(buffers, n, record, schema)
+        n += 1
+        if n == chunk_size:
+            # Cada linha sobrescreve todas as colunas, então os buffers são reaproveitados
+            yield _buffers_to_frame(buffers, n, schema)
+            n = 0
+    if n > 0:
+        yield _buffers_to_frame(buffers, n, schema)
+
+
+def sample_raw(path=RAW_PATH, size=10_000, by="Churn", seed=SAMPLE_SEED, coerce=True):
+    """Amostra estratificada por `by` (até `size` registros por valor) do JSON bruto.
+
+    Os registros fora da amostra não são achatados (ver sampling.sample_records).
+    """
+    return sample_records(iter_raw_records(path), size, key=lambda record: record.get(by), by=by,
+                          to_frame=lambda records: records_to_frame(records, coerce), seed=seed)
+
+
+@traced("parse_json")
+def read_raw(path=RAW_PATH, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Carrega o JSON bruto inteiro como um único DataFrame achatado (texto numérico já convertido)."""
+    chunks = list(read_raw_chunks(path, chunk_size))
+    if not chunks:
+        df = pd.DataFrame(columns=RAW_COLUMNS)
+        df.attrs[REJECTED_ATTR] = {"rows": 0, "columns": {}}
+        return df
+    if len(chunks) == 1:
+        return chunks[0]
+    rejected = {"rows": 0, "columns": {}}
+    for chunk in chunks:
+        rejected = merge_rejected(rejected, chunk.attrs[REJECTED_ATTR])
+    df = pd.concat(chunks, ignore_index=True)
+    df.attrs[REJECTED_ATTR] = rejected
+    return df
@@ -0,0 +1,284 @@
+import argparse
+import contextlib
+import cProfile
+import functools
+import io
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+import uuid
+
+# -------------------------------------------------
+# Instrumentação por etapa: tempo, memória e perfil opcional
+# -------------------------------------------------
+# span("nome") mede um trecho nomeado (tempo de parede, CPU, RSS atual e
+# pico de RSS durante o trecho). Spans podem ser aninhados: o nome gravado
+# é o caminho completo, ex. "data_cleaning/missing_values".
+#
+# Nada é gravado a menos que o trace esteja ligado:
+#   TELECOMX_TRACE=trace.jsonl   grava um registro JSON por span (uma linha)
+#   TELECOMX_PROFILE=data_cleaning,exploratory_analysis
+#                                roda cProfile nos spans com esses nomes
+#                                ("all" = todos os spans de primeiro nível)
+#   TELECOMX_PROFILE_DIR=...     onde gravar os .prof (padrão: data/profiles)
+#
+# Os .prof abrem com `python -m pstats` ou snakeviz; o registro do span traz
+# também as funções mais pesadas (tempo acumulado). Para resumir um trace:
+#   python src/instrumentation.py summary trace.jsonl
+
+BASE_DIR = os.path.dirname(__file__)            # .../src
+DEFAULT_PROFILE_DIR = os.path.join(BASE_DIR, os.pardir, "data", "profiles")
+PROFILE_TOP_N = 15
+
+_config = {
+    "trace_path": os.environ.get("TELECOMX_TRACE") or None,
+    "profile": {s.strip() for s in os.environ.get("TELECOMX_PROFILE", "").split(",") if s.strip()},
+    "profile_dir": os.environ.get("TELECOMX_PROFILE_DIR") or DEFAULT_PROFILE_DIR,
+}
+RUN_ID = uuid.uuid4().hex[:12]
+
+_local = threading.local()
+_write_lock = threading.Lock()
+
+
+def configure(trace_path=None, profile=None, profile_dir=None):
+    """Liga o trace/perfil por código (equivalente às variáveis de ambiente)."""
+    if trace_path is not None:
+        _config["trace_path"] = trace_path
+        # Subprocessos herdam a configuração
+        os.environ["TELECOMX_TRACE"] = trace_path
+    if profile is not None:
+        _config["profile"] = set(profile)
+        os.environ["TELECOMX_PROFILE"] = ",".join(sorted(profile))
+    if profile_dir is not None:
+        _config["profile_dir"] = profile_dir
+        os.environ["TELECOMX_PROFILE_DIR"] = profile_dir
+
+
+def enabled():
+    return bool(_config["trace_path"] or _config["profile"])
+
+
+# -------------------------------------------------
+# 1) Memória: RSS atual e pico (high-water mark)
+# -------------------------------------------------
+
+def _read_status_kb(field):
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def reset_peak_rss():
+    """Zera o pico de RSS do processo (Linux: /proc/self/clear_refs); devolve se conseguiu."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_mb():
+    """Pico de RSS em MB (VmHWM no Linux; ru_maxrss, acumulado, nos demais)."""
+    kb = _read_status_kb("VmHWM:")
+    if kb is not None:
+        return kb / 1024
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss vem em KB no Linux e em bytes no macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def rss_mb():
+    kb = _read_status_kb("VmRSS:")
+    return kb / 1024 if kb is not None else None
+
+
+# -------------------------------------------------
+# 2) Spans
+# -------------------------------------------------
+
+def _stack():
+    if not hasattr(_local, "stack"):
+        _local.stack = []
+    return _local.stack
+
+
+def _write(record):
+    line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+    path = _config["trace_path"]
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with _write_lock, open(path, "a", encoding="utf-8") as f:
+        f.write(line)
+
+
+def _should_profile(name, depth):
+    profile = _config["profile"]
+    return name in profile or ("all" in profile and depth == 0)
+
+
+def _profile_summary(profiler, path):
+    profiler.dump_stats(path)
+    out = io.StringIO()
+    stats = pstats.Stats(profiler, stream=out)
+    top = []
+    for (filename, line, func), (_, ncalls, tottime, cumtime, _) in sorted(
+        stats.stats.items(), key=lambda item: item[1][3], reverse=True
+    )[:PROFILE_TOP_N]:
+        top.append({
+            "func": f"{os.path.basename(filename)}:{line}({func})",
+            "ncalls": ncalls,
+            "tottime_s": round(tottime, 4),
+            "cumtime_s": round(cumtime, 4),
+        })
+    return top
+
+
+@contextlib.contextmanager
+def span(name, **attrs):
+    """Mede o trecho `name`; com o trace desligado, não faz nada."""
+    if not enabled():
+        yield attrs
+        return
+
+    stack = _stack()
+    parent = stack[-1] if stack else None
+    frame = {"name": name, "peak": 0.0}
+    path = f"{parent['path']}/{name}" if parent else name
+    frame["path"] = path
+
+    # O pico do pai até aqui fica guardado antes de zerar o contador para o filho
+    peak_before = peak_rss_mb()
+    if parent is not None and peak_before is not None:
+        parent["peak"] = max(parent["peak"], peak_before)
+    per_span_peak = reset_peak_rss()
+
+    # Um perfilador por vez: spans aninhados num trecho já perfilado não abrem outro
+    profiler = None
+    if _should_profile(name, len(stack)) and not any(f.get("profiling") for f in stack):
+        profiler = cProfile.Profile()
+        frame["profiling"] = True
+
+    stack.append(frame)
+    start_ts = time.time()
+    start_wall = time.perf_counter()
+    start_cpu = time.process_time()
+    error = None
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield attrs
+    except BaseException as exc:
+        error = f"{type(exc).__name__}: {exc}"
+        raise
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        wall = time.perf_counter() - start_wall
+        cpu = time.process_time() - start_cpu
+        stack.pop()
+
+        peak_now = peak_rss_mb()
+        peak = max(frame["peak"], peak_now) if peak_now is not None else None
+        if parent is not None and peak is not None:
+            parent["peak"] = max(parent["peak"], peak)
+
+        record = {
+            "run_id": RUN_ID,
+            "pid": os.getpid(),
+            "ts": round(start_ts, 3),
+            "name": path,
+            "depth": len(stack),
+            "wall_s": round(wall, 6),
+            "cpu_s": round(cpu, 6),
+            "rss_mb": _round(rss_mb()),
+            "peak_rss_mb": _round(peak),
+            # Sem /proc o pico é o do processo inteiro, não o do trecho
+            "peak_scope": "span" if per_span_peak else "process",
+        }
+        if attrs:
+            record["attrs"] = attrs
+        if error:
+            record["error"] = error
+        if profiler is not None:
+            os.makedirs(_config["profile_dir"], exist_ok=True)
+            prof_path = os.path.join(
+                _config["profile_dir"], f"{path.replace('/', '.')}_{RUN_ID}_{os.getpid()}.prof"
+            )
+            record["profile"] = {"path": prof_path, "top": _profile_summary(profiler, prof_path)}
+        if _config["trace_path"]:
+            _write(record)
+
+
+def traced(name):
+    """Decorador: executa a função dentro de span(name)."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _round(value, ndigits=1):
+    return round(value, ndigits) if value is not None else None
+
+
+# -------------------------------------------------
+# 3) Resumo de um trace
+# -------------------------------------------------
+
+def read_trace(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def summarize(records):
+    """Agrega os spans por nome: chamadas, tempo total/máximo e maior pico de RSS."""
+    summary = {}
+    for rec in records:
+        item = summary.setdefault(rec["name"], {"calls": 0, "wall_s": 0.0, "max_wall_s": 0.0,
+                                                "cpu_s": 0.0, "peak_rss_mb": None})
+        item["calls"] += 1
+        item["wall_s"] += rec["wall_s"]
+        item["max_wall_s"] = max(item["max_wall_s"], rec["wall_s"])
+        item["cpu_s"] += rec["cpu_s"]
+        if rec.get("peak_rss_mb") is not None:
+            item["peak_rss_mb"] = max(item["peak_rss_mb"] or 0.0, rec["peak_rss_mb"])
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Resumo de traces gravados com TELECOMX_TRACE.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_sum = sub.add_parser("summary", help="tempo e memória agregados por span")
+    p_sum.add_argument("trace", help="arquivo .jsonl do trace")
+    p_sum.add_argument("--run-id", help="filtra uma execução")
+    args = parser.parse_args(argv)
+
+    records = read_trace(args.trace)
+    if args.run_id:
+        records = [r for r in records if r["run_id"] == args.run_id]
+    summary = summarize(records)
+    print(f"{'span':<50} {'chamadas':>8} {'total_s':>9} {'max_s':>9} {'cpu_s':>9} {'pico_MB':>9}")
+    for name, item in sorted(summary.items(), key=lambda kv: kv[1]["wall_s"], reverse=True):
+        peak = f"{item['peak_rss_mb']:.1f}" if item["peak_rss_mb"] is not None else "-"
+        print(f"{name:<50} {item['calls']:>8} {item['wall_s']:>9.3f} {item['max_wall_s']:>9.3f} "
+              f"{item['cpu_s']:>9.3f} {peak:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,14 @@
-import os
-import json
 import pandas as pd
 
+from ingestion import RAW_PATH
+from raw_cache import load_raw
+from storage import save_table
+
 # -------------------------------------------------
 # 1) Carregar JSON bruto e criar DataFrame
 # -------------------------------------------------
-path_raw = os.path.join(
-    os.path.dirname(__file__),
-    os.pardir,
-    "data",
-    "raw",
-    "TelecomX_Data.json"
-)
-
-with open(path_raw, "r", encoding="utf-8") as f:
-    data_json = json.load(f)
-
-df = pd.json_normalize(data_json)
+# Parse único do JSON, reaproveitado via cache colunar (ver raw_cache.py)
+df = load_raw(RAW_PATH)
 
 # -------------------------------------------------
 # 2) Inspeção inicial (dimensões, head, info, dtypes)
@@ -65,11 +57,7 @@ print("\nPrimeiras 5 linhas do subset:")
 print(df_subset.head())
 
 # -------------------------------------------------
-# 5) Salvar o subset limpo em CSV na pasta data/clean/
+# 5) Salvar o subset limpo na pasta data/clean/ (ver storage.py)
 # -------------------------------------------------
-clean_dir = os.path.join(os.path.dirname(__file__), os.pardir, "data", "clean")
-os.makedirs(clean_dir, exist_ok=True)
-
-subset_path = os.path.join(clean_dir, "telecom_churn_subset.csv")
-df_subset.to_csv(subset_path, index=False)
-print(f"\nSubset salvo em: {subset_path}")
+subset_paths = save_table(df_subset, "telecom_churn_subset")
+print(f"\nSubset salvo em: {', '.join(subset_paths)}")
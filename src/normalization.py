@@ -0,0 +1,138 @@
+import numpy as np
+import pandas as pd
+
+# -------------------------------------------------
+# Normalização de colunas categóricas por valores únicos
+# -------------------------------------------------
+# Em vez de aplicar .str.strip().str.lower() e uma sequência de .replace()
+# linha a linha, cada coluna é fatorada uma única vez (códigos inteiros +
+# valores únicos). A padronização e o mapeamento rodam só sobre os valores
+# únicos, e a coluna é reconstruída a partir dos códigos. O custo em Python
+# depende da cardinalidade (poucas categorias), não do número de linhas.
+#
+# Os mapeamentos abaixo são dados: data_cleaning.py usa CLEANING_MAPS e
+# data_transformation.py usa TRANSLATION_MAPS.
+
+# -------------------------------------------------
+# 1) Tabelas de mapeamento
+# -------------------------------------------------
+
+# Limpeza (valores já em strip + lower). Valores fora do mapa são mantidos;
+# as demais colunas só são padronizadas. Valores fora das categorias de
+# schema.py viram 'unknown' na limpeza (replace_unexpected), que informa
+# quantos foram trocados.
+CLEANING_MAPS = {
+    # Churn: 'yes'/'no' viram boolean; '' (Churn em branco) fica como está
+    "Churn": {"yes": True, "no": False},
+}
+
+YES_NO_FLAG = {"yes": 1, "no": 0, "unknown": 0}
+SERVICE_FLAG = {"yes": 1, "no": 0, "no internet service": 0}
+
+# Transformação (nomes já em português). Valores fora do mapa viram NaN,
+# como no Series.map() original.
+TRANSLATION_MAPS = {
+    "Evasao":            {True: 1, False: 0},
+    "Tem_Conjuge":       YES_NO_FLAG,
+    "Tem_Dependentes":   YES_NO_FLAG,
+    "Tem_Telefone":      YES_NO_FLAG,
+    "Fatura_Digital":    YES_NO_FLAG,
+    "Linhas_Adicionais": SERVICE_FLAG,
+    "Seg_Online":        SERVICE_FLAG,
+    "Backup_Online":     SERVICE_FLAG,
+    "Prot_Dispositivos": SERVICE_FLAG,
+    "Suporte_Tecnico":   SERVICE_FLAG,
+    "Streaming_TV":      SERVICE_FLAG,
+    "Streaming_Filmes":  SERVICE_FLAG,
+    "Tipo_Internet": {
+        "dsl": "DSL",
+        "fiber optic": "Fibra Optica",
+        "no": "Sem Internet",
+    },
+    "Tipo_Contrato": {
+        "month-to-month": "Mensal",
+        "one year": "Anual",
+        "two year": "Bienal",
+    },
+    "Metodo_Pagamento": {
+        "electronic check": "Cheque Eletronico",
+        "mailed check": "Cheque Enviado",
+        "bank transfer (automatic)": "Transferencia Bancaria (Automatica)",
+        "credit card (automatic)": "Cartao de Credito (Automatico)",
+    },
+    "Genero": {"female": 1, "male": 0},
+}
+
+
+# -------------------------------------------------
+# 2) Motor: fatorar, mapear os únicos, reconstruir pelos códigos
+# -------------------------------------------------
+
+def _standardize(value):
+    # Mesmo resultado de .str.strip().str.lower(): não-strings viram NaN
+    return value.strip().lower() if isinstance(value, str) else np.nan
+
+
+def _is_missing(value):
+    return value is None or value is pd.NA or (isinstance(value, float) and np.isnan(value))
+
+
+def _rebuild(codes, values):
+    """Monta a coluna final a partir dos códigos e do valor final de cada código."""
+    present = [v for v in values if not _is_missing(v)]
+
+    if present and all(isinstance(v, str) for v in present):
+        # Só strings: Categorical direto dos códigos, sem materializar objetos
+        categories = pd.Index(pd.unique(np.array(present, dtype=object)))
+        lookup = np.append(categories.get_indexer(values), -1)
+        return pd.Categorical.from_codes(lookup[codes], categories)
+
+    if present and all(isinstance(v, (int, float, np.number)) and not isinstance(v, (bool, np.bool_))
+                       for v in present):
+        lookup = np.array([np.nan if _is_missing(v) else v for v in values] + [np.nan], dtype="float64")
+        out = lookup[codes]
+        if not np.isnan(out).any() and np.array_equal(out, np.round(out)):
+            return out.astype("int64")
+        return out
+
+    lookup = np.array(list(values) + [np.nan], dtype=object)
+    return lookup[codes]
+
+
+def normalize_column(series, mapping=None, standardize=True, keep_unmapped=True):
+    """Padroniza (strip + lower) e mapeia `series` operando só sobre os valores únicos.
+
+    Com `keep_unmapped=False`, valores fora de `mapping` viram NaN (semântica
+    de Series.map); caso contrário são mantidos (semântica de Series.replace).
+    """
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    values = list(np.asarray(uniques, dtype=object))
+
+    if standardize:
+        values = [_standardize(v) for v in values]
+    if mapping is not None:
+        if keep_unmapped:
+            values = [mapping.get(v, v) if not _is_missing(v) else v for v in values]
+        else:
+            values = [mapping.get(v, np.nan) if not _is_missing(v) else v for v in values]
+
+    # código -1 (ausente) aponta para a última posição do lookup (NaN)
+    return pd.Series(_rebuild(codes, values), index=series.index, name=series.name)
+
+
+def replace_unexpected(series, allowed, fallback="unknown"):
+    """Troca os valores presentes fora de `allowed` por `fallback`, operando só sobre os valores únicos.
+
+    Devolve (série, {valor inesperado: linhas}); a série volta intacta se nada foi trocado.
+    """
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    values = list(np.asarray(uniques, dtype=object))
+    allowed = set(allowed)
+    bad = [i for i, v in enumerate(values) if not _is_missing(v) and v not in allowed]
+    if not bad:
+        return series, {}
+    counts = np.bincount(codes[codes >= 0], minlength=len(values))
+    unexpected = {values[i]: int(counts[i]) for i in bad}
+    for i in bad:
+        values[i] = fallback
+    return pd.Series(_rebuild(codes, values), index=series.index, name=series.name), unexpected
@@ -0,0 +1,199 @@
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+import data_cleaning
+import data_transformation
+import feature_engineering
+from columnar import read_column_array, read_frame, read_frame_rows, write_frame
+from correlation import frame_comoments, save_correlation
+from imputation import coerce_numeric
+from incremental import ID_COL, raw_subset
+from ingestion import RAW_PATH, REJECTED_ATTR, merge_rejected, read_raw_chunks
+from instrumentation import span
+from schema import validate_schema
+from sharding import STAGES, median_from_counts, process_shard, shard_codes, shard_value_counts
+from stats_accumulators import merge_comoments, merge_frequencies, new_frequencies
+from storage import CLEAN_DIR, save_table_chunks
+
+# -------------------------------------------------
+# Limpeza → features → transformação com memória limitada (out-of-core)
+# -------------------------------------------------
+# Para exports maiores que a memória: nenhuma etapa tem a base inteira num
+# DataFrame. O JSON bruto é lido em chunks e tudo passa por arquivos
+# colunares num diretório de spill (data/cache/out_of_core/):
+#   1) spill     -> cada chunk vai para a partição de hash do seu customerID
+#                   (como em sharding.py: todas as ocorrências de um ID caem
+#                   na mesma partição, na ordem do export) com a posição da
+#                   linha no export; as contagens de valores das colunas
+#                   numéricas são somadas chunk a chunk
+#   2) medianas  -> mediana exata de cada coluna a partir das contagens
+#                   (sharding.median_from_counts): são os fill values
+#   3) partições -> cada partição (1/TELECOMX_OOC_PARTITIONS do export) roda
+#                   limpeza, features e transformação (sharding.process_shard);
+#                   o keep="first" da remoção de duplicados vale porque a
+#                   partição tem todas as linhas do ID, na ordem original
+#   4) merge     -> as saídas das partições são intercaladas pela posição no
+#                   export, em janelas de TELECOMX_OOC_CHUNK_ROWS posições, e
+#                   gravadas no formato particionado de storage.py
+# A tabela transformada ganha também a matriz de features e o índice por
+# ID_Cliente, gerados em chunks; a limpa, as estatísticas de correlação
+# (correlation.py), calculadas em cada partição e combinadas. O resultado é
+# o mesmo da execução em memória; a memória depende do tamanho da partição
+# e do chunk.
+#
+#   TELECOMX_OOC_PARTITIONS=16      partições de spill (mais = partições menores)
+#   TELECOMX_OOC_CHUNK_ROWS=100000  linhas por chunk na leitura e no merge
+
+PARTITIONS = int(os.environ.get("TELECOMX_OOC_PARTITIONS", "16"))
+CHUNK_ROWS = int(os.environ.get("TELECOMX_OOC_CHUNK_ROWS", "100000"))
+SPILL_DIR = os.path.join(os.path.dirname(__file__), os.pardir, "data", "cache", "out_of_core")
+
+# Posição da linha no export, gravada junto de cada partição
+POSITION_COL = "_posicao"
+
+TABLES = {
+    "cleaned":     data_cleaning.OUTPUT_TABLE,
+    "features":    feature_engineering.OUTPUT_TABLE,
+    "transformed": data_transformation.OUTPUT_TABLE,
+}
+
+
+# -------------------------------------------------
+# 1) Spill por partição de customerID
+# -------------------------------------------------
+
+def _partition_dir(spill_dir, kind, partition):
+    return os.path.join(spill_dir, kind, f"p{partition:03d}")
+
+
+def _spill(raw_path, spill_dir, n_partitions, chunk_rows):
+    """Distribui o export nas partições; devolve (linhas, contagens de valores, rejeitados)."""
+    rows, freqs, rejected = 0, {}, {}
+    for i, chunk in enumerate(read_raw_chunks(raw_path, chunk_rows)):
+        subset, _ = coerce_numeric(raw_subset(chunk))
+        subset.index = pd.RangeIndex(rows, rows + len(subset))
+        rejected = merge_rejected(rejected, chunk.attrs.get(REJECTED_ATTR, {}))
+        rows += len(subset)
+
+        numeric_cols = list(subset.select_dtypes(include="number").columns)
+        for col, counts in shard_value_counts(subset[numeric_cols]).items():
+            freqs[col] = merge_frequencies(freqs.get(col, new_frequencies()), counts)
+
+        codes = shard_codes(subset[ID_COL], n_partitions)
+        order = np.argsort(codes, kind="stable")
+        bounds = np.searchsorted(codes[order], np.arange(n_partitions + 1))
+        for partition, (lo, hi) in enumerate(zip(bounds[:-1], bounds[1:])):
+            if hi > lo:
+                piece = subset.take(order[lo:hi])
+                piece = piece.assign(**{POSITION_COL: piece.index.to_numpy(np.int64)}).reset_index(drop=True)
+                write_frame(piece, os.path.join(_partition_dir(spill_dir, "runs", partition), f"run-{i:05d}"))
+    return rows, freqs, rejected
+
+
+# -------------------------------------------------
+# 2) Etapas por partição
+# -------------------------------------------------
+
+def _process_partitions(spill_dir, n_partitions, fill_values, keep):
+    """Roda as etapas em cada partição e grava a saída de cada etapa com as posições no export.
+
+    Devolve (linhas de cada partição, estatísticas de correlação da tabela limpa).
+    """
+    sizes, corr_stats = [], None
+    for partition in range(n_partitions):
+        runs_dir = _partition_dir(spill_dir, "runs", partition)
+        if not os.path.isdir(runs_dir):
+            continue
+        df = pd.concat([read_frame(os.path.join(runs_dir, run)) for run in sorted(os.listdir(runs_dir))],
+                       ignore_index=True)
+        df.index = pd.Index(df.pop(POSITION_COL).to_numpy())
+        frames = process_shard(df, fill_values, keep)
+        if "cleaned" in frames:
+            part = frame_comoments(frames["cleaned"])
+            corr_stats = part if corr_stats is None else merge_comoments(corr_stats, part)
+        for stage, frame in frames.items():
+            validate_schema(frame, stage)
+            out = frame.reset_index(drop=True).assign(**{POSITION_COL: frame.index.to_numpy(np.int64)})
+            write_frame(out, _partition_dir(spill_dir, stage, partition))
+        sizes.append(len(df))
+        # As entradas da partição não são mais necessárias: libera o disco
+        shutil.rmtree(runs_dir)
+    return sizes, corr_stats
+
+
+# -------------------------------------------------
+# 3) Merge pela posição no export
+# -------------------------------------------------
+
+def merged_chunks(stage_dir, rows, chunk_rows):
+    """Linhas de todas as partições de `stage_dir` na ordem do export, em janelas de `chunk_rows` posições."""
+    partitions = [os.path.join(stage_dir, name) for name in sorted(os.listdir(stage_dir))]
+    positions = [read_column_array(directory, POSITION_COL) for directory in partitions]
+    for start in range(0, rows, chunk_rows):
+        pieces = []
+        for directory, pos in zip(partitions, positions):
+            lo, hi = np.searchsorted(pos, [start, start + chunk_rows])
+            if hi > lo:
+                pieces.append(read_frame_rows(directory, lo, hi))
+        if pieces:
+            df = pd.concat(pieces, ignore_index=True) if len(pieces) > 1 else pieces[0]
+            df = df.sort_values(POSITION_COL, kind="stable").drop(columns=POSITION_COL)
+            yield df.reset_index(drop=True)
+
+
+# -------------------------------------------------
+# 4) API pública
+# -------------------------------------------------
+
+def run_out_of_core(raw_path=RAW_PATH, keep=STAGES, n_partitions=None, chunk_rows=None,
+                    spill_dir=SPILL_DIR, directory=CLEAN_DIR):
+    """Limpeza, features e transformação do export com memória limitada; grava as etapas de `keep`.
+
+    Devolve ({etapa: caminhos gravados}, fill values usados, linhas do export).
+    """
+    n_partitions = max(1, n_partitions or PARTITIONS)
+    chunk_rows = max(1, chunk_rows or CHUNK_ROWS)
+    if os.path.isdir(spill_dir):
+        shutil.rmtree(spill_dir)
+    os.makedirs(spill_dir)
+
+    try:
+        with span("out_of_core", partitions=n_partitions, chunk_rows=chunk_rows) as info:
+            with span("spill"):
+                rows, freqs, rejected = _spill(raw_path, spill_dir, n_partitions, chunk_rows)
+            info["rows"] = rows
+            print(f"[out_of_core] {rows} linhas em {n_partitions} partições por hash de '{ID_COL}' "
+                  f"(spill em {os.path.normpath(spill_dir)})")
+            for col, motivos in rejected.get("columns", {}).items():
+                if motivos["blank"] or motivos["invalid"]:
+                    print(f"[out_of_core] '{col}': {motivos['blank']} em branco e {motivos['invalid']} inválidos "
+                          f"convertidos em ausentes na ingestão")
+
+            with span("fill_values"):
+                fill_values = {col: median_from_counts(freq) for col, freq in freqs.items()}
+            for col, value in fill_values.items():
+                print(f"[out_of_core] Mediana global de '{col}' (contagens dos chunks): {value:.2f}")
+
+            with span("process_partitions", partitions=n_partitions):
+                sizes, corr_stats = _process_partitions(spill_dir, n_partitions, fill_values, keep)
+            if sizes:
+                print(f"[out_of_core] Partições processadas: {len(sizes)} (maior: {max(sizes)} linhas)")
+
+            paths = {}
+            for stage in keep:
+                stage_dir = os.path.join(spill_dir, stage)
+                with span("merge", stage=stage):
+                    chunks = merged_chunks(stage_dir, rows, chunk_rows) if os.path.isdir(stage_dir) else iter(())
+                    if stage == "transformed":
+                        paths[stage] = data_transformation.save_transformed_chunks(chunks, chunk_rows, directory)
+                    else:
+                        paths[stage] = save_table_chunks(chunks, TABLES[stage], directory=directory)
+            if corr_stats is not None:
+                print("[out_of_core] Estatísticas de correlação (partições combinadas) salvas em:",
+                      save_correlation(corr_stats, TABLES["cleaned"], directory))
+    finally:
+        shutil.rmtree(spill_dir, ignore_errors=True)
+    return paths, fill_values, rows
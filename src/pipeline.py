@@ -0,0 +1,194 @@
+import argparse
+
+import data_cleaning
+import data_transformation
+import descriptive_analysis
+import exploratory_analysis
+import feature_engineering
+import out_of_core
+import sharding
+from exact_stats import exact_statistics
+from imputation import fit_fill_values, save_fill_values
+from ingestion import RAW_PATH
+from instrumentation import configure, span
+from raw_cache import load_raw
+from schema import validate_schema
+from storage import save_table
+
+# -------------------------------------------------
+# Pipeline em processo: limpeza → features → transformação → análise
+# -------------------------------------------------
+# Executa a mesma lógica dos scripts de cada etapa, mas passando os
+# DataFrames em memória. Gravar os intermediários em data/clean/ é opcional,
+# por etapa (--materialize), então uma execução noturna pode pular as
+# idas e voltas ao disco que não interessam.
+#
+# Com --out-of-core, nenhuma etapa tem a base inteira em memória: limpeza,
+# features e transformação rodam por partições em disco (out_of_core.py),
+# as tabelas saem no formato particionado e a análise lê as tabelas em
+# chunks, com os mesmos resultados.
+
+# Intermediários que podem ser gravados e a tabela correspondente
+MATERIALIZABLE = {
+    "cleaned":     data_cleaning.OUTPUT_TABLE,
+    "features":    feature_engineering.OUTPUT_TABLE,
+    "transformed": data_transformation.OUTPUT_TABLE,
+}
+DEFAULT_MATERIALIZE = ("transformed",)
+
+
+def _materialize(stage, df, materialize):
+    # Confere o esquema antes de passar o DataFrame para a próxima etapa
+    validate_schema(df, stage)
+    if stage in materialize:
+        if stage == "transformed":
+            paths = data_transformation.save_transformed(df)
+        else:
+            paths = save_table(df, MATERIALIZABLE[stage])
+        print(f"[pipeline] '{stage}' salvo em: {', '.join(paths)}\n")
+
+
+def _save_fill_values(fill_values, rows):
+    # Medianas do export inteiro, reaplicadas pelo incremental e pelo scoring
+    print(f"[pipeline] Fill values gravados em: {save_fill_values(fill_values, rows)}\n")
+
+
+def _project(df, columns):
+    return df[[c for c in columns if c in df.columns]]
+
+
+def run_analysis(df_clean, df_transformed):
+    """Roda a análise descritiva e a exploratória sobre DataFrames já em memória."""
+    # Estatísticas por Evasao calculadas uma vez e reaproveitadas pela análise numérica
+    stats = descriptive_analysis.describe_data(df_transformed)
+
+    # As funções exploratórias devolvem specs; os gráficos saem juntos, em paralelo
+    charts = exploratory_analysis.explore_cleaned(df_clean)
+    charts += exploratory_analysis.plot_churn_by_category(
+        _project(df_transformed, exploratory_analysis.CATEGORICAL_COLS + ["Evasao"])
+    )
+    charts += exploratory_analysis.analyze_numeric_churn(
+        _project(df_transformed, ["Evasao"] + exploratory_analysis.NUMERIC_CHURN_COLS), stats
+    )
+    exploratory_analysis.render_report(charts, df_clean, df_transformed)
+
+
+def run_analysis_chunked(chunk_rows=out_of_core.CHUNK_ROWS):
+    """run_analysis lendo as tabelas gravadas em chunks de `chunk_rows` linhas (mesmas saídas)."""
+    read_clean = exploratory_analysis.table_reader(MATERIALIZABLE["cleaned"], chunk_rows)
+    read_transformed = exploratory_analysis.table_reader(MATERIALIZABLE["transformed"], chunk_rows)
+    empty_clean = exploratory_analysis.empty_frame(read_clean)
+    empty_transformed = exploratory_analysis.empty_frame(read_transformed)
+
+    group = descriptive_analysis.GROUP_COL
+    stats = descriptive_analysis.describe_data(stats=exact_statistics(
+        read_transformed, by=group if group in empty_transformed.columns else None))
+
+    charts = exploratory_analysis.explore_cleaned(empty_clean, stats=exact_statistics(
+        read_clean, by="Churn" if "Churn" in empty_clean.columns else None), stats_table=MATERIALIZABLE["cleaned"])
+    categorical = _project(empty_transformed, exploratory_analysis.CATEGORICAL_COLS + ["Evasao"])
+    crosstabs = (exploratory_analysis.churn_crosstabs(read_transformed, categorical.columns.drop("Evasao"))
+                 if "Evasao" in categorical.columns else None)
+    charts += exploratory_analysis.plot_churn_by_category(categorical, crosstabs=crosstabs, rows=stats["rows"])
+    charts += exploratory_analysis.analyze_numeric_churn(
+        _project(empty_transformed, ["Evasao"] + exploratory_analysis.NUMERIC_CHURN_COLS), stats, rows=stats["rows"]
+    )
+    exploratory_analysis.render_report(charts, read_clean, read_transformed)
+
+
+def run_pipeline(raw_path=RAW_PATH, materialize=DEFAULT_MATERIALIZE, analysis=True, workers=1,
+                 out_of_core_mode=False):
+    """Executa todas as etapas em memória e devolve os DataFrames limpo e transformado.
+
+    Com `workers` > 1, limpeza, features e transformação rodam em shards
+    paralelos por customerID (ver sharding.py), com o mesmo resultado.
+    Com `out_of_core_mode`, as etapas rodam com memória limitada e nada é
+    devolvido (as tabelas ficam em data/clean/, ver out_of_core.py).
+    """
+    unknown = set(materialize) - set(MATERIALIZABLE)
+    if unknown:
+        raise ValueError(f"Etapas desconhecidas para materializar: {sorted(unknown)}")
+
+    with span("pipeline", raw_path=raw_path):
+        if out_of_core_mode:
+            return _run_out_of_core(raw_path, materialize, analysis)
+        return _run_stages(raw_path, materialize, analysis, workers)
+
+
+def _run_out_of_core(raw_path, materialize, analysis):
+    # A análise lê as tabelas limpa e transformada do disco: elas sempre são gravadas
+    keep = [stage for stage in sharding.STAGES
+            if stage in materialize or (analysis and stage in ("cleaned", "transformed"))]
+    print("[pipeline] Processando fora da memória (out-of-core) os dados brutos de:", raw_path)
+    paths, fill_values, rows = out_of_core.run_out_of_core(raw_path, keep)
+    _save_fill_values(fill_values, rows)
+    for stage in keep:
+        print(f"[pipeline] '{stage}' salvo em: {', '.join(paths[stage])}\n")
+
+    if analysis:
+        run_analysis_chunked()
+
+
+def _run_stages(raw_path, materialize, analysis, workers=1):
+
+    print("[pipeline] Carregando dados brutos de:", raw_path)
+    df_raw = load_raw(raw_path)
+    if workers > 1:
+        # Features só voltam dos workers se forem gravadas
+        keep = [stage for stage in sharding.STAGES if stage != "features" or "features" in materialize]
+        frames, fill_values = sharding.run_sharded(df_raw, workers, keep=keep)
+        _save_fill_values(fill_values, len(df_raw))
+        for stage in keep:
+            _materialize(stage, frames[stage], materialize)
+        df_clean, df_transformed = frames["cleaned"], frames["transformed"]
+    else:
+        fill_values = fit_fill_values(data_cleaning.relevant_subset(df_raw))
+        _save_fill_values(fill_values, len(df_raw))
+        df_clean = data_cleaning.clean_data(df_raw, fill_values=fill_values)
+        del df_raw
+        _materialize("cleaned", df_clean, materialize)
+
+        df_features = feature_engineering.add_features(df_clean)
+        _materialize("features", df_features, materialize)
+
+        df_transformed = data_transformation.transform_data(df_features)
+        del df_features
+        _materialize("transformed", df_transformed, materialize)
+
+    if analysis:
+        run_analysis(df_clean, df_transformed)
+
+    return df_clean, df_transformed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Executa o pipeline Telecom X (limpeza → features → transformação → análise) em memória."
+    )
+    parser.add_argument("--raw-path", default=RAW_PATH, help="JSON bruto de entrada")
+    parser.add_argument(
+        "--materialize", nargs="*", choices=sorted(MATERIALIZABLE), default=list(DEFAULT_MATERIALIZE),
+        help="intermediários a gravar em data/clean/ (padrão: transformed; vazio = nenhum)",
+    )
+    parser.add_argument("--skip-analysis", action="store_true", help="não roda as etapas de análise")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="processos para limpeza/features/transformação em shards por customerID "
+                             "(padrão: 1, sem shards; 0 = núcleos disponíveis)")
+    parser.add_argument("--out-of-core", action="store_true",
+                        help="processa o export por partições em disco, com memória limitada (para bases "
+                             "maiores que a RAM; mesmos resultados, tabelas no formato particionado)")
+    parser.add_argument("--trace", metavar="ARQUIVO", help="grava tempo/memória por etapa em JSON lines")
+    parser.add_argument("--profile", nargs="+", metavar="SPAN",
+                        help="roda cProfile nesses spans (ex.: data_cleaning exploratory_analysis; 'all')")
+    args = parser.parse_args(argv)
+
+    configure(trace_path=args.trace, profile=args.profile)
+
+    workers = args.workers if args.workers > 0 else sharding.MAX_WORKERS
+    run_pipeline(args.raw_path, materialize=args.materialize, analysis=not args.skip_analysis, workers=workers,
+                 out_of_core_mode=args.out_of_core)
+    print("[pipeline] Concluído.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,400 @@
+import os
+import re
+import numpy as np
+import pandas as pd
+
+from ingestion import raw_number
+from instrumentation import span
+from normalization import CLEANING_MAPS
+from sampling import CONFIDENCE, ROW_COL, STRATUM_COL, estimate_proportion, profile, sample_frame
+from schema import CLEANED_SCHEMA
+
+# -------------------------------------------------
+# Regras de qualidade declarativas sobre o export bruto
+# -------------------------------------------------
+# Cada regra é um dict {coluna, verificação, severidade, parâmetros}. As regras
+# de uma coluna são avaliadas juntas, numa única passada por coluna em cada
+# chunk:
+#   - texto: a coluna é fatorada uma vez (códigos + valores únicos); todas
+#     as verificações rodam só sobre os valores únicos e voltam para as
+#     linhas pelos códigos (como em normalization.py);
+#   - números: máscaras numpy sobre o array da coluna.
+# O estado é acumulado chunk a chunk (contagens, amostras de linhas, IDs já
+# vistos, grafia canônica de cada valor), então o export pode ser lido em
+# streaming (ingestion.read_raw_chunks com coerce=False: as regras olham o
+# valor original do JSON das colunas numéricas, convertido com as regras da
+# ingestão por ingestion.raw_number). report() devolve um dict
+# pronto para JSON com a contagem, o status e até SAMPLE_SIZE linhas de
+# exemplo por regra.
+# Para exports grandes há também o modo amostra (seção 3).
+#
+# Verificações:
+#   not_null   valor presente
+#   not_blank  texto não vazio depois do strip
+#   allowed    valor (strip + lower) dentro do conjunto aceito pela limpeza
+#   hygiene    sem espaços nas pontas
+#   casing     mesma grafia para o mesmo valor (a primeira vista é a canônica)
+#   pattern    texto casa com a expressão regular
+#   unique     valor não se repete (no export inteiro, entre chunks)
+#   numeric    número, ou texto numérico convertível (true, "abc" e " " não são)
+#   range      número dentro de [min, max] (ausentes não contam)
+#   integer    número sem parte fracionária
+
+SAMPLE_SIZE = 5
+ID_COL = "customerID"
+
+# Fração máxima de linhas violando uma regra de erro antes de ela falhar
+# (0 = qualquer violação). No modo amostra o limiar padrão é maior: com zero,
+# nenhuma amostra consegue mostrar que a taxa é nula.
+MAX_RATE = float(os.environ.get("TELECOMX_QUALITY_MAX_RATE", "0"))
+SAMPLE_MAX_RATE = float(os.environ.get("TELECOMX_QUALITY_SAMPLE_MAX_RATE", "0.001"))
+
+
+def rule(column, check, severity="error", **params):
+    return {"column": column, "check": check, "severity": severity, "params": params}
+
+
+def _allowed(col):
+    """Valores aceitos pela limpeza (ver schema.py), sem o 'unknown' do preenchimento."""
+    dtype = CLEANED_SCHEMA[col]
+    if isinstance(dtype, pd.CategoricalDtype):
+        return [v for v in dtype.categories if v != "unknown"]
+    return list(CLEANING_MAPS[col])
+
+
+CATEGORICAL_COLS = [
+    "customer.gender", "customer.Partner", "customer.Dependents",
+    "phone.PhoneService", "phone.MultipleLines",
+    "internet.InternetService", "internet.OnlineSecurity", "internet.OnlineBackup",
+    "internet.DeviceProtection", "internet.TechSupport", "internet.StreamingTV", "internet.StreamingMovies",
+    "account.Contract", "account.PaperlessBilling", "account.PaymentMethod",
+]
+
+RULES = [
+    rule(ID_COL, "not_null"),
+    rule(ID_COL, "unique"),
+    rule(ID_COL, "pattern", regex=r"^\d{4}-[A-Z]{5}$"),
+    rule(ID_COL, "hygiene", severity="warning"),
+    # Churn em branco vira alvo ausente na limpeza: aviso, não erro
+    rule("Churn", "not_blank", severity="warning"),
+    rule("Churn", "allowed", values=_allowed("Churn")),
+    rule("Churn", "hygiene", severity="warning"),
+    rule("Churn", "casing", severity="warning"),
+]
+for _col in CATEGORICAL_COLS:
+    RULES += [
+        rule(_col, "not_null"),
+        rule(_col, "allowed", values=_allowed(_col)),
+        rule(_col, "hygiene", severity="warning"),
+        rule(_col, "casing", severity="warning"),
+    ]
+RULES += [
+    rule("customer.SeniorCitizen", "not_null"),
+    rule("customer.SeniorCitizen", "numeric"),
+    rule("customer.SeniorCitizen", "range", min=0, max=1),
+    rule("customer.SeniorCitizen", "integer"),
+    rule("customer.tenure", "not_null"),
+    rule("customer.tenure", "numeric"),
+    rule("customer.tenure", "range", min=0, max=120),
+    rule("customer.tenure", "integer"),
+    rule("account.Charges.Monthly", "not_null"),
+    rule("account.Charges.Monthly", "numeric"),
+    rule("account.Charges.Monthly", "range", min=0, max=1000),
+    # Totais em branco (clientes novos) são preenchidos pela mediana na limpeza
+    rule("account.Charges.Total", "numeric", severity="warning"),
+    rule("account.Charges.Total", "range", min=0, max=None),
+]
+
+
+# -------------------------------------------------
+# 1) Estado acumulado entre chunks
+# -------------------------------------------------
+
+def new_state(rules=RULES, sample_size=SAMPLE_SIZE):
+    return {
+        "rules": rules,
+        "sample_size": sample_size,
+        "rows": 0,
+        "counts": [0] * len(rules),
+        "samples": [[] for _ in rules],
+        "missing_columns": set(),
+        "seen": {},        # coluna -> valores já vistos (unique)
+        "spellings": {},   # coluna -> valor normalizado -> grafia canônica (casing)
+    }
+
+
+def _is_missing(value):
+    return value is None or (isinstance(value, float) and np.isnan(value))
+
+
+def _record(state, i, mask, df, column, row_numbers):
+    rows = np.flatnonzero(mask)
+    state["counts"][i] += len(rows)
+    room = state["sample_size"] - len(state["samples"][i])
+    if room <= 0 or not len(rows):
+        return
+    ids = df[ID_COL].to_numpy(dtype=object) if ID_COL in df.columns else None
+    values = df[column].to_numpy(dtype=object)
+    for row in rows[:room]:
+        value = values[row]
+        state["samples"][i].append({
+            "row": int(row_numbers[row]),
+            ID_COL: None if ids is None or _is_missing(ids[row]) else ids[row],
+            "value": None if _is_missing(value) else (value.item() if isinstance(value, np.generic) else value),
+        })
+
+
+# -------------------------------------------------
+# 2) Avaliação: uma passada por coluna
+# -------------------------------------------------
+
+def _factorize(series):
+    """pd.factorize sem juntar true/false com 1/0 (iguais para o hash do Python) nos valores brutos do JSON."""
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    uniques = list(np.asarray(uniques, dtype=object))
+    if all(isinstance(v, str) or _is_missing(v) for v in uniques):
+        return codes, uniques
+    values = series.to_numpy(dtype=object)
+    is_bool = np.fromiter((type(v) is bool for v in values), dtype=bool, count=len(values))
+    if not is_bool.any():
+        return codes, uniques
+    codes, uniques = pd.factorize(np.where(is_bool, None, values), use_na_sentinel=True)
+    bool_codes, bool_uniques = pd.factorize(values[is_bool])
+    codes[is_bool] = bool_codes + len(uniques)
+    return codes, list(np.asarray(uniques, dtype=object)) + list(bool_uniques)
+
+
+def _text_masks(state, column, series, checks):
+    """Máscaras por linha das verificações de texto, calculadas sobre os valores únicos."""
+    codes, uniques = _factorize(series)
+    missing = [_is_missing(v) for v in uniques]
+    text = [v if isinstance(v, str) else None for v in uniques]
+    stripped = [t.strip() if t is not None else None for t in text]
+    normalized = [s.lower() if s is not None else None for s in stripped]
+
+    per_unique = {}
+    for i, check, params in checks:
+        if check == "not_null":
+            bad = missing
+        elif check == "not_blank":
+            bad = [s == "" for s in stripped]
+        elif check == "allowed":
+            allowed = set(params["values"])
+            bad = [n is not None and n != "" and n not in allowed for n in normalized]
+        elif check == "hygiene":
+            bad = [t is not None and t != s for t, s in zip(text, stripped)]
+        elif check == "casing":
+            canonical = state["spellings"].setdefault(column, {})
+            bad = []
+            for s, n in zip(stripped, normalized):
+                if n is None or n == "":
+                    bad.append(False)
+                    continue
+                bad.append(canonical.setdefault(n, s) != s)
+        elif check == "pattern":
+            regex = re.compile(params["regex"])
+            bad = [t is not None and regex.match(t) is None for t in text]
+        elif check in ("numeric", "range", "integer"):
+            numbers = np.array([raw_number(v) for v in uniques], dtype="float64")
+            bad = _numeric_bad(check, params, numbers, np.array(missing, dtype=bool))
+        elif check == "unique":
+            seen = state["seen"].setdefault(column, set())
+            bad = [v in seen for v in uniques]
+            seen.update(v for v, m in zip(uniques, missing) if not m)
+        else:
+            raise ValueError(f"Verificação desconhecida: '{check}'")
+        # Posição extra para o código -1 (ausente no factorize)
+        lookup = np.append(np.asarray(bad, dtype=bool), check == "not_null")
+        mask = lookup[codes]
+        if check == "unique":
+            # Repetições dentro do próprio chunk: só a primeira ocorrência passa
+            mask |= pd.Series(codes).duplicated().to_numpy() & (codes >= 0)
+        per_unique[i] = mask
+    return per_unique
+
+
+def _numeric_bad(check, params, numbers, missing):
+    if check == "numeric":
+        return np.isnan(numbers) & ~missing
+    if check == "range":
+        bad = np.zeros(len(numbers), dtype=bool)
+        if params.get("min") is not None:
+            bad |= numbers < params["min"]
+        if params.get("max") is not None:
+            bad |= numbers > params["max"]
+        return bad
+    if check == "integer":
+        return ~np.isnan(numbers) & (numbers != np.round(numbers))
+    raise ValueError(f"Verificação numérica desconhecida: '{check}'")
+
+
+def _numeric_masks(series, checks):
+    numbers = series.to_numpy(dtype="float64", na_value=np.nan)
+    missing = np.isnan(numbers)
+    masks = {}
+    for i, check, params in checks:
+        if check == "not_null":
+            masks[i] = missing
+        elif check in ("numeric", "range", "integer"):
+            masks[i] = _numeric_bad(check, params, numbers, missing)
+        elif check == "unique":
+            masks[i] = series.duplicated().to_numpy()
+        else:
+            # Verificações de texto numa coluna numérica: nada a conferir
+            masks[i] = np.zeros(len(numbers), dtype=bool)
+    return masks
+
+
+def _rule_masks(state, df):
+    """Gera (índice da regra, coluna, máscara das linhas que violam a regra), uma passada por coluna."""
+    by_column = {}
+    for i, r in enumerate(state["rules"]):
+        by_column.setdefault(r["column"], []).append((i, r["check"], r["params"]))
+    for column, checks in by_column.items():
+        if column not in df.columns:
+            state["missing_columns"].add(column)
+            continue
+        series = df[column]
+        if pd.api.types.is_numeric_dtype(series.dtype):
+            masks = _numeric_masks(series, checks)
+        else:
+            masks = _text_masks(state, column, series, checks)
+        for i, mask in masks.items():
+            yield i, column, mask
+
+
+def check_chunk(state, df):
+    """Avalia todas as regras sobre um chunk do export bruto e acumula no estado."""
+    offset = state["rows"]
+    row_numbers = np.arange(offset, offset + len(df))
+    with span("quality_chunk", rows=len(df)):
+        for i, column, mask in _rule_masks(state, df):
+            _record(state, i, mask, df, column, row_numbers)
+    state["rows"] += len(df)
+    return state
+
+
+def _status(entry, max_rate, missing_columns):
+    if entry["column"] in missing_columns:
+        return "coluna ausente"
+    if entry["severity"] != "error":
+        return "aviso" if entry["violations"] else "ok"
+    return "falha" if entry["rate"] > max_rate else "ok"
+
+
+def _summarize(rules, rows, missing_columns, max_rate, **extra):
+    totals = {"error": 0, "warning": 0}
+    for entry in rules:
+        totals[entry["severity"]] = totals.get(entry["severity"], 0) + entry["violations"]
+    return dict({
+        "rows": rows,
+        "errors": totals["error"],
+        "warnings": totals["warning"],
+        "max_rate": max_rate,
+        "missing_columns": sorted(missing_columns),
+        # Regra de erro não verificada não aprova: o veredito fica inconclusivo
+        "inconclusive": sum(e["status"] == "não verificada" for e in rules),
+        "passed": not missing_columns and all(e["status"] not in ("falha", "coluna ausente", "não verificada")
+                                              for e in rules),
+    }, **extra, rules=rules)
+
+
+def report(state, max_rate=MAX_RATE):
+    """Relatório em formato JSON: totais por severidade e cada regra com contagem, status e amostras.
+
+    Uma regra de severidade 'error' falha quando a fração de linhas que a
+    violam passa de `max_rate` (0 = qualquer violação).
+    """
+    rules = []
+    for r, count, samples in zip(state["rules"], state["counts"], state["samples"]):
+        entry = dict(r, violations=count, rate=count / state["rows"] if state["rows"] else 0.0, samples=samples)
+        entry["status"] = _status(entry, max_rate, state["missing_columns"])
+        rules.append(entry)
+    return _summarize(rules, state["rows"], state["missing_columns"], max_rate, mode="full")
+
+
+def run_checks(chunks, rules=RULES, sample_size=SAMPLE_SIZE, max_rate=MAX_RATE):
+    """Avalia `rules` sobre um iterável de chunks e devolve o relatório."""
+    state = new_state(rules, sample_size)
+    for chunk in chunks:
+        check_chunk(state, chunk)
+    return report(state, max_rate)
+
+
+# -------------------------------------------------
+# 3) Modo amostra: estimativas com intervalo e escalonamento
+# -------------------------------------------------
+# As regras rodam sobre a amostra estratificada por Churn (sampling.py) e
+# cada taxa de violação ganha um intervalo de confiança. Uma regra de erro
+# só é decidida pela amostra se o intervalo inteiro ficar de um lado do
+# limiar (`max_rate`); se o intervalo contiver o limiar, a regra é
+# "escalada" e recontada exatamente numa segunda leitura do export, só com
+# as regras escaladas. Unicidade não se estima por amostra (uma repetição
+# fora da amostra não aparece nela): um ID repetido na amostra já é falha;
+# sem repetição, a regra fica "não verificada", a menos que haja segunda
+# leitura, que então a confere também. Uma regra de erro não verificada não
+# aprova o export: o veredito fica inconclusivo.
+
+def estimate_checks(sample, rules=RULES, max_rate=SAMPLE_MAX_RATE, sample_size=SAMPLE_SIZE,
+                    confidence=CONFIDENCE):
+    """Relatório das regras estimado sobre a amostra `sample` (ver sampling.sample_chunks)."""
+    frame, strata = sample_frame(sample)
+    exact = all(n == N for _, N, n in strata)
+    codes = frame[STRATUM_COL].to_numpy(dtype=np.intp)
+    state = new_state(rules, sample_size)
+    hits = [np.zeros(len(strata), dtype=np.int64) for _ in rules]
+    with span("quality_sample", rows=len(frame)):
+        for i, column, mask in _rule_masks(state, frame):
+            _record(state, i, mask, frame, column, frame[ROW_COL].to_numpy())
+            hits[i] = np.bincount(codes[mask], minlength=len(strata))
+
+    entries = []
+    for i, r in enumerate(rules):
+        est = estimate_proportion(strata, hits[i], confidence)
+        found = state["counts"][i]
+        entry = dict(r, violations=int(round(est["estimate"] * sample["rows"])) if found else 0,
+                     violations_in_sample=found, rate=est["estimate"] if found else 0.0,
+                     rate_low=est["low"], rate_high=est["high"], samples=state["samples"][i])
+        if r["column"] in state["missing_columns"] or r["severity"] != "error" or exact:
+            entry["status"] = _status(entry, max_rate, state["missing_columns"])
+        elif r["check"] == "unique":
+            # Repetições na amostra são só um piso para as do export
+            entry.update(violations=found, rate=found / sample["rows"], rate_low=found / sample["rows"], rate_high=1.0)
+            entry["status"] = "falha" if found else "não verificada"
+        elif est["low"] > max_rate:
+            entry["status"] = "falha"
+        elif est["high"] <= max_rate:
+            entry["status"] = "ok"
+        else:
+            entry["status"] = "escalada"
+        entries.append(entry)
+    return _summarize(entries, sample["rows"], state["missing_columns"], max_rate, mode="sample",
+                      sampled=len(frame), confidence=confidence)
+
+
+def sampled_checks(sample, read_chunks, rules=RULES, max_rate=SAMPLE_MAX_RATE, sample_size=SAMPLE_SIZE,
+                   confidence=CONFIDENCE, numeric=("account.Charges.Monthly", "account.Charges.Total")):
+    """Veredito pela amostra `sample`, com segunda leitura só para as regras escaladas.
+
+    `read_chunks()` devolve um iterador de chunks do export inteiro e só é
+    chamado se alguma regra for escalada. O relatório inclui o perfil da
+    amostra (ausentes, frequências e quantis com intervalos, ver
+    sampling.profile).
+    """
+    result = estimate_checks(sample, rules, max_rate, sample_size, confidence)
+    result["profile"] = profile(sample, numeric=numeric, confidence=confidence)
+
+    escalated = [i for i, e in enumerate(result["rules"]) if e["status"] == "escalada"]
+    result["escalated"] = len(escalated)
+    if escalated:
+        pending = escalated + [i for i, e in enumerate(result["rules"]) if e["status"] == "não verificada"]
+        with span("quality_escalation", rules=len(pending)):
+            exact = run_checks(read_chunks(), [rules[i] for i in pending], sample_size, max_rate)
+        rules_out = list(result["rules"])
+        for i, entry in zip(pending, exact["rules"]):
+            rules_out[i] = dict(entry, escalated=True)
+        extra = {k: v for k, v in result.items()
+                 if k not in ("rows", "errors", "warnings", "max_rate", "missing_columns", "inconclusive",
+                              "passed", "rules")}
+        result = _summarize(rules_out, result["rows"], set(result["missing_columns"]), max_rate, **extra)
+    return result
@@ -0,0 +1,162 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+
+from columnar import directory_size, read_frame, write_frame
+from ingestion import INGESTION_VERSION, RAW_PATH, REJECTED_ATTR, read_raw
+from instrumentation import span
+
+# -------------------------------------------------
+# Cache compartilhado do DataFrame bruto normalizado
+# -------------------------------------------------
+# O JSON bruto é parseado uma única vez; o DataFrame achatado fica gravado em
+# formato colunar (ver columnar.py) num diretório cujo nome é o SHA-256 do
+# conteúdo do arquivo. Qualquer etapa que precise dos dados brutos chama
+# load_raw() e, se o arquivo não mudou, só lê os .npy do cache.
+#
+# Para não recalcular o hash a cada chamada, index.json guarda
+# (tamanho, mtime) -> hash por arquivo de origem: se tamanho e mtime não
+# mudaram, o hash salvo é reaproveitado; se mudaram, o hash é recalculado e
+# aponta para um snapshot novo (invalidação automática).
+#
+# O nome do snapshot leva também ingestion.INGESTION_VERSION: se o formato do
+# DataFrame achatado mudar (ex.: texto numérico convertido na ingestão), os
+# snapshots antigos deixam de ser usados e saem pela política de remoção. As
+# contagens de valores rejeitados na conversão (df.attrs["rejected"]) ficam
+# em rejected.json, junto do snapshot.
+
+CACHE_DIR = os.path.join(os.path.dirname(__file__), os.pardir, "data", "cache", "raw")
+INDEX_FILE = "index.json"
+LAST_USED_FILE = "last_used"
+REJECTED_FILE = "rejected.json"
+
+# Limite total do cache; snapshots menos usados recentemente são removidos
+MAX_CACHE_BYTES = int(os.environ.get("TELECOMX_RAW_CACHE_MAX_BYTES", 2 * 1024 ** 3))
+
+HASH_BLOCK_SIZE = 8 * 1024 * 1024
+
+
+# -------------------------------------------------
+# 1) Impressão digital do arquivo de origem
+# -------------------------------------------------
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _load_index(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, INDEX_FILE), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _save_index(cache_dir, index):
+    tmp_path = os.path.join(cache_dir, f"{INDEX_FILE}.{os.getpid()}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=2)
+    os.replace(tmp_path, os.path.join(cache_dir, INDEX_FILE))
+
+
+def fingerprint(path, cache_dir=CACHE_DIR):
+    """Retorna o hash do conteúdo de `path`, reaproveitando-o se tamanho e mtime não mudaram."""
+    stat = os.stat(path)
+    source = os.path.abspath(path)
+    index = _load_index(cache_dir)
+    entry = index.get(source)
+    if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+        return entry["sha256"]
+
+    sha = _file_sha256(path)
+    os.makedirs(cache_dir, exist_ok=True)
+    index = _load_index(cache_dir)
+    index[source] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": sha}
+    _save_index(cache_dir, index)
+    return sha
+
+
+# -------------------------------------------------
+# 2) Política de remoção (LRU limitado por tamanho)
+# -------------------------------------------------
+
+def _touch(snapshot_dir):
+    with open(os.path.join(snapshot_dir, LAST_USED_FILE), "w", encoding="utf-8") as f:
+        f.write(str(time.time()))
+
+
+def _last_used(snapshot_dir):
+    try:
+        with open(os.path.join(snapshot_dir, LAST_USED_FILE), "r", encoding="utf-8") as f:
+            return float(f.read())
+    except (FileNotFoundError, ValueError):
+        return 0.0
+
+
+def evict(cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES, keep=()):
+    """Remove snapshots menos usados até o cache caber em `max_bytes`."""
+    if not os.path.isdir(cache_dir):
+        return []
+    snapshots = []
+    for name in os.listdir(cache_dir):
+        snapshot_dir = os.path.join(cache_dir, name)
+        if os.path.isdir(snapshot_dir) and not name.startswith("."):
+            snapshots.append((_last_used(snapshot_dir), name, directory_size(snapshot_dir)))
+
+    total = sum(size for _, _, size in snapshots)
+    removed = []
+    for _, name, size in sorted(snapshots):
+        if total <= max_bytes:
+            break
+        if name in keep:
+            continue
+        shutil.rmtree(os.path.join(cache_dir, name), ignore_errors=True)
+        total -= size
+        removed.append(name)
+    return removed
+
+
+# -------------------------------------------------
+# 3) API pública
+# -------------------------------------------------
+
+def load_raw(path=RAW_PATH, columns=None, cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+    """Carrega o DataFrame bruto normalizado, parseando o JSON só em caso de cache miss."""
+    with span("load_raw") as info:
+        with span("fingerprint"):
+            sha = fingerprint(path, cache_dir)
+        key = f"{sha}.v{INGESTION_VERSION}"
+        snapshot_dir = os.path.join(cache_dir, key)
+
+        if not os.path.isdir(snapshot_dir):
+            info["cache"] = "miss"
+            df = read_raw(path)
+            with span("write_cache"):
+                # rejected.json e last_used entram no snapshot na mesma troca atômica das colunas
+                write_frame(df, snapshot_dir, extra_files={
+                    REJECTED_FILE: json.dumps(df.attrs.get(REJECTED_ATTR, {})),
+                    LAST_USED_FILE: str(time.time()),
+                })
+                evict(cache_dir, max_bytes, keep={key})
+            return df if columns is None else df[list(columns)]
+
+        info["cache"] = "hit"
+        _touch(snapshot_dir)
+        with span("read_cache"):
+            df = read_frame(snapshot_dir, columns=columns)
+        try:
+            with open(os.path.join(snapshot_dir, REJECTED_FILE), "r", encoding="utf-8") as f:
+                df.attrs[REJECTED_ATTR] = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass
+        return df
+
+
+def clear(cache_dir=CACHE_DIR):
+    shutil.rmtree(cache_dir, ignore_errors=True)
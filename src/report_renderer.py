@@ -0,0 +1,245 @@
+import os
+import sys
+import colorsys
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import chart_cache
+from chart_summaries import summarize_chart, summarize_chart_chunks
+from instrumentation import span
+
+# -------------------------------------------------
+# Renderização paralela dos gráficos de reports/
+# -------------------------------------------------
+# Cada gráfico é descrito por um "spec" (dict) com o tipo do gráfico, a
+# tabela e as colunas de entrada, títulos e o arquivo de saída. Os specs são
+# renderizados num pool de processos com backend Agg; cada figura é
+# independente, então o tempo total cai com o número de núcleos.
+#
+# As linhas dos clientes não vão para os workers: cada spec é antes reduzido
+# a um resumo pequeno (contagens, bins, quartis; ver chart_summaries.py) e o
+# gráfico é desenhado a partir dele. Enviar o resumo para o worker custa o
+# mesmo com mil ou dez milhões de clientes.
+#
+# Gráficos cujas colunas de entrada e spec não mudaram desde a última
+# execução não são resumidos nem renderizados de novo (ver chart_cache.py).
+#
+# Campos de um spec:
+#   kind      -> "hist", "hist_by", "box", "count" ou "heatmap_corr"
+#   table     -> chave da tabela em `tables` (ex.: "cleaned"): um DataFrame ou,
+#                para tabelas maiores que a memória, um leitor em chunks
+#                `read_chunks(columns)` (ver chart_summaries.py)
+#   columns   -> colunas lidas pelo gráfico
+#   filename  -> nome do PNG em reports/
+#   message   -> texto impresso depois de salvar (seguido do caminho)
+#   title, xlabel, ylabel, figsize, rotation, legend... -> aparência
+
+# Número de processos: padrão = núcleos disponíveis; 1 = renderiza no próprio processo
+MAX_WORKERS = int(os.environ.get("TELECOMX_REPORT_WORKERS", "0")) or os.cpu_count() or 1
+
+# Mesmos padrões dos gráficos categóricos do seaborn
+SATURATION = 0.75
+BOX_WIDTH = 0.8
+
+
+# -------------------------------------------------
+# 1) Desenho de cada tipo de gráfico a partir do resumo
+# -------------------------------------------------
+
+def _draw_distribution(sns, plt, dist, stat="count", **kwargs):
+    # Um ponto por bin, com peso = contagem: as barras saem iguais às do histplot sobre as linhas
+    centers = (dist["edges"][:-1] + dist["edges"][1:]) / 2
+    # (bordas uniformes: bins + binrange reproduzem as mesmas bordas)
+    ax = sns.histplot(x=centers, weights=dist["counts"], bins=len(dist["counts"]),
+                      binrange=(dist["edges"][0], dist["edges"][-1]), stat=stat,
+                      alpha=0.5 if dist["kde"] is not None else 0.75, **kwargs)
+    if dist["kde"] is not None:
+        # Curva na escala das barras (como o histplot faz com kde=True)
+        widths = np.diff(dist["edges"])
+        scale = (dist["counts"] * widths).sum() if stat == "count" else 1.0
+        color = ax.patches[-1].get_facecolor()[:3]
+        ax.plot(dist["kde"]["support"], dist["kde"]["density"] * scale, color=color)
+
+
+def _draw_hist(sns, plt, summary, spec):
+    if summary is not None:
+        _draw_distribution(sns, plt, summary, spec.get("stat", "count"))
+
+
+def _draw_hist_by(sns, plt, summary, spec):
+    # Um histograma por grupo de `by`, sobrepostos (ex.: Evasao 0 × 1)
+    for dist, (_, color, label) in zip(summary["groups"], spec["groups"]):
+        if dist is not None:
+            _draw_distribution(sns, plt, dist, spec.get("stat", "count"), color=color, label=label)
+
+
+def _draw_box(sns, plt, summary, spec):
+    ax = plt.gca()
+    levels = summary["levels"]
+    palette = sns.color_palette(spec["palette"], len(levels)) if "palette" in spec \
+        else [sns.color_palette()[0]] * len(levels)
+    colors = [sns.desaturate(c, SATURATION) for c in palette]
+    # Linhas em cinza, um pouco mais escuras que a cor mais escura das caixas
+    gray = min(colorsys.rgb_to_hls(*c)[1] for c in colors) * 0.6
+    line = (gray, gray, gray)
+    for pos, (stats, color) in enumerate(zip(summary["stats"], colors)):
+        if stats is None:
+            continue
+        ax.bxp([stats], positions=[pos], widths=BOX_WIDTH, capwidths=BOX_WIDTH / 2,
+               patch_artist=True, manage_ticks=False,
+               boxprops={"facecolor": color, "edgecolor": line},
+               medianprops={"color": line, "solid_capstyle": "butt"},
+               whiskerprops={"color": line, "solid_capstyle": "butt"},
+               capprops={"color": line}, flierprops={"markeredgecolor": line})
+    ax.set_xticks(range(len(levels)), [str(level) for level in levels])
+    ax.set_xlim(-0.5, len(levels) - 0.5)
+    ax.xaxis.grid(False)
+    ax.set_xlabel(spec["x"])
+    ax.set_ylabel(spec["y"])
+
+
+def _draw_count(sns, plt, summary, spec):
+    x_levels, hue_levels, counts = summary["x_levels"], summary["hue_levels"], summary["counts"]
+    options = {"palette": spec["palette"]} if "palette" in spec else {}
+    if hue_levels is None:
+        data = pd.DataFrame({spec["x"]: pd.Series(x_levels, dtype=object), "count": counts})
+        sns.barplot(data=data, x=spec["x"], y="count", order=x_levels, errorbar=None, **options)
+        return
+    data = pd.DataFrame({
+        spec["x"]: pd.Series(x_levels, dtype=object).repeat(len(hue_levels)).to_numpy(),
+        spec["hue"]: pd.Series(hue_levels * len(x_levels), dtype=object).to_numpy(),
+        "count": counts.ravel(),
+    })
+    sns.barplot(data=data, x=spec["x"], y="count", hue=spec["hue"],
+                order=x_levels, hue_order=hue_levels, errorbar=None, **options)
+
+
+def _draw_heatmap_corr(sns, plt, summary, spec):
+    sns.heatmap(summary["corr"], annot=True, fmt=".2f", cmap="coolwarm")
+
+
+DRAWERS = {
+    "hist": _draw_hist,
+    "hist_by": _draw_hist_by,
+    "box": _draw_box,
+    "count": _draw_count,
+    "heatmap_corr": _draw_heatmap_corr,
+}
+
+
+def _setup_matplotlib():
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    sns.set_style("whitegrid")
+    plt.rcParams["figure.figsize"] = (8, 5)
+    return sns, plt
+
+
+def render_spec(spec, summary, reports_dir):
+    """Desenha um spec a partir do seu resumo e grava o PNG; devolve o caminho."""
+    sns, plt = _setup_matplotlib()
+    out_path = os.path.join(reports_dir, spec["filename"])
+    with span("render", chart=spec["filename"]):
+        plt.figure(figsize=spec.get("figsize"))
+        DRAWERS[spec["kind"]](sns, plt, summary, spec)
+        plt.title(spec["title"])
+        if "xlabel" in spec:
+            plt.xlabel(spec["xlabel"])
+        if "ylabel" in spec:
+            plt.ylabel(spec["ylabel"])
+        if "rotation" in spec:
+            plt.xticks(rotation=spec["rotation"])
+        if "legend_labels" in spec:
+            plt.legend(title=spec.get("legend_title"), labels=spec["legend_labels"])
+        elif "legend_title" in spec:
+            plt.legend(title=spec["legend_title"])
+        plt.tight_layout()
+        plt.savefig(out_path)
+        plt.close()
+    return out_path
+
+
+def _worker_init(src_dir):
+    if src_dir not in sys.path:
+        sys.path.insert(0, src_dir)
+    _setup_matplotlib()
+
+
+# -------------------------------------------------
+# 2) API pública
+# -------------------------------------------------
+
+def summarize_charts(specs, tables):
+    """Resumo de cada spec; colunas usadas por vários gráficos são preparadas uma vez só."""
+    cache = {}
+    summaries = []
+    with span("summarize", charts=len(specs)):
+        for spec in specs:
+            df = tables[spec["table"]]
+            summaries.append(summarize_chart_chunks(spec, df) if callable(df) else summarize_chart(spec, df, cache))
+    return summaries
+
+
+def render_charts(specs, tables, reports_dir, max_workers=None, use_cache=None):
+    """Renderiza os specs (em paralelo quando há mais de um núcleo) e devolve os caminhos gerados.
+
+    Com o cache ligado (padrão: TELECOMX_CHART_CACHE), PNGs já atualizados são mantidos.
+    """
+    os.makedirs(reports_dir, exist_ok=True)
+    use_cache = chart_cache.ENABLED if use_cache is None else use_cache
+    # Specs com o mesmo arquivo de saída: vale o último, como numa execução sequencial
+    specs = list({spec["filename"]: spec for spec in specs}.values())
+
+    with span("render_charts", charts=len(specs)) as attrs:
+        pending = list(range(len(specs)))
+        if use_cache:
+            with span("fingerprint"):
+                keys = chart_cache.chart_keys(specs, tables)
+            manifest = chart_cache.load_manifest(reports_dir)
+            pending = [i for i in pending
+                       if not chart_cache.is_fresh(manifest, reports_dir, specs[i]["filename"], keys[i])]
+        attrs["rendered"] = len(pending)
+
+        rendered = iter(_render_pending([specs[i] for i in pending], tables, reports_dir, max_workers))
+        paths = []
+        for i, spec in enumerate(specs):
+            if i in pending:
+                paths.append(next(rendered))
+                print(f"{spec['message']} {paths[-1]}")
+            else:
+                paths.append(os.path.join(reports_dir, spec["filename"]))
+                print(f"{spec['message']} {paths[-1]} (sem alterações)")
+
+        if use_cache and pending:
+            # Relê o manifesto: outro processo (ex.: a outra metade da análise no
+            # scheduler.py) pode ter gravado entradas enquanto estes gráficos saíam
+            manifest = chart_cache.load_manifest(reports_dir)
+            for i in pending:
+                chart_cache.record(manifest, reports_dir, specs[i]["filename"], keys[i])
+            chart_cache.save_manifest(reports_dir, manifest)
+    return paths
+
+
+def _render_pending(specs, tables, reports_dir, max_workers=None):
+    if not specs:
+        return []
+    workers = max(1, min(max_workers or MAX_WORKERS, len(specs)))
+    summaries = summarize_charts(specs, tables)
+    if workers == 1:
+        return [render_spec(spec, summary, reports_dir) for spec, summary in zip(specs, summaries)]
+
+    # spawn: workers limpos (sem herdar estado do matplotlib do processo pai)
+    ctx = multiprocessing.get_context("spawn")
+    src_dir = os.path.dirname(os.path.abspath(__file__))
+    with span("pool", workers=workers), ProcessPoolExecutor(
+        max_workers=workers, mp_context=ctx, initializer=_worker_init, initargs=(src_dir,)
+    ) as pool:
+        futures = [pool.submit(render_spec, spec, summary, reports_dir)
+                   for spec, summary in zip(specs, summaries)]
+        return [future.result() for future in futures]
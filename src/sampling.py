@@ -0,0 +1,294 @@
+import os
+import math
+import random
+import numpy as np
+import pandas as pd
+from statistics import NormalDist
+
+from instrumentation import span
+from stats_engine import PERCENTILES, is_numeric
+
+# -------------------------------------------------
+# Amostragem estratificada em streaming e estimativas com intervalo de confiança
+# -------------------------------------------------
+# Para um veredito rápido sobre exports grandes, em vez de avaliar tudo sobre
+# todas as linhas, guardamos uma amostra enquanto os chunks passam:
+#   - cada estrato (valor da coluna `by`, ex.: Churn; ausente vira um estrato
+#     próprio) tem um reservatório de até `size` linhas (Algoritmo R,
+#     vetorizado por chunk: as substituições de um chunk são sorteadas de uma
+#     vez e, para o mesmo slot, vale a última, como no algoritmo sequencial);
+#   - o total de linhas de cada estrato é contado exatamente.
+# Sobre registros (dicts do JSON bruto) a amostragem acontece antes de achatar
+# cada registro em colunas, que é a maior parte do custo da ingestão:
+# sample_records() usa o Algoritmo L (sorteia quantos registros pular até a
+# próxima substituição), então um registro fora da amostra custa só a
+# leitura da chave do estrato.
+# As estimativas ponderam cada estrato pelo seu peso no arquivo (N_h / N):
+#   proporções -> estimador estratificado, variância com correção de
+#                 população finita e intervalo de Wilson sobre o tamanho
+#                 efetivo da amostra (exato se todos os estratos couberam
+#                 inteiros no reservatório)
+#   quantis    -> quantil ponderado da amostra; intervalo de Woodruff (o
+#                 intervalo da proporção F(q) levado de volta para valores)
+# profile() junta taxa de ausentes, frequências por categoria e quantis de
+# todas as colunas num dict pronto para JSON.
+#
+#   TELECOMX_SAMPLE_SEED=0   semente dos sorteios (amostras reprodutíveis)
+
+SAMPLE_SEED = int(os.environ.get("TELECOMX_SAMPLE_SEED", "0"))
+CONFIDENCE = 0.95
+
+# Colunas auxiliares do DataFrame da amostra
+ROW_COL = "_linha"
+STRATUM_COL = "_estrato"
+
+# Colunas com mais valores distintos que isso na amostra (IDs, textos livres)
+# ficam só com a taxa de ausentes
+MAX_CATEGORIES = 50
+
+
+# -------------------------------------------------
+# 1) Reservatórios por estrato
+# -------------------------------------------------
+
+def new_sample(size, by=None, seed=SAMPLE_SEED):
+    if size <= 0:
+        raise ValueError("o tamanho da amostra deve ser positivo")
+    return {"size": size, "by": by, "rows": 0, "strata": {}, "rng": np.random.default_rng(seed)}
+
+
+def _stratum_key(value):
+    if pd.api.types.is_scalar(value) and pd.isna(value):
+        return None
+    if isinstance(value, np.generic):
+        value = value.item()
+    return value.strip().lower() if isinstance(value, str) else value
+
+
+def _reservoir_update(sample, stratum, chunk, rows):
+    k = sample["size"]
+    positions = stratum["seen"] + np.arange(len(rows))
+    slots = positions.copy()
+    late = positions >= k
+    slots[late] = sample["rng"].integers(0, positions[late] + 1)
+    keep = slots < k
+    slots, rows = slots[keep], rows[keep]
+    stratum["seen"] += len(positions)
+    if not len(rows):
+        return
+    # Mesmo slot sorteado mais de uma vez no chunk: fica a última linha
+    _, last = np.unique(slots[::-1], return_index=True)
+    pick = len(slots) - 1 - last
+    new = chunk.iloc[rows[pick]].set_axis(slots[pick])
+    frame = stratum["frame"]
+    stratum["frame"] = new if frame is None else pd.concat([frame.drop(index=slots[pick], errors="ignore"), new])
+
+
+def update_sample(sample, chunk):
+    """Passa um chunk pelos reservatórios; as linhas guardadas levam o número da linha no arquivo."""
+    with span("sample_update", rows=len(chunk)):
+        chunk = chunk.assign(**{ROW_COL: np.arange(sample["rows"], sample["rows"] + len(chunk))})
+        by = sample["by"]
+        if by is not None and by in chunk.columns:
+            codes, uniques = pd.factorize(chunk[by], use_na_sentinel=False)
+            keys = [_stratum_key(v) for v in uniques]
+        else:
+            codes, keys = np.zeros(len(chunk), dtype=np.intp), [None]
+        # Valores com a mesma chave (ex.: "Yes" e " yes") caem no mesmo estrato
+        for key in dict.fromkeys(keys):
+            rows = np.flatnonzero(np.isin(codes, [c for c, k in enumerate(keys) if k == key]))
+            stratum = sample["strata"].setdefault(key, {"seen": 0, "frame": None})
+            _reservoir_update(sample, stratum, chunk, rows)
+        sample["rows"] += len(chunk)
+    return sample
+
+
+def _next_skip(stratum, k, rng):
+    stratum["w"] *= math.exp(math.log(rng.random()) / k)
+    stratum["next"] += int(math.log(rng.random()) / math.log1p(-stratum["w"])) + 1
+
+
+def sample_records(records, size, key, by=None, to_frame=pd.DataFrame, seed=SAMPLE_SEED):
+    """Amostra estratificada de um iterável de registros; `key(registro)` dá o valor do estrato.
+
+    Só os registros guardados passam por `to_frame` (lista de registros ->
+    DataFrame), no fim; o resultado tem o mesmo formato de new_sample().
+    """
+    if size <= 0:
+        raise ValueError("o tamanho da amostra deve ser positivo")
+    rng = random.Random(seed)
+    strata = {}
+    row = -1
+    with span("sample_records"):
+        for row, record in enumerate(records):
+            stratum_key = _stratum_key(key(record))
+            stratum = strata.get(stratum_key)
+            if stratum is None:
+                stratum = strata[stratum_key] = {"seen": 0, "rows": [], "items": [], "w": 1.0, "next": size - 1}
+            i = stratum["seen"]
+            stratum["seen"] = i + 1
+            if i < size:
+                stratum["rows"].append(row)
+                stratum["items"].append(record)
+                if i == size - 1:
+                    _next_skip(stratum, size, rng)
+            elif i == stratum["next"]:
+                slot = rng.randrange(size)
+                stratum["rows"][slot] = row
+                stratum["items"][slot] = record
+                _next_skip(stratum, size, rng)
+
+    sample = new_sample(size, by, seed)
+    sample["rows"] = row + 1
+    for stratum_key, stratum in strata.items():
+        frame = to_frame(stratum["items"]).assign(**{ROW_COL: stratum["rows"]})
+        sample["strata"][stratum_key] = {"seen": stratum["seen"], "frame": frame}
+    return sample
+
+
+def sample_chunks(chunks, size, by=None, seed=SAMPLE_SEED):
+    """Amostra estratificada de um iterável de chunks."""
+    sample = new_sample(size, by, seed)
+    for chunk in chunks:
+        update_sample(sample, chunk)
+    return sample
+
+
+def sample_frame(sample):
+    """(linhas amostradas com ROW_COL e STRATUM_COL, [(chave, linhas no arquivo, linhas na amostra)])."""
+    frames, strata = [], []
+    for code, (key, stratum) in enumerate(sample["strata"].items()):
+        frame = stratum["frame"]
+        n = 0 if frame is None else len(frame)
+        strata.append((key, stratum["seen"], n))
+        if n:
+            frames.append(frame.assign(**{STRATUM_COL: code}))
+    if not frames:
+        return pd.DataFrame(columns=[ROW_COL, STRATUM_COL]), strata
+    frame = pd.concat(frames).sort_values(ROW_COL, kind="stable").reset_index(drop=True)
+    return frame, strata
+
+
+# -------------------------------------------------
+# 2) Estimadores
+# -------------------------------------------------
+
+def _z(confidence):
+    return NormalDist().inv_cdf(0.5 + confidence / 2)
+
+
+def _wilson(p, n, z):
+    if n <= 0:
+        return 0.0, 1.0
+    denom = 1 + z * z / n
+    center = (p + z * z / (2 * n)) / denom
+    half = z * np.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denom
+    return max(0.0, center - half), min(1.0, center + half)
+
+
+def estimate_proportion(strata, hits, confidence=CONFIDENCE):
+    """Proporção estimada de linhas com a propriedade, a partir de `hits[h]` acertos no estrato h."""
+    N = np.array([s[1] for s in strata], dtype="float64")
+    n = np.array([s[2] for s in strata], dtype="float64")
+    hits = np.asarray(hits, dtype="float64")
+    total = N.sum()
+    if not total or not n.sum():
+        return {"estimate": float("nan"), "low": 0.0, "high": 1.0, "se": float("nan")}
+    sampled = n > 0
+    W = N[sampled] / total
+    p_h = hits[sampled] / n[sampled]
+    p = float(W @ p_h)
+    fpc = 1 - n[sampled] / N[sampled]
+    var = float(np.sum(W ** 2 * fpc * p_h * (1 - p_h) / np.maximum(n[sampled] - 1, 1)))
+    if not fpc.any():
+        # Todos os estratos couberam inteiros na amostra: valor exato
+        return {"estimate": p, "low": p, "high": p, "se": 0.0}
+    n_eff = p * (1 - p) / var if var > 0 else n.sum()
+    low, high = _wilson(p, n_eff, _z(confidence))
+    return {"estimate": p, "low": min(low, p), "high": max(high, p), "se": float(np.sqrt(var))}
+
+
+def _weighted_quantile(values, cum, p):
+    idx = np.searchsorted(cum, p * cum[-1], side="left")
+    return float(values[min(idx, len(values) - 1)])
+
+
+def estimate_quantiles(values, codes, strata, percentiles=PERCENTILES, confidence=CONFIDENCE):
+    """Quantis ponderados de `values` (estrato de cada valor em `codes`) com intervalo de Woodruff."""
+    values = np.asarray(values, dtype="float64")
+    valid = ~np.isnan(values)
+    values, codes = values[valid], np.asarray(codes)[valid]
+    if not len(values):
+        return {p: {"estimate": float("nan"), "low": float("nan"), "high": float("nan")} for p in percentiles}
+    weights = np.array([s[1] / s[2] if s[2] else 0.0 for s in strata])[codes]
+    order = np.argsort(values, kind="stable")
+    values, codes, cum = values[order], codes[order], np.cumsum(weights[order])
+    z = _z(confidence)
+    result = {}
+    for p in percentiles:
+        q = _weighted_quantile(values, cum, p)
+        # Erro padrão de F(q) estimado com o indicador (valor <= q) entre os não ausentes
+        hits = np.bincount(codes[values <= q], minlength=len(strata))
+        counts = np.bincount(codes, minlength=len(strata))
+        valid_strata = [(k, N * c / n if n else 0, c) for (k, N, n), c in zip(strata, counts)]
+        se = estimate_proportion(valid_strata, hits, confidence)["se"]
+        result[p] = {
+            "estimate": q,
+            "low": _weighted_quantile(values, cum, max(0.0, p - z * se)),
+            "high": _weighted_quantile(values, cum, min(1.0, p + z * se)),
+        }
+    return result
+
+
+# -------------------------------------------------
+# 3) Perfil da amostra
+# -------------------------------------------------
+
+def _missing(series):
+    missing = series.isna().to_numpy()
+    if series.dtype == object:
+        missing |= series.map(lambda v: isinstance(v, str) and not v.strip()).to_numpy(dtype=bool)
+    return missing
+
+
+def profile(sample, numeric=(), percentiles=PERCENTILES, confidence=CONFIDENCE):
+    """Taxa de ausentes, frequências e quantis (com intervalos) de todas as colunas da amostra.
+
+    Colunas de ponto flutuante (e as de `numeric`, convertidas de texto) têm
+    quantis; as demais, frequências por valor se tiverem até MAX_CATEGORIES
+    valores distintos na amostra.
+    """
+    frame, strata = sample_frame(sample)
+    codes = frame[STRATUM_COL].to_numpy(dtype=np.intp)
+    result = {
+        "rows": sample["rows"],
+        "sampled": len(frame),
+        "by": sample["by"],
+        "confidence": confidence,
+        "strata": [{"value": key, "rows": N, "sampled": n} for key, N, n in strata],
+        "columns": {},
+    }
+    with span("sample_profile", rows=len(frame)):
+        for col in frame.columns:
+            if col in (ROW_COL, STRATUM_COL):
+                continue
+            series = frame[col]
+            missing = _missing(series)
+            entry = {"missing": estimate_proportion(strata, np.bincount(codes[missing], minlength=len(strata)),
+                                                    confidence)}
+            if col in numeric or (is_numeric(series.dtype) and series.dtype.kind == "f"):
+                numbers = pd.to_numeric(series, errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+                entry["quantiles"] = estimate_quantiles(numbers, codes, strata, percentiles, confidence)
+            else:
+                values, uniques = pd.factorize(series.where(~missing), use_na_sentinel=True)
+                if len(uniques) <= MAX_CATEGORIES:
+                    entry["frequencies"] = {
+                        (v.item() if isinstance(v, np.generic) else v):
+                            estimate_proportion(strata, np.bincount(codes[values == i], minlength=len(strata)),
+                                                confidence)
+                        for i, v in enumerate(uniques)
+                    }
+                else:
+                    entry["distinct_in_sample"] = len(uniques)
+            result["columns"][col] = entry
+    return result
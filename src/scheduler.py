@@ -0,0 +1,384 @@
+import io
+import os
+import sys
+import json
+import runpy
+import hashlib
+import argparse
+import importlib
+import traceback
+import contextlib
+import multiprocessing
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from instrumentation import configure, span
+from storage import table_path
+
+# -------------------------------------------------
+# Scheduler das etapas (DAG) com "pular se atualizado"
+# -------------------------------------------------
+# Cada etapa declara o que lê e o que grava (artefatos: arquivos de data/,
+# tabelas de data/clean/ como "table:<nome>") e os módulos de src/ cujo código
+# influencia o resultado. As dependências saem dos artefatos: B depende de A
+# se B lê algo que A grava. A execução segue o grafo:
+#   - uma etapa só roda depois das etapas de que depende;
+#   - no momento de rodar, a chave da etapa é o SHA-256 do alvo, do código e
+#     do conteúdo atual de cada entrada. Se a chave é a da última execução
+#     bem-sucedida e as saídas gravadas continuam iguais, a etapa é pulada.
+#     Se uma etapa roda de novo mas grava as mesmas saídas, as seguintes
+#     continuam puladas;
+#   - etapas independentes (ex.: análise descritiva e as duas metades da
+#     exploratória) rodam ao mesmo tempo, cada uma num processo, com a saída
+#     de console impressa inteira quando a etapa termina.
+#
+# O estado (chaves e hashes das saídas) fica em data/cache/stages.json. Os
+# hashes de arquivo são reaproveitados enquanto (tamanho, mtime) não mudam,
+# como em raw_cache.py.
+#
+#   TELECOMX_STAGE_WORKERS=2   processos (padrão: núcleos disponíveis)
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+STATE_PATH = os.path.join(ROOT_DIR, "data", "cache", "stages.json")
+MAX_WORKERS = int(os.environ.get("TELECOMX_STAGE_WORKERS", "0")) or os.cpu_count() or 1
+
+RAW = "data/raw/TelecomX_Data.json"
+STORAGE_CODE = ["storage.py", "columnar.py", "schema.py"]
+CHART_CODE = ["exploratory_analysis.py", "chart_summaries.py", "report_renderer.py", "chart_cache.py",
+              "stats_engine.py", "stats_accumulators.py", "exact_stats.py", "correlation.py"]
+
+# alvo: "script.py" (roda como `python src/script.py`) ou "módulo:função"
+STAGES = {
+    "subset": {
+        "target": "load_telecom_data.py",
+        "inputs": [RAW],
+        "outputs": ["table:telecom_churn_subset"],
+        "code": ["load_telecom_data.py", "ingestion.py", "raw_cache.py"] + STORAGE_CODE,
+    },
+    "quality": {
+        "target": "data_quality_checks.py",
+        "inputs": [RAW],
+        "outputs": ["reports/data_quality.json"],
+        "code": ["data_quality_checks.py", "quality_rules.py", "sampling.py", "ingestion.py", "normalization.py",
+                 "schema.py"],
+    },
+    "cleaned": {
+        "target": "data_cleaning.py",
+        "inputs": [RAW],
+        "outputs": ["table:telecom_churn_cleaned", "data/clean/fill_values.json"],
+        "code": ["data_cleaning.py", "imputation.py", "normalization.py", "ingestion.py",
+                 "raw_cache.py"] + STORAGE_CODE,
+    },
+    "features": {
+        "target": "feature_engineering.py",
+        "inputs": ["table:telecom_churn_cleaned"],
+        "outputs": ["table:telecom_churn_features"],
+        "code": ["feature_engineering.py"] + STORAGE_CODE,
+    },
+    "transformed": {
+        "target": "data_transformation.py",
+        "inputs": ["table:telecom_churn_features"],
+        "outputs": ["table:telecom_churn_transformed", "data/matrix/telecom_churn_transformed",
+                    "data/matrix/telecom_churn_transformed.index"],
+        "code": ["data_transformation.py", "normalization.py", "feature_matrix.py",
+                 "customer_index.py"] + STORAGE_CODE,
+    },
+    "descriptive": {
+        "target": "descriptive_analysis.py",
+        "inputs": ["table:telecom_churn_transformed", "data/matrix/telecom_churn_transformed"],
+        "outputs": [],
+        "code": ["descriptive_analysis.py", "stats_engine.py", "stats_accumulators.py", "exact_stats.py",
+                 "sampling.py", "feature_matrix.py"] + STORAGE_CODE,
+    },
+    "charts_cleaned": {
+        "target": "exploratory_analysis:report_cleaned",
+        "inputs": ["table:telecom_churn_cleaned"],
+        "outputs": [],
+        "code": CHART_CODE + STORAGE_CODE,
+    },
+    "charts_transformed": {
+        "target": "exploratory_analysis:report_transformed",
+        "inputs": ["table:telecom_churn_transformed", "data/matrix/telecom_churn_transformed"],
+        "outputs": [],
+        "code": CHART_CODE + ["feature_matrix.py"] + STORAGE_CODE,
+    },
+}
+
+
+# -------------------------------------------------
+# 1) Grafo
+# -------------------------------------------------
+
+def dependencies(stages=STAGES):
+    """{etapa: etapas que gravam alguma das suas entradas}."""
+    producers = {}
+    for name, stage in stages.items():
+        for artifact in stage["outputs"]:
+            producers[artifact] = name
+    return {name: sorted({producers[a] for a in stage["inputs"] if a in producers} - {name})
+            for name, stage in stages.items()}
+
+
+def topological_order(stages=STAGES):
+    """Etapas em ordem de execução (na ordem de declaração entre as independentes)."""
+    deps = dependencies(stages)
+    order, visiting = [], set()
+
+    def visit(name):
+        if name in order:
+            return
+        if name in visiting:
+            raise ValueError(f"Ciclo no grafo de etapas passando por '{name}'")
+        visiting.add(name)
+        for dep in deps[name]:
+            visit(dep)
+        visiting.discard(name)
+        order.append(name)
+
+    for name in stages:
+        visit(name)
+    return order
+
+
+def with_upstream(targets, stages=STAGES):
+    """`targets` e todas as etapas de que elas dependem, direta ou indiretamente."""
+    deps = dependencies(stages)
+    selected, stack = set(), list(targets)
+    while stack:
+        name = stack.pop()
+        if name not in stages:
+            raise ValueError(f"Etapa desconhecida: '{name}' (disponíveis: {', '.join(stages)})")
+        if name not in selected:
+            selected.add(name)
+            stack.extend(deps[name])
+    return [name for name in topological_order(stages) if name in selected]
+
+
+# -------------------------------------------------
+# 2) Impressões digitais
+# -------------------------------------------------
+
+def _file_sha256(path, memo):
+    stat = os.stat(path)
+    entry = memo.get(path)
+    if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+        return entry["sha256"]
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(8 * 1024 * 1024), b""):
+            digest.update(block)
+    memo[path] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": digest.hexdigest()}
+    return memo[path]["sha256"]
+
+
+def resolve(artifact):
+    """Caminho de um artefato ("table:<nome>" -> formato atual da tabela, ver storage.py)."""
+    if artifact.startswith("table:"):
+        return table_path(artifact[len("table:"):])
+    return os.path.join(ROOT_DIR, artifact)
+
+
+def fingerprint(path, memo):
+    """Hash do conteúdo de um arquivo ou diretório (nomes relativos + conteúdo); None se não existe."""
+    path = os.path.abspath(path)
+    if os.path.isfile(path):
+        return _file_sha256(path, memo)
+    if not os.path.isdir(path):
+        return None
+    digest = hashlib.sha256()
+    for base, dirs, files in os.walk(path):
+        dirs.sort()
+        for name in sorted(files):
+            full = os.path.join(base, name)
+            digest.update(os.path.relpath(full, path).encode())
+            digest.update(_file_sha256(full, memo).encode())
+    return digest.hexdigest()
+
+
+def stage_key(name, memo, stages=STAGES):
+    """Chave da etapa: alvo, código e conteúdo atual das entradas."""
+    stage = stages[name]
+    src_dir = os.path.dirname(os.path.abspath(__file__))
+    described = {
+        "target": stage["target"],
+        "code": {f: fingerprint(os.path.join(src_dir, f), memo) for f in sorted(set(stage["code"]))},
+        "inputs": {},
+    }
+    for artifact in stage["inputs"]:
+        try:
+            described["inputs"][artifact] = fingerprint(resolve(artifact), memo)
+        except FileNotFoundError:
+            described["inputs"][artifact] = None
+    return hashlib.sha256(json.dumps(described, sort_keys=True).encode()).hexdigest()
+
+
+def _outputs_unchanged(recorded, memo):
+    for path, digest in recorded.items():
+        try:
+            if fingerprint(path, memo) != digest:
+                return False
+        except FileNotFoundError:
+            return False
+    return True
+
+
+def load_state(path=STATE_PATH):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {"files": {}, "stages": {}}
+
+
+def save_state(state, path=STATE_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+# -------------------------------------------------
+# 3) Execução de uma etapa (no processo atual ou num worker)
+# -------------------------------------------------
+
+def run_stage(name, capture=False, stages=STAGES):
+    """Roda o alvo da etapa; devolve (ok, saída de console capturada, caminhos devolvidos pelo alvo)."""
+    target = stages[name]["target"]
+    out = io.StringIO() if capture else None
+    redirect = (contextlib.redirect_stdout(out), contextlib.redirect_stderr(out)) if capture else ()
+    with contextlib.ExitStack() as stack:
+        for context in redirect:
+            stack.enter_context(context)
+        try:
+            with span(f"stage/{name}"):
+                if ":" in target:
+                    module, function = target.split(":")
+                    returned = getattr(importlib.import_module(module), function)()
+                else:
+                    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), target)
+                    argv, sys.argv = sys.argv, [script]
+                    try:
+                        runpy.run_path(script, run_name="__main__")
+                    finally:
+                        sys.argv = argv
+                    returned = None
+        except SystemExit as exc:
+            if exc.code not in (None, 0):
+                return False, out.getvalue() if capture else "", []
+            returned = None
+        except Exception:
+            traceback.print_exc(file=out or sys.stderr)
+            return False, out.getvalue() if capture else "", []
+    paths = [str(p) for p in returned] if isinstance(returned, (list, tuple)) else []
+    return True, out.getvalue() if capture else "", paths
+
+
+def _worker_init(src_dir):
+    if src_dir not in sys.path:
+        sys.path.insert(0, src_dir)
+
+
+# -------------------------------------------------
+# 4) API pública
+# -------------------------------------------------
+
+def run(targets=None, force=False, max_workers=None, stages=STAGES, state_path=STATE_PATH):
+    """Roda `targets` (padrão: todas as etapas) e o que estiver desatualizado antes delas.
+
+    Devolve {etapa: "executada" | "atualizada" | "falhou" | "não executada"}.
+    """
+    order = with_upstream(targets or list(stages), stages)
+    deps = dependencies(stages)
+    workers = max(1, min(max_workers or MAX_WORKERS, len(order)))
+    state = load_state(state_path)
+    memo = state.setdefault("files", {})
+    status, keys = {}, {}
+
+    def start(name):
+        """Decide se a etapa roda; devolve False se ela foi pulada."""
+        keys[name] = stage_key(name, memo, stages)
+        previous = state["stages"].get(name)
+        if (not force and previous and previous["key"] == keys[name]
+                and _outputs_unchanged(previous["outputs"], memo)):
+            status[name] = "atualizada"
+            print(f"[scheduler] '{name}': atualizada, pulando")
+            return False
+        print(f"[scheduler] '{name}': executando")
+        return True
+
+    def finish(name, ok, output, returned):
+        if output:
+            print(f"----- saída de '{name}' -----\n{output.rstrip()}\n----- fim de '{name}' -----")
+        if not ok:
+            status[name] = "falhou"
+            state["stages"].pop(name, None)
+            print(f"[scheduler] '{name}': falhou")
+            return
+        outputs = {}
+        for path in [resolve(a) for a in stages[name]["outputs"]] + returned:
+            outputs[os.path.abspath(path)] = fingerprint(path, memo)
+        state["stages"][name] = {"key": keys[name], "outputs": outputs}
+        status[name] = "executada"
+        save_state(state, state_path)
+
+    def ready(name):
+        return all(status.get(dep) in ("executada", "atualizada") for dep in deps[name] if dep in order)
+
+    def blocked(name):
+        return any(status.get(dep) in ("falhou", "não executada") for dep in deps[name] if dep in order)
+
+    with span("scheduler", stages=len(order), workers=workers):
+        if workers == 1:
+            for name in order:
+                if blocked(name):
+                    status[name] = "não executada"
+                elif start(name):
+                    finish(name, *run_stage(name, stages=stages))
+        else:
+            # spawn: workers limpos, como em report_renderer.py e sharding.py
+            ctx = multiprocessing.get_context("spawn")
+            src_dir = os.path.dirname(os.path.abspath(__file__))
+            with ProcessPoolExecutor(max_workers=workers, mp_context=ctx,
+                                     initializer=_worker_init, initargs=(src_dir,)) as pool:
+                running = {}
+                while len(status) < len(order):
+                    for name in order:
+                        if name in status or name in running.values():
+                            continue
+                        if blocked(name):
+                            status[name] = "não executada"
+                        elif ready(name) and start(name):
+                            running[pool.submit(run_stage, name, True, stages)] = name
+                    if not running:
+                        continue
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        finish(running.pop(future), *future.result())
+
+    # Esquece hashes de arquivos que não existem mais (tabelas e diretórios regravados)
+    state["files"] = {path: entry for path, entry in memo.items() if os.path.exists(path)}
+    save_state(state, state_path)
+    return {name: status[name] for name in order}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Roda as etapas do Telecom X pelo grafo de dependências, pulando as que estão atualizadas."
+    )
+    parser.add_argument("stages", nargs="*", metavar="ETAPA",
+                        help=f"etapas a atualizar (com as anteriores): {', '.join(STAGES)} (padrão: todas)")
+    parser.add_argument("--force", action="store_true", help="roda as etapas mesmo se estiverem atualizadas")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="etapas em paralelo (padrão: TELECOMX_STAGE_WORKERS ou núcleos disponíveis)")
+    parser.add_argument("--trace", metavar="ARQUIVO", help="grava tempo/memória por etapa em JSON lines")
+    args = parser.parse_args(argv)
+
+    configure(trace_path=args.trace)
+    status = run(args.stages, force=args.force, max_workers=args.workers or None)
+    print("[scheduler] Resumo:", ", ".join(f"{name}={s}" for name, s in status.items()))
+    if any(s in ("falhou", "não executada") for s in status.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
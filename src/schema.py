@@ -0,0 +1,166 @@
+import pandas as pd
+
+# -------------------------------------------------
+# Esquema de tipos compactos por etapa
+# -------------------------------------------------
+# Declara o dtype de cada coluna das tabelas limpa, com features e
+# transformada. Em vez de strings Python (object) e int64, usamos:
+#   - Categorical com categorias fixas para as enumerações;
+#   - int8/int16 para flags e contagens pequenas;
+#   - float64 para valores monetários: em float32 as médias, somas e quantis
+#     impressos pela análise mudariam (ex.: 35.425001 em vez de 35.425);
+#   - tipos anuláveis (boolean/Int8) para o alvo e flags que podem ter ausentes.
+# apply_schema() converte um DataFrame para o esquema (recusando valores fora
+# das categorias) e validate_schema() confere, entre etapas, se as colunas e
+# os tipos continuam os declarados.
+
+
+class SchemaError(ValueError):
+    pass
+
+
+def _categories(*values):
+    return pd.CategoricalDtype(list(values))
+
+
+# Categorias possíveis depois da limpeza ('unknown' vem do preenchimento de ausentes)
+YES_NO = _categories("no", "yes", "unknown")
+YES_NO_INTERNET = _categories("no", "yes", "no internet service", "unknown")
+
+CLEANED_SCHEMA = {
+    "customerID":                "object",
+    "Churn":                     "boolean",
+    "customer.gender":           _categories("female", "male", "unknown"),
+    "customer.SeniorCitizen":    "int8",
+    "customer.Partner":          YES_NO,
+    "customer.Dependents":       YES_NO,
+    "customer.tenure":           "int16",
+    "phone.PhoneService":        YES_NO,
+    "phone.MultipleLines":       _categories("no", "yes", "no phone service", "unknown"),
+    "internet.InternetService":  _categories("dsl", "fiber optic", "no", "unknown"),
+    "internet.OnlineSecurity":   YES_NO_INTERNET,
+    "internet.OnlineBackup":     YES_NO_INTERNET,
+    "internet.DeviceProtection": YES_NO_INTERNET,
+    "internet.TechSupport":      YES_NO_INTERNET,
+    "internet.StreamingTV":      YES_NO_INTERNET,
+    "internet.StreamingMovies":  YES_NO_INTERNET,
+    "account.Contract":          _categories("month-to-month", "one year", "two year", "unknown"),
+    "account.PaperlessBilling":  YES_NO,
+    "account.PaymentMethod":     _categories(
+        "electronic check", "mailed check",
+        "bank transfer (automatic)", "credit card (automatic)", "unknown"
+    ),
+    "account.Charges.Monthly":   "float64",
+    # Chega como texto do JSON bruto ("593.3", " "); a limpeza converte e preenche
+    "account.Charges.Total":     "float64",
+}
+
+FEATURES_SCHEMA = dict(CLEANED_SCHEMA, **{"Contas_Diarias": "float64"})
+
+TRANSFORMED_SCHEMA = {
+    "ID_Cliente":        "object",
+    "Evasao":            "Int8",   # alvo: ausente quando o Churn bruto vem em branco
+    # Flags cujo mapeamento cobre 'unknown' nunca ficam ausentes: int8.
+    # As demais ('no phone service', 'unknown' sem mapeamento) são Int8 anulável.
+    "Genero":            "Int8",
+    "Idoso":             "int8",
+    "Tem_Conjuge":       "int8",
+    "Tem_Dependentes":   "int8",
+    "Meses_Contratado":  "int16",
+    "Tem_Telefone":      "int8",
+    "Linhas_Adicionais": "Int8",
+    "Tipo_Internet":     _categories("DSL", "Fibra Optica", "Sem Internet"),
+    "Seg_Online":        "Int8",
+    "Backup_Online":     "Int8",
+    "Prot_Dispositivos": "Int8",
+    "Suporte_Tecnico":   "Int8",
+    "Streaming_TV":      "Int8",
+    "Streaming_Filmes":  "Int8",
+    "Tipo_Contrato":     _categories("Mensal", "Anual", "Bienal"),
+    "Fatura_Digital":    "int8",
+    "Metodo_Pagamento":  _categories(
+        "Cheque Eletronico", "Cheque Enviado",
+        "Transferencia Bancaria (Automatica)", "Cartao de Credito (Automatico)"
+    ),
+    "Cobranca_Mensal":   "float64",
+    "Cobranca_Total":    "float64",
+    "Cobranca_Diaria":   "float64",
+}
+
+SCHEMAS = {
+    "cleaned":     CLEANED_SCHEMA,
+    "features":    FEATURES_SCHEMA,
+    "transformed": TRANSFORMED_SCHEMA,
+}
+
+# Tabela gravada em data/clean/ -> esquema aplicado na leitura
+TABLE_SCHEMAS = {
+    "telecom_churn_cleaned":     "cleaned",
+    "telecom_churn_features":    "features",
+    "telecom_churn_transformed": "transformed",
+}
+
+
+def _dtype_matches(series, dtype):
+    if isinstance(dtype, pd.CategoricalDtype):
+        # Categóricas não ordenadas com as mesmas categorias em outra ordem são
+        # "iguais" para o pandas; aqui a ordem declarada também precisa bater
+        return series.dtype == dtype and list(series.cat.categories) == list(dtype.categories)
+    return str(series.dtype) == str(dtype)
+
+
+def _is_plain_integer(dtype):
+    # int8/int16 do numpy; os anuláveis (Int8) já recusam valores não inteiros no astype()
+    dtype = pd.api.types.pandas_dtype(dtype)
+    return not isinstance(dtype, pd.api.extensions.ExtensionDtype) and pd.api.types.is_integer_dtype(dtype)
+
+
+def _cast(series, dtype):
+    if str(dtype) == "boolean" and series.dtype == object:
+        # Strings vazias (Churn em branco) e outros valores não booleanos viram <NA>
+        is_bool = series.map(lambda v: isinstance(v, bool))
+        return series.where(is_bool, None).astype("boolean")
+    if isinstance(dtype, pd.CategoricalDtype) and isinstance(series.dtype, pd.CategoricalDtype):
+        # astype() não reordena categorias que o pandas já considera iguais
+        out = series.cat.set_categories(dtype.categories, ordered=dtype.ordered)
+    elif _is_plain_integer(dtype) and pd.api.types.is_float_dtype(series.dtype):
+        # astype() truncaria (29.5 -> 29, ex.: mediana de preenchimento): arredonda antes
+        # (metades para o par, como Series.round)
+        out = series.round().astype(dtype)
+    else:
+        out = series.astype(dtype)
+    if isinstance(dtype, pd.CategoricalDtype):
+        outside = out.isna() & series.notna()
+        if outside.any():
+            unexpected = sorted(map(str, series[outside].unique()))[:5]
+            raise SchemaError(f"valores fora das categorias {list(dtype.categories)}: {unexpected}")
+    return out
+
+
+def apply_schema(df, stage):
+    """Converte as colunas de `df` presentes no esquema de `stage` para os dtypes declarados."""
+    schema = SCHEMAS[stage]
+    out = df.copy(deep=False)
+    for col, dtype in schema.items():
+        if col in out.columns and not _dtype_matches(out[col], dtype):
+            try:
+                out[col] = _cast(out[col], dtype)
+            except (TypeError, ValueError, SchemaError) as exc:
+                raise SchemaError(f"Não foi possível converter '{col}' para {dtype}: {exc}") from exc
+    return out
+
+
+def validate_schema(df, stage, strict=True):
+    """Confere colunas e dtypes; levanta SchemaError (ou devolve a lista de problemas)."""
+    schema = SCHEMAS[stage]
+    problems = []
+    for col, dtype in schema.items():
+        if col not in df.columns:
+            problems.append(f"coluna ausente: '{col}'")
+            continue
+        series = df[col]
+        if not _dtype_matches(series, dtype):
+            problems.append(f"'{col}': dtype {series.dtype}, esperado {dtype}")
+    if problems and strict:
+        raise SchemaError(f"Esquema '{stage}' violado:\n  - " + "\n  - ".join(problems))
+    return problems
@@ -0,0 +1,390 @@
+import io
+import os
+import sys
+import json
+import time
+import queue
+import argparse
+import threading
+import contextlib
+import http.client
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+import data_cleaning
+import data_transformation
+import feature_engineering
+from imputation import coerce_numeric, load_fill_values
+from ingestion import RAW_PATH, RAW_SCHEMA, iter_raw_records, records_to_frame
+from normalization import CLEANING_MAPS
+from schema import CLEANED_SCHEMA
+
+# -------------------------------------------------
+# Serviço local de transformação on-line (micro-batches)
+# -------------------------------------------------
+# Recebe registros brutos do TelecomX (o mesmo JSON aninhado do export) por
+# HTTP e devolve as linhas transformadas, como sairiam de data_cleaning.py →
+# feature_engineering.py → data_transformation.py.
+#
+# Parâmetros carregados uma vez, na subida:
+#   - fill values (medianas) gravados em data/clean/fill_values.json;
+#   - uma tabela por coluna categórica: valor limpo (strip + lower) → valor
+#     final transformado. As tabelas NÃO são reescritas aqui: saem de uma
+#     execução das funções reais do pipeline sobre um DataFrame de sondagem
+#     com todas as categorias aceitas por schema.py, então qualquer mudança em
+#     normalization.py/schema.py chega ao serviço no próximo start.
+# Na subida, o caminho compilado é conferido contra o pipeline real sobre a
+# sondagem (inclusive ausentes e totais em branco); se divergir, o serviço
+# não sobe.
+#
+# Micro-batching: as requisições entram numa fila; uma thread única junta o
+# que estiver na fila (até MAX_BATCH registros, esperando no máximo
+# BATCH_WAIT_MS pelo próximo) e transforma o lote inteiro de uma vez, coluna
+# por coluna (numéricas em numpy, categóricas por dicionário). Com pouca
+# carga, cada requisição vira um lote sozinha e não espera ninguém.
+#
+# Diferenças em relação ao processamento do export: cada registro é
+# independente (sem remoção de duplicados entre requisições) e registros que
+# a limpeza descartaria (valores negativos) ou que o esquema recusaria
+# (categorias desconhecidas) voltam como erro, só para aquele registro.
+#
+#   POST /transform   corpo: um registro ou uma lista de registros
+#   GET  /health      fill values em uso e contadores de lotes
+#
+#   TELECOMX_SCORING_MAX_BATCH=256      registros por lote
+#   TELECOMX_SCORING_BATCH_WAIT_MS=0    espera máxima para completar um lote
+
+MAX_BATCH = int(os.environ.get("TELECOMX_SCORING_MAX_BATCH", "256"))
+BATCH_WAIT_MS = float(os.environ.get("TELECOMX_SCORING_BATCH_WAIT_MS", "0"))
+
+ID_COL = "customerID"
+NUMERIC_COLS = ["customer.SeniorCitizen", "customer.tenure", "account.Charges.Monthly", "account.Charges.Total"]
+DAILY_COL = "Contas_Diarias"
+
+
+# -------------------------------------------------
+# 1) Compilação das tabelas (uma vez, na subida)
+# -------------------------------------------------
+
+def _domain(col):
+    """Valores limpos que a coluna pode ter depois da limpeza."""
+    dtype = CLEANED_SCHEMA[col]
+    if isinstance(dtype, pd.CategoricalDtype):
+        return list(dtype.categories)
+    # Churn: mapeado por CLEANING_MAPS; qualquer outro valor (ex.: "") vira ausente
+    return list(CLEANING_MAPS[col]) + [""]
+
+
+def _probe_records():
+    """Registros brutos cobrindo todas as categorias, ausentes e totais em branco."""
+    size = max(len(_domain(col)) for col in data_cleaning.CATEGORICAL_COLS) + 2
+    frame = {ID_COL: [f"probe-{i}" for i in range(size)]}
+    for col in data_cleaning.CATEGORICAL_COLS:
+        values = _domain(col)
+        # Maiúsculas/espaços exercitam o strip + lower; o último registro traz ausentes
+        frame[col] = [f" {v.upper()} " if i % 2 else v for i, v in enumerate(np.resize(values, size - 1))] + [None]
+    frame["customer.SeniorCitizen"] = [i % 2 for i in range(size - 1)] + [None]
+    frame["customer.tenure"] = [i * 7 for i in range(size - 1)] + [None]
+    frame["account.Charges.Monthly"] = [20.05 + i * 13.37 for i in range(size - 1)] + [None]
+    frame["account.Charges.Total"] = [str(round(100.1 + i * 77.7, 2)) for i in range(size - 2)] + [" ", None]
+
+    records = []
+    for i in range(size):
+        record = {}
+        for path, col, _ in RAW_SCHEMA:
+            node = record
+            for key in path[:-1]:
+                node = node.setdefault(key, {})
+            if frame[col][i] is not None:
+                node[path[-1]] = frame[col][i]
+        records.append(record)
+    return records
+
+
+def run_pipeline_batch(records, fill_values):
+    """Referência: as funções do pipeline, sem o relatório de console."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        df_clean = data_cleaning.clean_data(records_to_frame(records), fill_values=fill_values)
+        df_features = feature_engineering.add_features(df_clean)
+        return data_transformation.transform_data(df_features)
+
+
+def compile_model(fill_values):
+    """Fill values, tabelas categóricas e dtypes de saída, derivados do pipeline real."""
+    probe = records_to_frame(_probe_records())
+    reference = run_pipeline_batch(_probe_records(), fill_values)
+    rename = data_transformation.MAPEAMENTO_COLUNAS
+
+    tables = {}
+    for col in data_cleaning.CATEGORICAL_COLS:
+        out = reference[rename[col]]
+        table = {}
+        for raw, value in zip(probe[col], out):
+            key = "unknown" if raw is None else raw.strip().lower()
+            table.setdefault(key, None if pd.isna(value) else _to_json(value))
+        tables[col] = table
+
+    model = {
+        "fill_values": dict(fill_values),
+        "tables": tables,
+        "columns": list(reference.columns),
+        "dtypes": {col: str(dtype) for col, dtype in reference.dtypes.items()},
+    }
+    _self_check(model, fill_values)
+    return model
+
+
+def frame_rows(df):
+    """Linhas de `df` no formato de resposta do serviço (ausentes como None)."""
+    columns = {col: [None if pd.isna(v) else _to_json(v) for v in df[col].to_numpy()] for col in df.columns}
+    return [dict(zip(columns, values)) for values in zip(*columns.values())]
+
+
+def _self_check(model, fill_values):
+    records = _probe_records()
+    expected = frame_rows(run_pipeline_batch(records, fill_values))
+    rows, errors = transform_records(records, model)
+    if any(errors) or rows != expected:
+        raise RuntimeError("As tabelas compiladas divergem do pipeline sobre a sondagem; confira normalization.py")
+
+
+# -------------------------------------------------
+# 2) Transformação de um lote
+# -------------------------------------------------
+
+def _to_json(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def transform_records(records, model):
+    """Transforma um lote; devolve (linhas, erros), com None na posição do que não se aplica."""
+    n = len(records)
+    df = records_to_frame(records)
+    errors = [None] * n
+    rename = data_transformation.MAPEAMENTO_COLUNAS
+    out = {}
+
+    ids = df[ID_COL].to_numpy(dtype=object)
+    out[rename[ID_COL]] = ["unknown" if v is None or v != v else v for v in ids]
+
+    # Categóricas: strip + lower e a tabela compilada
+    for col, table in model["tables"].items():
+        mapped = []
+        for i, value in enumerate(df[col].to_numpy(dtype=object)):
+            if value is None or value != value:
+                key = "unknown"
+            elif isinstance(value, str):
+                key = value.strip().lower()
+            else:
+                key = None
+            mapped.append(table.get(key))
+            # Churn fora do mapa vira ausente (cast para boolean); as demais são recusadas pelo esquema
+            if key not in table and col not in CLEANING_MAPS:
+                errors[i] = errors[i] or f"'{col}': valor fora das categorias: {value!r}"
+        out[rename[col]] = mapped
+
+    # Numéricas: texto → número, ausentes → fill value, negativos descartados (como na limpeza)
+    df, _ = coerce_numeric(df)
+    numeric = {}
+    for col in NUMERIC_COLS:
+        values = df[col].to_numpy(dtype="float64", na_value=np.nan).copy()
+        missing = np.isnan(values)
+        if missing.any():
+            fill = model["fill_values"].get(col)
+            if fill is None:
+                for i in np.flatnonzero(missing):
+                    errors[i] = errors[i] or f"'{col}': ausente e sem fill value"
+            else:
+                values[missing] = fill
+        for i in np.flatnonzero(values < 0):
+            errors[i] = errors[i] or f"'{col}': valor negativo ({values[i]})"
+        numeric[col] = values
+
+    # Mesmos casts/arredondamentos de schema.py e feature_engineering.py
+    monthly = numeric["account.Charges.Monthly"]
+    numeric[DAILY_COL] = np.round(monthly / 30, 2)
+    for col, values in numeric.items():
+        dtype = np.dtype(model["dtypes"][rename[col]])
+        if dtype.kind in "iu":
+            values = np.rint(np.nan_to_num(values))
+        out[rename[col]] = [_to_json(v) for v in values.astype(dtype)]
+
+    columns = model["columns"]
+    rows = [None if errors[i] else {col: out[col][i] for col in columns} for i in range(n)]
+    return rows, errors
+
+
+# -------------------------------------------------
+# 3) Micro-batching
+# -------------------------------------------------
+
+def start_batcher(model, max_batch=MAX_BATCH, batch_wait_ms=BATCH_WAIT_MS):
+    """Sobe a thread de lotes; devolve o estado do serviço (fila e contadores)."""
+    service = {"model": model, "queue": queue.Queue(), "batches": 0, "records": 0}
+
+    def loop():
+        while True:
+            first = service["queue"].get()
+            batch, size = [first], len(first["records"])
+            deadline = time.monotonic() + batch_wait_ms / 1000
+            while size < max_batch:
+                try:
+                    timeout = deadline - time.monotonic()
+                    item = service["queue"].get(timeout=timeout) if timeout > 0 else service["queue"].get_nowait()
+                except queue.Empty:
+                    break
+                batch.append(item)
+                size += len(item["records"])
+
+            records = [record for item in batch for record in item["records"]]
+            try:
+                rows, errors = transform_records(records, model)
+            except Exception as exc:  # noqa: BLE001 - o erro volta para cada requisição do lote
+                rows, errors = [None] * len(records), [f"falha no lote: {exc}"] * len(records)
+            offset = 0
+            for item in batch:
+                k = len(item["records"])
+                item["result"] = (rows[offset:offset + k], errors[offset:offset + k])
+                offset += k
+                item["done"].set()
+            service["batches"] += 1
+            service["records"] += len(records)
+
+    threading.Thread(target=loop, name="scoring-batcher", daemon=True).start()
+    return service
+
+
+def submit(service, records):
+    """Enfileira `records` e espera o lote em que eles entraram; devolve (linhas, erros)."""
+    item = {"records": records, "done": threading.Event()}
+    service["queue"].put(item)
+    item["done"].wait()
+    return item["result"]
+
+
+# -------------------------------------------------
+# 4) HTTP
+# -------------------------------------------------
+
+def make_server(service, host="127.0.0.1", port=8765):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive: uma conexão por cliente
+        # Cabeçalho e corpo saem em writes separados: sem Nagle, a resposta não
+        # fica esperando o ACK atrasado do cliente (~40 ms)
+        disable_nagle_algorithm = True
+
+        def _reply(self, status, payload):
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path != "/health":
+                return self._reply(404, {"error": "rota desconhecida"})
+            self._reply(200, {"status": "ok", "fill_values": service["model"]["fill_values"],
+                              "batches": service["batches"], "records": service["records"]})
+
+        def do_POST(self):
+            if self.path != "/transform":
+                return self._reply(404, {"error": "rota desconhecida"})
+            try:
+                payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            except (ValueError, json.JSONDecodeError) as exc:
+                return self._reply(400, {"error": f"JSON inválido: {exc}"})
+            records = payload if isinstance(payload, list) else [payload]
+            if not records or not all(isinstance(r, dict) for r in records):
+                return self._reply(400, {"error": "esperado um registro (objeto) ou uma lista de registros"})
+
+            rows, errors = submit(service, records)
+            self._reply(200, {
+                "rows": [row for row in rows if row is not None],
+                "errors": [{"index": i, "customerID": records[i].get(ID_COL), "error": error}
+                           for i, error in enumerate(errors) if error],
+            })
+
+        def log_message(self, format, *args):
+            pass
+
+    return ThreadingHTTPServer((host, port), Handler)
+
+
+# -------------------------------------------------
+# 5) Linha de comando: servir ou medir
+# -------------------------------------------------
+
+def load_model():
+    fill_values = load_fill_values()
+    if fill_values is None:
+        sys.exit("Fill values não encontrados: rode antes `python src/data_cleaning.py` (ou o pipeline).")
+    return compile_model(fill_values)
+
+
+def bench(server_address, records, requests, concurrency):
+    """Dispara `requests` requisições de um registro em `concurrency` conexões; imprime vazão e latências."""
+    latencies, lock = [], threading.Lock()
+    bodies = [json.dumps(records[i % len(records)]).encode() for i in range(requests)]
+
+    def client(start):
+        conn = http.client.HTTPConnection(*server_address)
+        local = []
+        for body in bodies[start::concurrency]:
+            t0 = time.perf_counter()
+            conn.request("POST", "/transform", body, {"Content-Type": "application/json"})
+            conn.getresponse().read()
+            local.append(time.perf_counter() - t0)
+        conn.close()
+        with lock:
+            latencies.extend(local)
+
+    t0 = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - t0
+    ms = np.array(latencies) * 1000
+    print(f"[scoring] {requests} requisições em {elapsed:.2f}s ({requests / elapsed:.0f} req/s), "
+          f"p50={np.percentile(ms, 50):.2f}ms p99={np.percentile(ms, 99):.2f}ms")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serviço HTTP que transforma registros brutos em micro-batches.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--bench", type=int, metavar="N",
+                        help="sobe o serviço numa porta livre, dispara N requisições do export e sai")
+    parser.add_argument("--concurrency", type=int, default=16, help="conexões simultâneas no --bench")
+    args = parser.parse_args(argv)
+
+    model = load_model()
+    service = start_batcher(model)
+    server = make_server(service, args.host, 0 if args.bench else args.port)
+
+    if args.bench:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        records = [record for _, record in zip(range(1000), iter_raw_records(RAW_PATH))]
+        print("[scoring] Cliente e servidor no mesmo processo (disputam o GIL): números conservadores")
+        bench(server.server_address, records, args.bench, args.concurrency)
+        print(f"[scoring] {service['records']} registros em {service['batches']} lotes")
+        server.shutdown()
+        return
+
+    print(f"[scoring] Servindo em http://{args.host}:{server.server_address[1]} (POST /transform, GET /health)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+import io
+import os
+import sys
+import contextlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import data_cleaning
+import data_transformation
+import feature_engineering
+from imputation import coerce_numeric
+from incremental import ID_COL, raw_subset
+from instrumentation import span
+from stats_accumulators import merge_frequencies, new_frequencies, update_frequencies
+
+# -------------------------------------------------
+# Limpeza → features → transformação em paralelo, por shards de customerID
+# -------------------------------------------------
+# Quase tudo em data_cleaning/feature_engineering/data_transformation é
+# linha a linha (strip/lower, mapas de valores, yes/no → 1/0,
+# Contas_Diarias). As duas exceções são globais:
+#   - remoção de duplicados por customerID: as linhas são distribuídas por
+#     hash do customerID, então todas as ocorrências de um ID caem no mesmo
+#     shard (na ordem do export) e o keep="first" de cada shard é o mesmo da
+#     execução sequencial;
+#   - medianas de preenchimento: redução em duas fases. Cada worker devolve
+#     as contagens de valores das colunas numéricas do seu shard (o texto de
+#     account.Charges.Total já convertido, ver imputation.py); o processo
+#     principal soma as contagens (exatas, ver
+#     stats_accumulators.merge_frequencies) e calcula a mediana exata do
+#     export inteiro, que volta para os workers como `fill_values`.
+# No fim, os shards são concatenados e reordenados pela posição no export:
+# o resultado é o mesmo DataFrame da execução em um único processo.
+#
+#   TELECOMX_SHARD_WORKERS=4   processos (padrão: núcleos disponíveis)
+
+MAX_WORKERS = int(os.environ.get("TELECOMX_SHARD_WORKERS", "0")) or os.cpu_count() or 1
+
+STAGES = ("cleaned", "features", "transformed")
+
+
+# -------------------------------------------------
+# 1) Particionamento por hash do customerID
+# -------------------------------------------------
+
+def shard_codes(ids, n_shards):
+    """Shard de cada linha: hash estável do customerID módulo `n_shards`."""
+    return (pd.util.hash_pandas_object(ids, index=False).to_numpy() % np.uint64(n_shards)).astype(np.intp)
+
+
+def split_shards(df, n_shards, id_col=ID_COL):
+    """Divide `df` em até `n_shards` partes não vazias, mantendo a ordem das linhas em cada uma."""
+    if n_shards <= 1 or id_col not in df.columns:
+        return [df]
+    codes = shard_codes(df[id_col], n_shards)
+    order = np.argsort(codes, kind="stable")
+    bounds = np.searchsorted(codes[order], np.arange(n_shards + 1))
+    return [df.take(order[lo:hi]) for lo, hi in zip(bounds[:-1], bounds[1:]) if hi > lo]
+
+
+# -------------------------------------------------
+# 2) Tarefas dos workers
+# -------------------------------------------------
+
+def shard_value_counts(df):
+    """Fase 1: contagens de valores (sem ausentes) de cada coluna do shard."""
+    return {col: update_frequencies(new_frequencies(), df[col]) for col in df.columns}
+
+
+def process_shard(df_rows, fill_values, keep=STAGES):
+    """Fase 2: roda as etapas linha a linha sobre o shard (sem imprimir o relatório de cada etapa)."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        df_clean = data_cleaning.clean_data(df_rows, fill_values=fill_values)
+        df_features = feature_engineering.add_features(df_clean)
+        df_transformed = data_transformation.transform_data(df_features)
+    frames = {"cleaned": df_clean, "features": df_features, "transformed": df_transformed}
+    return {stage: frames[stage] for stage in keep}
+
+
+def _worker_init(src_dir):
+    if src_dir not in sys.path:
+        sys.path.insert(0, src_dir)
+
+
+# -------------------------------------------------
+# 3) Redução das medianas
+# -------------------------------------------------
+
+def median_from_counts(freq):
+    """Mediana exata a partir das contagens de valores (mesma regra de Series.median)."""
+    if not freq["counts"]:
+        return np.nan
+    values = np.fromiter(freq["counts"].keys(), dtype="float64", count=len(freq["counts"]))
+    counts = np.fromiter(freq["counts"].values(), dtype=np.int64, count=len(freq["counts"]))
+    order = np.argsort(values)
+    values, cumulative = values[order], np.cumsum(counts[order])
+    n = cumulative[-1]
+    # Valores nas posições (n - 1) // 2 e n // 2 da lista ordenada
+    lower = values[np.searchsorted(cumulative, (n - 1) // 2, side="right")]
+    upper = values[np.searchsorted(cumulative, n // 2, side="right")]
+    return float(lower) if lower == upper else float((lower + upper) / 2)
+
+
+def _fit_fill_values(shards, submit):
+    # Todas as numéricas: os fill values também são gravados para o incremental/scoring
+    numeric_cols = list(shards[0].select_dtypes(include="number").columns)
+    if not numeric_cols:
+        return {}
+    merged = {col: new_frequencies() for col in numeric_cols}
+    for counts in submit(shard_value_counts, [(shard[numeric_cols],) for shard in shards]):
+        for col, freq in counts.items():
+            merged[col] = merge_frequencies(merged[col], freq)
+    return {col: median_from_counts(freq) for col, freq in merged.items()}
+
+
+# -------------------------------------------------
+# 4) API pública
+# -------------------------------------------------
+
+def run_sharded(df_raw, max_workers=None, keep=STAGES):
+    """Limpeza, features e transformação de `df_raw` em shards paralelos.
+
+    Devolve ({etapa: DataFrame}, fill values usados no preenchimento).
+    """
+    workers = max(1, max_workers or MAX_WORKERS)
+    df_subset, _ = coerce_numeric(raw_subset(df_raw))
+
+    with span("sharded", workers=workers, rows=len(df_subset)):
+        with span("split"):
+            shards = split_shards(df_subset, workers)
+        print(f"[sharding] {len(df_subset)} linhas em {len(shards)} shards por hash de '{ID_COL}'")
+
+        if len(shards) == 1:
+            def submit(func, args_list):
+                return [func(*args) for args in args_list]
+            return _run_phases(shards, submit, keep)
+
+        # spawn: workers limpos, como em report_renderer.py
+        ctx = multiprocessing.get_context("spawn")
+        src_dir = os.path.dirname(os.path.abspath(__file__))
+        with ProcessPoolExecutor(max_workers=min(workers, len(shards)), mp_context=ctx,
+                                 initializer=_worker_init, initargs=(src_dir,)) as pool:
+            def submit(func, args_list):
+                futures = [pool.submit(func, *args) for args in args_list]
+                return [future.result() for future in futures]
+            return _run_phases(shards, submit, keep)
+
+
+def _run_phases(shards, submit, keep):
+    with span("fill_values"):
+        fill_values = _fit_fill_values(shards, submit)
+    for col, value in fill_values.items():
+        print(f"[sharding] Mediana global de '{col}' (redução das contagens dos shards): {value:.2f}")
+
+    with span("process_shards", shards=len(shards)):
+        results = submit(process_shard, [(shard, fill_values, keep) for shard in shards])
+
+    with span("combine"):
+        # Índice = posição da linha no export: ordenar devolve a ordem da execução sequencial
+        frames = {stage: pd.concat([result[stage] for result in results]).sort_index(kind="stable")
+                  for stage in keep}
+    for stage, df in frames.items():
+        print(f"[sharding] '{stage}': {df.shape[0]} linhas × {df.shape[1]} colunas")
+    return frames, fill_values
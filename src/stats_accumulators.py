@@ -0,0 +1,551 @@
+import os
+import math
+import numpy as np
+import pandas as pd
+
+from instrumentation import span
+from stats_engine import PERCENTILES, is_masked, is_numeric, sorted_quantiles
+
+# -------------------------------------------------
+# Acumuladores combináveis para estatísticas por chunks
+# -------------------------------------------------
+# compute_statistics (stats_engine.py) precisa da tabela inteira em memória.
+# Aqui as mesmas estatísticas são acumuladas chunk a chunk, e dois
+# acumuladores (de chunks ou de processos diferentes) podem ser combinados:
+#   momentos    -> count, média e soma dos quadrados dos desvios (Welford /
+#                  fórmula paralela de Chan), mínimo e máximo: exatos
+#   frequências -> contagem por valor (ordem de primeira aparição): exatas
+#   sketch KLL  -> quantis/mediana com memória limitada (~3·k valores por
+#                  coluna) e erro de posto conhecido
+#   co-momentos -> correlação de Pearson por par de colunas (seção 8); um
+#                  trecho já somado também pode ser retirado (deltas)
+# As seções 6 e 7 (somas na ordem do numpy, seleção exata de postos) servem
+# às estatísticas exatas em chunks de exact_stats.py.
+# finalize() devolve um dict no formato de compute_statistics, então
+# describe()/value_counts()/column_stats() funcionam sem mudanças. Cada
+# coluna numérica ganha também "quantile_error" (erro de posto normalizado,
+# com CONFIDENCE de confiança) e "quantile_bounds" (faixa de valores que
+# contém o quantil exato).
+#
+#   TELECOMX_SKETCH_K=400    tamanho do sketch (maior = quantis mais precisos)
+
+SKETCH_K = int(os.environ.get("TELECOMX_SKETCH_K", "400"))
+CONFIDENCE = 0.99
+
+# Capacidade dos níveis do KLL: o nível mais alto guarda k itens e cada nível
+# abaixo dele, 2/3 do de cima (no mínimo 2)
+_CAPACITY_DECAY = 2 / 3
+_SKETCH_SEED = 0
+
+# remove_comoments: soma de quadrados restante abaixo desta fração da soma
+# antes da remoção é resíduo de arredondamento (cancelamento), tratada como zero
+_REMOVE_RTOL = 1e-12
+
+
+# -------------------------------------------------
+# 1) Momentos (count, média, variância, mínimo, máximo)
+# -------------------------------------------------
+
+def new_moments():
+    return {"count": 0, "mean": 0.0, "m2": 0.0, "min": np.nan, "max": np.nan}
+
+
+def merge_moments(a, b):
+    """Combina dois acumuladores de momentos (fórmula paralela de Chan)."""
+    if not b["count"]:
+        return dict(a)
+    if not a["count"]:
+        return dict(b)
+    count = a["count"] + b["count"]
+    delta = b["mean"] - a["mean"]
+    return {
+        "count": count,
+        "mean": a["mean"] + delta * b["count"] / count,
+        "m2": a["m2"] + b["m2"] + delta * delta * a["count"] * b["count"] / count,
+        "min": min(a["min"], b["min"]),
+        "max": max(a["max"], b["max"]),
+    }
+
+
+def update_moments(acc, values):
+    """Acrescenta os valores (float64, sem NaN) de um chunk."""
+    if values.size:
+        mean = values.mean()
+        chunk = {"count": int(values.size), "mean": float(mean), "m2": float(((values - mean) ** 2).sum()),
+                 "min": float(values.min()), "max": float(values.max())}
+        acc.update(merge_moments(acc, chunk))
+    return acc
+
+
+# -------------------------------------------------
+# 2) Frequências exatas
+# -------------------------------------------------
+
+def new_frequencies():
+    return {"counts": {}, "missing": 0}
+
+
+def merge_frequencies(a, b):
+    counts = dict(a["counts"])
+    for value, count in b["counts"].items():
+        counts[value] = counts.get(value, 0) + count
+    return {"counts": counts, "missing": a["missing"] + b["missing"]}
+
+
+def update_frequencies(acc, series):
+    """Conta os valores de um chunk (uma fatoração + bincount por chunk)."""
+    codes, uniques = pd.factorize(series)
+    counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+    for value, count in zip(uniques.tolist(), counts.tolist()):
+        acc["counts"][value] = acc["counts"].get(value, 0) + count
+    acc["missing"] += int((codes < 0).sum())
+    return acc
+
+
+# -------------------------------------------------
+# 3) Sketch de quantis (KLL)
+# -------------------------------------------------
+# Os valores entram no nível 0 com peso 1. Quando um nível passa da sua
+# capacidade, ele é ordenado e metade dos itens (os de posição par ou ímpar,
+# sorteado) sobe para o nível seguinte com o dobro do peso. Cada compactação
+# no nível h desloca o posto de qualquer consulta em 0 ou ±2^h, com média
+# zero; guardando a soma de 4^h das compactações feitas, a desigualdade de
+# Hoeffding dá o erro máximo de posto com a confiança pedida. Enquanto nada
+# foi compactado o sketch é exato e os quantis saem iguais aos do pandas.
+
+def new_sketch(k=SKETCH_K, seed=_SKETCH_SEED):
+    return {"k": k, "n": 0, "levels": [np.empty(0)], "error_sq": 0.0,
+            "rng": np.random.default_rng(seed)}
+
+
+def _capacity(k, height, level):
+    return max(2, math.ceil(k * _CAPACITY_DECAY ** (height - 1 - level)))
+
+
+def _compress(sketch):
+    levels = sketch["levels"]
+    h = 0
+    while h < len(levels):
+        if levels[h].size > _capacity(sketch["k"], len(levels), h):
+            if h + 1 == len(levels):
+                levels.append(np.empty(0))
+            items = np.sort(levels[h])
+            # Com número ímpar de itens, o maior fica no nível atual
+            keep = items.size % 2
+            offset = int(sketch["rng"].integers(2))
+            levels[h + 1] = np.concatenate([levels[h + 1], items[offset:items.size - keep:2]])
+            levels[h] = items[items.size - keep:]
+            sketch["error_sq"] += 4.0 ** h
+        h += 1
+    return sketch
+
+
+def update_sketch(sketch, values):
+    """Acrescenta os valores (float64, sem NaN) de um chunk."""
+    if values.size:
+        sketch["levels"][0] = np.concatenate([sketch["levels"][0], values])
+        sketch["n"] += int(values.size)
+        _compress(sketch)
+    return sketch
+
+
+def merge_sketch(a, b):
+    """Sketch equivalente a ter visto os valores de `a` e de `b`."""
+    height = max(len(a["levels"]), len(b["levels"]))
+    empty = np.empty(0)
+    merged = {
+        "k": min(a["k"], b["k"]),
+        "n": a["n"] + b["n"],
+        "levels": [np.concatenate([a["levels"][h] if h < len(a["levels"]) else empty,
+                                   b["levels"][h] if h < len(b["levels"]) else empty])
+                   for h in range(height)],
+        "error_sq": a["error_sq"] + b["error_sq"],
+        "rng": a["rng"],
+    }
+    return _compress(merged)
+
+
+def sketch_rank_error(sketch, confidence=CONFIDENCE):
+    """Erro máximo de posto, como fração de n, com probabilidade `confidence` (0 se exato)."""
+    if not sketch["n"] or not sketch["error_sq"]:
+        return 0.0
+    bound = math.sqrt(2 * sketch["error_sq"] * math.log(2 / (1 - confidence)))
+    return min(1.0, bound / sketch["n"])
+
+
+def sketch_quantiles(sketch, percentiles):
+    """Quantis pedidos; exatos (interpolação do pandas) enquanto o sketch não compactou nada."""
+    percentiles = np.asarray(percentiles, dtype="float64")
+    if not sketch["n"]:
+        return [np.nan] * len(percentiles)
+    if not sketch["error_sq"]:
+        return sorted_quantiles(np.sort(sketch["levels"][0]), percentiles)
+    values = np.concatenate(sketch["levels"])
+    weights = np.concatenate([np.full(level.size, 2.0 ** h) for h, level in enumerate(sketch["levels"])])
+    order = np.argsort(values, kind="stable")
+    ranks = np.cumsum(weights[order])
+    # Primeiro item cujo posto acumulado alcança q·n
+    idx = np.searchsorted(ranks, percentiles * ranks[-1], side="left")
+    return values[order][np.minimum(idx, values.size - 1)].tolist()
+
+
+def sketch_quantile_bounds(sketch, percentiles, confidence=CONFIDENCE, lowest=-np.inf, highest=np.inf):
+    """Para cada quantil, a faixa [q(p - erro), q(p + erro)] que contém o valor exato.
+
+    Depois de compactar, o menor e o maior item guardados não são o mínimo e
+    o máximo dos dados: quando p - erro < 0 (ou p + erro > 1) a faixa vai até
+    `lowest` (ou `highest`), o mínimo/máximo exatos quando conhecidos.
+    """
+    eps = sketch_rank_error(sketch, confidence)
+    lows = sketch_quantiles(sketch, [max(0.0, p - eps) for p in percentiles])
+    highs = sketch_quantiles(sketch, [min(1.0, p + eps) for p in percentiles])
+    if eps:
+        lows = [lowest if p - eps <= 0 else low for p, low in zip(percentiles, lows)]
+        highs = [highest if p + eps >= 1 else high for p, high in zip(percentiles, highs)]
+    return dict(zip(percentiles, zip(lows, highs)))
+
+
+# -------------------------------------------------
+# 4) Acumulador de uma coluna e de uma tabela
+# -------------------------------------------------
+# Mesmas regras de compute_statistics: colunas numéricas têm momentos e
+# quantis; colunas inteiras e não numéricas, tabela de frequências.
+
+def new_column(dtype, k=SKETCH_K):
+    numeric = is_numeric(dtype)
+    return {
+        "kind": "numeric" if numeric else "categorical",
+        "dtype": dtype,
+        "moments": new_moments() if numeric else None,
+        "sketch": new_sketch(k) if numeric else None,
+        "freq": new_frequencies() if not numeric or not pd.api.types.is_float_dtype(dtype) else None,
+    }
+
+
+def update_column(acc, series):
+    if acc["kind"] == "numeric":
+        values = series.to_numpy(dtype="float64", na_value=np.nan)
+        values = values[~np.isnan(values)]
+        update_moments(acc["moments"], values)
+        update_sketch(acc["sketch"], values)
+    if acc["freq"] is not None:
+        update_frequencies(acc["freq"], series)
+    return acc
+
+
+def merge_column(a, b):
+    merged = dict(a)
+    if a["kind"] == "numeric":
+        merged["moments"] = merge_moments(a["moments"], b["moments"])
+        merged["sketch"] = merge_sketch(a["sketch"], b["sketch"])
+    if a["freq"] is not None:
+        merged["freq"] = merge_frequencies(a["freq"], b["freq"])
+    return merged
+
+
+def new_table(by=None, k=SKETCH_K):
+    """Acumulador vazio de uma tabela, no total e por nível de `by`."""
+    return {"rows": 0, "by": by, "k": k, "dtypes": {}, "overall": {}, "groups": {}, "group_rows": {}}
+
+
+def _update_columns(columns, chunk, dtypes, k):
+    for col in chunk.columns:
+        if col not in columns:
+            columns[col] = new_column(dtypes[col], k)
+        update_column(columns[col], chunk[col])
+
+
+def update_table(acc, chunk):
+    """Acrescenta um chunk (DataFrame) ao acumulador da tabela."""
+    for col in chunk.columns:
+        # O tipo da coluna é o do primeiro chunk em que ela aparece
+        acc["dtypes"].setdefault(col, chunk[col].dtype)
+    acc["rows"] += len(chunk)
+    _update_columns(acc["overall"], chunk, acc["dtypes"], acc["k"])
+
+    if acc["by"] is not None:
+        codes, levels = pd.factorize(chunk[acc["by"]])
+        order = np.argsort(codes, kind="stable")
+        bounds = np.searchsorted(codes[order], np.arange(-1, len(levels) + 1), side="left")
+        for i, level in enumerate(levels.tolist()):
+            part = chunk.take(order[bounds[i + 1]:bounds[i + 2]])
+            acc["group_rows"][level] = acc["group_rows"].get(level, 0) + len(part)
+            _update_columns(acc["groups"].setdefault(level, {}), part, acc["dtypes"], acc["k"])
+    return acc
+
+
+def _merge_column_maps(a, b):
+    merged = dict(a)
+    for col, column in b.items():
+        merged[col] = merge_column(merged[col], column) if col in merged else column
+    return merged
+
+
+def merge_tables(a, b):
+    """Combina os acumuladores de duas partes da mesma tabela (chunks ou processos)."""
+    if a["by"] != b["by"]:
+        raise ValueError(f"Acumuladores agrupados por colunas diferentes: {a['by']!r} e {b['by']!r}")
+    groups = dict(a["groups"])
+    for level, columns in b["groups"].items():
+        groups[level] = _merge_column_maps(groups[level], columns) if level in groups else columns
+    group_rows = dict(a["group_rows"])
+    for level, rows in b["group_rows"].items():
+        group_rows[level] = group_rows.get(level, 0) + rows
+    return {
+        "rows": a["rows"] + b["rows"],
+        "by": a["by"],
+        "k": min(a["k"], b["k"]),
+        "dtypes": {**b["dtypes"], **a["dtypes"]},
+        "overall": _merge_column_maps(a["overall"], b["overall"]),
+        "groups": groups,
+        "group_rows": group_rows,
+    }
+
+
+# -------------------------------------------------
+# 5) Resultado no formato de compute_statistics
+# -------------------------------------------------
+
+def _counts_series(freq, dtype, name):
+    if isinstance(dtype, pd.CategoricalDtype):
+        index = pd.CategoricalIndex(dtype.categories, dtype=dtype, name=name)
+        counts = [freq["counts"].get(value, 0) for value in dtype.categories]
+    else:
+        index = pd.Index(pd.array(list(freq["counts"]), dtype=dtype), name=name)
+        counts = list(freq["counts"].values())
+    return pd.Series(np.asarray(counts, dtype=np.int64), index=index, name="count")
+
+
+def _finalize_column(column, name, percentiles, confidence):
+    freq = column["freq"]
+    if column["kind"] == "numeric":
+        moments, sketch = column["moments"], column["sketch"]
+        count = moments["count"]
+        var = moments["m2"] / (count - 1) if count > 1 else np.nan
+        quantiles = sketch_quantiles(sketch, percentiles)
+        summary = {
+            "count": count,
+            "mean": moments["mean"] if count else np.nan,
+            "var": var,
+            "std": np.sqrt(var),
+            "min": moments["min"],
+            "max": moments["max"],
+            "median": sketch_quantiles(sketch, [0.5])[0],
+            "quantiles": dict(zip(percentiles, quantiles)),
+            "quantile_error": sketch_rank_error(sketch, confidence),
+            "quantile_bounds": sketch_quantile_bounds(sketch, percentiles, confidence,
+                                                      moments["min"], moments["max"]),
+        }
+        if freq is not None:
+            summary.update(counts=_counts_series(freq, column["dtype"], name), missing=freq["missing"])
+        return summary
+    return {"count": sum(freq["counts"].values()), "missing": freq["missing"],
+            "counts": _counts_series(freq, column["dtype"], name)}
+
+
+def finalize(acc, percentiles=PERCENTILES, confidence=CONFIDENCE):
+    """Estatísticas acumuladas no mesmo formato de stats_engine.compute_statistics."""
+    levels = sorted(acc["groups"])
+    columns = {}
+    for col, column in acc["overall"].items():
+        groups = []
+        for level in levels:
+            # Grupo sem linhas de algum tipo de coluna: acumulador vazio
+            part = acc["groups"][level].get(col) or new_column(acc["dtypes"][col], acc["k"])
+            groups.append(_finalize_column(part, col, percentiles, confidence))
+        columns[col] = {
+            "kind": column["kind"],
+            "dtype": acc["dtypes"][col],
+            "overall": _finalize_column(column, col, percentiles, confidence),
+            "groups": groups,
+        }
+    return {
+        "rows": acc["rows"],
+        "by": acc["by"],
+        "groups": levels,
+        "group_rows": [acc["group_rows"][level] for level in levels],
+        "percentiles": list(percentiles),
+        "columns": columns,
+        "sketch_k": acc["k"],
+        "confidence": confidence,
+    }
+
+
+def accumulate_chunks(chunks, by=None, k=SKETCH_K, percentiles=PERCENTILES):
+    """Estatísticas de uma tabela lida em chunks (ex.: storage.iter_table_chunks)."""
+    with span("accumulate_chunks", by=by) as info:
+        acc = new_table(by, k)
+        n_chunks = 0
+        for chunk in chunks:
+            update_table(acc, chunk)
+            n_chunks += 1
+        info["rows"], info["chunks"] = acc["rows"], n_chunks
+        return finalize(acc, percentiles)
+
+
+# -------------------------------------------------
+# 6) Somas na ordem do numpy (resultado idêntico ao da tabela inteira)
+# -------------------------------------------------
+# As reduções do numpy (sum/mean/var) percorrem o array em blocos de
+# np.getbufsize() valores: cada bloco é somado por soma em pares e o total é
+# acumulado bloco a bloco, no dtype pedido. Guardando o resto que não fecha
+# um bloco, a soma de uma sequência lida em chunks de qualquer tamanho sai
+# bit a bit igual à do array inteiro. Ao contrário dos momentos acima, estas
+# somas dependem da ordem das linhas e não são combináveis entre processos.
+
+def new_ordered_sum(dtype):
+    return {"dtype": np.dtype(dtype), "total": np.dtype(dtype).type(0), "pending": np.empty(0)}
+
+
+def update_ordered_sum(acc, values):
+    """Acrescenta os próximos valores da sequência (na ordem das linhas)."""
+    block = np.getbufsize()
+    values = np.concatenate([acc["pending"], values]) if acc["pending"].size else np.asarray(values)
+    full = values.size - values.size % block
+    total, dtype = acc["total"], acc["dtype"]
+    for start in range(0, full, block):
+        total = dtype.type(total + np.add.reduce(values[start:start + block], dtype=dtype))
+    acc["total"], acc["pending"] = total, values[full:]
+    return acc
+
+
+def ordered_sum(acc):
+    """Soma da sequência inteira, igual a np.sum(sequência, dtype=...)."""
+    if not acc["pending"].size:
+        return acc["total"]
+    return acc["dtype"].type(acc["total"] + np.add.reduce(acc["pending"], dtype=acc["dtype"]))
+
+
+# -------------------------------------------------
+# 7) Seleção exata de postos
+# -------------------------------------------------
+# Os quantis exatos (interpolação do pandas) precisam dos valores em postos
+# conhecidos da lista ordenada. Numa passada extra, cada janela [lo, hi]
+# (faixa de valores que o sketch KLL diz conter os postos pedidos) conta os
+# valores abaixo de lo e guarda a contagem de cada valor dentro dela; a
+# memória depende dos valores distintos na janela, não do número de linhas.
+
+def rank_window(sketch, n, ranks, widen=1, confidence=1 - 1e-9, lowest=-np.inf, highest=np.inf):
+    """Faixa de valores [lo, hi] que deve conter os postos (0 a n-1) pedidos; `widen` multiplica a margem.
+
+    Como em sketch_quantile_bounds, a faixa que passa das pontas vai até
+    `lowest`/`highest` (mínimo/máximo exatos), não até o menor/maior item do sketch.
+    """
+    eps = widen * (sketch_rank_error(sketch, confidence) + 1 / n)
+    start, stop = min(ranks) / n - eps, (max(ranks) + 1) / n + eps
+    lo = lowest if start <= 0 else sketch_quantiles(sketch, [start])[0]
+    hi = highest if stop >= 1 else sketch_quantiles(sketch, [stop])[0]
+    return lo, hi
+
+
+def new_selection(lo, hi):
+    return {"lo": lo, "hi": hi, "below": 0, "values": [], "counts": []}
+
+
+def _compact_selection(acc):
+    if len(acc["values"]) > 1:
+        values, inverse = np.unique(np.concatenate(acc["values"]), return_inverse=True)
+        counts = np.bincount(inverse, weights=np.concatenate(acc["counts"])).astype(np.int64)
+        acc["values"], acc["counts"] = [values], [counts]
+    return acc
+
+
+def update_selection(acc, values):
+    """Acrescenta os valores (sem ausentes, no dtype de origem) de um chunk."""
+    as_float = values.astype("float64", copy=False)
+    acc["below"] += int((as_float < acc["lo"]).sum())
+    inside, counts = np.unique(values[(as_float >= acc["lo"]) & (as_float <= acc["hi"])], return_counts=True)
+    if inside.size:
+        acc["values"].append(inside)
+        acc["counts"].append(counts)
+        if len(acc["values"]) > 64:
+            _compact_selection(acc)
+    return acc
+
+
+def selected_values(acc, ranks):
+    """Valor em cada posto pedido; None se algum posto ficou fora da janela."""
+    _compact_selection(acc)
+    if not acc["values"]:
+        return None
+    values, counts = acc["values"][0], acc["counts"][0]
+    ranks = np.asarray(ranks, dtype=np.int64) - acc["below"]
+    cumulative = np.cumsum(counts)
+    if ranks.min() < 0 or ranks.max() >= cumulative[-1]:
+        return None
+    return values[np.searchsorted(cumulative, ranks, side="right")]
+
+
+# -------------------------------------------------
+# 8) Co-momentos (correlação de Pearson entre pares de colunas)
+# -------------------------------------------------
+# Mesma regra de DataFrame.corr(): cada par usa só as linhas em que as duas
+# colunas têm valor. Para cada par (i, j) guardamos n, a média de i nessas
+# linhas, a soma dos quadrados dos desvios de i e a soma dos produtos dos
+# desvios; chunks são combinados pela fórmula de Chan (como os momentos da
+# seção 1). Os valores de cada chunk são centrados na média da coluna antes
+# dos produtos, para não perder precisão com valores grandes.
+
+def new_comoments(columns):
+    k = len(columns)
+    return {"columns": list(columns), "n": np.zeros((k, k)), "mean": np.zeros((k, k)),
+            "m2": np.zeros((k, k)), "cross": np.zeros((k, k))}
+
+
+def merge_comoments(a, b):
+    """Combina dois acumuladores de co-momentos das mesmas colunas (fórmula de Chan, par a par)."""
+    n = a["n"] + b["n"]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        weight = np.where(n > 0, a["n"] * b["n"] / n, 0.0)
+        delta = b["mean"] - a["mean"]
+        mean = np.where(n > 0, a["mean"] + delta * np.where(n > 0, b["n"] / n, 0.0), 0.0)
+    return {"columns": a["columns"], "n": n, "mean": mean,
+            "m2": a["m2"] + b["m2"] + delta * delta * weight,
+            "cross": a["cross"] + b["cross"] + delta * delta.T * weight}
+
+
+def remove_comoments(total, part):
+    """Inverso de merge_comoments: co-momentos de `total` sem as linhas de `part` (contidas em `total`)."""
+    n = total["n"] - part["n"]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rest = n > 0
+        mean = np.where(rest, total["mean"] - (part["mean"] - total["mean"]) * part["n"] / np.where(rest, n, 1), 0.0)
+        weight = np.where(rest, n * part["n"] / np.where(rest, total["n"], 1), 0.0)
+    delta = part["mean"] - mean
+    m2 = total["m2"] - part["m2"] - delta * delta * weight
+    # Com uma linha (ou nenhuma) no par não há desvio. O que sobra abaixo do
+    # erro de arredondamento da subtração (ou abaixo de zero) também é zero:
+    # senão uma coluna que ficou constante teria correlação em vez de NaN
+    m2 = np.where((n > 1) & (m2 > _REMOVE_RTOL * total["m2"]), m2, 0.0)
+    cross = np.where(n > 1, total["cross"] - part["cross"] - delta * delta.T * weight, 0.0)
+    return {"columns": total["columns"], "n": np.where(rest, n, 0.0), "mean": mean, "m2": m2, "cross": cross}
+
+
+def update_comoments(acc, values):
+    """Acrescenta um chunk (array linhas × colunas em float64, NaN = ausente)."""
+    if not len(values):
+        return acc
+    valid = ~np.isnan(values)
+    mask = valid.astype("float64")
+    # Centro de cada coluna no chunk (0 se a coluna não tem valores nele)
+    counts = mask.sum(axis=0)
+    shift = np.where(valid, values, 0.0).sum(axis=0) / np.maximum(counts, 1)
+    centered = np.where(valid, values - shift, 0.0)
+    n = mask.T @ mask
+    sums = centered.T @ mask                      # [i, j]: soma de i nas linhas válidas do par
+    squares = (centered * centered).T @ mask
+    products = centered.T @ centered
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.where(n > 0, sums / n, 0.0)
+    chunk = {"columns": acc["columns"], "n": n, "mean": mean + shift[:, None],
+             "m2": squares - mean * sums, "cross": products - mean * sums.T}
+    acc.update(merge_comoments(acc, chunk))
+    return acc
+
+
+def comoment_corr(acc):
+    """Matriz de correlação (DataFrame, como DataFrame.corr) a partir dos co-momentos."""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        divisor = np.sqrt(acc["m2"] * acc["m2"].T)
+        corr = np.where((acc["n"] > 0) & (divisor != 0), acc["cross"] / divisor, np.nan)
+    return pd.DataFrame(corr, index=acc["columns"], columns=acc["columns"])
@@ -0,0 +1,318 @@
+import numpy as np
+import pandas as pd
+
+from instrumentation import span
+
+# -------------------------------------------------
+# Estatísticas de todas as colunas, no total e por grupo, numa passada
+# -------------------------------------------------
+# compute_statistics(df, by="Evasao") percorre cada coluna uma única vez e
+# calcula, para o DataFrame inteiro e para cada grupo de `by` ao mesmo tempo:
+#   colunas numéricas -> count, média, variância/desvio, mínimo, máximo e quantis
+#                        (uma ordenação por coluna serve ao total e a todos os
+#                        grupos; somas por grupo com np.bincount)
+#   demais colunas    -> tabela de frequências (np.bincount dos códigos)
+#
+# O resultado é um dict que as etapas de impressão/relatório consomem no
+# lugar de chamar describe()/groupby()/value_counts() de novo:
+#   {"rows", "by", "groups" (níveis de `by`, ordenados), "group_rows",
+#    "percentiles", "columns": {col: {"kind", "dtype", "overall", "groups"}}}
+# "overall" e cada item de "groups" trazem as estatísticas daquele recorte.
+# describe() e value_counts() abaixo remontam as tabelas no mesmo formato
+# (e com os mesmos valores) de DataFrame.describe/Series.value_counts.
+
+PERCENTILES = [0.25, 0.5, 0.75]
+
+
+# -------------------------------------------------
+# 1) Tipos de coluna e grupos
+# -------------------------------------------------
+
+def is_numeric(dtype):
+    # Mesmo critério de describe(): números, exceto bool e categorias
+    return (pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)
+            and not isinstance(dtype, pd.CategoricalDtype))
+
+
+def is_masked(dtype):
+    return isinstance(dtype, pd.api.extensions.ExtensionDtype) and not isinstance(dtype, pd.CategoricalDtype)
+
+
+def _group_codes(df, by):
+    """Níveis de `by` (ordenados, sem ausentes, como no groupby) e o código de cada linha."""
+    if by is None:
+        return [], np.full(len(df), -1, dtype=np.intp)
+    codes, levels = pd.factorize(df[by], sort=True)
+    return list(levels), codes.astype(np.intp)
+
+
+def _group_index(gcodes, n_groups):
+    """Permutação que deixa cada grupo contíguo (na ordem original das linhas) e os limites de cada um.
+
+    Calculada uma vez e reaproveitada por todas as colunas.
+    """
+    in_group = np.flatnonzero(gcodes >= 0)
+    order = in_group[np.argsort(gcodes[in_group], kind="stable")]
+    bounds = np.concatenate([[0], np.cumsum(np.bincount(gcodes[in_group], minlength=n_groups))])
+    return order, bounds
+
+
+# -------------------------------------------------
+# 2) Colunas numéricas
+# -------------------------------------------------
+# Média e variância seguem as regras de precisão do pandas (nanops): colunas
+# float32 acumulam a média em float32 e devolvem a variância em float32;
+# inteiros e anuláveis (Int8) usam float64. Assim os números impressos são os
+# mesmos de describe()/mean()/std().
+
+def native_values(series):
+    """Valores no dtype de origem e máscara de válidos."""
+    if is_masked(series.dtype):
+        values = series.to_numpy(dtype=series.dtype.numpy_dtype, na_value=0)
+        return values, series.notna().to_numpy(), "masked"
+    values = series.to_numpy()
+    if values.dtype.kind == "f":
+        return values, ~np.isnan(values), "float"
+    return values, np.ones(len(values), dtype=bool), "int"
+
+
+def _mean_var(values, valid, how):
+    count = int(valid.sum())
+    if how == "masked":
+        kept = values[valid]
+        mean = np.mean(kept) if count else np.nan
+        return mean, (np.var(kept, ddof=1) if count > 1 else np.nan)
+    if how == "int":
+        values = values.astype("float64")
+    dtype = values.dtype
+    filled = np.where(valid, values, 0)
+    mean = filled.sum(dtype=dtype) / dtype.type(count) if count else np.nan
+    if count < 2:
+        return mean, np.nan
+    avg = filled.sum(dtype=np.float64) / dtype.type(count)
+    sqr = (avg - filled) ** 2
+    np.putmask(sqr, ~valid, 0)
+    var = (sqr.sum(dtype=np.float64) / dtype.type(count - 1)).astype(dtype)
+    return mean, var
+
+
+def quantile_positions(n, percentiles):
+    """Posições (anterior, seguinte) na lista ordenada de `n` valores e o peso da interpolação."""
+    virtual = np.asarray(percentiles, dtype="float64") * (n - 1)
+    prev = np.floor(virtual).astype(np.intp)
+    nxt = np.minimum(prev + 1, n - 1)
+    return prev, nxt, virtual - prev
+
+
+def interpolate(a, b, gamma):
+    """Interpolação linear entre os valores `a` e `b` (arrays) com a mesma fórmula de np.percentile."""
+    diff = b - a
+    result = a + diff * gamma
+    np.subtract(b, diff * (1 - gamma), out=result, where=gamma >= 0.5)
+    return result.tolist()
+
+
+def sorted_quantiles(sorted_values, percentiles):
+    """Interpolação linear sobre valores já ordenados (mesma fórmula de np.percentile)."""
+    n = sorted_values.size
+    if n == 0:
+        return [np.nan] * len(percentiles)
+    prev, nxt, gamma = quantile_positions(n, percentiles)
+    return interpolate(sorted_values[prev], sorted_values[nxt], gamma)
+
+
+def sorted_median(sorted_values, how):
+    """Mediana de valores já ordenados (mesma regra de Series.median para cada tipo de coluna)."""
+    n = sorted_values.size
+    if n == 0:
+        return np.nan
+    if how != "float":
+        sorted_values = sorted_values.astype("float64")
+    mid = n // 2
+    return sorted_values[mid] if n % 2 else np.mean(sorted_values[mid - 1:mid + 1])
+
+
+def _numeric_summary(values, valid, how, percentiles):
+    """Estatísticas de um recorte (linhas na ordem original)."""
+    mean, var = _mean_var(values, valid, how)
+    ordered = np.sort(values[valid])
+    count = ordered.size
+    return {
+        "count": count,
+        "mean": mean,
+        "var": var,
+        "std": np.sqrt(var),
+        "min": ordered[0] if count else np.nan,
+        "max": ordered[-1] if count else np.nan,
+        "median": sorted_median(ordered, how),
+        "quantiles": dict(zip(percentiles, sorted_quantiles(ordered, percentiles))),
+    }
+
+
+def _numeric_stats(series, group_index, percentiles):
+    values, valid, how = native_values(series)
+    overall = _numeric_summary(values, valid, how, percentiles)
+    order, bounds = group_index
+    grouped_values, grouped_valid = values[order], valid[order]
+    groups = [
+        _numeric_summary(grouped_values[lo:hi], grouped_valid[lo:hi], how, percentiles)
+        for lo, hi in zip(bounds[:-1], bounds[1:])
+    ]
+    return overall, groups
+
+
+# -------------------------------------------------
+# 3) Frequências
+# -------------------------------------------------
+
+def _frequency_stats(series, gcodes, n_groups):
+    """Contagens na ordem "natural" do value_counts (categorias ou ordem de aparição)."""
+    categorical = isinstance(series.dtype, pd.CategoricalDtype)
+    if categorical:
+        levels = pd.CategoricalIndex(series.cat.categories, dtype=series.dtype)
+        codes = series.cat.codes.to_numpy().astype(np.intp)
+    else:
+        codes, levels = pd.factorize(series)
+    levels = levels.rename(series.name)
+    k = len(levels)
+    valid = codes >= 0
+    overall = {
+        "count": int(valid.sum()),
+        "missing": int((~valid).sum()),
+        "counts": pd.Series(np.bincount(codes[valid], minlength=k), index=levels, name="count"),
+    }
+
+    groups = []
+    if n_groups:
+        in_group = gcodes >= 0
+        sel = valid & in_group
+        combined = gcodes[sel] * k + codes[sel]
+        counts = np.bincount(combined, minlength=n_groups * k).reshape(n_groups, k)
+        missing = np.bincount(gcodes[in_group & ~valid], minlength=n_groups)
+        if not categorical:
+            # Sem categorias, a ordem é a de primeira aparição dentro de cada grupo
+            uniq, first = np.unique(combined, return_index=True)
+        for i in range(n_groups):
+            if categorical:
+                part = pd.Series(counts[i], index=levels, name="count")
+            else:
+                mine = (uniq >= i * k) & (uniq < (i + 1) * k)
+                idx = (uniq[mine] - i * k)[np.argsort(first[mine], kind="stable")]
+                part = pd.Series(counts[i][idx], index=levels[idx], name="count")
+            groups.append({"count": int(counts[i].sum()), "missing": int(missing[i]), "counts": part})
+    return overall, groups
+
+
+# -------------------------------------------------
+# 4) API pública
+# -------------------------------------------------
+
+def compute_statistics(df, by=None, percentiles=PERCENTILES):
+    """Estatísticas de todas as colunas de `df`, no total e por grupo de `by`."""
+    with span("compute_statistics", rows=len(df), by=by):
+        levels, gcodes = _group_codes(df, by)
+        group_index = _group_index(gcodes, len(levels))
+        group_rows = np.diff(group_index[1]).tolist()
+        columns = {}
+        for col in df.columns:
+            series = df[col]
+            entry = {"kind": "numeric" if is_numeric(series.dtype) else "categorical", "dtype": series.dtype}
+            if entry["kind"] == "numeric":
+                overall, groups = _numeric_stats(series, group_index, percentiles)
+                if not pd.api.types.is_float_dtype(series.dtype):
+                    # Inteiros (flags 0/1, meses) também ganham tabela de frequências
+                    freq_overall, freq_groups = _frequency_stats(series, gcodes, len(levels))
+                    overall.update(counts=freq_overall["counts"], missing=freq_overall["missing"])
+                    for stats, freq in zip(groups, freq_groups):
+                        stats.update(counts=freq["counts"], missing=freq["missing"])
+            else:
+                overall, groups = _frequency_stats(series, gcodes, len(levels))
+            entry["overall"], entry["groups"] = overall, groups
+            columns[col] = entry
+    return {
+        "rows": len(df),
+        "by": by,
+        "groups": levels,
+        "group_rows": group_rows,
+        "percentiles": list(percentiles),
+        "columns": columns,
+    }
+
+
+def column_stats(stats, col, group=None):
+    """Estatísticas de uma coluna no total (group=None) ou num nível de `by`."""
+    entry = stats["columns"][col]
+    if group is None:
+        return entry["overall"]
+    return entry["groups"][stats["groups"].index(group)]
+
+
+def value_counts(stats, col, group=None, normalize=False, dropna=True):
+    """Equivalente a Series.value_counts() da coluna (no total ou num grupo)."""
+    entry = stats["columns"][col]
+    scope = column_stats(stats, col, group)
+    counts = scope["counts"]
+    masked = is_masked(entry["dtype"])
+    if not dropna:
+        if masked or scope["missing"]:
+            # Ausentes entram no fim, antes da ordenação (como no pandas)
+            na_value = entry["dtype"].na_value if masked else np.nan
+            index = counts.index.insert(len(counts), na_value)
+            counts = pd.Series(np.append(counts.to_numpy(), scope["missing"]), index=index, name="count")
+    if masked:
+        counts = counts.astype("Int64")
+    counts = counts.sort_values(ascending=False)
+    if normalize:
+        counts = (counts / counts.sum()).rename("proportion")
+    return counts
+
+
+def _format_percentile(p):
+    return f"{p * 100:g}%"
+
+
+def _describe_column(stats, col, group):
+    entry = stats["columns"][col]
+    scope = column_stats(stats, col, group)
+    if entry["kind"] == "numeric":
+        index = ["count", "mean", "std", "min"] + [_format_percentile(p) for p in stats["percentiles"]] + ["max"]
+        data = ([scope["count"], scope["mean"], scope["std"], scope["min"]]
+                + [scope["quantiles"][p] for p in stats["percentiles"]] + [scope["max"]])
+        dtype = "Float64" if is_masked(entry["dtype"]) else "float64"
+        return pd.Series(data, index=index, name=col, dtype=dtype)
+
+    counts = value_counts(stats, col, group)
+    unique = int((counts != 0).sum())
+    if unique > 0:
+        top, freq, dtype = counts.index[0], counts.iloc[0], None
+    else:
+        top, freq, dtype = np.nan, np.nan, "object"
+    return pd.Series([scope["count"], unique, top, freq], index=["count", "unique", "top", "freq"],
+                     name=col, dtype=dtype)
+
+
+def describe(stats, group=None, include=None):
+    """Tabela no formato de DataFrame.describe(include=...) para o total ou para um grupo."""
+    columns = list(stats["columns"])
+    if include is None:
+        numeric = [c for c in columns if stats["columns"][c]["kind"] == "numeric"]
+        columns = numeric or columns
+    elif include != "all":
+        raise ValueError("include deve ser None ou 'all'")
+
+    described = [_describe_column(stats, col, group) for col in columns]
+    # Linhas: união dos índices, das séries mais curtas para as mais longas
+    names = []
+    for index in sorted((s.index for s in described), key=len):
+        names += [name for name in index if name not in names]
+    table = pd.concat([s.reindex(names) for s in described], axis=1, sort=False)
+    table.columns = pd.Index(columns)
+    return table
+
+
+def describe_by_group(stats, col):
+    """Equivalente a df.groupby(by)[col].describe(): uma linha por nível de `by`."""
+    rows = [_describe_column(stats, col, level).rename(level) for level in stats["groups"]]
+    table = pd.concat(rows, axis=1).T
+    table.index.name = stats["by"]
+    return table
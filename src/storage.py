@@ -0,0 +1,324 @@
+import os
+import sys
+import json
+import shutil
+import uuid
+import numpy as np
+import pandas as pd
+
+from columnar import iter_frame_chunks, read_frame, read_meta, replace_directory, write_frame
+from instrumentation import span
+from schema import SCHEMAS, TABLE_SCHEMAS, apply_schema
+
+# -------------------------------------------------
+# Camada de armazenamento dos intermediários em data/clean/
+# -------------------------------------------------
+# Cada etapa grava/lê suas tabelas pelo nome lógico (ex.: "telecom_churn_cleaned")
+# e a camada escolhe o formato. O backend padrão é o colunar binário
+# (columnar.py): categorias como códigos de dicionário, flags 0/1 em int8 e
+# leitura só das colunas pedidas. O CSV continua disponível como formato de
+# exportação (TELECOMX_EXPORT_CSV=1 ou `python src/storage.py export`).
+#
+# O formato particionado (modo out-of-core, ver out_of_core.py) guarda a
+# tabela em <nome>.parts/: partes colunares de até PARTITION_ROWS linhas e
+# um parts.json com as colunas e o número de linhas de cada parte.
+# load_table/iter_table_chunks leem as partes como qualquer outro formato;
+# save_table_chunks grava uma tabela a partir de um iterador de chunks, sem
+# juntá-la em memória.
+
+CLEAN_DIR = os.path.join(os.path.dirname(__file__), os.pardir, "data", "clean")
+
+DEFAULT_FORMAT = os.environ.get("TELECOMX_STORAGE_FORMAT", "columnar")
+EXPORT_CSV = os.environ.get("TELECOMX_EXPORT_CSV", "0") == "1"
+
+PARTS_SUFFIX = ".parts"
+PARTS_FILE = "parts.json"
+PARTITION_ROWS = int(os.environ.get("TELECOMX_PARTITION_ROWS", "1000000"))
+
+
+# -------------------------------------------------
+# 1) Backends
+# -------------------------------------------------
+
+def compact_flags(df):
+    """Converte colunas inteiras que só contêm 0/1 para int8."""
+    out = df.copy(deep=False)
+    for col in out.columns:
+        series = out[col]
+        if series.dtype.kind in "iu" and series.dtype != np.int8 and len(series) > 0:
+            if series.isin([0, 1]).all():
+                out[col] = series.astype(np.int8)
+    return out
+
+
+def _columnar_path(name, directory):
+    return os.path.join(directory, name)
+
+
+def _columnar_save(df, name, directory):
+    return write_frame(compact_flags(df), _columnar_path(name, directory))
+
+
+def _columnar_load(name, directory, columns=None):
+    return read_frame(_columnar_path(name, directory), columns=columns)
+
+
+def _columnar_chunks(name, directory, chunk_rows, columns=None, text_columns=()):
+    return iter_frame_chunks(_columnar_path(name, directory), chunk_rows, columns=columns)
+
+
+def _columnar_columns(name, directory):
+    return [c["name"] for c in read_meta(_columnar_path(name, directory))["columns"]]
+
+
+def _csv_path(name, directory):
+    return os.path.join(directory, f"{name}.csv")
+
+
+def _csv_save(df, name, directory):
+    path = _csv_path(name, directory)
+    df.to_csv(path, index=False)
+    return path
+
+
+def _csv_load(name, directory, columns=None):
+    df = pd.read_csv(_csv_path(name, directory), usecols=columns)
+    return df if columns is None else df[columns]
+
+
+def _csv_chunks(name, directory, chunk_rows, columns=None, text_columns=()):
+    # Colunas de texto lidas como texto em todos os chunks: sem isso, um chunk
+    # em que todos os textos parecem números viraria float
+    dtype = {col: str for col in text_columns}
+    for df in pd.read_csv(_csv_path(name, directory), usecols=columns, chunksize=chunk_rows, dtype=dtype):
+        yield df if columns is None else df[columns]
+
+
+def _csv_columns(name, directory):
+    return pd.read_csv(_csv_path(name, directory), nrows=0).columns.tolist()
+
+
+def _csv_save_chunks(chunks, name, directory):
+    # Cabeçalho só no primeiro chunk; o CSV só aparece completo (arquivo temporário + rename)
+    path = _csv_path(name, directory)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+        for i, df in enumerate(chunks):
+            df.to_csv(f, index=False, header=i == 0)
+    os.replace(tmp_path, path)
+    return path
+
+
+def _partitioned_path(name, directory):
+    return os.path.join(directory, f"{name}{PARTS_SUFFIX}")
+
+
+def _read_parts(path):
+    with open(os.path.join(path, PARTS_FILE), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write_parts(chunks, path, part_rows=PARTITION_ROWS):
+    """Grava os chunks em partes de `part_rows` linhas, de forma atômica (diretório temporário + rename)."""
+    parent = os.path.dirname(os.path.abspath(path))
+    tmp_dir = os.path.join(parent, f".tmp-{uuid.uuid4().hex}")
+    os.makedirs(tmp_dir)
+    meta = {"rows": 0, "columns": None, "parts": []}
+
+    def flush(frame):
+        part = f"part-{len(meta['parts']):05d}"
+        write_frame(frame.reset_index(drop=True), os.path.join(tmp_dir, part))
+        meta["parts"].append({"name": part, "rows": len(frame)})
+        meta["rows"] += len(frame)
+
+    try:
+        pending, pending_rows = [], 0
+        for df in chunks:
+            if meta["columns"] is None:
+                meta["columns"] = list(df.columns)
+            pending.append(df)
+            pending_rows += len(df)
+            while pending_rows >= part_rows:
+                frame = pd.concat(pending) if len(pending) > 1 else pending[0]
+                flush(frame.iloc[:part_rows])
+                pending, pending_rows = [frame.iloc[part_rows:]], pending_rows - part_rows
+        if pending_rows or not meta["parts"] and pending:
+            flush(pd.concat(pending) if len(pending) > 1 else pending[0])
+        meta["columns"] = meta["columns"] or []
+
+        with open(os.path.join(tmp_dir, PARTS_FILE), "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        replace_directory(tmp_dir, path)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    return path
+
+
+def _partitioned_save(df, name, directory):
+    df = compact_flags(df)
+    chunks = (df.iloc[start:start + PARTITION_ROWS] for start in range(0, max(len(df), 1), PARTITION_ROWS))
+    return _write_parts(chunks, _partitioned_path(name, directory))
+
+
+def _partitioned_load(name, directory, columns=None):
+    path = _partitioned_path(name, directory)
+    meta = _read_parts(path)
+    frames = [read_frame(os.path.join(path, part["name"]), columns=columns) for part in meta["parts"]]
+    if not frames:
+        return pd.DataFrame(columns=meta["columns"] if columns is None else columns)
+    return pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+
+
+def _partitioned_chunks(name, directory, chunk_rows, columns=None, text_columns=()):
+    # Um chunk não atravessa partes; o índice é a posição da linha na tabela inteira
+    path = _partitioned_path(name, directory)
+    offset = 0
+    for part in _read_parts(path)["parts"]:
+        for df in iter_frame_chunks(os.path.join(path, part["name"]), chunk_rows, columns=columns):
+            df.index = df.index + offset
+            yield df
+        offset += part["rows"]
+
+
+def _partitioned_columns(name, directory):
+    return _read_parts(_partitioned_path(name, directory))["columns"]
+
+
+# nome -> (caminho, salvar, carregar, listar colunas, carregar em chunks)
+BACKENDS = {
+    "columnar":    (_columnar_path, _columnar_save, _columnar_load, _columnar_columns, _columnar_chunks),
+    "csv":         (_csv_path, _csv_save, _csv_load, _csv_columns, _csv_chunks),
+    "partitioned": (_partitioned_path, _partitioned_save, _partitioned_load, _partitioned_columns,
+                    _partitioned_chunks),
+}
+
+
+def _backend(fmt):
+    if fmt not in BACKENDS:
+        raise ValueError(f"Formato de armazenamento desconhecido: {fmt!r} (opções: {sorted(BACKENDS)})")
+    return BACKENDS[fmt]
+
+
+def _exists(fmt, name, directory):
+    return os.path.exists(_backend(fmt)[0](name, directory))
+
+
+def _mtime(fmt, name, directory):
+    return os.path.getmtime(_backend(fmt)[0](name, directory))
+
+
+# -------------------------------------------------
+# 2) API pública
+# -------------------------------------------------
+
+def save_table(df, name, fmt=None, export_csv=None, directory=CLEAN_DIR):
+    """Grava a tabela no formato principal e, opcionalmente, exporta CSV."""
+    fmt = fmt or DEFAULT_FORMAT
+    export_csv = EXPORT_CSV if export_csv is None else export_csv
+    os.makedirs(directory, exist_ok=True)
+
+    with span("save_table", table=name, format=fmt, rows=len(df)):
+        paths = [_backend(fmt)[1](df, name, directory)]
+        if export_csv and fmt != "csv":
+            paths.append(_csv_save(df, name, directory))
+            _mark_fresh(fmt, name, directory)
+    return paths
+
+
+def save_table_chunks(chunks, name, export_csv=None, directory=CLEAN_DIR):
+    """Grava no formato particionado uma tabela que chega em chunks (sem juntá-la em memória)."""
+    export_csv = EXPORT_CSV if export_csv is None else export_csv
+    os.makedirs(directory, exist_ok=True)
+
+    with span("save_table_chunks", table=name) as info:
+        paths = [_write_parts(chunks, _partitioned_path(name, directory))]
+        info["rows"] = _read_parts(paths[0])["rows"]
+        if export_csv:
+            paths.append(_csv_save_chunks(_partitioned_chunks(name, directory, PARTITION_ROWS), name, directory))
+            _mark_fresh("partitioned", name, directory)
+    return paths
+
+
+def _mark_fresh(fmt, name, directory):
+    # O CSV exportado é só uma cópia: o formato principal continua sendo o
+    # mais recente para que load_table não passe a ler o CSV.
+    os.utime(_backend(fmt)[0](name, directory))
+
+
+def resolve_format(name, directory=CLEAN_DIR):
+    """Formato mais recente disponível para a tabela (colunar tem preferência no empate)."""
+    available = [fmt for fmt in BACKENDS if _exists(fmt, name, directory)]
+    if not available:
+        raise FileNotFoundError(f"Tabela '{name}' não encontrada em {directory}")
+    return max(available, key=lambda fmt: (_mtime(fmt, name, directory), fmt == "columnar"))
+
+
+def load_table(name, columns=None, directory=CLEAN_DIR):
+    """Lê a tabela `name`; com `columns`, só essas colunas saem do disco.
+
+    Tabelas com esquema declarado (ver schema.py) saem já nos dtypes compactos.
+    """
+    fmt = resolve_format(name, directory)
+    columns = list(columns) if columns is not None else None
+    with span("load_table", table=name, format=fmt) as info:
+        df = _backend(fmt)[2](name, directory, columns)
+        if name in TABLE_SCHEMAS:
+            df = apply_schema(df, TABLE_SCHEMAS[name])
+        info["rows"] = len(df)
+    return df
+
+
+def iter_table_chunks(name, chunk_rows, columns=None, directory=CLEAN_DIR):
+    """Lê a tabela `name` em DataFrames de até `chunk_rows` linhas, sem carregá-la inteira.
+
+    Cada chunk sai nos dtypes do esquema, como em load_table.
+    """
+    fmt = resolve_format(name, directory)
+    columns = list(columns) if columns is not None else None
+    schema = SCHEMAS[TABLE_SCHEMAS[name]] if name in TABLE_SCHEMAS else {}
+    text_columns = [col for col, dtype in schema.items()
+                    if dtype == "object" and (columns is None or col in columns)]
+    for df in _backend(fmt)[4](name, directory, chunk_rows, columns, text_columns):
+        if name in TABLE_SCHEMAS:
+            df = apply_schema(df, TABLE_SCHEMAS[name])
+        yield df
+
+
+def table_columns(name, directory=CLEAN_DIR):
+    fmt = resolve_format(name, directory)
+    return _backend(fmt)[3](name, directory)
+
+
+def table_path(name, directory=CLEAN_DIR):
+    fmt = resolve_format(name, directory)
+    return _backend(fmt)[0](name, directory)
+
+
+def export_csv(name, directory=CLEAN_DIR):
+    """Exporta a versão mais recente da tabela para CSV."""
+    fmt = resolve_format(name, directory)
+    if fmt == "partitioned":
+        path = _csv_save_chunks(_partitioned_chunks(name, directory, PARTITION_ROWS), name, directory)
+    else:
+        path = _csv_save(_backend(fmt)[2](name, directory), name, directory)
+    if fmt != "csv":
+        _mark_fresh(fmt, name, directory)
+    return path
+
+
+# -------------------------------------------------
+# 3) Linha de comando: exportar tabelas para CSV
+# -------------------------------------------------
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "export":
+        print("Uso: python src/storage.py export [nome_da_tabela ...]")
+        sys.exit(1)
+
+    names = sys.argv[2:] or sorted({
+        entry.removesuffix(PARTS_SUFFIX) for entry in os.listdir(CLEAN_DIR)
+        if os.path.isdir(os.path.join(CLEAN_DIR, entry)) and not entry.startswith(".")
+    })
+    for table in names:
+        print("CSV exportado em:", export_csv(table))
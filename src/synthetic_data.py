@@ -0,0 +1,196 @@
+import argparse
+import json
+import os
+
+import numpy as np
+
+# -------------------------------------------------
+# Gerador determinístico de dados sintéticos no formato do TelecomX_Data.json
+# -------------------------------------------------
+# Produz registros com o mesmo esquema aninhado do export real (customer,
+# phone, internet, account.Charges), com as mesmas peculiaridades:
+#   - 'Total' como texto ("593.3") e " " para clientes com tenure 0;
+#   - 'Churn' em branco ("") numa fração dos registros;
+#   - customerIDs duplicados (cópias de registros anteriores do mesmo bloco);
+#   - 'No phone service' / 'No internet service' coerentes com o serviço base.
+# As proporções seguem as do export real. Mesma semente + mesmo tamanho =>
+# mesmo arquivo, byte a byte.
+
+BASE_DIR  = os.path.dirname(__file__)            # .../src
+BENCH_DIR = os.path.join(BASE_DIR, os.pardir, "data", "bench")
+
+DEFAULT_SEED = 42
+BLOCK_SIZE = 100_000
+
+BLANK_CHURN_RATE = 224 / 7267
+DUPLICATE_RATE = 0.005
+ZERO_TENURE_RATE = 11 / 7267      # clientes novos: 'Total' vem como " "
+
+YES_NO = np.array(["No", "Yes"])
+
+# (valores, probabilidades) aproximadas do export real
+GENDER           = (["Male", "Female"], [0.506, 0.494])
+CHURN            = (["No", "Yes"], [0.735, 0.265])
+INTERNET_SERVICE = (["Fiber optic", "DSL", "No"], [0.44, 0.342, 0.218])
+CONTRACT         = (["Month-to-month", "Two year", "One year"], [0.551, 0.240, 0.209])
+PAYMENT_METHOD   = (
+    ["Electronic check", "Mailed check", "Bank transfer (automatic)", "Credit card (automatic)"],
+    [0.336, 0.229, 0.219, 0.216],
+)
+INTERNET_ADDONS = {
+    # proporção de 'Yes' entre clientes com internet
+    "OnlineSecurity":   0.366,
+    "OnlineBackup":     0.440,
+    "DeviceProtection": 0.438,
+    "TechSupport":      0.370,
+    "StreamingTV":      0.491,
+    "StreamingMovies":  0.495,
+}
+
+ID_LETTERS = 5
+ID_SPACE = 26 ** ID_LETTERS
+ID_STRIDE = 7_919_201   # primo com 26**5: i -> (i * ID_STRIDE) % ID_SPACE é uma bijeção
+
+
+def _choice(rng, spec, size):
+    values, probs = spec
+    return np.asarray(values)[rng.choice(len(values), size=size, p=probs)]
+
+
+def _customer_ids(start, size):
+    """IDs únicos no formato '0002-ORFBO' derivados da posição do registro."""
+    idx = np.arange(start, start + size, dtype=np.int64)
+    scrambled = ((idx + 1) * ID_STRIDE) % ID_SPACE
+    letters = np.empty((size, ID_LETTERS), dtype="U1")
+    for pos in range(ID_LETTERS - 1, -1, -1):
+        letters[:, pos] = np.array(list("ABCDEFGHIJKLMNOPQRSTUVWXYZ"))[scrambled % 26]
+        scrambled //= 26
+    digits = (idx // ID_SPACE * 7 + idx * 7_573) % 10_000
+    return [f"{d:04d}-{''.join(row)}" for d, row in zip(digits, letters)]
+
+
+def _format_total(value):
+    # Mesmo formato do export: repr curto de um float com 2 casas ("593.3")
+    return repr(round(float(value), 2))
+
+
+def generate_block(rng, start, size):
+    """Gera `size` registros (dicts) a partir da posição global `start`."""
+    ids = _customer_ids(start, size)
+    gender = _choice(rng, GENDER, size)
+    senior = (rng.random(size) < 0.163).astype(int)
+    partner = YES_NO[(rng.random(size) < 0.484).astype(int)]
+    dependents = YES_NO[(rng.random(size) < 0.300).astype(int)]
+    tenure = rng.integers(1, 73, size=size)
+    tenure[rng.random(size) < ZERO_TENURE_RATE] = 0
+
+    phone_service = rng.random(size) < 0.903
+    multiple_lines = np.where(
+        phone_service, YES_NO[(rng.random(size) < 0.467).astype(int)], "No phone service"
+    )
+
+    internet = _choice(rng, INTERNET_SERVICE, size)
+    has_internet = internet != "No"
+    addons = {
+        name: np.where(has_internet, YES_NO[(rng.random(size) < p).astype(int)], "No internet service")
+        for name, p in INTERNET_ADDONS.items()
+    }
+
+    contract = _choice(rng, CONTRACT, size)
+    paperless = YES_NO[(rng.random(size) < 0.593).astype(int)]
+    payment = _choice(rng, PAYMENT_METHOD, size)
+
+    # Mensalidade em múltiplos de 0,05 entre 18,25 e 118,75
+    monthly = np.round(rng.integers(365, 2376, size=size) * 0.05, 2)
+    total = monthly * np.maximum(tenure, 1) * rng.uniform(0.9, 1.1, size=size)
+
+    churn = _choice(rng, CHURN, size)
+    churn[rng.random(size) < BLANK_CHURN_RATE] = ""
+
+    records = []
+    for i in range(size):
+        records.append({
+            "customerID": ids[i],
+            "Churn": str(churn[i]),
+            "customer": {
+                "gender": str(gender[i]),
+                "SeniorCitizen": int(senior[i]),
+                "Partner": str(partner[i]),
+                "Dependents": str(dependents[i]),
+                "tenure": int(tenure[i]),
+            },
+            "phone": {
+                "PhoneService": "Yes" if phone_service[i] else "No",
+                "MultipleLines": str(multiple_lines[i]),
+            },
+            "internet": {
+                "InternetService": str(internet[i]),
+                **{name: str(values[i]) for name, values in addons.items()},
+            },
+            "account": {
+                "Contract": str(contract[i]),
+                "PaperlessBilling": str(paperless[i]),
+                "PaymentMethod": str(payment[i]),
+                "Charges": {
+                    "Monthly": float(monthly[i]),
+                    "Total": " " if tenure[i] == 0 else _format_total(total[i]),
+                },
+            },
+        })
+
+    # Duplicados: alguns registros repetem um registro anterior do bloco
+    dup_pos = np.flatnonzero(rng.random(size) < DUPLICATE_RATE)
+    for pos in dup_pos[dup_pos > 0]:
+        records[pos] = records[int(rng.integers(0, pos))]
+    return records
+
+
+def iter_records(n_rows, seed=DEFAULT_SEED, block_size=BLOCK_SIZE):
+    """Gera `n_rows` registros sintéticos, bloco a bloco (memória limitada ao bloco)."""
+    rng = np.random.default_rng(seed)
+    for start in range(0, n_rows, block_size):
+        yield from generate_block(rng, start, min(block_size, n_rows - start))
+
+
+def write_dataset(path, n_rows, seed=DEFAULT_SEED):
+    """Grava um array JSON compacto com `n_rows` registros em `path` (atômico)."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write("[")
+        for i, record in enumerate(iter_records(n_rows, seed)):
+            if i:
+                f.write(",")
+            f.write(encoder.encode(record))
+        f.write("]")
+    os.replace(tmp_path, path)
+    return path
+
+
+def dataset_path(n_rows, seed=DEFAULT_SEED, directory=BENCH_DIR):
+    return os.path.join(directory, f"telecomx_synthetic_{n_rows}_s{seed}.json")
+
+
+def ensure_dataset(n_rows, seed=DEFAULT_SEED, directory=BENCH_DIR):
+    """Devolve o caminho do dataset sintético, gerando-o só se ainda não existir."""
+    path = dataset_path(n_rows, seed, directory)
+    if not os.path.exists(path):
+        write_dataset(path, n_rows, seed)
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera um export sintético no formato do TelecomX_Data.json.")
+    parser.add_argument("rows", type=int, help="número de registros")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--output", help="arquivo de saída (padrão: data/bench/telecomx_synthetic_<rows>_s<seed>.json)")
+    args = parser.parse_args(argv)
+
+    path = args.output or dataset_path(args.rows, args.seed)
+    write_dataset(path, args.rows, args.seed)
+    print(f"{args.rows} registros sintéticos gravados em: {path}")
+
+
+if __name__ == "__main__":
+    main()
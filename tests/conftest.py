@@ -0,0 +1,48 @@
+import os
+import sys
+import copy
+import json
+
+import pytest
+
+# Os módulos de src/ importam uns aos outros pelo nome (como quando rodam como scripts)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+# Primeiro registro do export real (data/raw/TelecomX_Data.json)
+RECORD = {
+    "customerID": "0002-ORFBO", "Churn": "No",
+    "customer": {"gender": "Female", "SeniorCitizen": 0, "Partner": "Yes", "Dependents": "Yes", "tenure": 9},
+    "phone": {"PhoneService": "Yes", "MultipleLines": "No"},
+    "internet": {"InternetService": "DSL", "OnlineSecurity": "No", "OnlineBackup": "Yes", "DeviceProtection": "No",
+                 "TechSupport": "Yes", "StreamingTV": "Yes", "StreamingMovies": "No"},
+    "account": {"Contract": "One year", "PaperlessBilling": "Yes", "PaymentMethod": "Mailed check",
+                "Charges": {"Monthly": 65.6, "Total": "593.3"}},
+}
+
+
+@pytest.fixture
+def make_record():
+    """Registro do export com campos trocados: make_record("C-1", tenure=12.7, Monthly="abc")."""
+    def make(customer_id, **fields):
+        record = copy.deepcopy(RECORD)
+        record["customerID"] = customer_id
+        for key, value in fields.items():
+            for section in (record, record["customer"], record["phone"], record["internet"], record["account"],
+                            record["account"]["Charges"]):
+                if key in section:
+                    section[key] = value
+                    break
+            else:
+                raise KeyError(key)
+        return record
+    return make
+
+
+@pytest.fixture
+def write_export(tmp_path):
+    """Grava registros como um export JSON em tmp_path e devolve o caminho."""
+    def write(records, name="export.json"):
+        path = tmp_path / name
+        path.write_text(json.dumps(records, ensure_ascii=False), encoding="utf-8")
+        return str(path)
+    return write
@@ -0,0 +1,56 @@
+import os
+
+import pandas as pd
+
+import chart_cache
+from report_renderer import render_charts
+
+
+def test_code_files_follow_chart_summaries_imports():
+    src_dir = os.path.dirname(chart_cache.__file__)
+    files = chart_cache.code_files(src_dir)
+    for name in ("chart_summaries.py", "report_renderer.py", "chart_cache.py",
+                 "correlation.py", "exact_stats.py", "stats_accumulators.py"):
+        assert name in files
+
+
+def test_code_files_only_local_modules(tmp_path):
+    (tmp_path / "chart_summaries.py").write_text("import numpy as np\nfrom novo_calculo import f\n", encoding="utf-8")
+    (tmp_path / "novo_calculo.py").write_text("def f():\n    pass\n", encoding="utf-8")
+    files = chart_cache.code_files(str(tmp_path))
+    assert "novo_calculo.py" in files and "numpy.py" not in files
+
+
+def test_keys_follow_data_and_spec_but_not_message():
+    spec = {"kind": "hist", "table": "t", "columns": ["b"], "x": "b", "filename": "b.png", "message": "Salvo:"}
+    df = pd.DataFrame({"b": [1.0, 2.0, 3.0]})
+    [key] = chart_cache.chart_keys([spec], {"t": df})
+    assert chart_cache.chart_keys([dict(spec, message="Outro:")], {"t": df}) == [key]
+    assert chart_cache.chart_keys([dict(spec, bins=10)], {"t": df}) != [key]
+    assert chart_cache.chart_keys([spec], {"t": df.assign(b=[1.0, 2.0, 4.0])}) != [key]
+    assert chart_cache.chart_keys([spec], {"t": df.iloc[::-1].reset_index(drop=True)}) != [key]
+    # Tabela lida em chunks dá a mesma chave que o DataFrame inteiro
+    read_chunks = lambda columns: (df[columns].iloc[i:i + 2] for i in range(0, len(df), 2))
+    assert chart_cache.chart_keys([spec], {"t": read_chunks}) == [key]
+
+
+def test_render_charts_skips_only_unchanged_charts(tmp_path, capsys):
+    specs = [
+        {"kind": "count", "table": "t", "columns": ["a"], "x": "a", "filename": "a.png", "message": "Salvo:",
+         "title": "A"},
+        {"kind": "hist", "table": "t", "columns": ["b"], "x": "b", "filename": "b.png", "message": "Salvo:",
+         "title": "B"},
+    ]
+    df = pd.DataFrame({"a": ["x", "y", "x"], "b": [1.0, 2.0, 3.0]})
+    reports = str(tmp_path)
+
+    def render(table):
+        render_charts(specs, {"t": table}, reports, max_workers=1, use_cache=True)
+        return [line.endswith("(sem alterações)") for line in capsys.readouterr().out.splitlines()]
+
+    assert render(df) == [False, False]
+    assert render(df) == [True, True]
+    assert render(df.assign(b=[1.0, 2.0, 5.0])) == [True, False]
+    # PNG apagado fora do pipeline volta a ser desenhado
+    os.remove(os.path.join(reports, "a.png"))
+    assert render(df.assign(b=[1.0, 2.0, 5.0])) == [False, True]
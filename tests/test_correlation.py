@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from correlation import apply_delta, chunked_comoments, correlation_matrix, frame_comoments
+
+# A matriz saída dos co-momentos (inclusive depois de deltas) tem de bater
+# com DataFrame.corr(), que usa só as linhas em que o par tem valor.
+
+
+def _frame(rows=400, seed=0):
+    rng = np.random.default_rng(seed)
+    mensal = rng.uniform(20, 120, rows)
+    meses = rng.integers(0, 73, rows)
+    total = mensal * meses + rng.normal(0, 50, rows) + 1e6  # valores grandes: testa a centragem
+    total[rng.random(rows) < 0.2] = np.nan
+    # Ausentes em linhas disjuntas: o par (so_pares, so_impares) não tem nenhuma linha em comum
+    so_pares = np.where(np.arange(rows) % 2 == 0, rng.normal(0, 1, rows), np.nan)
+    so_impares = np.where(np.arange(rows) % 2 == 1, mensal + rng.normal(0, 5, rows), np.nan)
+    return pd.DataFrame({"mensal": mensal, "meses": meses, "total": total, "so_pares": so_pares,
+                         "so_impares": so_impares, "constante": np.full(rows, 3.0)})
+
+
+def _assert_corr(acc, df):
+    pd.testing.assert_frame_equal(correlation_matrix(acc), df.corr(), check_exact=False, rtol=1e-9, atol=1e-12)
+
+
+@pytest.mark.parametrize("size", [1, 33, 400])
+def test_chunked_matches_pandas(size):
+    df = _frame()
+    acc = chunked_comoments((df.iloc[i:i + size] for i in range(0, len(df), size)), df.columns)
+    _assert_corr(acc, df)
+
+
+def test_delta_matches_recomputed():
+    df = _frame()
+    acc = frame_comoments(df)
+    rng = np.random.default_rng(1)
+    current = df
+    for step in range(10):
+        removed = current.sample(n=25, random_state=step)
+        added = _frame(rows=30, seed=100 + step)
+        acc = apply_delta(acc, removed=removed, added=added)
+        current = pd.concat([current.drop(removed.index), added], ignore_index=True)
+        _assert_corr(acc, current)
+    # Só remoções e só inclusões
+    removed = current.iloc[rng.permutation(len(current))[:50]]
+    acc = apply_delta(acc, removed=removed)
+    current = current.drop(removed.index)
+    _assert_corr(acc, current)
+    acc = apply_delta(acc, added=_frame(rows=5, seed=7))
+    _assert_corr(acc, pd.concat([current, _frame(rows=5, seed=7)]))
+
+
+@pytest.mark.parametrize("keep", [3, 2, 1, 0])
+def test_removal_down_to_few_rows(keep):
+    df = _frame(rows=50)
+    acc = apply_delta(frame_comoments(df), removed=df.iloc[keep:])
+    rest = df.iloc[:keep]
+    expected = rest.corr()
+    result = correlation_matrix(acc)
+    # Com n <= 1 (ou pares sem linha em comum) o pandas devolve NaN; a matriz também
+    np.testing.assert_allclose(result.to_numpy(), expected.to_numpy(), rtol=1e-9, atol=1e-9, equal_nan=True)
+    if keep <= 1:
+        assert np.isnan(result.to_numpy()).all()
+    pairs = acc["n"]
+    assert (pairs >= 0).all() and (acc["m2"] >= 0).all()
+
+
+def test_removing_a_column_block_of_nans():
+    # Retira todas as linhas em que `total` tem valor: os pares com `total` ficam sem linhas
+    df = _frame()
+    removed = df[df["total"].notna()]
+    acc = apply_delta(frame_comoments(df), removed=removed)
+    rest = df[df["total"].isna()]
+    np.testing.assert_allclose(correlation_matrix(acc).to_numpy(), rest.corr().to_numpy(),
+                               rtol=1e-9, atol=1e-12, equal_nan=True)
@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import customer_index
+from data_cleaning import clean_data
+from data_transformation import transform_data
+from feature_engineering import add_features
+from feature_matrix import read_index, write_feature_matrix
+from ingestion import records_to_frame
+
+
+@pytest.fixture
+def dirs(make_record, tmp_path):
+    ids = ["0005-EEEEE", "0001-AAAAA", "0004-DDDDD", "0002-BBBBB", "0003-CCCCC"]
+    df = transform_data(add_features(clean_data(records_to_frame(
+        [make_record(customer_id, tenure=i + 1) for i, customer_id in enumerate(ids)]))))
+    matrix_dir = str(tmp_path / "matrix")
+    write_feature_matrix(df, matrix_dir)
+    return df, matrix_dir, str(tmp_path / "index")
+
+
+def _keys(directory):
+    keys, rows = customer_index._read_keys(directory)
+    return keys.tolist(), rows.tolist()
+
+
+def test_lookup_and_fetch(dirs):
+    df, matrix_dir, index_dir = dirs
+    # Sem índice gravado, a primeira consulta o constrói a partir da matriz
+    positions = customer_index.lookup(["0004-DDDDD", "9999-ZZZZZ", "0005-EEEEE"], index_dir, matrix_dir)
+    np.testing.assert_array_equal(positions, [2, -1, 0])
+    fetched = customer_index.fetch(["0003-CCCCC", "0001-AAAAA", "nao-existe"], ["Meses_Contratado"],
+                                   index_dir, matrix_dir)
+    assert fetched["ID_Cliente"].tolist() == ["0003-CCCCC", "0001-AAAAA"]
+    assert fetched["Meses_Contratado"].tolist() == [5, 2]
+
+
+def test_stale_index_is_rebuilt(dirs):
+    df, matrix_dir, index_dir = dirs
+    customer_index.build_index(["X"], build="outro-build", directory=index_dir)
+    np.testing.assert_array_equal(customer_index.lookup(["0001-AAAAA"], index_dir, matrix_dir), [1])
+    with open(f"{index_dir}/index.json", encoding="utf-8") as f:
+        assert read_index(matrix_dir)["build"] in f.read()
+
+
+def test_chunked_build_matches_build_index(dirs, tmp_path):
+    df, _, index_dir = dirs
+    ids = df["ID_Cliente"]
+    customer_index.build_index(ids, build="b", directory=index_dir)
+    chunked = str(tmp_path / "chunked")
+    customer_index.build_index_chunks(lambda: (ids[i:i + 2] for i in range(0, len(ids), 2)), build="b",
+                                      directory=chunked, block=2)
+    assert _keys(chunked) == _keys(index_dir)
+    with pytest.raises(ValueError):
+        customer_index.build_index(["A", "B", "A"], directory=str(tmp_path / "dup"))
+
+
+def test_apply_delta_matches_a_rebuild(tmp_path):
+    directory, rebuilt = str(tmp_path / "index"), str(tmp_path / "rebuilt")
+    customer_index.build_index(["C", "A", "D", "B"], build="old", directory=directory)
+    # Nova ordem: A, E, C, BB (D e B saíram; E e BB entraram)
+    row_map = np.array([2, 0, -1, -1])
+    assert customer_index.apply_delta(row_map, ["BB", "E"], [3, 1], build="new", base_build="old",
+                                      directory=directory) is not None
+    customer_index.build_index(["A", "E", "C", "BB"], build="new", directory=rebuilt)
+    assert _keys(directory) == _keys(rebuilt)
+    # Índice de outro build: nada é gravado e o chamador reconstrói
+    assert customer_index.apply_delta(row_map, [], [], build="x", base_build="old", directory=directory) is None
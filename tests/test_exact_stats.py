@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from exact_stats import exact_statistics
+from stats_accumulators import new_sketch, rank_window, update_sketch
+from stats_engine import compute_statistics, describe, value_counts
+
+# exact_statistics lê a tabela em chunks e tem de devolver os mesmos valores
+# (bit a bit) de compute_statistics sobre a tabela inteira, que por sua vez
+# reproduz DataFrame.describe().
+
+ROWS = 1200
+K = 16  # sketch pequeno: compacta e as janelas de postos são de fato usadas
+
+
+def _frame(rows=ROWS, seed=0):
+    rng = np.random.default_rng(seed)
+    grupo = rng.choice(["Sim", "Não", "Vazio"], rows).astype(object)
+    grupo[rng.random(rows) < 0.02] = None  # linhas sem grupo ficam só no total
+    cobranca = rng.lognormal(7, 1, rows)
+    cobranca[(rng.random(rows) < 0.1) | (grupo == "Vazio")] = np.nan
+    flag = pd.array(rng.integers(0, 2, rows), dtype="Int8")
+    flag[rng.random(rows) < 0.05] = pd.NA
+    return pd.DataFrame({
+        "cobranca": cobranca,
+        "mensal": rng.normal(65, 30, rows).astype("float32"),
+        "meses": rng.integers(0, 73, rows),
+        "flag": flag,
+        "contrato": rng.choice(["Mensal", "Anual", "Bienal"], rows),
+        "grupo": grupo,
+    })
+
+
+def _reader(df, size, calls):
+    def read_chunks():
+        calls.append(size)
+        return (df.iloc[start:start + size] for start in range(0, len(df), size))
+    return read_chunks
+
+
+def _scopes(stats):
+    return [None] + list(stats["groups"])
+
+
+@pytest.mark.parametrize("size", [1, 7, 100, 1000, ROWS])
+@pytest.mark.parametrize("by", [None, "grupo"])
+def test_matches_compute_statistics(size, by):
+    df = _frame()
+    calls = []
+    stats = exact_statistics(_reader(df, size, calls), by, k=K)
+    expected = compute_statistics(df, by)
+    assert len(calls) == 2
+    assert stats["groups"] == expected["groups"] and stats["group_rows"] == expected["group_rows"]
+    for scope in _scopes(expected):
+        pd.testing.assert_frame_equal(describe(stats, scope, include="all"), describe(expected, scope, include="all"),
+                                      check_exact=True)
+        for col in ("cobranca", "mensal", "meses", "flag"):
+            got, want = (s["columns"][col]["overall" if scope is None else "groups"] for s in (stats, expected))
+            if scope is not None:
+                got, want = (g[expected["groups"].index(scope)] for g in (got, want))
+            assert got["var"] == want["var"] or np.isnan(got["var"]) and np.isnan(want["var"])
+            assert got["median"] == want["median"] or np.isnan(got["median"]) and np.isnan(want["median"])
+        pd.testing.assert_series_equal(value_counts(stats, "contrato", scope), value_counts(expected, "contrato", scope))
+
+
+@pytest.mark.filterwarnings("ignore:Mean of empty slice")  # mediana do pandas no grupo sem valores
+@pytest.mark.parametrize("by", [None, "grupo"])
+def test_matches_pandas_describe(by):
+    df = _frame()
+    stats = exact_statistics(_reader(df, 97, []), by, k=K)
+    pd.testing.assert_frame_equal(describe(stats), df.describe(), check_exact=False, rtol=1e-12)
+    if by is not None:
+        for level, part in df.groupby(by):
+            pd.testing.assert_frame_equal(describe(stats, level), part.describe(), check_exact=False, rtol=1e-12)
+            assert stats["columns"]["cobranca"]["groups"][stats["groups"].index(level)]["median"] \
+                == pytest.approx(part["cobranca"].median(), nan_ok=True)
+
+
+def test_extreme_percentiles_in_two_passes():
+    # Postos nas pontas: a janela vai até o mínimo/máximo exatos sem passadas extras
+    df = _frame()
+    percentiles = [0, 0.001, 0.5, 0.999, 1]
+    calls = []
+    stats = exact_statistics(_reader(df, 50, calls), "grupo", percentiles=percentiles, k=K)
+    expected = compute_statistics(df, "grupo", percentiles=percentiles)
+    assert len(calls) == 2
+    for scope in _scopes(expected):
+        pd.testing.assert_frame_equal(describe(stats, scope), describe(expected, scope), check_exact=True)
+
+
+def test_rank_window_reaches_exact_extremes():
+    values = np.random.default_rng(1).normal(0, 1, 10_000)
+    sketch = update_sketch(new_sketch(16), values)
+    lo, hi = rank_window(sketch, values.size, [0, values.size - 1], lowest=values.min(), highest=values.max())
+    assert (lo, hi) == (values.min(), values.max())
+    lo, hi = rank_window(sketch, values.size, [values.size // 2])
+    assert lo <= np.median(values) <= hi
+
+
+def test_empty_table():
+    df = _frame().iloc[:0]
+    stats = exact_statistics(_reader(df, 10, []), "grupo", k=K)
+    assert stats["rows"] == 0 and stats["groups"] == []
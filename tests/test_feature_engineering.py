@@ -0,0 +1,16 @@
+import numpy as np
+import pandas as pd
+
+from data_cleaning import clean_data
+from feature_engineering import add_features
+from ingestion import records_to_frame
+
+
+def test_daily_charge_divides_before_rounding(make_record):
+    monthly = [65.6, 100.954, 29.856, 118.75]
+    df = records_to_frame([make_record(f"000{i}-AAAAA", Monthly=m) for i, m in enumerate(monthly)])
+    features = add_features(clean_data(df))
+    # Mesma fórmula do baseline: Monthly / 30 arredondado para 2 casas (100.954 -> 3.37, não 3.36)
+    expected = (pd.Series(monthly) / 30).round(2)
+    np.testing.assert_array_equal(features["Contas_Diarias"].to_numpy(), expected.to_numpy())
+    assert features["Contas_Diarias"].dtype == "float64"
@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+
+from data_cleaning import clean_data
+from imputation import coerce_numeric, fit_fill_values, load_fill_values, medians, save_fill_values
+from ingestion import records_to_frame
+
+
+def test_medians_match_series_median():
+    rng = np.random.default_rng(7)
+    df = pd.DataFrame({
+        "impar": rng.normal(size=101),
+        "par": rng.integers(0, 50, size=100).astype(float).tolist() + [np.nan],
+        "anulavel": pd.array([1, None, 3, 4] * 25 + [None], dtype="Int16"),
+        "vazia": [np.nan] * 101,
+    })
+    result = medians(df, df.columns)
+    for col in ["impar", "par", "anulavel"]:
+        assert result[col] == df[col].median()
+    assert np.isnan(result["vazia"])
+    assert medians(df, []) == {}
+
+
+def test_fill_values_coerce_text_and_skip_non_numeric():
+    df = pd.DataFrame({"account.Charges.Total": ["10", " ", "30", "abc"], "id": ["a", "b", "c", "d"],
+                       "customer.tenure": [1, 2, 3, 40]})
+    coerced, rejected = coerce_numeric(df)
+    assert rejected == {"account.Charges.Total": 2}
+    assert coerced["account.Charges.Total"].isna().tolist() == [False, True, False, True]
+    assert fit_fill_values(df) == {"account.Charges.Total": 20.0, "customer.tenure": 2.5}
+
+
+def test_given_fill_values_replace_the_local_medians(make_record):
+    df = records_to_frame([make_record("A", tenure=None), make_record("B", tenure=10), make_record("C", tenure=20)])
+    assert clean_data(df)["customer.tenure"].tolist() == [15, 10, 20]
+    # Mediana do export inteiro (incremental/shards) vale mesmo se o recorte tiver outra
+    assert clean_data(df, fill_values={"customer.tenure": 3.0})["customer.tenure"].tolist() == [3, 10, 20]
+
+
+def test_fill_values_file_round_trip(tmp_path):
+    path = str(tmp_path / "fill_values.json")
+    assert load_fill_values(path) is None
+    save_fill_values({"customer.tenure": 29.0}, rows=7043, path=path)
+    assert load_fill_values(path) == {"customer.tenure": 29.0}
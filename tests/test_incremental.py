@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+
+from incremental import ID_COL, _process, build_snapshot, diff_snapshots, merge_delta, raw_subset
+from ingestion import records_to_frame
+
+
+def _snapshot(records):
+    return build_snapshot(raw_subset(records_to_frame(records)))
+
+
+def test_diff_uses_first_occurrence_and_row_content(make_record):
+    _, old = _snapshot([make_record("A"), make_record("B"), make_record("C")])
+    _, new = _snapshot([
+        make_record("B", tenure=30),          # alterado
+        make_record("C"),
+        make_record("C", tenure=99),          # duplicado: só a primeira ocorrência conta
+        make_record("D"),                     # novo
+    ])
+    diff = diff_snapshots(old, new)
+    assert {k: sorted(v) for k, v in diff.items()} == {
+        "novos": ["D"], "alterados": ["B"], "removidos": ["A"], "inalterados": ["C"]}
+
+
+def test_merge_delta_follows_the_export_order():
+    stored = pd.DataFrame({ID_COL: ["A", "B", "C"], "v": [1, 2, 3]})
+    delta = pd.DataFrame({ID_COL: ["D", "B"], "v": [40, 20]})
+    merged, row_map, delta_positions = merge_delta(stored, delta, ID_COL, drop_ids=["A", "B"],
+                                                   order=["D", "C", "B"])
+    assert merged[ID_COL].tolist() == ["D", "C", "B"] and merged["v"].tolist() == [40, 3, 20]
+    np.testing.assert_array_equal(row_map, [-1, -1, 1])
+    np.testing.assert_array_equal(delta_positions, [0, 2])
+
+
+def test_merging_the_delta_matches_a_full_run(make_record):
+    old_records = [make_record(f"{i:04d}-AAAAA", tenure=i + 1) for i in range(6)]
+    new_records = old_records[1:] + [make_record("0009-AAAAA")]
+    new_records[2] = make_record("0003-AAAAA", Contract="Two year", Total=" ")
+    fill_values = {"customer.SeniorCitizen": 0.0, "customer.tenure": 3.0,
+                   "account.Charges.Monthly": 65.6, "account.Charges.Total": 593.3}
+
+    old_first, old_snapshot = _snapshot(old_records)
+    new_first, new_snapshot = _snapshot(new_records)
+    stored = _process(old_first, fill_values)
+    expected = _process(new_first, fill_values)
+
+    diff = diff_snapshots(old_snapshot, new_snapshot)
+    delta = _process(new_first[new_first[ID_COL].isin(diff["novos"].append(diff["alterados"]))], fill_values)
+    drop_ids = diff["alterados"].append(diff["removidos"])
+    for stage, id_col in (("cleaned", ID_COL), ("features", ID_COL), ("transformed", "ID_Cliente")):
+        merged, _, _ = merge_delta(stored[stage], delta[stage], id_col, drop_ids, new_snapshot[ID_COL])
+        pd.testing.assert_frame_equal(merged, expected[stage].reset_index(drop=True))
@@ -0,0 +1,81 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ingestion import RAW_COLUMNS, iter_raw_records, parse_numeric_text, read_raw, read_raw_chunks, records_to_frame
+
+
+@pytest.fixture
+def records(make_record):
+    return [
+        make_record("0001-AAAAA"),
+        make_record("0002-BBBBB", tenure=12.7),
+        make_record("0003-CCCCC", Total=" "),
+        make_record("0004-DDDDD", Monthly="abc", Total="abc"),
+        make_record("0005-EEEEE", tenure=None),
+    ]
+
+
+def test_iter_raw_records_across_block_boundaries(records, tmp_path):
+    path = tmp_path / "export.json"
+    path.write_text(json.dumps(records, indent=2, ensure_ascii=False), encoding="utf-8")
+    # Blocos menores que um registro obrigam a juntar texto várias vezes
+    assert list(iter_raw_records(str(path), block_size=7)) == records
+
+
+def test_iter_raw_records_rejects_unclosed_array(tmp_path):
+    path = tmp_path / "export.json"
+    path.write_text('[{"customerID": "0001-AAAAA"},', encoding="utf-8")
+    with pytest.raises(ValueError):
+        list(iter_raw_records(str(path), block_size=4))
+
+
+def test_chunks_concatenate_to_read_raw(records, write_export):
+    path = write_export(records)
+    chunks = list(read_raw_chunks(path, chunk_size=2))
+    assert [len(c) for c in chunks] == [2, 2, 1]
+    df = read_raw(path, chunk_size=2)
+    assert list(df.columns) == RAW_COLUMNS
+    pd.testing.assert_frame_equal(df, pd.concat(chunks, ignore_index=True))
+    pd.testing.assert_frame_equal(df, read_raw(path, chunk_size=100))
+    with pytest.raises(ValueError):
+        next(read_raw_chunks(path, chunk_size=0))
+
+
+def test_rejected_counts_are_summed_across_chunks(records, write_export):
+    df = read_raw(write_export(records), chunk_size=2)
+    rejected = df.attrs["rejected"]
+    assert rejected["rows"] == 5
+    assert rejected["columns"]["customer.tenure"] == {"blank": 0, "invalid": 1}
+    assert rejected["columns"]["account.Charges.Total"] == {"blank": 1, "invalid": 1}
+    assert rejected["columns"]["account.Charges.Monthly"] == {"blank": 0, "invalid": 1}
+    # Ausente no JSON (tenure=None) não é rejeitado, só vira NaN
+    assert np.isnan(df["customer.tenure"]).tolist() == [False, True, False, False, True]
+    assert df["account.Charges.Total"].iloc[0] == 593.3
+
+
+def test_parse_numeric_text_matches_to_numeric():
+    tokens = ["593.3", " ", "", "abc", "1.2.3", "-1e3", " 42 ", "7"]
+    raw = np.array(tokens, dtype="S32")
+    missing = np.array([False] * 7 + [True])
+    values, rejected = parse_numeric_text(raw, missing)
+    expected = pd.to_numeric(pd.Series(tokens[:7]).str.strip().replace("", None), errors="coerce")
+    np.testing.assert_array_equal(values[:7], expected.to_numpy(dtype="float64"))
+    # Ausente vira NaN sem contar; brancos e textos inválidos são contados separados
+    assert np.isnan(values[7])
+    assert rejected == {"blank": 2, "invalid": 2}
+
+
+def test_numeric_text_columns_accept_json_numbers(make_record):
+    df = records_to_frame([
+        make_record("0001-AAAAA", Total=593.3),
+        make_record("0002-BBBBB", Total="1.5"),
+        make_record("0003-CCCCC", Total="Ação"),
+        make_record("0004-DDDDD", Total=None),
+    ])
+    assert df["account.Charges.Total"].dtype == "float64"
+    assert df["account.Charges.Total"].tolist()[:2] == [593.3, 1.5]
+    assert df["account.Charges.Total"].isna().tolist() == [False, False, True, True]
+    assert df.attrs["rejected"]["columns"]["account.Charges.Total"] == {"blank": 0, "invalid": 1}
@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+
+from data_cleaning import clean_data
+from data_transformation import transform_data
+from feature_engineering import add_features
+from ingestion import records_to_frame
+from normalization import CLEANING_MAPS, TRANSLATION_MAPS, normalize_column, replace_unexpected
+
+
+def _values(series):
+    return [None if pd.isna(v) else v for v in series.astype(object)]
+
+
+def test_normalize_column_matches_row_by_row_pandas():
+    raw = pd.Series([" Yes", "no", "YES ", None, "", 3, "No"] * 3, name="Churn")
+    expected = raw.str.strip().str.lower().replace(CLEANING_MAPS["Churn"])
+    assert _values(normalize_column(raw, CLEANING_MAPS["Churn"])) == _values(expected)
+
+    contract = pd.Series(["one year", "two year", "month-to-month", "unknown", np.nan])
+    expected = contract.map(TRANSLATION_MAPS["Tipo_Contrato"])
+    out = normalize_column(contract, TRANSLATION_MAPS["Tipo_Contrato"], standardize=False, keep_unmapped=False)
+    assert _values(out) == _values(expected)
+    assert isinstance(out.dtype, pd.CategoricalDtype)
+
+
+def test_normalize_column_builds_integer_flags():
+    out = normalize_column(pd.Series(["yes", "no", "unknown"]), TRANSLATION_MAPS["Tem_Conjuge"],
+                           standardize=False, keep_unmapped=False)
+    assert out.dtype == "int64" and out.tolist() == [1, 0, 0]
+    out = normalize_column(pd.Series(["yes", "no phone service"]), TRANSLATION_MAPS["Linhas_Adicionais"],
+                           standardize=False, keep_unmapped=False)
+    assert out.dtype == "float64" and _values(out) == [1.0, None]
+
+
+def test_replace_unexpected_counts_rows():
+    series = pd.Series(["yes", "talvez", None, "talvez", "no"])
+    out, unexpected = replace_unexpected(series, ["yes", "no", "unknown"])
+    assert unexpected == {"talvez": 2}
+    assert out.astype(object).where(out.notna(), None).tolist() == ["yes", "unknown", None, "unknown", "no"]
+    series = pd.Series(["yes", "no"])
+    same, none = replace_unexpected(series, ["yes", "no"])
+    assert same is series and none == {}
+
+
+def test_unexpected_category_does_not_stop_the_pipeline(make_record, capsys):
+    df = records_to_frame([
+        make_record("0001-AAAAA"),
+        make_record("0002-BBBBB", Contract=" Quarterly "),
+        make_record("0003-CCCCC", Partner="Talvez"),
+    ])
+    cleaned = clean_data(df)
+    out = capsys.readouterr().out
+    assert "'account.Contract': 1 valor(es) fora das categorias esperadas" in out
+    assert "'customer.Partner': 1 valor(es)" in out
+    assert cleaned["account.Contract"].tolist() == ["one year", "unknown", "one year"]
+    assert cleaned["customer.Partner"].tolist() == ["yes", "yes", "unknown"]
+
+    # Como no baseline, a transformação não tem tradução para o valor: fica ausente
+    transformed = transform_data(add_features(cleaned))
+    assert transformed["Tipo_Contrato"].isna().tolist() == [False, True, False]
+    assert transformed["Tem_Conjuge"].tolist() == [1, 1, 0]
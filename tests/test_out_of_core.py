@@ -0,0 +1,30 @@
+import pandas as pd
+
+import storage
+from data_cleaning import clean_data, relevant_subset
+from feature_engineering import add_features
+from imputation import fit_fill_values
+from ingestion import read_raw
+from out_of_core import run_out_of_core
+
+
+def test_out_of_core_matches_the_in_memory_stages(make_record, write_export, tmp_path):
+    records = [make_record(f"000{i}-AAAAA", tenure=i, Monthly=20.0 + i) for i in range(7)]
+    records[2] = make_record("0002-AAAAA", Total=" ")
+    records.append(make_record("0004-AAAAA", Churn="Yes"))  # duplicado: fica a primeira ocorrência
+    records.append(make_record("0009-AAAAA", Total=None, tenure=None))
+    path = write_export(records)
+    directory = str(tmp_path / "clean")
+
+    paths, fill_values, rows = run_out_of_core(path, keep=("cleaned", "features"), n_partitions=3, chunk_rows=2,
+                                               spill_dir=str(tmp_path / "spill"), directory=directory)
+    assert rows == len(records)
+
+    raw = read_raw(path)
+    expected_fill = fit_fill_values(relevant_subset(raw))
+    assert fill_values == expected_fill
+    cleaned = clean_data(raw, fill_values=expected_fill).reset_index(drop=True)
+    pd.testing.assert_frame_equal(storage.load_table("telecom_churn_cleaned", directory=directory), cleaned)
+    pd.testing.assert_frame_equal(storage.load_table("telecom_churn_features", directory=directory),
+                                  add_features(cleaned))
+    assert not (tmp_path / "spill").exists()
@@ -0,0 +1,62 @@
+from data_quality_checks import check_raw
+
+
+def _entry(result, column, check):
+    return next(e for e in result["rules"] if e["column"] == column and e["check"] == check)
+
+
+def test_raw_numeric_values_reach_the_type_checks(make_record, write_export):
+    path = write_export([
+        make_record("0001-AAAAA", SeniorCitizen=1, tenure=12),
+        make_record("0002-BBBBB", tenure=12.7),
+        make_record("0003-CCCCC", SeniorCitizen=True),
+        make_record("0004-DDDDD", Monthly="abc"),
+    ])
+    result = check_raw(path, chunk_size=2)
+
+    tenure = _entry(result, "customer.tenure", "integer")
+    assert tenure["violations"] == 1 and tenure["samples"][0]["value"] == 12.7
+    senior = _entry(result, "customer.SeniorCitizen", "numeric")
+    assert senior["violations"] == 1 and senior["samples"][0]["value"] is True
+    monthly = _entry(result, "account.Charges.Monthly", "numeric")
+    assert monthly["violations"] == 1 and monthly["samples"][0]["value"] == "abc"
+    # Valores presentes, mesmo inválidos, não são ausentes
+    for column in ("customer.tenure", "customer.SeniorCitizen", "account.Charges.Monthly"):
+        assert _entry(result, column, "not_null")["violations"] == 0
+    assert not result["passed"]
+
+
+def _strip_samples(result):
+    return [{k: v for k, v in e.items() if k != "samples"} for e in result["rules"]]
+
+
+def test_rules_accumulate_across_chunks(make_record, write_export):
+    path = write_export([
+        make_record("0001-AAAAA"),
+        make_record("0002-BBBBB", Partner=" Yes", Contract="ONE YEAR"),
+        make_record("0001-AAAAA", tenure=-3),
+        make_record("bad-id", Partner="Talvez", Monthly=None),
+    ])
+    result = check_raw(path, chunk_size=1)
+    assert result["rows"] == 4
+    unique = _entry(result, "customerID", "unique")
+    # A repetição está em outro chunk; a linha de exemplo é a posição no export inteiro
+    assert unique["violations"] == 1 and unique["samples"][0]["row"] == 2
+    assert _entry(result, "customerID", "pattern")["violations"] == 1
+    assert _entry(result, "customer.Partner", "hygiene")["status"] == "aviso"
+    assert _entry(result, "customer.Partner", "allowed")["samples"][0]["value"] == "Talvez"
+    assert _entry(result, "account.Contract", "casing")["violations"] == 1
+    assert _entry(result, "account.Contract", "allowed")["violations"] == 0
+    assert _entry(result, "customer.tenure", "range")["violations"] == 1
+    assert _entry(result, "account.Charges.Monthly", "not_null")["violations"] == 1
+    assert _entry(result, "account.Charges.Monthly", "range")["violations"] == 0
+    assert not result["passed"]
+    assert _strip_samples(check_raw(path, chunk_size=100)) == _strip_samples(result)
+
+
+def test_error_rules_fail_only_above_max_rate(make_record, write_export):
+    path = write_export([make_record(f"000{i}-AAAAA") for i in range(9)] + [make_record("0009-AAAAA", tenure=200)])
+    assert check_raw(path)["errors"] == 1 and not check_raw(path)["passed"]
+    result = check_raw(path, max_rate=0.1)
+    assert _entry(result, "customer.tenure", "range")["status"] == "ok"
+    assert result["passed"]
@@ -0,0 +1,74 @@
+import os
+
+import pandas as pd
+
+import columnar
+import raw_cache
+
+
+def test_miss_installs_rejected_and_last_used_with_the_snapshot(make_record, write_export, tmp_path, monkeypatch):
+    path = write_export([make_record("0001-AAAAA"), make_record("0002-BBBBB", Monthly="abc")])
+    cache_dir = str(tmp_path / "cache")
+    swapped = []
+    replace = columnar.replace_directory
+
+    def spy(tmp_dir, directory):
+        swapped.append(sorted(os.listdir(tmp_dir)))
+        return replace(tmp_dir, directory)
+
+    monkeypatch.setattr(columnar, "replace_directory", spy)
+    df = raw_cache.load_raw(path, cache_dir=cache_dir)
+
+    # Os dois arquivos já estavam no diretório temporário quando ele foi instalado
+    assert raw_cache.REJECTED_FILE in swapped[0] and raw_cache.LAST_USED_FILE in swapped[0]
+    assert df.attrs["rejected"]["columns"]["account.Charges.Monthly"]["invalid"] == 1
+    assert raw_cache.load_raw(path, cache_dir=cache_dir).attrs["rejected"] == df.attrs["rejected"]
+
+
+def test_hits_skip_parsing_and_changes_miss(make_record, write_export, tmp_path, monkeypatch):
+    path = write_export([make_record("0001-AAAAA"), make_record("0002-BBBBB")])
+    cache_dir = str(tmp_path / "cache")
+    parses = []
+    read_raw = raw_cache.read_raw
+    monkeypatch.setattr(raw_cache, "read_raw", lambda p: parses.append(p) or read_raw(p))
+
+    first = raw_cache.load_raw(path, cache_dir=cache_dir)
+    hit = raw_cache.load_raw(path, cache_dir=cache_dir)
+    assert len(parses) == 1
+    pd.testing.assert_frame_equal(hit, first)
+    pd.testing.assert_frame_equal(raw_cache.load_raw(path, columns=["customerID"], cache_dir=cache_dir),
+                                  first[["customerID"]])
+
+    # Conteúdo novo no mesmo caminho: outro hash, outro snapshot
+    write_export([make_record("0003-CCCCC")])
+    assert raw_cache.load_raw(path, cache_dir=cache_dir)["customerID"].tolist() == ["0003-CCCCC"]
+    assert len(parses) == 2
+    assert len([name for name in os.listdir(cache_dir) if os.path.isdir(os.path.join(cache_dir, name))]) == 2
+
+
+def test_fingerprint_reuses_the_hash_while_size_and_mtime_match(write_export, tmp_path, monkeypatch):
+    path = write_export([], name="vazio.json")
+    cache_dir = str(tmp_path / "cache")
+    hashed = []
+    file_sha256 = raw_cache._file_sha256
+    monkeypatch.setattr(raw_cache, "_file_sha256", lambda p: hashed.append(p) or file_sha256(p))
+    sha = raw_cache.fingerprint(path, cache_dir)
+    assert raw_cache.fingerprint(path, cache_dir) == sha and len(hashed) == 1
+    os.utime(path, ns=(0, 0))
+    assert raw_cache.fingerprint(path, cache_dir) == sha and len(hashed) == 2
+
+
+def test_evict_removes_least_recently_used_first(tmp_path):
+    cache_dir = tmp_path / "cache"
+    for i, name in enumerate(["antigo", "medio", "novo"]):
+        snapshot = cache_dir / name
+        snapshot.mkdir(parents=True)
+        (snapshot / "dados.bin").write_bytes(b"x" * 100)
+        (snapshot / raw_cache.LAST_USED_FILE).write_text(str(1000 + i), encoding="utf-8")
+    size = raw_cache.directory_size(str(cache_dir / "novo"))
+
+    # "antigo" é o menos usado, mas está em uso (keep): sai o seguinte
+    assert raw_cache.evict(str(cache_dir), max_bytes=2 * size, keep={"antigo"}) == ["medio"]
+    assert raw_cache.evict(str(cache_dir), max_bytes=size) == ["antigo"]
+    assert sorted(os.listdir(cache_dir)) == ["novo"]
+    assert raw_cache.evict(str(tmp_path / "nao_existe"), max_bytes=0) == []
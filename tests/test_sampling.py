@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from sampling import (ROW_COL, STRATUM_COL, estimate_proportion, estimate_quantiles, sample_chunks, sample_frame,
+                      sample_records)
+
+
+def _population(n=20_000, seed=3):
+    rng = np.random.default_rng(seed)
+    churn = np.where(rng.random(n) < 0.25, "Yes", "No").astype(object)
+    churn[:50] = " yes"  # mesma chave de estrato que "Yes"
+    return pd.DataFrame({"Churn": churn, "valor": rng.gamma(2.0, 30.0, n), "flag": rng.random(n) < 0.1})
+
+
+def test_reservoirs_keep_size_rows_per_stratum_with_exact_counts():
+    df = _population()
+    chunks = (df.iloc[start:start + 777] for start in range(0, len(df), 777))
+    frame, strata = sample_frame(sample_chunks(chunks, 500, by="Churn"))
+    seen = {key: (N, n) for key, N, n in strata}
+    assert seen == {"yes": ((df["Churn"].str.strip().str.lower() == "yes").sum(), 500),
+                    "no": ((df["Churn"] == "No").sum(), 500)}
+    # Cada linha da amostra é a linha do arquivo indicada em ROW_COL
+    rows = frame[ROW_COL].to_numpy()
+    assert len(np.unique(rows)) == len(rows)
+    np.testing.assert_array_equal(frame["valor"].to_numpy(), df["valor"].to_numpy()[rows])
+
+
+def test_sample_records_matches_the_reservoir_format():
+    records = [{"Churn": c, "id": i} for i, c in enumerate(["Yes", "No", "No", None] * 100)]
+    sample = sample_records(records, 10, key=lambda r: r["Churn"], by="Churn")
+    frame, strata = sample_frame(sample)
+    assert sample["rows"] == 400
+    assert sorted((str(k), N, n) for k, N, n in strata) == [("None", 100, 10), ("no", 200, 10), ("yes", 100, 10)]
+    assert (frame["id"] == frame[ROW_COL]).all()
+
+
+def test_fully_sampled_strata_give_exact_estimates():
+    strata = [("no", 30, 30), ("yes", 10, 10)]
+    assert estimate_proportion(strata, [3, 5]) == {"estimate": 0.2, "low": 0.2, "high": 0.2, "se": 0.0}
+
+
+def test_intervals_cover_the_population_values():
+    df = _population()
+    frame, strata = sample_frame(sample_chunks([df], 1000, by="Churn"))
+    codes = frame[STRATUM_COL].to_numpy()
+
+    flag = estimate_proportion(strata, np.bincount(codes[frame["flag"].to_numpy()], minlength=len(strata)))
+    assert flag["low"] < df["flag"].mean() < flag["high"]
+    assert flag["high"] - flag["low"] < 0.05
+
+    median = estimate_quantiles(frame["valor"], codes, strata, percentiles=[0.5])[0.5]
+    assert median["low"] <= df["valor"].median() <= median["high"]
+
+
+def test_sample_size_must_be_positive():
+    with pytest.raises(ValueError):
+        sample_chunks([], 0)
@@ -0,0 +1,93 @@
+import sys
+
+import pytest
+
+import scheduler
+
+STAGE_MODULE = '''
+CALLS = []
+
+def _copy(name, src, dst, transform):
+    CALLS.append(name)
+    with open(src, encoding="utf-8") as f:
+        text = f.read()
+    if text == "falha":
+        raise RuntimeError("etapa falhou")
+    with open(dst, "w", encoding="utf-8") as f:
+        f.write(transform(text))
+
+def make_a():
+    _copy("a", {src!r}, {a!r}, lambda text: text.strip().upper())
+
+def make_b():
+    _copy("b", {a!r}, {b!r}, lambda text: text + "!")
+'''
+
+
+@pytest.fixture
+def dag(tmp_path, monkeypatch):
+    paths = {name: str(tmp_path / f"{name}.txt") for name in ("src", "a", "b")}
+    module_dir = tmp_path / "modulos"
+    module_dir.mkdir()
+    (module_dir / "etapas_teste.py").write_text(STAGE_MODULE.format(**paths), encoding="utf-8")
+    monkeypatch.syspath_prepend(str(module_dir))
+    # Cada teste tem os próprios caminhos: o módulo é importado de novo
+    monkeypatch.delitem(sys.modules, "etapas_teste", raising=False)
+    import etapas_teste
+
+    stages = {
+        "b": {"target": "etapas_teste:make_b", "inputs": [paths["a"]], "outputs": [paths["b"]], "code": []},
+        "a": {"target": "etapas_teste:make_a", "inputs": [paths["src"]], "outputs": [paths["a"]], "code": []},
+    }
+    state_path = str(tmp_path / "stages.json")
+
+    def run(**kwargs):
+        etapas_teste.CALLS.clear()
+        status = scheduler.run(stages=stages, state_path=state_path, max_workers=1, **kwargs)
+        return status, list(etapas_teste.CALLS)
+
+    def write(text):
+        with open(paths["src"], "w", encoding="utf-8") as f:
+            f.write(text)
+
+    write("abc")
+    return stages, paths, run, write
+
+
+def test_order_follows_artifacts(dag):
+    stages = dag[0]
+    assert scheduler.dependencies(stages) == {"a": [], "b": ["a"]}
+    assert scheduler.topological_order(stages) == ["a", "b"]
+    assert scheduler.with_upstream(["b"], stages) == ["a", "b"]
+    with pytest.raises(ValueError):
+        scheduler.with_upstream(["c"], stages)
+    cycle = dict(stages, a=dict(stages["a"], inputs=stages["b"]["outputs"]))
+    with pytest.raises(ValueError, match="Ciclo"):
+        scheduler.topological_order(cycle)
+
+
+def test_up_to_date_stages_are_skipped(dag):
+    _, paths, run, write = dag
+    assert run() == ({"a": "executada", "b": "executada"}, ["a", "b"])
+    assert run() == ({"a": "atualizada", "b": "atualizada"}, [])
+
+    # Entrada nova, mas 'a' grava a mesma saída: 'b' continua atualizada
+    write("  ABC ")
+    assert run() == ({"a": "executada", "b": "atualizada"}, ["a"])
+
+    # Saída alterada fora do scheduler: a etapa que a grava roda de novo
+    with open(paths["b"], "w", encoding="utf-8") as f:
+        f.write("editado")
+    assert run() == ({"a": "atualizada", "b": "executada"}, ["b"])
+
+    assert run(force=True)[1] == ["a", "b"]
+    assert run(targets=["a"], force=True) == ({"a": "executada"}, ["a"])
+
+
+def test_failed_stage_blocks_downstream_and_reruns(dag, capsys):
+    _, _, run, write = dag
+    run()
+    write("falha")
+    assert run() == ({"a": "falhou", "b": "não executada"}, ["a"])
+    write("xyz")
+    assert run() == ({"a": "executada", "b": "executada"}, ["a", "b"])
@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from schema import CLEANED_SCHEMA, SchemaError, apply_schema, validate_schema
+
+
+def test_float_to_integer_columns_round_instead_of_truncating():
+    df = pd.DataFrame({"customer.tenure": [29.5, 28.5, 12.7, 3.0]})
+    out = apply_schema(df, "cleaned")
+    assert out["customer.tenure"].dtype == "int16"
+    # Metades para o par, como Series.round
+    assert out["customer.tenure"].tolist() == [30, 28, 13, 3]
+
+
+def test_money_columns_stay_float64():
+    df = pd.DataFrame({"account.Charges.Monthly": [35.425], "account.Charges.Total": [np.float32(1.5)]})
+    out = apply_schema(df, "cleaned")
+    assert out.dtypes.astype(str).tolist() == ["float64", "float64"]
+    assert out["account.Charges.Monthly"].iloc[0] == 35.425
+
+
+def test_blank_churn_becomes_missing_boolean():
+    out = apply_schema(pd.DataFrame({"Churn": [True, False, "", None]}, dtype=object), "cleaned")
+    assert str(out["Churn"].dtype) == "boolean"
+    assert out["Churn"].isna().tolist() == [False, False, True, True]
+
+
+def test_categories_follow_the_declared_order():
+    series = pd.Series(pd.Categorical(["yes", "no"], categories=["unknown", "yes", "no"]))
+    out = apply_schema(pd.DataFrame({"customer.Partner": series}), "cleaned")
+    assert list(out["customer.Partner"].cat.categories) == list(CLEANED_SCHEMA["customer.Partner"].categories)
+    assert out["customer.Partner"].tolist() == ["yes", "no"]
+
+
+def test_values_outside_the_categories_raise():
+    with pytest.raises(SchemaError, match="account.Contract"):
+        apply_schema(pd.DataFrame({"account.Contract": ["one year", "quarterly"]}), "cleaned")
+
+
+def test_validate_schema_reports_missing_columns_and_dtypes():
+    df = apply_schema(pd.DataFrame({"customerID": ["C-1"], "customer.tenure": [1.0]}), "cleaned")
+    df["customer.tenure"] = df["customer.tenure"].astype("int64")
+    problems = validate_schema(df, "cleaned", strict=False)
+    assert "'customer.tenure': dtype int64, esperado int16" in problems
+    assert "coluna ausente: 'Churn'" in problems
+    with pytest.raises(SchemaError):
+        validate_schema(df, "cleaned")
@@ -0,0 +1,85 @@
+import json
+import threading
+import http.client
+
+import pytest
+
+import scoring_service
+
+FILL_VALUES = {"customer.SeniorCitizen": 0.0, "customer.tenure": 29.0,
+               "account.Charges.Monthly": 70.35, "account.Charges.Total": 1397.47}
+
+
+@pytest.fixture(scope="module")
+def model():
+    return scoring_service.compile_model(FILL_VALUES)
+
+
+def test_batch_matches_the_pipeline(model, make_record):
+    records = [
+        make_record("0001-AAAAA"),
+        make_record("0002-BBBBB", Total=" ", tenure=None, Churn=""),
+        make_record("0003-CCCCC", Monthly=100.954, Contract=" Two year ", InternetService="No"),
+        make_record("0004-DDDDD", MultipleLines="No phone service", gender=None),
+    ]
+    expected = scoring_service.frame_rows(scoring_service.run_pipeline_batch(records, FILL_VALUES))
+    rows, errors = scoring_service.transform_records(records, model)
+    assert errors == [None] * 4
+    assert rows == expected
+    assert rows[2]["Cobranca_Diaria"] == 3.37
+
+
+def test_invalid_records_fail_alone(model, make_record):
+    records = [make_record("0001-AAAAA", tenure=-1), make_record("0002-BBBBB"),
+               make_record("0003-CCCCC", Contract="Quarterly")]
+    rows, errors = scoring_service.transform_records(records, model)
+    assert rows[0] is None and "negativo" in errors[0]
+    assert rows[1]["ID_Cliente"] == "0002-BBBBB" and errors[1] is None
+    assert rows[2] is None and "account.Contract" in errors[2]
+
+
+def _submit_together(service, requests):
+    results = [None] * len(requests)
+
+    def client(i):
+        results[i] = scoring_service.submit(service, requests[i])
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(len(requests))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+    return results
+
+
+def test_concurrent_requests_share_batches_and_get_their_own_rows(model, make_record):
+    service = scoring_service.start_batcher(model, max_batch=2, batch_wait_ms=500)
+    requests = [[make_record(f"000{i}-AAAAA")] for i in range(3)]
+    results = _submit_together(service, requests)
+    # Lote fecha ao chegar a max_batch registros: 3 requisições simultâneas = 2 lotes
+    assert service["batches"] == 2 and service["records"] == 3
+    for request, (rows, errors) in zip(requests, results):
+        assert [row["ID_Cliente"] for row in rows] == [request[0]["customerID"]] and errors == [None]
+
+
+def test_http_transform_and_health(model, make_record):
+    service = scoring_service.start_batcher(model)
+    server = scoring_service.make_server(service, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        conn = http.client.HTTPConnection(*server.server_address)
+        body = json.dumps([make_record("0001-AAAAA"), make_record("0002-BBBBB", tenure=-5)])
+        conn.request("POST", "/transform", body, {"Content-Type": "application/json"})
+        reply = json.loads(conn.getresponse().read())
+        assert [row["ID_Cliente"] for row in reply["rows"]] == ["0001-AAAAA"]
+        assert reply["errors"][0]["index"] == 1 and reply["errors"][0]["customerID"] == "0002-BBBBB"
+
+        conn.request("POST", "/transform", "[]")
+        response = conn.getresponse()
+        assert response.status == 400 and "error" in json.loads(response.read())
+        conn.request("GET", "/health")
+        health = json.loads(conn.getresponse().read())
+        assert health["fill_values"] == FILL_VALUES and health["records"] == 2
+    finally:
+        server.shutdown()
+        server.server_close()
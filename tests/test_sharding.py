@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from sharding import median_from_counts, shard_value_counts
+from stats_accumulators import merge_frequencies
+
+# Mediana de preenchimento calculada das contagens somadas entre shards:
+# tem de ser a Series.median() do export inteiro.
+
+
+@pytest.mark.parametrize("values", [
+    [3.0],
+    [1.0, 2.0],
+    [5, 1, 5, 2, 5, 3],
+    [np.nan, 2.5, np.nan, 2.5, 10.0],
+    list(np.random.default_rng(0).integers(0, 73, 1001)),
+    list(np.random.default_rng(1).normal(2000, 900, 1000).round(2)),
+])
+def test_median_from_counts_matches_pandas(values):
+    series = pd.Series(values, dtype="float64")
+    freq = shard_value_counts(series.to_frame("x"))["x"]
+    assert median_from_counts(freq) == series.median()
+
+
+def test_median_from_merged_shards():
+    series = pd.Series(np.random.default_rng(2).lognormal(4, 1, 2000).round(1))
+    series[series > 200] = np.nan
+    shards = [shard_value_counts(series.iloc[start:start + 300].to_frame("x"))["x"] for start in range(0, 2000, 300)]
+    merged = shards[0]
+    for freq in shards[1:]:
+        merged = merge_frequencies(merged, freq)
+    assert median_from_counts(merged) == series.median()
+
+
+def test_median_from_counts_empty():
+    freq = shard_value_counts(pd.DataFrame({"x": [np.nan, np.nan]}))["x"]
+    assert np.isnan(median_from_counts(freq))
@@ -0,0 +1,238 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from stats_accumulators import (finalize, merge_frequencies, merge_moments, merge_sketch, merge_tables, new_column,
+                                new_frequencies, new_moments, new_ordered_sum, new_selection, new_sketch, new_table,
+                                ordered_sum, rank_window, selected_values, sketch_quantile_bounds, sketch_quantiles,
+                                sketch_rank_error, update_frequencies, update_ordered_sum, update_selection,
+                                update_sketch, update_table)
+from stats_engine import describe, value_counts
+
+# Comparações com o pandas: as estatísticas acumuladas chunk a chunk (e
+# combinadas entre acumuladores) têm de bater com as da tabela inteira,
+# qualquer que seja a divisão em chunks.
+
+ROWS = 300  # abaixo de SKETCH_K: o sketch não compacta e os quantis são exatos
+
+
+def _frame(rows=ROWS, seed=0):
+    rng = np.random.default_rng(seed)
+    valor = rng.normal(5000, 1000, rows)
+    valor[rng.random(rows) < 0.1] = np.nan
+    flag = pd.array(rng.integers(0, 2, rows), dtype="Int8")
+    flag[rng.random(rows) < 0.05] = pd.NA
+    tipo = rng.choice(["DSL", "Fibra", None], rows).astype(object)
+    grupo = rng.choice(["A", "B", "C", "D"], rows).astype(object)
+    # Grupo "D" sem nenhum valor numérico em "valor"
+    valor[grupo == "D"] = np.nan
+    return pd.DataFrame({"valor": valor, "meses": rng.integers(0, 73, rows), "flag": flag,
+                         "tipo": tipo, "grupo": grupo})
+
+
+def _chunks(df, size):
+    return [df.iloc[start:start + size] for start in range(0, len(df), size)]
+
+
+def _accumulate(chunks, by=None, k=400):
+    acc = new_table(by, k)
+    for chunk in chunks:
+        update_table(acc, chunk)
+    return acc
+
+
+# -------------------------------------------------
+# Tabela inteira × chunks
+# -------------------------------------------------
+
+@pytest.mark.parametrize("size", [1, 7, 64, ROWS])
+@pytest.mark.parametrize("by", [None, "grupo"])
+def test_chunked_describe_matches_pandas(size, by):
+    df = _frame()
+    stats = finalize(_accumulate(_chunks(df, size), by))
+    pd.testing.assert_frame_equal(describe(stats), df.describe(), check_exact=False, rtol=1e-10)
+    pd.testing.assert_series_equal(value_counts(stats, "tipo"), df["tipo"].value_counts())
+    assert stats["columns"]["tipo"]["overall"]["missing"] == df["tipo"].isna().sum()
+    if by is not None:
+        sizes = df.groupby(by).size()
+        assert stats["groups"] == sizes.index.tolist()
+        assert stats["group_rows"] == sizes.tolist()
+        for level, part in df.groupby(by):
+            pd.testing.assert_frame_equal(describe(stats, level), part.describe(), check_exact=False, rtol=1e-10)
+            pd.testing.assert_series_equal(value_counts(stats, "meses", level), part["meses"].value_counts())
+
+
+def test_empty_group_has_no_numeric_values():
+    df = _frame()
+    stats = finalize(_accumulate(_chunks(df, 50), "grupo"))
+    empty = stats["columns"]["valor"]["groups"][stats["groups"].index("D")]
+    assert empty["count"] == 0
+    assert all(np.isnan(empty[key]) for key in ("mean", "std", "min", "max", "median"))
+    assert all(np.isnan(q) for q in empty["quantiles"].values())
+
+
+def test_column_missing_from_a_group_finalizes_empty():
+    # Um grupo cujos chunks não trazem a coluna recebe um acumulador vazio
+    acc = _accumulate([pd.DataFrame({"g": ["A", "A"], "x": [1.0, 2.0]}), pd.DataFrame({"g": ["B"]})], "g")
+    stats = finalize(acc)
+    assert stats["group_rows"] == [2, 1]
+    missing = stats["columns"]["x"]["groups"][1]
+    assert missing["count"] == 0 and np.isnan(missing["mean"])
+
+
+def test_merged_tables_match_single_pass():
+    df = _frame()
+    parts = [_accumulate(_chunks(part, 13), "grupo") for part in (df.iloc[:40], df.iloc[40:41], df.iloc[41:])]
+    merged = finalize(merge_tables(parts[0], merge_tables(parts[1], parts[2])))
+    single = finalize(_accumulate([df], "grupo"))
+    for level in [None] + single["groups"]:
+        pd.testing.assert_frame_equal(describe(merged, level), describe(single, level), check_exact=False, rtol=1e-12)
+
+
+def test_merge_tables_rejects_different_by():
+    with pytest.raises(ValueError):
+        merge_tables(new_table("grupo"), new_table(None))
+
+
+# -------------------------------------------------
+# Momentos e frequências
+# -------------------------------------------------
+
+def test_moments_merge_with_empty():
+    empty = merge_moments(new_moments(), new_moments())
+    assert empty["count"] == 0 and np.isnan(empty["min"])
+    values = {"count": 2, "mean": 1.5, "m2": 0.5, "min": 1.0, "max": 2.0}
+    assert merge_moments(new_moments(), values) == values
+    assert merge_moments(values, new_moments()) == values
+
+
+def test_empty_numeric_column_finalizes_to_nan():
+    stats = finalize(_accumulate([pd.DataFrame({"x": pd.Series([np.nan, np.nan])})]))
+    overall = stats["columns"]["x"]["overall"]
+    assert overall["count"] == 0 and np.isnan(overall["mean"]) and np.isnan(overall["var"])
+    assert overall["quantile_error"] == 0.0
+
+
+def test_frequencies_in_first_appearance_order():
+    series = _frame()["tipo"]
+    acc = new_frequencies()
+    for chunk in _chunks(series, 17):
+        update_frequencies(acc, chunk)
+    split = merge_frequencies(update_frequencies(new_frequencies(), series.iloc[:100]),
+                              update_frequencies(new_frequencies(), series.iloc[100:]))
+    expected = series.value_counts(sort=False)
+    for freq in (acc, split):
+        assert list(freq["counts"]) == expected.index.tolist()
+        assert list(freq["counts"].values()) == expected.tolist()
+        assert freq["missing"] == series.isna().sum()
+
+
+# -------------------------------------------------
+# Sketch KLL
+# -------------------------------------------------
+
+def test_sketch_is_exact_before_compacting():
+    values = _frame()["valor"].dropna().to_numpy()
+    sketches = [update_sketch(new_sketch(400), chunk) for chunk in np.array_split(values, 5)]
+    merged = sketches[0]
+    for sketch in sketches[1:]:
+        merged = merge_sketch(merged, sketch)
+    percentiles = [0, 0.1, 0.25, 0.5, 0.75, 0.9, 1]
+    assert merged["error_sq"] == 0 and sketch_rank_error(merged) == 0
+    assert sketch_quantiles(merged, percentiles) == pd.Series(values).quantile(percentiles).tolist()
+
+
+@pytest.mark.parametrize("build", ["chunks", "merge"])
+def test_sketch_rank_error_is_bounded(build):
+    rng = np.random.default_rng(1)
+    values = rng.lognormal(8, 1, 50_000)
+    k = 64
+    if build == "chunks":
+        sketch = new_sketch(k)
+        for chunk in np.array_split(values, 51):
+            update_sketch(sketch, chunk)
+    else:
+        parts = [update_sketch(new_sketch(k, seed), chunk) for seed, chunk in enumerate(np.array_split(values, 8))]
+        sketch = parts[0]
+        for part in parts[1:]:
+            sketch = merge_sketch(sketch, part)
+    assert sketch["n"] == values.size
+    # Memória limitada: ~3·k itens, e não os 50 mil valores
+    assert sum(level.size for level in sketch["levels"]) <= 3 * k + 2 * len(sketch["levels"])
+
+    ordered = np.sort(values)
+    percentiles = np.linspace(0, 1, 26).tolist()
+    eps = sketch_rank_error(sketch)
+    assert 0 < eps < 0.1
+    # Nas pontas a faixa vai até o mínimo/máximo exatos, que o sketch não guarda
+    bounds = sketch_quantile_bounds(sketch, percentiles, lowest=ordered[0], highest=ordered[-1])
+    for p, q in zip(percentiles, sketch_quantiles(sketch, percentiles)):
+        lo, hi = np.searchsorted(ordered, q, "left"), np.searchsorted(ordered, q, "right")
+        assert lo - 1 <= (p + eps) * values.size and hi + 1 >= (p - eps) * values.size
+        low, high = bounds[p]
+        assert low <= np.quantile(values, p) <= high
+
+
+# -------------------------------------------------
+# Somas na ordem do numpy
+# -------------------------------------------------
+
+@pytest.mark.parametrize("dtype", ["float32", "float64"])
+@pytest.mark.parametrize("size", [3, 1000, 8192, 8193, 30_000])
+def test_ordered_sum_is_bitwise_numpy(dtype, size):
+    rng = np.random.default_rng(2)
+    values = (rng.normal(0, 1e4, 3 * np.getbufsize() + 123)).astype(dtype)
+    acc = new_ordered_sum(dtype)
+    for start in range(0, values.size, size):
+        update_ordered_sum(acc, values[start:start + size])
+    assert ordered_sum(acc) == np.sum(values, dtype=dtype)
+    assert ordered_sum(new_ordered_sum(dtype)) == 0
+
+
+# -------------------------------------------------
+# Seleção exata de postos
+# -------------------------------------------------
+
+@pytest.mark.parametrize("kind", ["int", "float"])
+def test_rank_selection_matches_sort(kind):
+    rng = np.random.default_rng(3)
+    values = rng.integers(0, 500, 20_000) if kind == "int" else rng.normal(70, 30, 20_000)
+    sketch = new_sketch(128)
+    for chunk in np.array_split(values, 20):
+        update_sketch(sketch, chunk.astype("float64"))
+    assert sketch["error_sq"] > 0
+    n = values.size
+    ranks = [n // 4, (n - 1) // 2, n // 2, 3 * n // 4]
+    selection = new_selection(*rank_window(sketch, n, ranks))
+    for chunk in np.array_split(values, 7):
+        update_selection(selection, chunk)
+    selected = selected_values(selection, ranks)
+    assert selected.dtype == values.dtype
+    assert selected.tolist() == np.sort(values)[ranks].tolist()
+
+
+def test_finalized_bounds_contain_pandas_quantiles():
+    rng = np.random.default_rng(4)
+    df = pd.DataFrame({"x": rng.exponential(100, 20_000), "g": rng.choice(["A", "B"], 20_000)})
+    stats = finalize(_accumulate(_chunks(df, 1000), "g", k=32))
+    for level, part in [(None, df)] + list(df.groupby("g")):
+        summary = stats["columns"]["x"]["overall" if level is None else "groups"]
+        summary = summary if level is None else summary[stats["groups"].index(level)]
+        assert summary["quantile_error"] > 0
+        for p, (low, high) in summary["quantile_bounds"].items():
+            assert low <= part["x"].quantile(p) <= high
+
+
+def test_rank_selection_reports_missed_window():
+    values = np.arange(100.0)
+    selection = update_selection(new_selection(40.0, 60.0), values)
+    assert selected_values(selection, [50]).tolist() == [50.0]
+    assert selected_values(selection, [10]) is None
+    assert selected_values(selection, [90]) is None
+    assert selected_values(new_selection(1000.0, 2000.0), [0]) is None
+
+
+def test_new_column_kinds():
+    assert new_column(np.dtype("float64"))["freq"] is None
+    assert new_column(np.dtype("int64"))["freq"] is not None
+    assert new_column(np.dtype("object"))["kind"] == "categorical"
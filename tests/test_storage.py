@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import storage
+from columnar import read_frame, write_frame
+from data_cleaning import clean_data
+from ingestion import records_to_frame
+
+
+@pytest.fixture
+def cleaned(make_record):
+    df = records_to_frame([
+        make_record("0001-AAAAA"),
+        make_record("0002-BBBBB", Churn="", Total=" ", Contract="Month-to-month"),
+        make_record("0003-CCCCC", Churn="Yes", InternetService="No", SeniorCitizen=1),
+    ])
+    return clean_data(df)
+
+
+def test_columnar_round_trip_keeps_values_and_dtypes(tmp_path):
+    df = pd.DataFrame({
+        "id": [f"C-{i}" for i in range(4)],
+        "rotulo": [True, False, "", np.nan],
+        "plano": pd.Categorical(["a", "b", "a", None], categories=["a", "b", "c"]),
+        "meses": np.array([1, 2, 3, 4], dtype="int64"),
+        "valor": [1.5, np.nan, 2.25, 0.0],
+        "flag": pd.array([1, None, 0, 1], dtype="Int8"),
+    })
+    write_frame(df, str(tmp_path / "t"))
+    pd.testing.assert_frame_equal(read_frame(str(tmp_path / "t")), df)
+    pd.testing.assert_frame_equal(read_frame(str(tmp_path / "t"), columns=["valor", "id"]), df[["valor", "id"]])
+    with pytest.raises(KeyError):
+        read_frame(str(tmp_path / "t"), columns=["nao_existe"])
+
+
+@pytest.mark.parametrize("fmt", ["columnar", "csv"])
+def test_save_and_load_table_round_trip(cleaned, tmp_path, fmt):
+    storage.save_table(cleaned, "telecom_churn_cleaned", fmt=fmt, export_csv=False, directory=str(tmp_path))
+    loaded = storage.load_table("telecom_churn_cleaned", directory=str(tmp_path))
+    pd.testing.assert_frame_equal(loaded, cleaned)
+    columns = ["customerID", "account.Charges.Total"]
+    pd.testing.assert_frame_equal(
+        storage.load_table("telecom_churn_cleaned", columns=columns, directory=str(tmp_path)), cleaned[columns])
+
+
+def test_exported_csv_does_not_replace_the_columnar_table(cleaned, tmp_path):
+    directory = str(tmp_path)
+    storage.save_table(cleaned, "telecom_churn_cleaned", export_csv=True, directory=directory)
+    assert (tmp_path / "telecom_churn_cleaned.csv").exists()
+    assert storage.resolve_format("telecom_churn_cleaned", directory) == "columnar"
+    with pytest.raises(FileNotFoundError):
+        storage.load_table("telecom_churn_features", directory=directory)
+
+
+def test_compact_flags_only_touches_binary_integer_columns():
+    df = pd.DataFrame({"flag": [0, 1, 1], "meses": [0, 1, 2], "valor": [0.0, 1.0, 1.0]})
+    out = storage.compact_flags(df)
+    assert out.dtypes.astype(str).tolist() == ["int8", "int64", "float64"]
+
+
+def test_partitioned_round_trip_across_parts(cleaned, tmp_path):
+    directory = str(tmp_path)
+    chunks = [cleaned.iloc[:1], cleaned.iloc[1:]]
+    storage._write_parts(iter(chunks), storage._partitioned_path("telecom_churn_cleaned", directory), part_rows=2)
+    meta = storage._read_parts(str(tmp_path / "telecom_churn_cleaned.parts"))
+    assert [part["rows"] for part in meta["parts"]] == [2, 1]
+    assert storage.resolve_format("telecom_churn_cleaned", directory) == "partitioned"
+
+    pd.testing.assert_frame_equal(storage.load_table("telecom_churn_cleaned", directory=directory), cleaned)
+    assert storage.table_columns("telecom_churn_cleaned", directory) == cleaned.columns.tolist()
+    # Chunks não atravessam partes, mas o índice continua sendo a posição na tabela inteira
+    read = list(storage.iter_table_chunks("telecom_churn_cleaned", 5, columns=["customerID"], directory=directory))
+    assert [chunk.index.tolist() for chunk in read] == [[0, 1], [2]]
+    assert pd.concat(read)["customerID"].tolist() == cleaned["customerID"].tolist()
+
+
+def test_partitioned_table_from_no_chunks_keeps_no_rows(tmp_path):
+    paths = storage.save_table_chunks(iter(()), "vazia", export_csv=False, directory=str(tmp_path))
+    assert storage._read_parts(paths[0])["rows"] == 0
+    assert len(storage.load_table("vazia", directory=str(tmp_path))) == 0